@@ -13,7 +13,7 @@ from .display.views import (
     View2DSurfaceY,
     View2DSurfaceZ,
 )
-from .energyLogging import EnergyLogger, EnergyType
+from .energyLogging import EnergyLogger, EnergyType, MemoryPolicy
 from .materials import ScatteringMaterial
 from .opencl import CONFIG, disableOpenCL, hardwareAccelerationIsAvailable
 from .photon import Photon
@@ -30,6 +30,7 @@ __all__ = [
     "DivergentSource",
     "EnergyLogger",
     "EnergyType",
+    "MemoryPolicy",
     "ScatteringScene",
     "Viewer",
     "PointCloudStyle",
@@ -38,7 +38,9 @@ class ProfileFactory:
         limits = (min(limits), max(limits))
         bins = int((limits[1] - limits[0]) / binSize)
 
-        if self._logger.has3D:
+        # The energy grid only holds the energy deposited in the solids.
+        usesEnergyGrid = self._logger.energyGrid is not None and surfaceLabel is None
+        if self._logger.has3D or usesEnergyGrid:
             histogram = self._extractHistogramFrom3D(
                 horizontalDirection, solidLabel, surfaceLabel, surfaceEnergyLeaving, limits, bins, energyType
             )
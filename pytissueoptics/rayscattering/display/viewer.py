@@ -152,8 +152,8 @@ class Viewer:
         limits: Tuple[tuple, tuple, tuple] = None,
         energyType: EnergyType = EnergyType.DEPOSITION,
     ):
-        if not self._logger.has3D:
-            utils.warn("ERROR: Cannot show 3D volume slicer without 3D data.")
+        if not self._logger.has3D and self._logger.energyGrid is None:
+            utils.warn("ERROR: Cannot show 3D volume slicer without 3D data or an energy grid.")
             return
 
         if binSize is None:
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -33,8 +33,12 @@ class View2DProjection(View2D):
             detectedBy=detectedBy,
         )
 
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
-        return dataPoints
+    def _filterMask(self, dataPoints: np.ndarray) -> Optional[np.ndarray]:
+        return None
+
+    @property
+    def _filterKey(self) -> tuple:
+        return (View2DProjection,)
 
 
 class View2DProjectionX(View2DProjection):
@@ -117,13 +121,18 @@ class View2DSurface(View2D):
             detectedBy=detectedBy,
         )
 
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
+    def _filterMask(self, dataPoints: np.ndarray) -> Optional[np.ndarray]:
         if self._surfaceEnergyLeaving:
-            dataPoints = dataPoints[dataPoints[:, 0] > 0]
-        else:
-            dataPoints = dataPoints[dataPoints[:, 0] < 0]
-            dataPoints[:, 0] *= -1
-        return dataPoints
+            return dataPoints[:, 0] > 0
+        return dataPoints[:, 0] < 0
+
+    @property
+    def _filterKey(self) -> tuple:
+        return View2DSurface, self._surfaceEnergyLeaving
+
+    @property
+    def _valueSign(self) -> int:
+        return 1 if self._surfaceEnergyLeaving else -1
 
     @property
     def group(self) -> ViewGroup:
@@ -223,12 +232,15 @@ class View2DSlice(View2D):
             self._thickness = binSize3D[self.axis]
         super().setContext(limits3D, binSize3D)
 
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
+    def _filterMask(self, dataPoints: np.ndarray) -> Optional[np.ndarray]:
         dataPositions = dataPoints[:, 1 + self.axis]
-        insideSlice = np.logical_and(
+        return np.logical_and(
             dataPositions > self._position - self._thickness / 2, dataPositions < self._position + self._thickness / 2
         )
-        return dataPoints[insideSlice]
+
+    @property
+    def _filterKey(self) -> tuple:
+        return View2DSlice, self.axis, self._position, self._thickness
 
 
 class View2DSliceX(View2DSlice):
@@ -133,27 +133,29 @@ class View2D:
         Used internally by Logger2D to store 3D datapoints into this 2D view.
         Data points are (n, 4) arrays with (value, x, y, z).
         """
-        if self._binsU is None or self._binsV is None:
-            raise RuntimeError("View2D must be initialized with setContext before extracting data.")
+        ViewBinner([self]).extract(dataPoints)
 
-        dataPoints = self._filter(dataPoints)
-        if dataPoints.size == 0:
-            return
-
-        u, v, w = dataPoints[:, 1 + self.axisU], dataPoints[:, 1 + self.axisV], dataPoints[:, 0]
-        sumUVProjection = np.histogram2d(
-            u, v, weights=w, bins=(self._binsU, self._binsV), range=(sorted(self._limitsU), sorted(self._limitsV))
-        )[0]
-        self._dataUV += np.flip(sumUVProjection, axis=1)
-        self._hasData = True
-
-    def _filter(self, dataPoints: np.ndarray) -> np.ndarray:
+    def _filterMask(self, dataPoints: np.ndarray) -> Optional[np.ndarray]:
         """
-        Filters the data points to only keep the ones that are relevant to this view.
+        Returns the mask of the data points that are relevant to this view, or None if they all are.
         Must be implemented by subclasses.
         """
         raise NotImplementedError()
 
+    @property
+    def _filterKey(self) -> tuple:
+        """Identifies the filter of this view, so that the views with the same filter can share their mask."""
+        return self.__class__, self._position, self._thickness, self._surfaceEnergyLeaving
+
+    @property
+    def _valueSign(self) -> int:
+        """Sign applied to the values of the data points extracted to this view."""
+        return 1
+
+    def _addData(self, sumUV: np.ndarray):
+        self._dataUV += np.flip(sumUV, axis=1)
+        self._hasData = True
+
     def flip(self):
         """Flips the view as if it was seen from behind."""
         self._projectionDirection = Direction((self._projectionDirection.value + 3) % 6)
@@ -226,6 +228,12 @@ class View2D:
         plt.ylabel("xyz"[self.axisV])
         plt.show()
 
+    def clearData(self):
+        """Removes the data extracted to this view, so that it can be extracted again."""
+        if self._dataUV is not None:
+            self._dataUV = np.zeros_like(self._dataUV)
+        self._hasData = False
+
     def initDataFrom(self, source: "View2D"):
         """Extract data from one view to another when there is only a difference in orientation."""
         assert self.isContainedBy(source), "Cannot extract data from views that are not equivalent."
@@ -237,6 +245,12 @@ class View2D:
             self._dataUV = np.flip(dataUV.T, axis=(0, 1))
         self._hasData = source._hasData
 
+    def addDataFrom(self, source: "View2D"):
+        """Adds the data extracted to an equal view, like the same view of another logger of the scene."""
+        assert self.isEqualTo(source), "Cannot add data from views that are not equal."
+        self._dataUV += source._dataUV
+        self._hasData = self._hasData or source._hasData
+
     def isEqualTo(self, other: "View2D") -> bool:
         if not self.isContainedBy(other):
             return False
@@ -377,3 +391,89 @@ class View2D:
     @property
     def group(self) -> ViewGroup:
         return ViewGroup.SOLIDS if self.solidLabel else ViewGroup.SCENE
+
+
+class ViewBinner:
+    """
+    Bins the same data points to many 2D views in a single pass, with the same result as `np.histogram2d` for each
+    view. The bin indices along an axis are computed once for all the views with the same limits and number of bins
+    along this axis, and the mask of a filter (like a slice or a surface direction) is computed once for all the views
+    with the same filter. Each distinct histogram is then accumulated once with `np.bincount` and added to all the
+    views that share it, like the projections of a solid with the same axes but a different orientation.
+    """
+
+    def __init__(self, views: List[View2D]):
+        for view in views:
+            if view.binsU is None or view.binsV is None:
+                raise RuntimeError("View2D must be initialized with setContext before extracting data.")
+        self._views = views
+
+    def extract(self, dataPoints: np.ndarray, fluenceRates: Optional[np.ndarray] = None):
+        """
+        Extracts the data points, which are (n, 4) arrays with (value, x, y, z), to the views. If given, the
+        `fluenceRates` are used as the values of the data points for the views of fluence rate.
+        """
+        if dataPoints.size == 0:
+            return
+
+        masks, axisBins, binnedPoints, histograms = {}, {}, {}, {}
+        for view in self._views:
+            filterKey = view._filterKey
+            if filterKey not in masks:
+                masks[filterKey] = view._filterMask(dataPoints)
+            mask = masks[filterKey]
+            if mask is not None and not mask.any():
+                continue
+
+            binsKey = tuple((axis, tuple(sorted(limits)), bins) for axis, limits, bins in self._viewAxes(view))
+            if (filterKey, binsKey) not in binnedPoints:
+                binnedPoints[filterKey, binsKey] = self._binPoints(dataPoints, mask, binsKey, axisBins)
+
+            useFluence = fluenceRates is not None and view.energyType == EnergyType.FLUENCE_RATE
+            histogramKey = (filterKey, binsKey, view._valueSign, useFluence)
+            if histogramKey not in histograms:
+                values = fluenceRates if useFluence else dataPoints[:, 0]
+                flatIndices, keep = binnedPoints[filterKey, binsKey]
+                weights = values[keep] if view._valueSign == 1 else values[keep] * view._valueSign
+                histogram = np.bincount(flatIndices, weights=weights, minlength=view.binsU * view.binsV)
+                histograms[histogramKey] = histogram.reshape(view.binsU, view.binsV)
+            view._addData(histograms[histogramKey])
+
+    @staticmethod
+    def _viewAxes(view: View2D):
+        return (view.axisU, view.limitsU, view.binsU), (view.axisV, view.limitsV, view.binsV)
+
+    @staticmethod
+    def _binPoints(dataPoints: np.ndarray, mask: Optional[np.ndarray], binsKey: tuple, axisBins: dict):
+        """Returns the flat bin index of the data points kept, which are inside the limits and the mask."""
+        (indicesU, insideU), (indicesV, insideV) = [
+            axisBins[axisKey] if axisKey in axisBins else axisBins.setdefault(axisKey, _axisBins(dataPoints, *axisKey))
+            for axisKey in binsKey
+        ]
+        keep = insideU & insideV
+        if mask is not None:
+            keep &= mask
+        binsV = binsKey[1][2]
+        return indicesU[keep] * binsV + indicesV[keep], keep
+
+
+def _axisBins(dataPoints: np.ndarray, axis: int, limits: Tuple[float, float], bins: int):
+    """
+    Returns the bin index of the data points along an axis, and whether they are inside the limits. The bins are the
+    same as `np.histogram2d`: a point on an edge is in the bin to its right, except on the last edge.
+    """
+    lower, upper = limits
+    if lower == upper:
+        lower, upper = lower - 0.5, upper + 0.5
+    positions = np.asarray(dataPoints[:, 1 + axis], dtype=np.float64)
+    inside = (positions >= lower) & (positions <= upper)
+
+    scaledPositions = (positions - lower) * (bins / (upper - lower))
+    scaledPositions[~inside] = 0
+    indices = np.minimum(scaledPositions.astype(np.intp), bins - 1)
+
+    # Corrects the rounding errors of the scaling with the exact edges.
+    edges = np.linspace(lower, upper, bins + 1)
+    indices[inside & (positions < edges[indices])] -= 1
+    indices[inside & (positions >= edges[indices + 1]) & (indices != bins - 1)] += 1
+    return indices, inside
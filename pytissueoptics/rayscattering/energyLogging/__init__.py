@@ -1,11 +1,17 @@
+from .dataPointBuffer import DataPointBuffer
 from .energyLogger import EnergyLogger
+from .energyTally import EnergyTally
 from .energyType import EnergyType
+from .memoryPolicy import MemoryPolicy
 from .pointCloud import PointCloud
 from .pointCloudFactory import PointCloudFactory
 
 __all__ = [
+    "DataPointBuffer",
     "EnergyLogger",
+    "EnergyTally",
     "EnergyType",
+    "MemoryPolicy",
     "PointCloud",
     "PointCloudFactory",
 ]
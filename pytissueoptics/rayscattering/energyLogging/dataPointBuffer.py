@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from pytissueoptics.scene.geometry import Vector
+from pytissueoptics.scene.logger import InteractionKey, Logger
+
+from .energyLogger import EnergyLogger
+from .energyTally import EnergyTally
+
+
+class DataPointBuffer:
+    """
+    Buffer of the data points logged by the photons propagated without hardware acceleration. It is given to the
+    photons in place of the logger, and stores each data point in a preallocated array along with the integer ID of
+    its interaction key. The data points are written to the logger in a single call for all the keys when the buffer
+    is full and when it is flushed at the end of the propagation, so that the 2D views of an `EnergyLogger` are only
+    compiled once per flush. The data points of each key are logged in the same order as they were buffered.
+
+    The energy tally of an `EnergyLogger` is updated with the sum of the data points of each key at each flush.
+    """
+
+    def __init__(self, logger: Logger, capacity: int = 2**16):
+        self._logger = logger
+        self._capacity = capacity
+        self._keyIDs: Dict[InteractionKey, int] = {}
+        self._keys: List[InteractionKey] = []
+        self._points = np.empty((capacity, 5), dtype=np.float64)
+        self._pointKeyIDs = np.empty(capacity, dtype=np.int32)
+        self._size = 0
+        self._width = 5
+
+        isEnergyLogger = isinstance(logger, EnergyLogger)
+        self._tallyEnergy = isEnergyLogger and logger.energyTally is not None
+        self._logDataPoints = not isEnergyLogger or logger.logsDataPoints
+
+    def __len__(self):
+        return self._size
+
+    def logDataPoint(self, value: float, position: Vector, key: InteractionKey, ID: Optional[int] = None):
+        width = 4 if ID is None else 5
+        if width != self._width:
+            self.flush()
+            self._width = width
+        elif self._size == self._capacity:
+            self.flush()
+
+        keyID = self._keyIDs.get(key)
+        if keyID is None:
+            keyID = len(self._keys)
+            self._keyIDs[key] = keyID
+            self._keys.append(key)
+
+        self._points[self._size, :width] = (value, position.x, position.y, position.z, ID)[:width]
+        self._pointKeyIDs[self._size] = keyID
+        self._size += 1
+
+    def flush(self):
+        """Writes the buffered data points to the logger and empties the buffer."""
+        if self._size == 0:
+            return
+        keyArrays = self._getKeyArrays()
+        self._size = 0
+
+        if self._tallyEnergy:
+            energyTally = EnergyTally()
+            for key, array in keyArrays.items():
+                energyTally.addArray(key, array[:, 0])
+            self._logger.logEnergyTally(energyTally)
+        if self._logDataPoints:
+            self._logger.logDataPointArrays(keyArrays)
+
+    def _getKeyArrays(self) -> Dict[InteractionKey, np.ndarray]:
+        """Groups the buffered data points by key with a stable sort, which preserves their order within a key."""
+        keyIDs = self._pointKeyIDs[: self._size]
+        order = np.argsort(keyIDs, kind="stable")
+        sortedKeyIDs = keyIDs[order]
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(sortedKeyIDs)) + 1, [self._size]))
+
+        points = self._points[: self._size, : self._width]
+        keyArrays = {}
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            key = self._keys[sortedKeyIDs[a]]
+            keyArrays[key] = points[order[a:b]]
+        return keyArrays
@@ -0,0 +1,202 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from pytissueoptics.rayscattering import utils
+
+BLOCK_CELLS = 8
+MIN_CELLS = 1
+COORDINATE_BITS = 21
+COORDINATE_OFFSET = 2 ** (COORDINATE_BITS - 1)
+REFINE_RATIO = 2.0
+REFINE_MEMORY_FRACTION = 0.5
+
+
+class EnergyGrid:
+    """
+    Sparse 3D grid of the energy deposited in each solid, with a bounded memory. The space is divided into cubic
+    blocks of `BLOCK_CELLS`³ cells of `voxelSize`, which are only allocated where energy is deposited and are stored in
+    a hash map of their block coordinates.
+
+    The grid adapts to the deposited energy after each batch of data points. The blocks where the energy is
+    concentrated (more than `REFINE_RATIO` times the average energy of a block) have their cells halved, up to
+    `maxRefinement` times, as long as the memory stays under a fraction of `memoryMB`. The energy already in a block
+    is split evenly between the refined cells. When the memory exceeds `memoryMB`, the blocks with the least energy
+    are coarsened back, down to a single cell per block.
+
+    The energy of the grid is returned as data points at the center of each cell, which can be used in place of the
+    raw 3D data points, at the resolution of the grid.
+    """
+
+    def __init__(self, voxelSize: float, memoryMB: float = 256, maxRefinement: int = 2):
+        assert voxelSize > 0, "The voxel size must be positive."
+        self._voxelSize = voxelSize
+        self._blockSize = voxelSize * BLOCK_CELLS
+        self._maxCells = BLOCK_CELLS * 2**maxRefinement
+        self._maxBytes = int(memoryMB * 1024**2)
+        self._blocks: Dict[str, Dict[int, np.ndarray]] = {}
+        self._blockEnergy: Dict[str, Dict[int, float]] = {}
+        self._nBytes = 0
+        self._warnedMemory = False
+
+    @property
+    def voxelSize(self) -> float:
+        return self._voxelSize
+
+    @property
+    def solidLabels(self) -> List[str]:
+        return list(self._blocks.keys())
+
+    @property
+    def nBytes(self) -> int:
+        return self._nBytes
+
+    @property
+    def nBlocks(self) -> int:
+        return sum(len(blocks) for blocks in self._blocks.values())
+
+    def getTotalEnergy(self, solidLabel: str = None) -> float:
+        labels = [solidLabel] if solidLabel else self.solidLabels
+        return float(sum(sum(self._blockEnergy.get(label, {}).values()) for label in labels))
+
+    def addDataPoints(self, solidLabel: str, dataPoints: np.ndarray):
+        """Adds the energy of data points (value, x, y, z) deposited in a solid, then adapts the grid."""
+        if len(dataPoints) == 0:
+            return
+        blocks = self._blocks.setdefault(solidLabel, {})
+        blockEnergy = self._blockEnergy.setdefault(solidLabel, {})
+
+        coordinates = dataPoints[:, 1:4] / self._blockSize
+        blockCoordinates = np.floor(coordinates)
+        localCoordinates = coordinates - blockCoordinates
+        codes = self._encode(blockCoordinates.astype(np.int64))
+        order = np.argsort(codes, kind="stable")
+        codes, starts = np.unique(codes[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+
+        for code, start, end in zip(codes.tolist(), starts, ends):
+            rows = order[start:end]
+            block = blocks.get(code)
+            if block is None:
+                block = np.zeros((BLOCK_CELLS,) * 3)
+                blocks[code] = block
+                blockEnergy[code] = 0.0
+                self._nBytes += block.nbytes
+            nCells = block.shape[0]
+            cells = np.clip((localCoordinates[rows] * nCells).astype(np.int64), 0, nCells - 1)
+            flatCells = (cells[:, 0] * nCells + cells[:, 1]) * nCells + cells[:, 2]
+            weights = dataPoints[rows, 0]
+            block += np.bincount(flatCells, weights=weights, minlength=nCells**3).reshape(block.shape)
+            blockEnergy[code] += float(np.sum(weights))
+
+        self._refine()
+        self._enforceMemory()
+
+    def getDataPoints(self, solidLabel: str) -> Optional[np.ndarray]:
+        """Returns the energy of each cell with energy of the solid as data points (value, x, y, z) at its center."""
+        blocks = self._blocks.get(solidLabel)
+        if not blocks:
+            return None
+        dataPoints = []
+        for code, block in blocks.items():
+            cells = np.nonzero(block)
+            if len(cells[0]) == 0:
+                continue
+            origin = self._decode(code) * self._blockSize
+            cellSize = self._blockSize / block.shape[0]
+            positions = origin + (np.stack(cells, axis=1) + 0.5) * cellSize
+            dataPoints.append(np.column_stack((block[cells], positions)))
+        if len(dataPoints) == 0:
+            return None
+        return np.concatenate(dataPoints)
+
+    def merge(self, other: "EnergyGrid"):
+        """Adds the energy of another grid of the same voxel size, at the finest resolution of each block."""
+        assert other._voxelSize == self._voxelSize, "Cannot merge energy grids of different voxel sizes."
+        for solidLabel, otherBlocks in other._blocks.items():
+            blocks = self._blocks.setdefault(solidLabel, {})
+            blockEnergy = self._blockEnergy.setdefault(solidLabel, {})
+            for code, otherBlock in otherBlocks.items():
+                block = blocks.get(code)
+                if block is None:
+                    block = np.zeros_like(otherBlock)
+                    blockEnergy[code] = 0.0
+                    self._nBytes += block.nbytes
+                while block.shape[0] < otherBlock.shape[0]:
+                    block = self._resizeBlock(solidLabel, code, block, refine=True)
+                while otherBlock.shape[0] < block.shape[0]:
+                    otherBlock = self._refineCells(otherBlock)
+                blocks[code] = block + otherBlock
+                blockEnergy[code] += other._blockEnergy[solidLabel][code]
+        self._enforceMemory()
+
+    def _refine(self):
+        """Refines the blocks with the most energy first, while the memory stays under its refinement fraction."""
+        nBlocks = self.nBlocks
+        totalEnergy = self.getTotalEnergy()
+        if nBlocks == 0 or totalEnergy <= 0:
+            return
+        threshold = REFINE_RATIO * totalEnergy / nBlocks
+        candidates = [
+            (energy, solidLabel, code)
+            for solidLabel, blockEnergy in self._blockEnergy.items()
+            for code, energy in blockEnergy.items()
+            if energy > threshold and self._blocks[solidLabel][code].shape[0] < self._maxCells
+        ]
+        for _, solidLabel, code in sorted(candidates, reverse=True):
+            block = self._blocks[solidLabel][code]
+            if self._nBytes + 7 * block.nbytes > REFINE_MEMORY_FRACTION * self._maxBytes:
+                break
+            self._resizeBlock(solidLabel, code, block, refine=True)
+
+    def _enforceMemory(self):
+        """Coarsens the blocks with the least energy first until the memory is under its limit."""
+        while self._nBytes > self._maxBytes:
+            candidates = [
+                (energy, solidLabel, code)
+                for solidLabel, blockEnergy in self._blockEnergy.items()
+                for code, energy in blockEnergy.items()
+                if self._blocks[solidLabel][code].shape[0] > MIN_CELLS
+            ]
+            if not candidates:
+                if not self._warnedMemory:
+                    utils.warn(
+                        f"WARNING: The energy grid exceeds its memory limit of {self._maxBytes / 1024**2} MB with a "
+                        f"single cell per block. Consider using a larger voxel size."
+                    )
+                    self._warnedMemory = True
+                return
+            for _, solidLabel, code in sorted(candidates):
+                if self._nBytes <= self._maxBytes:
+                    break
+                self._resizeBlock(solidLabel, code, self._blocks[solidLabel][code], refine=False)
+
+    def _resizeBlock(self, solidLabel: str, code: int, block: np.ndarray, refine: bool) -> np.ndarray:
+        newBlock = self._refineCells(block) if refine else self._coarsenCells(block)
+        self._blocks[solidLabel][code] = newBlock
+        self._nBytes += newBlock.nbytes - block.nbytes
+        return newBlock
+
+    @staticmethod
+    def _refineCells(block: np.ndarray) -> np.ndarray:
+        """Splits each cell into 8 cells which share its energy evenly."""
+        for axis in range(3):
+            block = np.repeat(block, 2, axis=axis)
+        return block / 8
+
+    @staticmethod
+    def _coarsenCells(block: np.ndarray) -> np.ndarray:
+        n = block.shape[0] // 2
+        return block.reshape(n, 2, n, 2, n, 2).sum(axis=(1, 3, 5))
+
+    @staticmethod
+    def _encode(blockCoordinates: np.ndarray) -> np.ndarray:
+        """Packs the block coordinates into a single integer. Blocks beyond the range of the coordinates are clamped."""
+        coordinates = np.clip(blockCoordinates + COORDINATE_OFFSET, 0, 2**COORDINATE_BITS - 1)
+        return (coordinates[:, 0] << (2 * COORDINATE_BITS)) | (coordinates[:, 1] << COORDINATE_BITS) | coordinates[:, 2]
+
+    @staticmethod
+    def _decode(code: int) -> np.ndarray:
+        mask = 2**COORDINATE_BITS - 1
+        coordinates = [code >> (2 * COORDINATE_BITS), (code >> COORDINATE_BITS) & mask, code & mask]
+        return np.array(coordinates, dtype=np.float64) - COORDINATE_OFFSET
@@ -1,22 +1,42 @@
 from __future__ import annotations
 
+import copy
+import itertools
 import json
 import os
 import pickle
-from typing import Dict, List, Optional, TextIO, Union
+import shutil
+import tempfile
+import weakref
+import zipfile
+from multiprocessing.pool import ThreadPool
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
 from pytissueoptics.rayscattering import utils
-from pytissueoptics.rayscattering.display.views.view2D import View2D, ViewGroup
+from pytissueoptics.rayscattering.display.views.view2D import View2D, ViewBinner, ViewGroup
 from pytissueoptics.rayscattering.display.views.viewFactory import ViewFactory
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.scene.geometry import Vector
 from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
 from pytissueoptics.scene.logger.logger import DataType, InteractionData, InteractionKey, Logger
+from pytissueoptics.scene.logger.loggerArchive import LoggerArchive
 
 from ..opencl.CLScene import WORLD_SOLID_LABEL
+from .energyGrid import EnergyGrid
+from .energyTally import EnergyTally
 from .energyType import EnergyType
+from .memoryPolicy import MemoryPolicy
+from .photonIndex import PhotonIndex
+
+EXPORT_FORMATS = ["csv", "npy", "npz"]
+EXPORT_CHUNK_SIZE = 2**16
+EXPORT_THREADS = 8
+CSV_ROW_FORMAT = "%.8e,%.8e,%.8e,%.8e,%d,%d,%d\n"
+MISSING_PHOTON_ID = np.iinfo(np.uint64).max
+MEMORY_BUDGET_THRESHOLD = 0.9
+DOWNSAMPLE_FRACTION = 0.5
 
 
 class EnergyLogger(Logger):
@@ -31,6 +51,13 @@ class EnergyLogger(Logger):
         defaultViewEnergyType: EnergyType = EnergyType.DEPOSITION,
         defaultBinSize: Union[float, tuple] = 0.01,
         infiniteLimits=((-5, 5), (-5, 5), (-5, 5)),
+        tallyEnergy: bool = False,
+        logDataPoints: bool = True,
+        storageDirectory: str = None,
+        voxelSize: float = None,
+        gridMemoryMB: float = 256,
+        memoryBudgetMB: float = None,
+        memoryPolicy: MemoryPolicy = MemoryPolicy.SPILL,
     ):
         """
         Log the energy deposited by scattering photons as well as the energy that crossed surfaces. Every interaction
@@ -52,7 +79,37 @@ class EnergyLogger(Logger):
         :param defaultBinSize: The default bin size to use when binning the 3D data to 2D views. In the same physical
                 units as the scene. Custom bin sizes can be specified in each View2D.
         :param infiniteLimits: The default limits to use for the 2D views when the scene is infinite (has no solids).
+        :param tallyEnergy: (Default to False) If True, the total energy deposited in each solid and crossing each
+                surface in each direction is also tallied during the propagation (on the device when using hardware
+                acceleration). These tallies are sufficient for the report of `Stats`, which then reads them directly.
+        :param logDataPoints: (Default to True) If False, the individual data points are not logged at all and only
+                the energy tallies are kept, which requires `tallyEnergy`. This is the lightest alternative when only
+                the statistics are required, since the interactions are then never transferred from the device.
+        :param storageDirectory: (Optional) Store the 3D data points of each interaction key in append-only `.npy`
+                files in this directory instead of in memory, which allows keeping the 3D data of simulations larger
+                than the available RAM. The raw data points are then returned as read-only memory-mapped arrays, and
+                the views and the export process the data chunk by chunk. Only used when `keep3D` is True.
+        :param voxelSize: (Optional) When `keep3D` is False, also accumulate the energy deposited in each solid to a
+                sparse 3D grid of this base voxel size (see `EnergyGrid`), which refines itself where the energy is
+                concentrated. The 3D volume slicer, the 1D profiles and new 2D views of the solids are then computed
+                from the grid, at its resolution, instead of requiring the 3D data.
+        :param gridMemoryMB: (Default to 256) The memory limit of the energy grid in MB. The grid is coarsened where
+                the least energy is deposited to stay under this limit.
+        :param memoryBudgetMB: (Optional) When `keep3D` is True, the memory in MB that the 3D data held in memory can
+                use. When the data reaches 90% of this budget, the `memoryPolicy` is applied and reported with a
+                warning. The data stored in files (with a `storageDirectory` or a loaded archive) is not counted.
+        :param memoryPolicy: (Default to MemoryPolicy.SPILL) What to do when the memory budget is reached.
+                SPILL moves the data stored so far to files of a temporary directory, which are then memory-mapped
+                (the data logged to these keys afterward is also written to the files). The temporary directory is
+                removed with the logger, so a logger with spilled data is saved to a `.ptlog` or `.zip` archive to be
+                loaded later, since a pickled logger only refers to these files.
+                COMPILE bins the data to the 2D views, and to the energy grid if a `voxelSize` is given, then discards
+                the 3D data as if `keep3D` was False from then on. DOWNSAMPLE keeps a random half of the data points
+                of each sign in each key (at least one of each sign), and scales their values so that the total energy
+                entering, leaving or deposited in each key is preserved. The views are then binned again from the
+                downsampled data.
         """
+        assert tallyEnergy or logDataPoints, "Either `tallyEnergy` or `logDataPoints` is required."
         self._scene = scene
         self._keep3D = keep3D
         self._defaultBinSize = defaultBinSize
@@ -60,12 +117,33 @@ class EnergyLogger(Logger):
         self._viewFactory = ViewFactory(scene, defaultBinSize, infiniteLimits, energyType=defaultViewEnergyType)
 
         self._sceneHash = hash(scene)
+        self._dataSceneHash = self._sceneHash
         self._defaultViews = views
         self._views = self._viewFactory.build(views)
         self._outdatedViews = set()
+        self._binnedRows: Dict[View2D, Dict[InteractionKey, int]] = {}
+        self._photonIndices: Dict[InteractionKey, PhotonIndex] = {}
+        self._detectedRows: Dict[Tuple[str, ...], Tuple[tuple, Dict[InteractionKey, np.ndarray]]] = {}
         self._nDataPointsRemoved = 0
+        self._energyTally = EnergyTally() if tallyEnergy else None
+        self._logDataPoints = logDataPoints
+
+        if storageDirectory and not keep3D:
+            utils.warn("WARNING: Ignoring the storage directory, since the 3D data is discarded with keep3D=False.")
+            storageDirectory = None
+        if voxelSize and keep3D and not (memoryBudgetMB and memoryPolicy == MemoryPolicy.COMPILE):
+            utils.warn(
+                "WARNING: Ignoring the voxel size of the energy grid, since the 3D data is kept with keep3D=True."
+            )
+            voxelSize = None
+        self._energyGrid = EnergyGrid(voxelSize, gridMemoryMB) if voxelSize else None
+        self._memoryBudget = int(memoryBudgetMB * 1024**2) if memoryBudgetMB else None
+        self._memoryPolicy = memoryPolicy
+        self._appliedMemoryPolicy: Optional[MemoryPolicy] = None
+        self._spillDirectory = None
+        self._rng = np.random.default_rng()
 
-        super().__init__(fromFilepath=filepath)
+        super().__init__(fromFilepath=filepath, storageDirectory=storageDirectory)
 
     def addView(self, view: View2D) -> bool:
         self._viewFactory.build([view])
@@ -90,6 +168,11 @@ class EnergyLogger(Logger):
                 self._views.append(view)
                 return True
 
+        if self._energyGrid is not None and view.surfaceLabel is None and not view.detectedBy:
+            self._compileViewFromEnergyGrid(view)
+            self._views.append(view)
+            return True
+
         utils.warn(
             f"ERROR: Cannot create view {view.name}. The 3D data was discarded and the required data was not "
             f"found in existing views."
@@ -97,7 +180,13 @@ class EnergyLogger(Logger):
         return False
 
     def updateView(self, view: View2D):
-        if view in self._outdatedViews:
+        if view not in self._outdatedViews:
+            return
+        if view.detectedBy and self.has3D:
+            # The photons detected can change with new data, so the filtered data is binned again from scratch.
+            view.clearData()
+            self._compileViews([view], detectedBy=view.detectedBy)
+        else:
             self._compileViews([view])
 
     def showView(self, view: View2D = None, viewIndex: int = None, logScale: bool = True, colormap: str = "viridis"):
@@ -120,13 +209,23 @@ class EnergyLogger(Logger):
         for i, view in enumerate(self._views):
             print(f"\t{i}: {view.description}")
 
-    def save(self, filepath: str = None):
+    def save(self, filepath: str = None, compress: bool = False):
+        """
+        Saves the logger to the given file, or to the file it was loaded from. When the path has the `.ptlog` (as a
+        directory) or `.zip` extension, the logger is saved in the columnar format of `LoggerArchive`, so that only
+        the data of the keys that are accessed is read after loading. Zip archives can be compressed with `compress`.
+        Other paths are pickled.
+        """
         if filepath is None and self._filepath is None:
             filepath = self.DEFAULT_LOGGER_PATH
             utils.warn(f"No filepath specified. Saving to {filepath}.")
         elif filepath is None:
             filepath = self._filepath
 
+        if LoggerArchive.isArchive(filepath):
+            self._saveArchive(filepath, compress)
+            return
+
         with open(filepath, "wb") as file:
             pickle.dump(
                 (
@@ -139,10 +238,75 @@ class EnergyLogger(Logger):
                     self._nDataPointsRemoved,
                     self._sceneHash,
                     self.has3D,
+                    self._energyTally,
+                    self._binnedRows,
+                    self._energyGrid,
                 ),
                 file,
             )
 
+    def _saveArchive(self, filepath: str, compress: bool):
+        manifest = {
+            "info": self.info,
+            "labels": self._labels,
+            "views": [view.description for view in self._views],
+            "outdatedViews": [i for i, view in enumerate(self._views) if view in self._outdatedViews],
+            "nDataPointsRemoved": self._nDataPointsRemoved,
+            "sceneHash": self._sceneHash,
+            "has3D": self.has3D,
+            "binnedRows": [
+                [
+                    {"solidLabel": key.solidLabel, "surfaceLabel": key.surfaceLabel, "rows": rows}
+                    for key, rows in self._binnedRows.get(view, {}).items()
+                ]
+                for view in self._views
+            ],
+        }
+        objects = {
+            "views": self._views,
+            "defaultViews": self._defaultViews,
+            "energyTally": self._energyTally,
+            "energyGrid": self._energyGrid,
+        }
+        LoggerArchive(filepath).write(self._data, manifest, objects, compress=compress)
+
+    def _loadArchive(self, filepath: str) -> tuple:
+        archive = LoggerArchive(filepath)
+        manifest = archive.readManifest()
+        views = archive.readObject("views")
+        outdatedViews = set(views[i] for i in manifest["outdatedViews"])
+        binnedRows = {}
+        for view, viewRows in zip(views, manifest["binnedRows"]):
+            binnedRows[view] = {InteractionKey(row["solidLabel"], row["surfaceLabel"]): row["rows"] for row in viewRows}
+        return (
+            self._readArchiveData(archive, manifest),
+            manifest["info"],
+            manifest["labels"],
+            views,
+            archive.readObject("defaultViews"),
+            outdatedViews,
+            manifest["nDataPointsRemoved"],
+            manifest["sceneHash"],
+            manifest["has3D"],
+            archive.readObject("energyTally"),
+            binnedRows,
+            archive.readObject("energyGrid"),
+        )
+
+    def _initBinnedRowsOfOlderLogger(self):
+        """
+        Loggers saved before the binned rows were tracked have views that contain all the data, unless they are
+        outdated, in which case they may contain part of it and are binned again from scratch.
+        """
+        self._binnedRows = {}
+        for view in self._views:
+            if view in self._outdatedViews:
+                view.clearData()
+            else:
+                self._binnedRows[view] = {
+                    key: len(data.dataPoints) for key, data in self._data.items() if data.dataPoints is not None
+                }
+
     def load(self, filepath: str):
         self._filepath = filepath
 
@@ -153,18 +317,41 @@ class EnergyLogger(Logger):
             )
             return
 
-        with open(filepath, "rb") as file:
-            (
-                self._data,
-                self.info,
-                self._labels,
-                self._views,
-                oldDefaultViews,
-                self._outdatedViews,
-                self._nDataPointsRemoved,
-                oldSceneHash,
-                oldHas3D,
-            ) = pickle.load(file)
+        if LoggerArchive.isArchive(filepath):
+            loggerState = self._loadArchive(filepath)
+        else:
+            with open(filepath, "rb") as file:
+                loggerState = pickle.load(file)
+        (
+            self._data,
+            self.info,
+            self._labels,
+            self._views,
+            oldDefaultViews,
+            self._outdatedViews,
+            self._nDataPointsRemoved,
+            oldSceneHash,
+            oldHas3D,
+            *optionalState,
+        ) = loggerState
+        self._separatePhotonIDs()
+        self._clearPhotonIndices()
+        self._dataSceneHash = oldSceneHash
+        # Loggers saved before the energy tallies were added have no tally.
+        if optionalState and optionalState[0] is not None:
+            self._energyTally = optionalState[0]
+        if len(optionalState) > 1:
+            self._binnedRows = optionalState[1]
+        elif oldHas3D:
+            self._initBinnedRowsOfOlderLogger()
+        # Loggers saved before the energy grids were added have no grid.
+        if len(optionalState) > 2 and optionalState[2] is not None:
+            self._energyGrid = optionalState[2]
+        elif self._energyGrid is not None and not oldHas3D and self._nDataPointsRemoved > 0:
+            utils.warn(
+                "WARNING: The logger at '{}' has no energy grid of its discarded 3D data. The grid will only "
+                "contain the data logged from now on.".format(filepath)
+            )
 
         if oldSceneHash != self._sceneHash:
             utils.warn(
@@ -212,6 +399,33 @@ class EnergyLogger(Logger):
     def has3D(self) -> bool:
         return self._keep3D
 
+    @property
+    def energyTally(self) -> Optional[EnergyTally]:
+        return self._energyTally
+
+    @property
+    def energyGrid(self) -> Optional[EnergyGrid]:
+        return self._energyGrid
+
+    @property
+    def appliedMemoryPolicy(self) -> Optional[MemoryPolicy]:
+        """The memory policy applied when the memory budget was last reached, or None if it was never reached."""
+        return self._appliedMemoryPolicy
+
+    @property
+    def memoryUsage(self) -> int:
+        """Number of bytes of the 3D data held in memory."""
+        nBytes = 0
+        for data in self._data.values():
+            for container in (data.dataPoints, data.photonIDs):
+                if container is not None:
+                    nBytes += container.nBytes
+        return nBytes
+
+    @property
+    def logsDataPoints(self) -> bool:
+        return self._logDataPoints
+
     @property
     def defaultBinSize(self) -> float:
         return self._defaultBinSize
@@ -223,25 +437,138 @@ class EnergyLogger(Logger):
     def getSolidLimits(self, solidLabel: str) -> List[List[float]]:
         return self._scene.getSolid(solidLabel).getBoundingBox().xyzLimits
 
-    def logDataPointArray(self, array: np.ndarray, key: InteractionKey):
+    def logDataPointArray(self, array: np.ndarray, key: InteractionKey, photonIDs: Optional[np.ndarray] = None):
         """
         Used internally by `Source` when propagating photons. Overwrites the `Logger` method to automatically bin the
-        data to 2D views if 3D data is being discarded.
+        data to 2D views if 3D data is being discarded. The energy tally is not updated, since the propagation tallies
+        the energy separately, on the device or in a `DataPointBuffer`, and adds it with `logEnergyTally`.
         """
-        super().logDataPointArray(array, key)
+        super().logDataPointArray(array, key, photonIDs)
+        self._updateViews()
+
+    def logDataPointArrays(self, keyArrays: Dict[InteractionKey, np.ndarray]):
+        """
+        Used internally by `Source` to log the data points buffered when propagating photons without hardware
+        acceleration. The data of all the keys is binned to the 2D views at once if 3D data is being discarded.
+        """
+        for key, array in keyArrays.items():
+            super().logDataPointArray(array, key)
+        self._updateViews()
+
+    def _updateViews(self):
         self._outdatedViews = set(self._views)
 
         if not self._keep3D:
             self._compileViews(self._views)
+            self._addToEnergyGrid()
             self._delete3DData()
+        elif self._memoryBudget and self.memoryUsage > MEMORY_BUDGET_THRESHOLD * self._memoryBudget:
+            self._applyMemoryPolicy()
+
+    def _applyMemoryPolicy(self):
+        usageMB = self.memoryUsage / 1024**2
+        if self._memoryPolicy == MemoryPolicy.SPILL:
+            self._spillData()
+            action = f"Moved the 3D data to files in '{self._spillDirectory}'"
+        elif self._memoryPolicy == MemoryPolicy.COMPILE:
+            self._keep3D = False
+            self._updateViews()
+            action = "Compiled the 3D data to the 2D views and discarded it. The logger no longer keeps 3D data"
+        else:
+            self._downsampleData()
+            action = f"Downsampled the 3D data to {self.memoryUsage / 1024**2:.1f} MB, preserving the energy"
+        self._appliedMemoryPolicy = self._memoryPolicy
+        utils.warn(
+            f"WARNING: The 3D data in memory ({usageMB:.1f} MB) reached the memory budget of the logger "
+            f"({self._memoryBudget / 1024**2:.1f} MB). Applied MemoryPolicy.{self._memoryPolicy.name}: {action}."
+        )
+
+    def _spillData(self):
+        """Moves the data of each key held in memory to a file. The rows logged afterward are appended to the file."""
+        if self._spillDirectory is None:
+            self._spillDirectory = tempfile.mkdtemp(prefix="pytissueoptics-")
+            weakref.finalize(self, shutil.rmtree, self._spillDirectory, ignore_errors=True)
+        for interactionData in self._data.values():
+            for dataType in (DataType.DATA_POINT, DataType.PHOTON_ID):
+                container = getattr(interactionData, dataType.value)
+                if container is None or container.nBytes == 0:
+                    continue
+                diskContainer = self._createContainer(dataType, storageDirectory=self._spillDirectory)
+                diskContainer.extend(container)
+                setattr(interactionData, dataType.value, diskContainer)
+
+    def _downsampleData(self):
+        """
+        Keeps a random subset of the data points of each key held in memory, with their photon IDs. The values of the
+        positive and negative data points are scaled separately, so that the energy entering and leaving a surface is
+        preserved, as well as the energy deposited in a solid.
+        """
+        keepFraction = DOWNSAMPLE_FRACTION * MEMORY_BUDGET_THRESHOLD * self._memoryBudget / self.memoryUsage
+        for interactionData in self._data.values():
+            dataPoints = interactionData.dataPoints
+            if dataPoints is None or dataPoints.nBytes == 0:
+                continue
+            data = dataPoints.getData()
+            isPositive = data[:, 0] > 0
+            sampledRows = []
+            # Each sign is sampled separately, so that a sign with few data points keeps at least one of them.
+            for signRows in (np.flatnonzero(isPositive), np.flatnonzero(~isPositive)):
+                if len(signRows) == 0:
+                    continue
+                nKept = max(1, int(len(signRows) * keepFraction))
+                sampledRows.append(self._rng.choice(signRows, size=nKept, replace=False))
+            rows = np.sort(np.concatenate(sampledRows))
+            sampledData = np.array(data[rows])
+            for isSign in (isPositive, ~isPositive):
+                sampledEnergy = np.sum(sampledData[isSign[rows], 0], dtype=np.float64)
+                if sampledEnergy != 0:
+                    sampledData[isSign[rows], 0] *= np.sum(data[isSign, 0], dtype=np.float64) / sampledEnergy
+
+            interactionData.dataPoints = self._createContainer(DataType.DATA_POINT)
+            interactionData.dataPoints.append(sampledData)
+            if interactionData.photonIDs is not None:
+                photonIDs = np.array(interactionData.photonIDs.getData()[rows])
+                interactionData.photonIDs = self._createContainer(DataType.PHOTON_ID)
+                interactionData.photonIDs.append(photonIDs)
+
+        # The rows already binned to the views are not the same anymore, so the views are binned again from scratch.
+        for view in self._views:
+            view.clearData()
+        self._binnedRows.clear()
+        self._clearPhotonIndices()
+
+    def _addToEnergyGrid(self):
+        if self._energyGrid is None:
+            return
+        for key, data in self._data.items():
+            if not key.volumetric or data.dataPoints is None:
+                continue
+            for dataPoints in data.dataPoints.iterChunks():
+                self._energyGrid.addDataPoints(key.solidLabel, dataPoints)
 
     def logDataPoint(self, value: float, position: Vector, key: InteractionKey, ID: Optional[int] = None):
-        dataPoint = [value, *position.array]
-        if ID is not None:
-            dataPoint.append(ID)
-        self.logDataPointArray(np.array([dataPoint]), key)
+        if self._energyTally is not None:
+            self._energyTally.add(key, value)
+            self._registerLabels(key)
+        if not self._logDataPoints:
+            return
+        photonIDs = None if ID is None else [ID]
+        self.logDataPointArray(np.array([[value, *position.array]]), key, photonIDs)
+
+    def logEnergyTally(self, energyTally: EnergyTally):
+        """Used internally by `Source` to add the energy tallied on the device or by a `DataPointBuffer`."""
+        if self._energyTally is None:
+            return
+        self._energyTally.merge(energyTally)
+        for key in energyTally.keys:
+            self._registerLabels(key)
 
     def _compileViews(self, views: List[View2D], detectedBy: Union[str, List[str]] = None):
+        """
+        Bins the data points of each key to all the views in a single pass with a `ViewBinner`. Without `detectedBy`,
+        the number of rows of each key already binned to each view is tracked, so that only the new rows are binned
+        when a view is compiled again.
+        """
         if detectedBy is None:
             dataPerInteraction = self._data
             if any(view.detectedBy for view in views):
@@ -256,25 +583,57 @@ class EnergyLogger(Logger):
             datapointsContainer: Optional[ListArrayContainer] = data.dataPoints
             if datapointsContainer is None or len(datapointsContainer) == 0:
                 continue
+            nRows = len(datapointsContainer)
+            viewsPerStartRow: Dict[int, List[View2D]] = {}
             for view in views:
-                if view.solidLabel and not utils.labelsEqual(view.solidLabel, key.solidLabel):
-                    continue
-                if view.surfaceLabel and not utils.labelsEqual(view.surfaceLabel, key.surfaceLabel):
+                if not self._viewIncludesKey(view, key):
                     continue
-                if view.surfaceLabel is None and key.surfaceLabel is not None:
-                    continue
-
-                data = datapointsContainer.getData()
-                if view.energyType == EnergyType.FLUENCE_RATE:
-                    data = self._fluenceTransform(key, data)
-
-                view.extractData(data)
+                startRow = 0
+                if detectedBy is None:
+                    viewRows = self._binnedRows.setdefault(view, {})
+                    startRow = viewRows.get(key, 0)
+                    viewRows[key] = nRows
+                if startRow < nRows:
+                    viewsPerStartRow.setdefault(startRow, []).append(view)
+
+            for startRow, startViews in viewsPerStartRow.items():
+                binner = ViewBinner(startViews)
+                usesFluence = any(view.energyType == EnergyType.FLUENCE_RATE for view in startViews)
+                for data in datapointsContainer.iterChunks(startRow):
+                    fluenceRates = self._fluenceTransform(key, data)[:, 0] if usesFluence else None
+                    binner.extract(data, fluenceRates)
         for view in views:
             self._outdatedViews.discard(view)
 
+    def _compileViewFromEnergyGrid(self, view: View2D):
+        """Bins the cells of the energy grid in the solids of a view, at the resolution of the grid."""
+        for solidLabel in self._energyGrid.solidLabels:
+            key = InteractionKey(solidLabel)
+            if not self._viewIncludesKey(view, key):
+                continue
+            dataPoints = self._energyGrid.getDataPoints(solidLabel)
+            if dataPoints is None:
+                continue
+            fluenceRates = None
+            if view.energyType == EnergyType.FLUENCE_RATE:
+                fluenceRates = self._fluenceTransform(key, dataPoints)[:, 0]
+            ViewBinner([view]).extract(dataPoints, fluenceRates)
+
+    @staticmethod
+    def _viewIncludesKey(view: View2D, key: InteractionKey) -> bool:
+        if view.solidLabel and not utils.labelsEqual(view.solidLabel, key.solidLabel):
+            return False
+        if view.surfaceLabel and not utils.labelsEqual(view.surfaceLabel, key.surfaceLabel):
+            return False
+        if view.surfaceLabel is None and key.surfaceLabel is not None:
+            return False
+        return True
+
     def _delete3DData(self):
         self._nDataPointsRemoved += super().nDataPoints
         self._data.clear()
+        self._binnedRows.clear()
+        self._clearPhotonIndices()
 
     @property
     def nDataPoints(self) -> int:
@@ -314,87 +673,256 @@ class EnergyLogger(Logger):
         the value corresponds to the energy that crossed the surface (positive when in the direction of the normal). If
         only a solidLabel is given, the value corresponds to the volumetric EnergyType at that point.
         """
+        if self._energyGrid is not None and not self._keep3D and key.volumetric:
+            dataPoints = self._energyGrid.getDataPoints(key.solidLabel)
+            if energyType == EnergyType.FLUENCE_RATE:
+                return self._fluenceTransform(key, dataPoints)
+            return dataPoints
+
         if energyType == EnergyType.FLUENCE_RATE:
             return self._getData(DataType.DATA_POINT, key, transform=self._fluenceTransform)
 
         return self._getData(DataType.DATA_POINT, key)
 
+    def getStoredSolidLabels(self) -> List[str]:
+        """Overwrites the `Logger` method to include the solids of the energy grid."""
+        solidLabels = super().getStoredSolidLabels()
+        if self._energyGrid is not None and not self._keep3D:
+            solidLabels += [label for label in self._energyGrid.solidLabels if label not in solidLabels]
+        return solidLabels
+
     def filter(self, detectedBy: Union[str, List[str]]) -> None:
         """Keeps only the data points from photons detected by one of the specified detector(s)."""
         if not self._keep3D:
             utils.warn("Cannot filter a logger that has discarded the 3D data.")
             return
 
-        filteredPhotonIDs = self._getDetectedPhotonIDs(detectedBy)
-        self._data = self._getDataForPhotons(filteredPhotonIDs)
+        self._data = self._getDataForPhotons(self._getDetectedRows(detectedBy))
+        self._clearPhotonIndices()
         self._outdatedViews = set(self._views)
+        for view in self._views:
+            view.clearData()
+        self._binnedRows.clear()
 
     def getFiltered(self, detectedBy: Union[str, List[str]]) -> "EnergyLogger":
         """
         Returns a new logger with only data from photons detected by one of the specified detector(s).
         """
         filteredLogger = EnergyLogger(self._scene, views=[])
-        filteredPhotonIDs = self._getDetectedPhotonIDs(detectedBy)
-        filteredLogger._data = self._getDataForPhotons(filteredPhotonIDs)
+        filteredLogger._data = self._getDataForPhotons(self._getDetectedRows(detectedBy))
         return filteredLogger
 
-    def _getDetectedPhotonIDs(self, detectedBy: Union[str, List[str]]) -> np.ndarray:
-        """Helper to get photon IDs detected by one of the specified detector(s)."""
-        detector_labels = [detectedBy] if isinstance(detectedBy, str) else detectedBy
-        detector_keys = [InteractionKey(label) for label in detector_labels]
-        photonIDs = self._getPhotonIDs(detector_keys)
-        if len(photonIDs) == 0:
-            utils.warn(f"No photons detected by: {detectedBy}")
-        return photonIDs
-
-    def _getPhotonIDs(self, key: Union[InteractionKey, List[InteractionKey], None] = None) -> np.ndarray:
-        """Get all unique photon IDs that interacted with one of the given interaction key(s)."""
-        if isinstance(key, list):
-            all_photon_ids = []
-            for k in key:
-                data = self.getRawDataPoints(k)
-                if data is not None and data.shape[1] >= 5:
-                    all_photon_ids.append(data[:, 4].astype(np.uint32))
-
-            if len(all_photon_ids) == 0:
-                return np.array([], dtype=np.uint32)
-            combined = np.concatenate(all_photon_ids)
-            return np.unique(combined)
-
-        data = self.getRawDataPoints(key)
-        if data is None or data.shape[1] < 5:
-            return np.array([], dtype=np.uint32)
-        return np.unique(data[:, 4].astype(np.uint32))
-
-    def _getDataForPhotons(self, photonIDs: np.ndarray) -> Dict[InteractionKey, InteractionData]:
-        keyToData: Dict[InteractionKey, InteractionData] = {}
-        photonIDs = np.asarray(photonIDs, dtype=np.uint32)
-        for key, interactionData in self._data.items():
-            points: Optional[ListArrayContainer] = interactionData.dataPoints
-            if points is None:
-                continue
-            data = points.getData()
-            if data.shape[1] < 5:
+    def _getDetectedRows(self, detectedBy: Union[str, List[str]]) -> Dict[InteractionKey, np.ndarray]:
+        """
+        Returns the rows of the data points of each key from photons detected by one of the specified detector(s).
+        The rows are found with the `PhotonIndex` of each key and are cached per set of detectors until new data
+        points are logged.
+        """
+        detectorLabels = tuple(sorted({detectedBy} if isinstance(detectedBy, str) else set(detectedBy)))
+        state = tuple((key, len(data.photonIDs)) for key, data in self._data.items() if data.photonIDs is not None)
+        cachedState, cachedRows = self._detectedRows.get(detectorLabels, (None, None))
+        if cachedState == state:
+            return cachedRows
+
+        photonIDs = self._getDetectedPhotonIDs(detectorLabels)
+        keyRows = {}
+        for key in self._data:
+            photonIndex = self._getPhotonIndex(key)
+            if photonIndex is None:
                 continue
-            mask = np.isin(data[:, 4].astype(np.uint32), photonIDs)
-            filteredData = data[mask]
-            if filteredData.size > 0:
-                container = ListArrayContainer()
-                container.append(filteredData)
-                keyToData[key] = InteractionData(dataPoints=container)
+            rows = photonIndex.getRows(photonIDs)
+            if len(rows) > 0:
+                keyRows[key] = rows
+        self._detectedRows[detectorLabels] = (state, keyRows)
+        return keyRows
+
+    def _getDetectedPhotonIDs(self, detectorLabels: Tuple[str, ...]) -> np.ndarray:
+        """Helper to get the sorted unique photon IDs detected by one of the specified detector(s)."""
+        photonIDs = []
+        for label in detectorLabels:
+            photonIndex = self._getPhotonIndex(InteractionKey(label))
+            if photonIndex is not None:
+                photonIDs.append(photonIndex.uniqueIDs)
+        if len(photonIDs) == 0 or sum(len(ids) for ids in photonIDs) == 0:
+            utils.warn(f"No photons detected by: {list(detectorLabels)}")
+            return np.array([], dtype=np.uint64)
+        if len(photonIDs) == 1:
+            return photonIDs[0]
+        return np.unique(np.concatenate(photonIDs))
+
+    def _getPhotonIndex(self, key: InteractionKey) -> Optional[PhotonIndex]:
+        """Returns the `PhotonIndex` of the key, which is created when first required."""
+        interactionData = self._data.get(key)
+        if interactionData is None or interactionData.photonIDs is None or interactionData.dataPoints is None:
+            return None
+        photonIndex = self._photonIndices.get(key)
+        if photonIndex is None or not photonIndex.follows(interactionData.photonIDs):
+            photonIndex = PhotonIndex(interactionData.photonIDs)
+            self._photonIndices[key] = photonIndex
+        return photonIndex
+
+    def _clearPhotonIndices(self):
+        self._photonIndices.clear()
+        self._detectedRows.clear()
+
+    def _getDataForPhotons(self, keyRows: Dict[InteractionKey, np.ndarray]) -> Dict[InteractionKey, InteractionData]:
+        keyToData: Dict[InteractionKey, InteractionData] = {}
+        for key, rows in keyRows.items():
+            interactionData = self._data[key]
+            filteredData = InteractionData(
+                dataPoints=self._createContainer(DataType.DATA_POINT),
+                photonIDs=self._createContainer(DataType.PHOTON_ID),
+            )
+            filteredData.dataPoints.append(np.asarray(interactionData.dataPoints.getData()[rows]))
+            filteredData.photonIDs.append(np.asarray(interactionData.photonIDs.getData()[rows]))
+            keyToData[key] = filteredData
         return keyToData
 
+    def merge(self, *others: EnergyLogger):
+        """
+        Adds the data of other loggers of the same scene to this logger, like the loggers of a simulation split into
+        many jobs. The photon counts are summed, and the photon IDs of each logger are offset by the photon count of
+        the loggers merged before it so that they remain unique. The 3D data is appended chunk by chunk, so it is not
+        copied in memory when the loggers use a `storageDirectory` or were loaded from an archive.
+
+        A logger that keeps the 3D data can only merge loggers that also kept it. Otherwise, the 3D data of the other
+        loggers is binned to the views of this logger, or the data of their equal views is summed when they also
+        discarded their 3D data. The views of this logger that have no equal view in another logger are removed.
+        """
+        for other in others:
+            self._mergeLogger(other)
+
+    @classmethod
+    def mergeFiles(
+        cls,
+        scene: ScatteringScene,
+        filepaths: List[str],
+        outputPath: str,
+        keep3D: bool = True,
+        storageDirectory: str = None,
+        compress: bool = False,
+        tallyEnergy: bool = None,
+    ) -> EnergyLogger:
+        """
+        Merges the loggers saved at the given paths (see `merge`) and saves the merged logger to `outputPath`. The
+        loggers are loaded one at a time, so that only one of them is held at once along with the merged logger. With
+        a `storageDirectory`, the merged 3D data is stored in files of this directory instead of in memory. The
+        loggers saved as archives (see `save`) are then only read chunk by chunk.
+
+        :param keep3D: If the merged logger keeps the 3D data. Must be False if any of the loggers discarded it.
+        :param compress: Compress the merged logger when it is saved as a zip archive.
+        :param tallyEnergy: If the merged logger sums the energy tallies of the loggers. Defaults to whether the first
+                logger has an energy tally.
+        """
+        mergedLogger = None
+        for filepath in filepaths:
+            if not os.path.exists(filepath):
+                raise FileNotFoundError(f"No logger file found at '{filepath}'.")
+            logger = cls(scene, filepath, keep3D=keep3D)
+            if mergedLogger is None:
+                if tallyEnergy is None:
+                    tallyEnergy = logger.energyTally is not None
+                mergedLogger = cls(scene, keep3D=keep3D, storageDirectory=storageDirectory, tallyEnergy=tallyEnergy)
+            mergedLogger.merge(logger)
+        if mergedLogger is None:
+            mergedLogger = cls(scene, keep3D=keep3D, storageDirectory=storageDirectory, tallyEnergy=bool(tallyEnergy))
+        mergedLogger.save(outputPath, compress=compress)
+        return mergedLogger
+
+    def _mergeLogger(self, other: EnergyLogger):
+        if other._dataSceneHash != self._dataSceneHash:
+            raise ValueError("Cannot merge loggers of different scenes.")
+        if self._keep3D and not other._keep3D:
+            raise ValueError("Cannot merge a logger that discarded its 3D data into a logger that keeps it.")
+
+        wasEmpty = self.isEmpty
+        photonIDOffset = self._getNextPhotonID()
+        self._mergeInfo(other.info)
+        for solidLabel, surfaceLabels in other._labels.items():
+            self._registerLabels(InteractionKey(solidLabel))
+            for surfaceLabel in surfaceLabels:
+                self._registerLabels(InteractionKey(solidLabel, surfaceLabel))
+        if self._energyTally is not None:
+            if other._energyTally is None:
+                utils.warn("WARNING: Removing the energy tally, since a merged logger did not tally the energy.")
+                self._energyTally = None
+            else:
+                self._energyTally.merge(other._energyTally)
+
+        if other._keep3D:
+            for key in other._data:
+                if other._data[key].dataPoints is None:
+                    continue
+                for dataPoints, photonIDs in other._iterDataChunks(key):
+                    if photonIDs is not None:
+                        photonIDs = photonIDs + np.uint64(photonIDOffset)
+                    super().logDataPointArray(dataPoints, key, photonIDs)
+                # Bins each key before the next one when the 3D data is discarded, so that the 3D data of a single key
+                # is held at once. Otherwise, the memory budget is applied after each key.
+                self._updateViews()
+        else:
+            self._nDataPointsRemoved += other._nDataPointsRemoved
+            self._mergeViews(other._views, adopt=wasEmpty)
+            if self._energyGrid is not None:
+                if other._energyGrid is None:
+                    utils.warn("WARNING: Removing the energy grid, since a merged logger did not have an energy grid.")
+                    self._energyGrid = None
+                else:
+                    self._energyGrid.merge(other._energyGrid)
+
+    def _getNextPhotonID(self) -> int:
+        """Returns the photon ID that follows the photons of this logger, which is the offset of a merged logger."""
+        if "photonCount" in self.info:
+            return int(self.info["photonCount"])
+        maxPhotonIDs = [
+            int(data.photonIDs.getData().max()) for data in self._data.values() if data.photonIDs is not None
+        ]
+        return max(maxPhotonIDs) + 1 if maxPhotonIDs else 0
+
+    def _mergeInfo(self, info: dict):
+        for name, value in info.items():
+            if name == "photonCount":
+                self.info[name] = self.info.get(name, 0) + value
+            elif name not in self.info:
+                self.info[name] = value
+            elif self.info[name] != value:
+                utils.warn(f"WARNING: The merged loggers have a different '{name}'. Keeping {self.info[name]}.")
+
+    def _mergeViews(self, otherViews: List[View2D], adopt: bool):
+        """
+        Sums the data of the equal views of a logger that discarded its 3D data. A logger without data adopts the
+        views of the first logger merged into it.
+        """
+        if adopt:
+            self._views = [copy.deepcopy(view) for view in otherViews]
+            self._outdatedViews = set()
+            return
+
+        mergedViews = []
+        for view in self._views:
+            otherView = next((otherView for otherView in otherViews if view.isEqualTo(otherView)), None)
+            if otherView is None:
+                utils.warn(f"WARNING: Removing the view {view.name}, which is not in all the merged loggers.")
+                continue
+            view.addDataFrom(otherView)
+            mergedViews.append(view)
+        self._views = mergedViews
+        self._outdatedViews &= set(mergedViews)
+
     def _fluenceTransform(self, key: InteractionKey, data: Optional[np.ndarray]) -> Optional[np.ndarray]:
         # Converts volumetric data to fluence rate when needed.
         if not key.volumetric or data is None:
             return data
 
+        # The data is copied, since it can be the stored (or memory-mapped) data of the logger.
+        data = np.array(data)
         data[:, 0] = data[:, 0] / self._scene.getMaterial(key.solidLabel).mu_a
         return data
 
-    def export(self, exportName: str):
+    def export(self, exportName: str, fileFormat: str = "csv"):
         """
-        Export the raw 3D data points to a CSV file, along with the scene information to a JSON file.
+        Export the raw 3D data points to a CSV file (or a binary NumPy file), along with the scene information to a
+        JSON file.
 
         The data file <exportName>.csv will be comma-delimited and will contain the following columns:
         - energy, x, y, z, photon_index, solid_index, surface_index
@@ -402,12 +930,22 @@ class EnergyLogger(Logger):
         Two types of interactions are logged: scattering and surface crossings. In the first case, the energy will be
         the delta energy deposited at the point and the surface index will be -1. In the second case, the energy
         will be the total photon energy when crossing the surface, either as positive if leaving the surface
-        (along the normal) or as negative if entering the surface.
+        (along the normal) or as negative if entering the surface. The photon index is -1 for the data points logged
+        without photon IDs.
 
         The scene information will be saved in a JSON file named <exportName>.json, which includes details for each solid
         index and surface index, such as their labels, materials, and geometry. The world information is also exported
         as solid index -1.
+
+        :param fileFormat: "csv" (default) for the CSV file, which is formatted in chunks by worker threads. "npy" for
+                a single structured array <exportName>.npy with the same columns as fields, where the photon index
+                of the data points logged without photon IDs is `MISSING_PHOTON_ID` (the largest uint64). "npz" for an
+                archive <exportName>.npz of the raw (n, 4) data points (energy, x, y, z) of each key, named
+                "solid_<solid_index>" or "solid_<solid_index>_surface_<surface_index>", each with the (n,) photon
+                indices of its data points named with the "_photon_index" suffix, unless the key was logged without
+                photon IDs. The binary files are written chunk by chunk and keep the precision of the logged data.
         """
+        assert fileFormat in EXPORT_FORMATS, f"Export format must be one of {EXPORT_FORMATS}, not '{fileFormat}'."
         if not self.has3D:
             utils.warn("Cannot export data when keep3D is False. No 3D data available.")
             return
@@ -420,38 +958,127 @@ class EnergyLogger(Logger):
                 solidLabels.append(solid.getLabel())
         solidLabels.sort()
 
+        exportKeys = [(InteractionKey(WORLD_SOLID_LABEL), -1, -1)]
+        for i, solidLabel in enumerate(solidLabels):
+            exportKeys.append((InteractionKey(solidLabel), i, -1))
+            for j, surfaceLabel in enumerate(self._scene.getSurfaceLabels(solidLabel)):
+                exportKeys.append((InteractionKey(solidLabel, surfaceLabel), i, j))
+        exportKeys = [
+            (key, i, j) for key, i, j in exportKeys if key in self._data and self._data[key].dataPoints is not None
+        ]
+
         print("Exporting raw data to file...")
-        filepath = f"{exportName}.csv"
-        with open(filepath, "w") as file:
-            file.write("energy,x,y,z,photon_index,solid_index,surface_index\n")
-            self._writeKeyData(file, InteractionKey(WORLD_SOLID_LABEL), -1, -1)
-            for i, solidLabel in enumerate(solidLabels):
-                self._writeKeyData(file, InteractionKey(solidLabel), i, -1)
-                for j, surfaceLabel in enumerate(self._scene.getSurfaceLabels(solidLabel)):
-                    self._writeKeyData(file, InteractionKey(solidLabel, surfaceLabel), i, j)
+        filepath = f"{exportName}.{fileFormat}"
+        if fileFormat == "csv":
+            self._exportCSV(filepath, exportKeys)
+        elif fileFormat == "npy":
+            self._exportStructuredArray(filepath, exportKeys)
+        else:
+            self._exportKeyArrays(filepath, exportKeys)
         print(f"Exported data points to {filepath}")
 
         self._exportSceneInfo(f"{exportName}.json", solidLabels)
 
-    def _writeKeyData(self, file: TextIO, key: InteractionKey, solidIndex: int, surfaceIndex: int):
-        if key not in self._data or self._data[key].dataPoints is None:
-            return
-
-        dataArray = self._data[key].dataPoints.getData()
-        n_rows = dataArray.shape[0]
+    def _iterDataChunks(self, key: InteractionKey, chunkSize: int = EXPORT_CHUNK_SIZE):
+        """
+        Yields the data points of the key with their photon IDs (None if they were not logged), in chunks of at most
+        `chunkSize` rows.
+        """
+        photonIDs = self._data[key].photonIDs
+        # The photon IDs are also read chunk by chunk, and their chunks are split to match the data chunks.
+        photonIDChunks = None if photonIDs is None else photonIDs.iterChunks()
+        pendingIDs = np.empty((0, 1), dtype=np.uint64)
+        for data in self._data[key].dataPoints.iterChunks():
+            for start in range(0, len(data), chunkSize):
+                chunk = data[start : start + chunkSize]
+                if photonIDChunks is None:
+                    yield chunk, None
+                    continue
+                while len(pendingIDs) < len(chunk):
+                    nextIDs = next(photonIDChunks)
+                    pendingIDs = nextIDs if len(pendingIDs) == 0 else np.concatenate((pendingIDs, nextIDs))
+                yield chunk, pendingIDs[: len(chunk), 0]
+                pendingIDs = pendingIDs[len(chunk) :]
 
-        output = np.empty((n_rows, 7), dtype=np.float64)
-        output[:, :4] = dataArray[:, :4]
-        output[:, 4] = dataArray[:, 4].astype(np.uint32)
+    def _exportCSV(self, filepath: str, exportKeys: List[tuple]):
+        """
+        Formats the chunks of rows with a single string formatting operation each, which is much faster than
+        `np.savetxt`. The chunks are formatted by a pool of worker threads, a window at a time, and streamed to the
+        file in order.
+        """
+        chunks = (
+            (chunk, photonIDs, solidIndex, surfaceIndex)
+            for key, solidIndex, surfaceIndex in exportKeys
+            for chunk, photonIDs in self._iterDataChunks(key)
+        )
+        with open(filepath, "w") as file, ThreadPool(EXPORT_THREADS) as pool:
+            file.write("energy,x,y,z,photon_index,solid_index,surface_index\n")
+            while True:
+                window = list(itertools.islice(chunks, EXPORT_THREADS))
+                if not window:
+                    break
+                for text in pool.map(self._formatCSVChunk, window):
+                    file.write(text)
+
+    @staticmethod
+    def _formatCSVChunk(args: tuple) -> str:
+        dataArray, photonIDs, solidIndex, surfaceIndex = args
+        # The photon IDs are exact in float64 up to 2^53.
+        output = np.empty((dataArray.shape[0], 7), dtype=np.float64)
+        output[:, :4] = dataArray
+        output[:, 4] = -1 if photonIDs is None else photonIDs
         output[:, 5] = solidIndex
         output[:, 6] = surfaceIndex
+        return (CSV_ROW_FORMAT * output.shape[0]) % tuple(output.ravel().tolist())
 
-        np.savetxt(
-            file,
-            output,
-            delimiter=",",
-            fmt=["%.8e", "%.8e", "%.8e", "%.8e", "%d", "%d", "%d"],
+    def _exportStructuredArray(self, filepath: str, exportKeys: List[tuple]):
+        dataType = np.result_type(
+            *[self._getChunkType(self._data[key].dataPoints) for key, _, _ in exportKeys], np.float32
         )
+        structuredType = np.dtype(
+            [(name, dataType) for name in ["energy", "x", "y", "z"]]
+            + [("photon_index", np.uint64), ("solid_index", np.int32), ("surface_index", np.int32)]
+        )
+        nRows = sum(len(self._data[key].dataPoints) for key, _, _ in exportKeys)
+        with open(filepath, "wb") as file:
+            header = {"descr": np.lib.format.dtype_to_descr(structuredType), "fortran_order": False, "shape": (nRows,)}
+            np.lib.format.write_array_header_1_0(file, header)
+            for key, solidIndex, surfaceIndex in exportKeys:
+                for dataArray, photonIDs in self._iterDataChunks(key):
+                    output = np.empty(dataArray.shape[0], dtype=structuredType)
+                    for i, name in enumerate(["energy", "x", "y", "z"]):
+                        output[name] = dataArray[:, i]
+                    output["photon_index"] = MISSING_PHOTON_ID if photonIDs is None else photonIDs
+                    output["solid_index"] = solidIndex
+                    output["surface_index"] = surfaceIndex
+                    file.write(output.tobytes())
+
+    def _exportKeyArrays(self, filepath: str, exportKeys: List[tuple]):
+        with zipfile.ZipFile(filepath, "w", allowZip64=True) as archive:
+            for key, solidIndex, surfaceIndex in exportKeys:
+                name = f"solid_{solidIndex}" if key.volumetric else f"solid_{solidIndex}_surface_{surfaceIndex}"
+                dataPoints, photonIDs = self._data[key].dataPoints, self._data[key].photonIDs
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as file:
+                    dataType = self._getChunkType(dataPoints)
+                    self._writeArrayHeader(file, dataType, (len(dataPoints), dataPoints.width))
+                    for dataArray, _ in self._iterDataChunks(key):
+                        file.write(np.ascontiguousarray(dataArray, dtype=dataType).tobytes())
+                if photonIDs is None:
+                    continue
+                with archive.open(f"{name}_photon_index.npy", "w", force_zip64=True) as file:
+                    self._writeArrayHeader(file, np.dtype(np.uint64), (len(photonIDs),))
+                    for _, chunkPhotonIDs in self._iterDataChunks(key):
+                        file.write(np.ascontiguousarray(chunkPhotonIDs, dtype=np.uint64).tobytes())
+
+    @staticmethod
+    def _getChunkType(container) -> np.dtype:
+        """Type of the data of a container, found from its chunks so that the blocks in memory are not concatenated."""
+        return np.result_type(*[chunk.dtype for chunk in container.iterChunks()], np.float32)
+
+    @staticmethod
+    def _writeArrayHeader(file, dataType: np.dtype, shape: tuple):
+        header = {"descr": np.lib.format.dtype_to_descr(dataType), "fortran_order": False, "shape": shape}
+        np.lib.format.write_array_header_1_0(file, header)
 
     def _exportSceneInfo(self, filepath: str, solidLabels: List[str]):
         sceneInfo = {}
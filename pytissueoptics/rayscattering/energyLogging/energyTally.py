@@ -0,0 +1,60 @@
+from typing import Dict, List
+
+import numpy as np
+
+from pytissueoptics.rayscattering import utils
+from pytissueoptics.scene.logger import InteractionKey
+
+
+class EnergyTally:
+    """
+    Total energy logged for each interaction key, without the individual data points. The energy of a volumetric key
+    is the energy deposited in the solid (or detected, for a detector). The energy of a surface key is split between
+    the energy leaving the solid through the surface (positive crossings, in the direction of the normal) and the
+    energy entering the solid (negative crossings), following the sign convention of the data points.
+    """
+
+    def __init__(self):
+        self._energy: Dict[InteractionKey, List[float]] = {}
+
+    def add(self, key: InteractionKey, energy: float):
+        """Adds the energy of a data point (or the sum of data points of the same sign) logged for this key."""
+        if key not in self._energy:
+            self._energy[key] = [0.0, 0.0]
+        if key.volumetric or energy >= 0:
+            self._energy[key][0] += float(energy)
+        else:
+            self._energy[key][1] -= float(energy)
+
+    def addArray(self, key: InteractionKey, energies: np.ndarray):
+        """Adds the energy of an array of data points logged for this key."""
+        if key.volumetric:
+            self.add(key, np.sum(energies))
+            return
+        self.add(key, np.sum(energies[energies >= 0]))
+        self.add(key, np.sum(energies[energies < 0]))
+
+    def merge(self, other: "EnergyTally"):
+        for key, (positiveEnergy, negativeEnergy) in other._energy.items():
+            if key not in self._energy:
+                self._energy[key] = [0.0, 0.0]
+            self._energy[key][0] += positiveEnergy
+            self._energy[key][1] += negativeEnergy
+
+    @property
+    def keys(self) -> List[InteractionKey]:
+        return list(self._energy.keys())
+
+    def getDepositedEnergy(self, solidLabel: str) -> float:
+        return self._getEnergy(solidLabel, None)[0]
+
+    def getSurfaceEnergy(self, solidLabel: str, surfaceLabel: str, leaving: bool) -> float:
+        """Returns the energy that left the solid through the surface if `leaving`, else the energy that entered."""
+        positiveEnergy, negativeEnergy = self._getEnergy(solidLabel, surfaceLabel)
+        return positiveEnergy if leaving else negativeEnergy
+
+    def _getEnergy(self, solidLabel: str, surfaceLabel: str = None) -> List[float]:
+        for key, energy in self._energy.items():
+            if utils.labelsEqual(key.solidLabel, solidLabel) and utils.labelsEqual(key.surfaceLabel, surfaceLabel):
+                return energy
+        return [0.0, 0.0]
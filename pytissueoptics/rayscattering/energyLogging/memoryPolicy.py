@@ -0,0 +1,13 @@
+from enum import Enum, auto
+
+
+class MemoryPolicy(Enum):
+    """
+    What an `EnergyLogger` keeping the 3D data does when the data held in memory reaches its memory budget: either
+    spill the data stored so far to files, compile it to the 2D views (and energy grid) and discard it, or downsample
+    it while preserving its total energy.
+    """
+
+    SPILL = auto()
+    COMPILE = auto()
+    DOWNSAMPLE = auto()
@@ -0,0 +1,74 @@
+from typing import Optional
+
+import numpy as np
+
+from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+
+
+class PhotonIndex:
+    """
+    Index of the photon IDs of the data points of an interaction key, which are sorted once so that the rows of a set
+    of photons are found with a binary search instead of a scan of the whole key. The index follows a container of
+    photon IDs: the rows appended to the container since the last update are sorted and merged into the index.
+    """
+
+    def __init__(self, photonIDs: ListArrayContainer):
+        self._container = photonIDs
+        self._order = np.empty(0, dtype=np.int64)
+        self._sortedIDs = np.empty(0, dtype=np.uint64)
+        self._uniqueIDs: Optional[np.ndarray] = None
+
+    def follows(self, photonIDs: ListArrayContainer) -> bool:
+        return self._container is photonIDs
+
+    def _update(self):
+        nRows = len(self._container)
+        startRow = len(self._order)
+        if nRows == startRow:
+            return
+        newIDs = self._container.getData()[startRow:, 0].astype(np.uint64, copy=False)
+        newOrder = np.argsort(newIDs)
+        self._uniqueIDs = None
+        if startRow == 0:
+            self._sortedIDs, self._order = newIDs[newOrder], newOrder
+            return
+        sortedIDs = np.concatenate((self._sortedIDs, newIDs[newOrder]))
+        order = np.concatenate((self._order, newOrder + startRow))
+        # Merges the two sorted runs, which the stable sort does in linear time.
+        merge = np.argsort(sortedIDs, kind="stable")
+        self._sortedIDs = sortedIDs[merge]
+        self._order = order[merge]
+
+    @property
+    def uniqueIDs(self) -> np.ndarray:
+        """Sorted unique photon IDs of the key."""
+        self._update()
+        if self._uniqueIDs is None:
+            isFirst = np.ones(len(self._sortedIDs), dtype=bool)
+            isFirst[1:] = self._sortedIDs[1:] != self._sortedIDs[:-1]
+            self._uniqueIDs = self._sortedIDs[isFirst]
+        return self._uniqueIDs
+
+    def getRows(self, photonIDs: np.ndarray) -> np.ndarray:
+        """
+        Returns the sorted rows of the data points of the given photons, which must be sorted and unique. The rows of
+        each photon are found with a binary search, unless there are more photons than rows, in which case each row is
+        searched in the photons instead.
+        """
+        self._update()
+        if len(photonIDs) == 0 or len(self._sortedIDs) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        if len(photonIDs) < len(self._sortedIDs):
+            starts = np.searchsorted(self._sortedIDs, photonIDs, side="left")
+            ends = np.searchsorted(self._sortedIDs, photonIDs, side="right")
+            lengths = ends - starts
+            starts, lengths = starts[lengths > 0], lengths[lengths > 0]
+            # Concatenates the ranges [start, end) of each photon.
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            positions = offsets + np.arange(np.sum(lengths))
+        else:
+            matches = np.searchsorted(photonIDs, self._sortedIDs)
+            matches[matches == len(photonIDs)] = 0
+            positions = np.flatnonzero(photonIDs[matches] == self._sortedIDs)
+        return np.sort(self._order[positions])
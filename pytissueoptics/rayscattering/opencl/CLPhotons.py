@@ -1,15 +1,34 @@
 import os
+import threading
 import time
+from contextlib import nullcontext
+from multiprocessing.pool import ThreadPool
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
-from pytissueoptics.rayscattering.opencl import WEIGHT_THRESHOLD
-from pytissueoptics.rayscattering.opencl.buffers.dataPointCL import DataPointCL
-from pytissueoptics.rayscattering.opencl.buffers.photonCL import PhotonCL
+from pytissueoptics.rayscattering.energyLogging import EnergyLogger
+from pytissueoptics.rayscattering.opencl import CONFIG, WEIGHT_THRESHOLD
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf
+from pytissueoptics.rayscattering.opencl.buffers.dataPointCL import FULL_LOG_LAYOUT, DataPointCL, LogLayout
+from pytissueoptics.rayscattering.opencl.buffers.photonCL import PhotonCL, PhotonSoACL
 from pytissueoptics.rayscattering.opencl.buffers.seedCL import SeedCL
+from pytissueoptics.rayscattering.opencl.buffers.sourceCL import SourceCL, SourceCLInfo
+from pytissueoptics.rayscattering.opencl.CLProfiler import CLProfiler
 from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
 from pytissueoptics.rayscattering.opencl.CLScene import CLScene
-from pytissueoptics.rayscattering.opencl.utils import BatchTiming, CLKeyLog, CLParameters
+from pytissueoptics.rayscattering.opencl.CLWavefront import WAVEFRONT_SOURCE_PATH, CLWavefront
+from pytissueoptics.rayscattering.opencl.config.CLConfig import cl
+from pytissueoptics.rayscattering.opencl.utils import (
+    KERNEL_COUNTER_NAMES,
+    BatchTiming,
+    CLEnergyTally,
+    CLKernelCounters,
+    CLKeyLog,
+    CLLogCodec,
+    CLParameters,
+    PhotonScheduler,
+)
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.scene.geometry import Environment
 from pytissueoptics.scene.logger.logger import Logger
@@ -18,125 +37,573 @@ PROPAGATION_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)
 
 
 class CLPhotons:
-    def __init__(self, positions: np.ndarray, directions: np.ndarray):
-        assert positions.shape == directions.shape, "Positions and directions must have the same shape."
+    def __init__(
+        self,
+        positions: np.ndarray = None,
+        directions: np.ndarray = None,
+        sourceInfo: Optional[SourceCLInfo] = None,
+        N: int = None,
+        persistentThreads: bool = True,
+        devices: List[cl.Device] = None,
+        logLayout: LogLayout = FULL_LOG_LAYOUT,
+        specializeKernels: bool = True,
+        structureOfArrays: bool = False,
+        wavefront: bool = False,
+        countKernelEvents: bool = False,
+        traceFilePath: str = None,
+    ):
+        """
+        The photons are either given explicitly by their initial `positions` and `directions`, or described by the
+        parameters of their source (`sourceInfo`), in which case the `N` photons are generated directly on the device
+        and the host memory required does not depend on N.
+
+        With `persistentThreads`, work items take the next photon from a global atomic counter instead of a fixed
+        strided slice of photons, which avoids load imbalance at the end of each batch. Photons generated from a
+        source always use persistent threads.
+
+        The photons are propagated on all the `devices` given, or on the devices selected in the global CONFIG.
+
+        The `logLayout` selects the record format of the interactions transferred from the device (see DataPointCL).
+        Compact layouts reduce the transfer volume and the host memory of the log, but drop the photon IDs, which are
+        required to filter the detected photons.
+
+        With `specializeKernels`, the kernels are compiled with the feature flags of the scene (see
+        `CLScene.getFeatureFlags`), which removes the branches for the features that the scene does not use.
+
+        With `structureOfArrays`, the photons are stored on the device as separate tightly packed buffers for each
+        field (see PhotonSoACL) instead of an array of `Photon` structs.
+
+        With `wavefront`, each propagation step is split into stage kernels which communicate through compacted
+        queues of photons (see CLWavefront), instead of running the whole propagation loop in a single kernel.
+
+        With `countKernelEvents`, the kernels are compiled with counters of the work they do in each batch (steps,
+        intersection tests, interactions, etc., see CLKernelCounters), which are available in `kernelCounters` after
+        the propagation and displayed in the summary of a verbose propagation.
+
+        With a `traceFilePath`, the OpenCL events of the kernels and data transfers are profiled, along with the host
+        time spent converting and storing the logs, and the timeline of each propagation is written to this file in
+        the Chrome trace-event format (see CLProfiler).
+        """
+        if sourceInfo is None:
+            assert positions.shape == directions.shape, "Positions and directions must have the same shape."
+            N = len(positions)
+        else:
+            assert N is not None, "The number of photons N is required when generating photons from a source."
         self._positions = positions
         self._directions = directions
-        self._N = np.uint32(len(positions))
+        self._sourceInfo = sourceInfo
+        self._N = int(N)
+        self._persistentThreads = persistentThreads
+        self._devices = devices
+        self._logLayout = logLayout
+        self._specializeKernels = specializeKernels
+        self._structureOfArrays = structureOfArrays
+        self._wavefront = wavefront
+        self._countKernelEvents = countKernelEvents
+        self._traceFilePath = traceFilePath
         self._weightThreshold = np.float32(WEIGHT_THRESHOLD)
         self._initialMaterial = None
         self._initialSolid = None
+        self._tallyEnergy = False
+        self._logDataPoints = True
+        self._keepsLogInMemory = True
 
         self._scene = None
         self._sceneLogger = None
+        self._timing = None
+        self._batchKernelCounters = []
+        self._profiler = None
+        self._lock = threading.Lock()
 
     def setContext(self, scene: ScatteringScene, environment: Environment, logger: Logger = None):
+        """
+        When the logger is an EnergyLogger that tallies the energy, the energy is tallied on the device (see
+        CLEnergyTally). When it also does not log the data points, the kernels do not write the interaction log at
+        all, so the batches are no longer limited by the size of the log.
+        """
         self._scene = scene
         self._sceneLogger = logger
         self._initialMaterial = environment.material
         self._initialSolid = environment.solid
+        isEnergyLogger = isinstance(logger, EnergyLogger)
+        self._tallyEnergy = isEnergyLogger and logger.energyTally is not None
+        self._logDataPoints = not isEnergyLogger or logger.logsDataPoints
+        storesLogOnDisk = logger is not None and logger.storageDirectory is not None
+        self._keepsLogInMemory = self._logDataPoints and not storesLogOnDisk and (not isEnergyLogger or logger.has3D)
 
     def propagate(self, IPP: float, verbose: bool = False):
+        """
+        Propagates the photons on all the selected OpenCL devices (`CONFIG.devices` unless `devices` were given). Each
+        device has its own program, queue and scene buffers, and claims batches of photons from a shared budget
+        until all photons are propagated. The logs of all devices are merged into the same scene logger.
+        """
         assert self._scene is not None, "Context must be set before propagation."
-        program = CLProgram(sourcePath=PROPAGATION_SOURCE_PATH)
-        params = CLParameters(self._N, AVG_IT_PER_PHOTON=IPP)
+        devices = self._devices if self._devices is not None else CONFIG.devices
+        scheduler = PhotonScheduler(self._N)
+        self._timing = BatchTiming(self._N) if verbose else None
+        self._batchKernelCounters = []
+        self._profiler = CLProfiler() if self._traceFilePath is not None else None
 
-        scene = CLScene(self._scene, params.workItemAmount)
+        if len(devices) == 1:
+            self._propagateOnDevice(devices[0], scheduler, IPP, nDevices=1)
+        else:
+            pool = ThreadPool(len(devices))
+            try:
+                results = [
+                    pool.apply_async(self._propagateOnDevice, args=(device, scheduler, IPP, len(devices)))
+                    for device in devices
+                ]
+                for result in results:
+                    result.get()
+            finally:
+                pool.close()
+                pool.join()
 
-        kernelPhotons = PhotonCL(
-            self._positions[0 : params.maxPhotonsPerBatch],
-            self._directions[0 : params.maxPhotonsPerBatch],
-            materialID=scene.getMaterialID(self._initialMaterial),
-            solidID=scene.getSolidID(self._initialSolid),
-        )
-        photonPool = PhotonCL(
-            self._positions[params.maxPhotonsPerBatch :],
-            self._directions[params.maxPhotonsPerBatch :],
-            materialID=scene.getMaterialID(self._initialMaterial),
-            solidID=scene.getSolidID(self._initialSolid),
-            startID=params.maxPhotonsPerBatch,
+        if self._profiler is not None:
+            self._profiler.save(self._traceFilePath)
+
+    @property
+    def kernelCounters(self) -> Dict[str, int]:
+        """Total of each kernel counter of the last propagation (see CLKernelCounters)."""
+        assert self._countKernelEvents, "The kernel events are only counted with `countKernelEvents`."
+        totals = dict.fromkeys(KERNEL_COUNTER_NAMES, 0)
+        for counters in self._batchKernelCounters:
+            for name, count in counters.items():
+                totals[name] += count
+        return totals
+
+    @property
+    def batchKernelCounters(self) -> List[Dict[str, int]]:
+        """Kernel counters of each batch of the last propagation, in the order the batches completed."""
+        assert self._countKernelEvents, "The kernel events are only counted with `countKernelEvents`."
+        return list(self._batchKernelCounters)
+
+    def _propagateOnDevice(self, device: cl.Device, scheduler: PhotonScheduler, IPP: float, nDevices: int):
+        sourcePath = WAVEFRONT_SOURCE_PATH if self._wavefront else PROPAGATION_SOURCE_PATH
+        program = CLProgram(sourcePath=sourcePath, device=device, profiler=self._profiler)
+        params = CLParameters(
+            int(np.ceil(self._N / nDevices)),
+            AVG_IT_PER_PHOTON=IPP,
+            dataPointSize=DataPointCL.getLayoutItemSize(self._logLayout),
+            keepsLogInMemory=self._keepsLogInMemory,
         )
-        photonPool.make(program.device)
-        seeds = SeedCL(params.maxPhotonsPerBatch)
-        logger = DataPointCL(size=params.maxLoggableInteractions)
 
-        photonCount = 0
-        batchCount = 0
+        scene = CLScene(self._scene, params.workItemAmount)
+        codec = CLLogCodec(self._logLayout, scene)
+        energyTally = None
+        if self._tallyEnergy:
+            # The wavefront kernels return early, so they cannot sum the energy of their work group.
+            energyTally = CLEnergyTally(scene, device, globalAtomics=self._wavefront)
+        defines = scene.getFeatureFlags() if self._specializeKernels else {}
+        defines.update(codec.defines)
+        if energyTally is not None:
+            defines.update(energyTally.defines)
+        kernelCounters = CLKernelCounters() if self._countKernelEvents else None
+        if kernelCounters is not None:
+            defines.update(kernelCounters.defines)
+        if not self._logDataPoints:
+            defines["NO_LOG_DATA_POINTS"] = ""
+        for name, value in defines.items():
+            program.define(name, value)
+        program.include(codec.declarations)
+        if self._structureOfArrays:
+            program.define("PHOTON_SOA")
+            program.include(PhotonSoACL.getDeclaration(device))
+
+        if self._sourceInfo is not None:
+            self._propagateFromSource(program, params, scene, codec, energyTally, kernelCounters, scheduler)
+        else:
+            self._propagateFromHost(program, params, scene, codec, energyTally, kernelCounters, scheduler)
+
+        if energyTally is not None and self._sceneLogger is not None:
+            with self._lock:
+                self._sceneLogger.logEnergyTally(energyTally.toEnergyTally())
+
+    def _propagateFromHost(
+        self,
+        program: CLProgram,
+        params: CLParameters,
+        scene: CLScene,
+        codec: CLLogCodec,
+        energyTally: Optional[CLEnergyTally],
+        kernelCounters: Optional[CLKernelCounters],
+        scheduler: PhotonScheduler,
+    ):
+        materialID = scene.getMaterialID(self._initialMaterial)
+        solidID = scene.getSolidID(self._initialSolid)
+        kernelPhotons = self._claimPhotons(scheduler, params.maxPhotonsPerBatch, materialID, solidID, program.device)
+        if kernelPhotons.length == 0:
+            return
+        params.maxPhotonsPerBatch = kernelPhotons.length
 
-        if verbose:
-            timing = BatchTiming(self._N)
+        seeds = SeedCL(params.maxPhotonsPerBatch)
+        logger = self._makeLogger(params)
+        logCursor = BufferOf(np.zeros(1, dtype=np.uint32))
+        photonCounter = BufferOf(np.zeros(1, dtype=np.uint32))
+        tallyBins = self._getTallyBins(energyTally)
+        counterBuffer = self._getCounterBuffer(kernelCounters)
+        wavefront = None
+        if self._wavefront:
+            wavefront = CLWavefront(
+                program,
+                scene,
+                kernelPhotons.length,
+                logger,
+                logCursor,
+                tallyBins,
+                counterBuffer,
+                self._weightThreshold,
+            )
 
-        while photonCount < self._N:
+        while kernelPhotons.length > 0:
+            logCursor.hostBuffer[0] = 0
             t1 = time.time_ns()
-            program.launchKernel(
-                kernelName="propagate",
-                N=np.int32(params.workItemAmount),
-                arguments=[
-                    np.int32(params.photonsPerWorkItem),
-                    np.int32(params.maxLoggableInteractionsPerWorkItem),
-                    self._weightThreshold,
-                    np.int32(params.workItemAmount),
+            if wavefront is not None:
+                wavefront.propagate(kernelPhotons, seeds, activeSlots=np.flatnonzero(kernelPhotons.weights))
+            else:
+                self._launchPropagation(
+                    program,
+                    params,
+                    scene,
                     kernelPhotons,
-                    scene.materials,
-                    scene.nSolids,
-                    scene.solids,
-                    scene.surfaces,
-                    scene.triangles,
-                    scene.vertices,
-                    scene.solidCandidates,
                     seeds,
                     logger,
-                ],
-            )
+                    logCursor,
+                    photonCounter,
+                    tallyBins,
+                    counterBuffer,
+                )
             t2 = time.time_ns()
-            log = program.getData(logger)
+            log = self._collectBatch(program, logger, logCursor, codec, energyTally)
+            batchCounters = self._collectKernelCounters(program, kernelCounters)
             t3 = time.time_ns()
             self._translateToSceneLogger(log, scene)
             t4 = time.time_ns()
 
             logger.reset()
-            program.getData(kernelPhotons, returnData=False)
-            batchPhotonCount, photonCount = self._replaceFullyPropagatedPhotons(
-                kernelPhotons, photonPool, photonCount, params.maxPhotonsPerBatch
+            self._getPhotonData(program, kernelPhotons)
+            batchPhotonCount = self._replaceFullyPropagatedPhotons(
+                kernelPhotons, scheduler, materialID, solidID, program.device
             )
-            if verbose:
-                timing.recordBatch(
-                    batchPhotonCount,
-                    propagationTime=(t2 - t1),
-                    dataTransferTime=(t3 - t2),
-                    dataConversionTime=(t4 - t3),
-                    totalTime=(time.time_ns() - t1),
-                )
+            self._recordBatch(batchPhotonCount, t1, t2, t3, t4, batchCounters)
 
             params.maxPhotonsPerBatch = kernelPhotons.length
-            batchCount += 1
+
+    def _launchPropagation(
+        self,
+        program: CLProgram,
+        params: CLParameters,
+        scene: CLScene,
+        kernelPhotons: Union[PhotonCL, PhotonSoACL],
+        seeds: SeedCL,
+        logger: DataPointCL,
+        logCursor: BufferOf,
+        photonCounter: BufferOf,
+        tallyBins: BufferOf,
+        counterBuffer: BufferOf,
+    ):
+        logArguments = [
+            np.uint32(params.maxLoggableInteractions),
+            params.logChunkSize,
+            logCursor,
+            self._weightThreshold,
+        ]
+        if self._persistentThreads:
+            photonCounter.hostBuffer[0] = 0
+            kernelName = "propagatePersistent"
+            kernelArguments = [np.uint32(params.maxPhotonsPerBatch), *logArguments, photonCounter]
+        else:
+            kernelName = "propagate"
+            kernelArguments = [np.int32(params.photonsPerWorkItem), *logArguments, np.int32(params.workItemAmount)]
+        program.launchKernel(
+            kernelName=kernelName,
+            N=np.int32(params.workItemAmount),
+            arguments=kernelArguments
+            + kernelPhotons.buffers
+            + [
+                scene.materials,
+                scene.nSolids,
+                scene.solids,
+                scene.surfaces,
+                scene.triangles,
+                scene.vertices,
+                scene.solidCandidates,
+                seeds,
+                logger,
+                tallyBins,
+                counterBuffer,
+            ],
+        )
+
+    def _propagateFromSource(
+        self,
+        program: CLProgram,
+        params: CLParameters,
+        scene: CLScene,
+        codec: CLLogCodec,
+        energyTally: Optional[CLEnergyTally],
+        kernelCounters: Optional[CLKernelCounters],
+        scheduler: PhotonScheduler,
+    ):
+        """
+        Each work item owns a single photon slot which is refilled on the device with a new photon generated from
+        the source parameters. The device generates the photon IDs of the range it claimed from the scheduler and
+        claims a new range once it is exhausted. The photon counter is the 32-bit index of the next photon within the
+        range, and the 64-bit photon IDs are offset by the first ID of the range. Only the slots and the photon
+        counter are transferred between batches.
+
+        The wavefront kernels refill the empty slots at the start of each batch, and use a slot for each photon of a
+        batch to keep more photons in flight.
+        """
+        nSlots = int(params.maxPhotonsPerBatch if self._wavefront else params.workItemAmount)
+        source = SourceCL(self._sourceInfo)
+        materialID = np.uint32(scene.getMaterialID(self._initialMaterial))
+        solidID = np.int32(scene.getSolidID(self._initialSolid))
+        photonSlots = self._makePhotons(
+            np.zeros((nSlots, 3)),
+            np.zeros((nSlots, 3)),
+            materialID=materialID,
+            solidID=solidID,
+            device=program.device,
+            weight=0,
+        )
+        photonCounter = BufferOf(np.zeros(1, dtype=np.uint32))
+        seeds = SeedCL(nSlots)
+        logger = self._makeLogger(params)
+        logCursor = BufferOf(np.zeros(1, dtype=np.uint32))
+        tallyBins = self._getTallyBins(energyTally)
+        counterBuffer = self._getCounterBuffer(kernelCounters)
+        wavefront = None
+        if self._wavefront:
+            wavefront = CLWavefront(
+                program, scene, nSlots, logger, logCursor, tallyBins, counterBuffer, self._weightThreshold
+            )
+
+        photonLimit = 0
+        firstPhotonID = 0
+        photonsInFlight = 0
+        while True:
+            if photonCounter.hostBuffer[0] >= photonLimit:
+                firstPhotonID, photonLimit = scheduler.claim(params.maxPhotonsPerBatch)
+                photonCounter.hostBuffer[0] = 0
+            if photonCounter.hostBuffer[0] >= photonLimit and photonsInFlight == 0:
+                break
+
+            firstPhotonIndex = int(photonCounter.hostBuffer[0])
+            logCursor.hostBuffer[0] = 0
+            t1 = time.time_ns()
+            if wavefront is not None:
+                generatorArguments = [
+                    np.uint32(photonLimit),
+                    photonCounter,
+                    np.uint64(firstPhotonID),
+                    source,
+                    materialID,
+                    solidID,
+                ]
+                wavefront.propagate(photonSlots, seeds, generatorArguments=generatorArguments)
+            else:
+                program.launchKernel(
+                    kernelName="propagateFromSource",
+                    N=np.int32(nSlots),
+                    arguments=[
+                        np.uint32(photonLimit),
+                        np.uint32(params.maxLoggableInteractions),
+                        params.logChunkSize,
+                        logCursor,
+                        self._weightThreshold,
+                        photonCounter,
+                        np.uint64(firstPhotonID),
+                        source,
+                        materialID,
+                        solidID,
+                        *photonSlots.buffers,
+                        scene.materials,
+                        scene.nSolids,
+                        scene.solids,
+                        scene.surfaces,
+                        scene.triangles,
+                        scene.vertices,
+                        scene.solidCandidates,
+                        seeds,
+                        logger,
+                        tallyBins,
+                        counterBuffer,
+                    ],
+                )
+            t2 = time.time_ns()
+            log = self._collectBatch(program, logger, logCursor, codec, energyTally)
+            batchCounters = self._collectKernelCounters(program, kernelCounters)
+            t3 = time.time_ns()
+            self._translateToSceneLogger(log, scene)
+            t4 = time.time_ns()
+
+            logger.reset()
+            self._getPhotonData(program, photonSlots)
+            program.getData(photonCounter, returnData=False)
+            # Work items that found the photon range exhausted still incremented the counter.
+            photonCounter.hostBuffer[0] = min(int(photonCounter.hostBuffer[0]), photonLimit)
+            generatedCount = int(photonCounter.hostBuffer[0]) - firstPhotonIndex
+            newPhotonsInFlight = np.count_nonzero(photonSlots.weights)
+            batchPhotonCount = generatedCount + photonsInFlight - newPhotonsInFlight
+            photonsInFlight = newPhotonsInFlight
+
+            self._recordBatch(batchPhotonCount, t1, t2, t3, t4, batchCounters)
+
+    def _makeLogger(self, params: CLParameters) -> DataPointCL:
+        # Without data points, the log is never written by the kernels.
+        size = params.maxLoggableInteractions if self._logDataPoints else 1
+        return DataPointCL(size=size, layout=self._logLayout)
+
+    @staticmethod
+    def _getTallyBins(energyTally: Optional[CLEnergyTally]) -> BufferOf:
+        # The kernels always take the bins, which are unused unless the energy is tallied.
+        if energyTally is None:
+            return BufferOf(np.zeros(1, dtype=np.float32))
+        return energyTally.bins
+
+    @staticmethod
+    def _getCounterBuffer(kernelCounters: Optional[CLKernelCounters]) -> BufferOf:
+        # The kernels always take the counters, which are unused unless the kernel events are counted.
+        if kernelCounters is None:
+            return BufferOf(np.zeros(2, dtype=np.uint32))
+        return kernelCounters.buffer
+
+    def _collectBatch(
+        self,
+        program: CLProgram,
+        logger: DataPointCL,
+        logCursor: BufferOf,
+        codec: CLLogCodec,
+        energyTally: Optional[CLEnergyTally],
+    ) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """
+        Collects the energy tallied during the batch and returns its decoded log and photon IDs, if the data points
+        are logged.
+        """
+        if energyTally is not None:
+            energyTally.collect(program)
+        if not self._logDataPoints:
+            return None
+        return self._getDenseLog(program, logger, logCursor, codec)
+
+    @staticmethod
+    def _collectKernelCounters(
+        program: CLProgram, kernelCounters: Optional[CLKernelCounters]
+    ) -> Optional[Dict[str, int]]:
+        if kernelCounters is None:
+            return None
+        return kernelCounters.collect(program)
+
+    @staticmethod
+    def _getDenseLog(
+        program: CLProgram, logger: DataPointCL, logCursor: BufferOf, codec: CLLogCodec
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Only copies the part of the log that was allocated by the work items. The cursor can exceed the log size when
+        the log overflowed, in which case the interrupted photons are resumed by the next batch.
+        """
+        program.getData(logCursor, returnData=False)
+        logSize = min(int(logCursor.hostBuffer[0]), logger.length)
+        program.getData(logger, returnData=False, size=logSize)
+        return codec.decode(logger.hostBuffer[:logSize])
+
+    def _claimPhotons(
+        self, scheduler: PhotonScheduler, maxPhotons: int, materialID: int, solidID: int, device: cl.Device
+    ) -> Union[PhotonCL, PhotonSoACL]:
+        startIndex, photonCount = scheduler.claim(maxPhotons)
+        endIndex = startIndex + photonCount
+        return self._makePhotons(
+            self._positions[startIndex:endIndex],
+            self._directions[startIndex:endIndex],
+            materialID=materialID,
+            solidID=solidID,
+            device=device,
+            startID=startIndex,
+        )
+
+    def _makePhotons(
+        self,
+        positions: np.ndarray,
+        directions: np.ndarray,
+        materialID: int,
+        solidID: int,
+        device: cl.Device,
+        weight=1.0,
+        startID=0,
+    ) -> Union[PhotonCL, PhotonSoACL]:
+        if self._structureOfArrays:
+            return PhotonSoACL(positions, directions, materialID, solidID, weight=weight, startID=startID)
+        photons = PhotonCL(positions, directions, materialID, solidID, weight=weight, startID=startID)
+        photons.make(device)
+        photons.reset()
+        return photons
+
+    @staticmethod
+    def _getPhotonData(program: CLProgram, photons: Union[PhotonCL, PhotonSoACL]):
+        for buffer in photons.buffers:
+            program.getData(buffer, returnData=False)
 
     def _replaceFullyPropagatedPhotons(
-        self, kernelPhotons: PhotonCL, photonPool: PhotonCL, photonCount: int, currentKernelLength: int
-    ) -> (int, int):
-        photonsToReplace = np.where(kernelPhotons.hostBuffer["weight"] == 0)[0]
+        self,
+        kernelPhotons: Union[PhotonCL, PhotonSoACL],
+        scheduler: PhotonScheduler,
+        materialID: int,
+        solidID: int,
+        device: cl.Device,
+    ) -> int:
+        """Replaces the photons without energy left by new photons claimed from the scheduler, or removes them if
+        there are no photons left. Returns the number of photons that were fully propagated."""
+        photonsToReplace = np.where(kernelPhotons.weights == 0)[0]
         batchPhotonCount = len(photonsToReplace)
 
         if batchPhotonCount == 0:
-            return batchPhotonCount, photonCount
-
-        newPhotonsRemaining = photonCount + currentKernelLength < self._N
-        if newPhotonsRemaining:
-            replacement_photons = photonPool.hostBuffer[photonCount : photonCount + batchPhotonCount]
-            photonsToRemove = photonsToReplace[len(replacement_photons) :]
-            photonsToReplace = photonsToReplace[: len(replacement_photons)]
-            kernelPhotons.hostBuffer[photonsToReplace] = replacement_photons
-        else:
-            photonsToRemove = photonsToReplace
+            return batchPhotonCount
 
-        kernelPhotons.hostBuffer = np.delete(kernelPhotons.hostBuffer, photonsToRemove)
+        replacementPhotons = self._claimPhotons(scheduler, batchPhotonCount, materialID, solidID, device)
+        photonsToRemove = photonsToReplace[replacementPhotons.length :]
+        photonsToReplace = photonsToReplace[: replacementPhotons.length]
+        kernelPhotons.replace(photonsToReplace, replacementPhotons)
+        kernelPhotons.remove(photonsToRemove)
+        return batchPhotonCount
 
-        photonCount += batchPhotonCount
-        return batchPhotonCount, photonCount
+    def _recordBatch(
+        self,
+        batchPhotonCount: int,
+        t1: int,
+        t2: int,
+        t3: int,
+        t4: int,
+        kernelCounters: Optional[Dict[str, int]] = None,
+    ):
+        if self._profiler is not None:
+            self._profiler.recordSpan("Propagation", "batch", t1, t2, photonCount=batchPhotonCount)
+            self._profiler.recordSpan("Log collection", "batch", t2, t3)
+        with self._lock:
+            if kernelCounters is not None:
+                self._batchKernelCounters.append(kernelCounters)
+            if self._timing is None:
+                return
+            self._timing.recordBatch(
+                batchPhotonCount,
+                propagationTime=(t2 - t1),
+                dataTransferTime=(t3 - t2),
+                dataConversionTime=(t4 - t3),
+                totalTime=(time.time_ns() - t1),
+                kernelCounters=kernelCounters,
+            )
 
     def _translateToSceneLogger(self, log, sceneCL):
-        if not self._sceneLogger:
+        if not self._sceneLogger or log is None:
             return
 
-        keyLog = CLKeyLog(log, sceneCL=sceneCL)
-        keyLog.toSceneLogger(self._sceneLogger)
+        log, photonIDs = log
+        with self._profilerSpan("CLKeyLog conversion", "log", dataPoints=len(log)):
+            keyLog = CLKeyLog(log, sceneCL=sceneCL, photonIDs=photonIDs)
+        with self._lock, self._profilerSpan("Logger insertion", "log", dataPoints=len(log)):
+            keyLog.toSceneLogger(self._sceneLogger)
+
+    def _profilerSpan(self, name: str, category: str, **args):
+        if self._profiler is None:
+            return nullcontext()
+        return self._profiler.span(name, category, **args)
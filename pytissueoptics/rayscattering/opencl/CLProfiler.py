@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple
+
+try:
+    import pyopencl as cl
+except ImportError:
+    pass
+
+HOST_PROCESS_ID = 0
+
+
+class DeviceEvent(NamedTuple):
+    name: str
+    category: str
+    deviceID: int
+    deviceName: str
+    hostQueuedTime: int
+    event: "cl.Event"
+    args: dict
+
+
+class HostSpan(NamedTuple):
+    name: str
+    category: str
+    threadName: str
+    startTime: int
+    endTime: int
+    args: dict
+
+
+class CLProfiler:
+    """
+    Timeline of a propagation, exported in the Chrome trace-event format (see `save`), which can be opened in
+    chrome://tracing or Perfetto.
+
+    The programs created with a profiler use a command queue with profiling enabled, and record the OpenCL event of
+    each kernel launch and data transfer (see CLProgram). The device timestamps of an event are only read when the
+    trace is exported, once the event is completed. Each device is shown as a process with a track for the execution
+    of its commands and a track for the time they waited in the queue. The host spans recorded with `span` are shown
+    as a process with a track for each host thread.
+
+    The device clocks are aligned on the host clock with the time at which the commands were enqueued, which is the
+    closest to the QUEUED timestamp of their event. The implicit transfers of the buffers created with host pointers
+    are done by the OpenCL implementation and are not recorded.
+    """
+
+    def __init__(self):
+        self._startTime = self.now()
+        self._deviceEvents: List[DeviceEvent] = []
+        self._hostSpans: List[HostSpan] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def getQueueProperties():
+        return cl.command_queue_properties.PROFILING_ENABLE
+
+    @staticmethod
+    def now() -> int:
+        """Host time in nanoseconds, on the same clock as the `time.time_ns` measurements of the propagation."""
+        return time.time_ns()
+
+    def recordEvent(self, name: str, category: str, device: "cl.Device", hostQueuedTime: int, event, **args):
+        """Records an OpenCL event enqueued at `hostQueuedTime` (see `now`) on the queue of the device."""
+        with self._lock:
+            self._deviceEvents.append(
+                DeviceEvent(name, category, device.int_ptr, device.name, hostQueuedTime, event, args)
+            )
+
+    def recordSpan(self, name: str, category: str, startTime: int, endTime: int, **args):
+        """Records a host span between the given times (see `now`) on the track of the current thread."""
+        threadName = threading.current_thread().name
+        with self._lock:
+            self._hostSpans.append(HostSpan(name, category, threadName, startTime, endTime, args))
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """Records the host time spent in the context on the track of the current thread."""
+        startTime = self.now()
+        try:
+            yield
+        finally:
+            self.recordSpan(name, category, startTime, self.now(), **args)
+
+    def toChromeTrace(self) -> dict:
+        with self._lock:
+            deviceEvents = list(self._deviceEvents)
+            hostSpans = list(self._hostSpans)
+
+        traceEvents = [self._makeMetadata("process_name", HOST_PROCESS_ID, 0, "Host")]
+        threadIDs = {}
+        for span in hostSpans:
+            if span.threadName not in threadIDs:
+                threadIDs[span.threadName] = len(threadIDs)
+                traceEvents.append(
+                    self._makeMetadata("thread_name", HOST_PROCESS_ID, threadIDs[span.threadName], span.threadName)
+                )
+            traceEvents.append(
+                self._makeSlice(
+                    span.name,
+                    span.category,
+                    HOST_PROCESS_ID,
+                    threadIDs[span.threadName],
+                    span.startTime,
+                    span.endTime,
+                    span.args,
+                )
+            )
+
+        processIDs = {}
+        clockOffsets = self._getClockOffsets(deviceEvents)
+        for deviceEvent in deviceEvents:
+            if deviceEvent.deviceID not in processIDs:
+                processID = len(processIDs) + 1
+                processIDs[deviceEvent.deviceID] = processID
+                traceEvents.append(self._makeMetadata("process_name", processID, 0, deviceEvent.deviceName))
+                traceEvents.append(self._makeMetadata("thread_name", processID, 0, "Execution"))
+                traceEvents.append(self._makeMetadata("thread_name", processID, 1, "Queued"))
+            processID = processIDs[deviceEvent.deviceID]
+            offset = clockOffsets[deviceEvent.deviceID]
+            profile = deviceEvent.event.profile
+            queued, start, end = profile.queued + offset, profile.start + offset, profile.end + offset
+            args = {**deviceEvent.args, "queuedMicroseconds": (start - queued) / 1e3}
+            traceEvents.append(self._makeSlice(deviceEvent.name, deviceEvent.category, processID, 0, start, end, args))
+            traceEvents.append(self._makeSlice(deviceEvent.name, "queued", processID, 1, queued, start, {}))
+        return {"traceEvents": traceEvents, "displayTimeUnit": "ms"}
+
+    def save(self, filePath: str):
+        with open(filePath, "w") as file:
+            json.dump(self.toChromeTrace(), file)
+
+    @staticmethod
+    def _getClockOffsets(deviceEvents: List[DeviceEvent]) -> Dict[int, int]:
+        """
+        Offset from the device clock to the host clock of each device. An event is always queued after the host
+        time recorded before enqueueing it, so the largest offset of the events is the closest to the real offset.
+        """
+        offsets = {}
+        for deviceEvent in deviceEvents:
+            offset = deviceEvent.hostQueuedTime - deviceEvent.event.profile.queued
+            offsets[deviceEvent.deviceID] = max(offset, offsets.get(deviceEvent.deviceID, offset))
+        return offsets
+
+    def _makeSlice(
+        self, name: str, category: str, processID: int, threadID: int, startTime: int, endTime: int, args: dict
+    ) -> dict:
+        return {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (startTime - self._startTime) / 1e3,
+            "dur": max(endTime - startTime, 0) / 1e3,
+            "pid": processID,
+            "tid": threadID,
+            "args": args,
+        }
+
+    @staticmethod
+    def _makeMetadata(name: str, processID: int, threadID: int, value: str) -> dict:
+        return {"name": name, "ph": "M", "pid": processID, "tid": threadID, "args": {"name": value}}
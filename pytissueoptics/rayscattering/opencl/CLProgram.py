@@ -1,6 +1,8 @@
+import hashlib
 import os
+import threading
 import time
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
@@ -13,17 +15,66 @@ from numpy.lib import recfunctions as rfn
 
 from pytissueoptics.rayscattering.opencl import CONFIG
 from pytissueoptics.rayscattering.opencl.buffers import CLObject
+from pytissueoptics.rayscattering.opencl.CLProfiler import CLProfiler
+
+
+class ProgramCache:
+    """
+    Compiled programs shared by all CLProgram instances. A program is keyed by its context and by a hash of its full
+    source code, which includes the preprocessor definitions. Each specialized variant of a kernel is thus compiled
+    once per device instead of at every launch.
+    """
+
+    _contexts: Dict[int, "cl.Context"] = {}
+    _programs: Dict[Tuple[int, str], "cl.Program"] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def getContext(cls, device: "cl.Device") -> "cl.Context":
+        with cls._lock:
+            if device.int_ptr not in cls._contexts:
+                cls._contexts[device.int_ptr] = cl.Context([device])
+            return cls._contexts[device.int_ptr]
+
+    @classmethod
+    def getProgram(cls, context: "cl.Context", sourceCode: str) -> "cl.Program":
+        key = (context.int_ptr, hashlib.sha1(sourceCode.encode()).hexdigest())
+        with cls._lock:
+            program = cls._programs.get(key)
+        if program is None:
+            program = cl.Program(context, sourceCode).build()
+            with cls._lock:
+                cls._programs[key] = program
+        return program
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._programs.clear()
+
+    @classmethod
+    def size(cls) -> int:
+        return len(cls._programs)
 
 
 class CLProgram:
-    def __init__(self, sourcePath: str):
+    def __init__(self, sourcePath: str, device: "cl.Device" = None, profiler: CLProfiler = None):
+        """
+        The program is built for the given OpenCL device, or for the device selected in the global CONFIG. With a
+        `profiler`, the queue has profiling enabled and the events of the kernel launches and of the data transfers
+        are recorded by the profiler.
+        """
         self._sourcePath = sourcePath
-        self._context = CONFIG.clContext
-        self._device = CONFIG.device
+        self._device = CONFIG.device if device is None else device
+        self._context = ProgramCache.getContext(self._device)
+        self._profiler = profiler
 
-        self._mainQueue = cl.CommandQueue(self._context)
+        queueProperties = 0 if profiler is None else profiler.getQueueProperties()
+        self._mainQueue = cl.CommandQueue(self._context, properties=queueProperties)
         self._program: Optional[cl.Program] = None
         self._include = ""
+        self._defines = {}
+        self._kernels = {}
         self._mocks = []
 
     def release(self):
@@ -33,10 +84,27 @@ class CLProgram:
         self._context = None
         self._device = None
 
-    def launchKernel(self, kernelName: str, N: int, arguments: list, verbose: bool = False):
+    def launchKernel(
+        self,
+        kernelName: str,
+        N: int,
+        arguments: list,
+        verbose: bool = False,
+        build: bool = True,
+        localSize: int = None,
+    ):
+        """
+        By default, the device buffers of the CLObject arguments are created from their host buffers and the program
+        is built with their declarations. Without `build`, the program and the device buffers of the last `build` are
+        reused, so the data written by a previous kernel stays on the device for the next one.
+
+        The work-group size is chosen by the OpenCL implementation unless a `localSize` is given, in which case N
+        must be a multiple of it.
+        """
         t0 = time.time()
         CLObjects = [arg for arg in arguments if isinstance(arg, CLObject)]
-        self._build(CLObjects)
+        if build:
+            self._build(CLObjects)
         if verbose:
             for _object in CLObjects:
                 print(f" ... {_object.name} ({_object.nBytes / 1024**2:.3f} MB)")
@@ -46,9 +114,11 @@ class CLProgram:
         if verbose:
             print(f" ... {t1 - t0:.3f} s. [Build]")
 
-        kernel = getattr(self._program, kernelName)
+        kernel = self._getKernel(kernelName)
         try:
-            kernel(self._mainQueue, (N,), None, *buffers)
+            queuedTime = self._now()
+            event = kernel(self._mainQueue, (N,), None if localSize is None else (localSize,), *buffers)
+            self._recordEvent(kernelName, "kernel", queuedTime, event, globalSize=int(N), localSize=localSize)
         except cl.MemoryError:
             raise MemoryError(f"Cannot allocate {sizeOnDevice // 1024**2} MB on the device;the buffers are too large.")
         self._mainQueue.finish()
@@ -57,42 +127,89 @@ class CLProgram:
         if verbose:
             print(f" ... {t2 - t1:.3f} s. [Kernel execution]")
 
+    def build(self, objects: List[CLObject]):
+        """Creates the device buffers of the objects and builds the program with their declarations."""
+        self._build(objects)
+
     def _build(self, objects: List[CLObject]):
         for _object in objects:
             _object.build(self._device, self._context)
 
-        typeDeclarations = "".join([_object.declaration for _object in objects])
-        sourceCode = self._include + typeDeclarations + self._makeSource(self._sourcePath)
+        # Objects of the same type share the same declaration.
+        typeDeclarations = "".join(dict.fromkeys(_object.declaration for _object in objects))
+        defines = "".join([f"#define {name} {value}\n" for name, value in self._defines.items()])
+        sourceCode = defines + self._include + typeDeclarations + self._makeSource(self._sourcePath)
 
         for code, mock in self._mocks:
             if code not in sourceCode:
                 raise ValueError(f"Invalid mock. Code block not found in source code: {code}")
             sourceCode = sourceCode.replace(code, mock)
 
-        self._program = cl.Program(self._context, sourceCode).build()
-
-    def getData(self, _object: CLObject, dtype: np.dtype = np.float32, returnData: bool = True):
-        cl.enqueue_copy(self._mainQueue, dest=_object.hostBuffer, src=_object.deviceBuffer)
+        self._program = ProgramCache.getProgram(self._context, sourceCode)
+
+    def _getKernel(self, kernelName: str) -> "cl.Kernel":
+        """Kernels are reused as long as the same compiled program is used."""
+        key = (id(self._program), kernelName)
+        if key not in self._kernels:
+            self._kernels[key] = cl.Kernel(self._program, kernelName)
+        return self._kernels[key]
+
+    def getData(self, _object: CLObject, dtype: np.dtype = np.float32, returnData: bool = True, size: int = None):
+        """Copies the device buffer of the object to its host buffer. When `size` is given, only the first `size`
+        items are copied and returned."""
+        hostBuffer = _object.hostBuffer if size is None else _object.hostBuffer[:size]
+        queuedTime = self._now()
+        event = cl.enqueue_copy(self._mainQueue, dest=hostBuffer, src=_object.deviceBuffer)
+        self._recordEvent(
+            f"getData {self._getObjectName(_object)}", "transfer", queuedTime, event, bytes=hostBuffer.nbytes
+        )
         if not returnData:
             return
         if _object.STRUCT_DTYPE is not None:
-            return rfn.structured_to_unstructured(_object.hostBuffer, dtype=dtype)
+            return rfn.structured_to_unstructured(hostBuffer, dtype=dtype)
         else:
-            return _object.hostBuffer
+            return hostBuffer
+
+    def setData(self, _object: CLObject):
+        """Copies the host buffer of the object to its existing device buffer."""
+        queuedTime = self._now()
+        event = cl.enqueue_copy(self._mainQueue, dest=_object.deviceBuffer, src=_object.hostBuffer)
+        self._recordEvent(
+            f"setData {self._getObjectName(_object)}", "transfer", queuedTime, event, bytes=_object.hostBuffer.nbytes
+        )
+
+    @staticmethod
+    def _getObjectName(_object: CLObject) -> str:
+        return _object.name or type(_object).__name__
+
+    def _now(self) -> Optional[int]:
+        return None if self._profiler is None else self._profiler.now()
+
+    def _recordEvent(self, name: str, category: str, queuedTime: Optional[int], event: "cl.Event", **args):
+        if self._profiler is not None:
+            self._profiler.recordEvent(name, category, self._device, queuedTime, event, **args)
 
     def include(self, code: str):
         self._include += code
 
-    @staticmethod
-    def _makeSource(sourcePath) -> str:
+    def define(self, name: str, value: str = ""):
+        """Adds a preprocessor definition at the top of the source code."""
+        self._defines[name] = value
+
+    @classmethod
+    def _makeSource(cls, sourcePath, includedFiles: set = None) -> str:
+        """Inlines the files included at the top of the source file. Included files can include other files, which
+        are only inlined once."""
+        includedFiles = set() if includedFiles is None else includedFiles
         includeDir = os.path.dirname(sourcePath)
         sourceCode = ""
         with open(sourcePath, "r") as f:
             line = f.readline()
             while line.startswith("#include"):
                 libFileName = line.split('"')[1]
-                with open(os.path.join(includeDir, libFileName), "r") as libFile:
-                    sourceCode += libFile.read()
+                if libFileName not in includedFiles:
+                    includedFiles.add(libFileName)
+                    sourceCode += cls._makeSource(os.path.join(includeDir, libFileName), includedFiles)
                 line = f.readline()
             sourceCode += line
             sourceCode += f.read()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 import numpy as np
 
@@ -21,6 +21,7 @@ WORLD_SOLID_LABEL = "world"
 class CLScene:
     def __init__(self, scene: ScatteringScene, nWorkUnits: int):
         self._sceneMaterials = scene.getMaterials()
+        self._sceneBBox = scene.getBoundingBox()
         self._solidLabels = [solid.getLabel() for solid in scene.getSolids()]
         self._surfaceLabels = {}
 
@@ -32,6 +33,7 @@ class CLScene:
             self._processSolid(solid)
 
         self.nSolids = np.uint32(len(scene.solids))
+        self.nWorkUnits = int(nWorkUnits)
         self.materials = MaterialCL(self._sceneMaterials)
         self.solidCandidates = SolidCandidateCL(nWorkUnits, len(scene.solids))
         self.solids = SolidCL(self._solidsInfo)
@@ -39,6 +41,26 @@ class CLScene:
         self.triangles = TriangleCL(self._trianglesInfo)
         self.vertices = VertexCL(self._vertices)
 
+    def getFeatureFlags(self) -> Dict[str, str]:
+        """
+        Preprocessor definitions used to compile propagation kernels specialized for this scene. Each flag removes a
+        branch or a runtime lookup that the scene does not need, such that simple scenes get simpler kernels.
+        """
+        flags = {"N_SOLIDS": str(self.nSolids)}
+        if not any(surfaceInfo.isDetector for surfaceInfo in self._surfacesInfo):
+            flags["NO_DETECTORS"] = ""
+        if not any(surfaceInfo.toSmooth for surfaceInfo in self._surfacesInfo):
+            flags["NO_SMOOTHING"] = ""
+
+        materials = [material for material in self._sceneMaterials if material is not None]
+        if all(material.mu_t != 0 for material in materials):
+            flags["NO_ZERO_MU_T"] = ""
+        # Photons only scatter in materials where mu_t > 0.
+        anisotropies = {np.float32(material.g) for material in materials if material.mu_t != 0}
+        if len(anisotropies) == 1:
+            flags["CONSTANT_G"] = f"{float(anisotropies.pop())!r}f"
+        return flags
+
     def getMaterialID(self, material):
         if material is None:
             # Detector case. Set dummy value (not used).
@@ -67,6 +89,36 @@ class CLScene:
         surfaceIDs.insert(0, NO_SURFACE_ID)
         return surfaceIDs
 
+    @property
+    def nSolidIDs(self) -> int:
+        """Number of solid IDs in use, which can exceed the number of scene solids when they are stacked."""
+        return len(self._solidLabels)
+
+    @property
+    def logsWorldInteractions(self) -> bool:
+        """Photons only interact in the world, anywhere outside the solids, if its material has mu_t > 0."""
+        worldMaterial = self._sceneMaterials[0]
+        return worldMaterial is not None and worldMaterial.mu_t != 0
+
+    def getSurfaceSolidIDs(self) -> np.ndarray:
+        """Returns the (insideSolidID, outsideSolidID) of each surface, indexed by surfaceID."""
+        solidIDs = [(info.insideSolidID, info.outsideSolidID) for info in self._surfacesInfo]
+        return np.array(solidIDs, dtype=np.int32).reshape(-1, 2)
+
+    def getSolidBoundingBoxes(self) -> np.ndarray:
+        """
+        Returns the (min, max) corners of the bounding box of each solid ID, indexed by solidID - WORLD_SOLID_ID. The
+        world uses the bounding box of the scene and the unused NO_LOG_ID entry is left empty.
+        """
+        if self._sceneBBox is None:
+            raise ValueError("Cannot compute solid bounding boxes of an empty scene.")
+        bboxes = np.zeros((self.nSolidIDs + 2, 2, 3), dtype=np.float32)
+        bboxes[:] = np.transpose(self._sceneBBox.xyzLimits)
+        for i, solidInfo in enumerate(self._solidsInfo):
+            bboxes[i + FIRST_SOLID_ID - WORLD_SOLID_ID] = np.transpose(solidInfo.bbox.xyzLimits)
+        bboxes[NO_LOG_ID - WORLD_SOLID_ID] = 0
+        return bboxes
+
     def getSurfaceLabel(self, solidID, surfaceID):
         if solidID == WORLD_SOLID_ID:
             return None
@@ -0,0 +1,239 @@
+import os
+from typing import List, Optional, Union
+
+import numpy as np
+
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf, CLObject, DataPointCL, SeedCL, SurfaceHitCL
+from pytissueoptics.rayscattering.opencl.buffers.photonCL import PhotonCL, PhotonSoACL
+from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
+from pytissueoptics.rayscattering.opencl.CLScene import CLScene
+
+WAVEFRONT_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "wavefront.c")
+
+STEP_QUEUE = 0
+SURFACE_QUEUE = 1
+SCATTER_QUEUE = 2
+ACTIVE_QUEUE = 3
+MAX_LOGS_PER_STEP = 2
+WORK_GROUP_SIZE = 64
+
+
+class CLWavefront:
+    """
+    Wavefront propagation of the photon slots of a batch. Instead of a single kernel running the whole propagation
+    loop of each photon, every step of the active photons goes through a sequence of stage kernels (see
+    `wavefront.c`):
+
+    1. `wavefrontSampleStep` reserves the log space of the step and samples the scattering distance,
+    2. `wavefrontIntersect` moves the photon to its next intersection or to its scattering point,
+    3. `wavefrontInteractWithSurface` reflects, refracts or detects the photons that hit a surface,
+    4. `wavefrontScatter` scatters the photons that reached their scattering point,
+    5. `wavefrontRoulette` applies the russian roulette and queues the photons left for the next step.
+
+    The stages communicate through compacted queues of slot indices, so that each kernel only runs the coherent work
+    of its stage. The host reads the size of the queues after the stages to size the next launches. The buffers are
+    created once per batch, and the data stays on the device between the stages. The stages are launched with a fixed
+    work-group size, since the queue sizes change at every step and the kernels would otherwise be compiled again by
+    some OpenCL implementations for each new work-group size.
+    """
+
+    def __init__(
+        self,
+        program: CLProgram,
+        scene: CLScene,
+        nSlots: int,
+        logger: DataPointCL,
+        logCursor: BufferOf,
+        tallyBins: BufferOf,
+        kernelCounters: BufferOf,
+        weightThreshold: np.float32,
+    ):
+        self._program = program
+        self._scene = scene
+        self._logger = logger
+        self._logCursor = logCursor
+        self._tallyBins = tallyBins
+        self._kernelCounters = kernelCounters
+        self._weightThreshold = weightThreshold
+        self._workGroupSize = min(WORK_GROUP_SIZE, program.device.max_work_group_size)
+
+        queueSize = max(nSlots, 1)
+        self._activeQueue = BufferOf(np.zeros(queueSize, dtype=np.uint32))
+        self._nextActiveQueue = BufferOf(np.zeros(queueSize, dtype=np.uint32))
+        self._stepQueue = BufferOf(np.zeros(queueSize, dtype=np.uint32))
+        self._surfaceQueue = BufferOf(np.zeros(queueSize, dtype=np.uint32))
+        self._scatterQueue = BufferOf(np.zeros(queueSize, dtype=np.uint32))
+        self._queueSizes = BufferOf(np.zeros(4, dtype=np.uint32))
+        self._logReservation = BufferOf(np.zeros(1, dtype=np.uint32))
+        self._surfaceHits = SurfaceHitCL(queueSize)
+        self._stagingLog = DataPointCL(size=MAX_LOGS_PER_STEP * queueSize, layout=logger.layout)
+
+    def propagate(
+        self,
+        photons: Union[PhotonCL, PhotonSoACL],
+        seeds: SeedCL,
+        activeSlots: Optional[np.ndarray] = None,
+        generatorArguments: Optional[list] = None,
+    ):
+        """
+        Propagates the photons of the given slots until they have no more energy or until the log is full, in which
+        case the photons left stay in their slot to be resumed by the next batch. The photons to propagate are either
+        the `activeSlots`, or the slots refilled on the device by `wavefrontGenerate` with its `generatorArguments`
+        (photonLimit, photonCounter, firstPhotonID, source, initialMaterialID, initialSolidID).
+        """
+        distances = BufferOf(np.zeros(max(photons.length, 1), dtype=np.float32))
+        self._queueSizes.hostBuffer[:] = 0
+        self._logReservation.hostBuffer[0] = 0
+        if activeSlots is not None:
+            self._activeQueue.hostBuffer[: len(activeSlots)] = activeSlots
+
+        scene = self._scene
+        sceneObjects = [scene.solids, scene.surfaces, scene.triangles, scene.vertices, scene.solidCandidates]
+        sceneBuffers = [scene.nSolids, *sceneObjects]
+        self._program.build(
+            [
+                *photons.buffers,
+                seeds,
+                distances,
+                self._logger,
+                self._logCursor,
+                self._tallyBins,
+                self._kernelCounters,
+                self._logReservation,
+                self._activeQueue,
+                self._nextActiveQueue,
+                self._stepQueue,
+                self._surfaceQueue,
+                self._scatterQueue,
+                self._queueSizes,
+                self._surfaceHits,
+                self._stagingLog,
+                scene.materials,
+                *sceneObjects,
+                *[argument for argument in generatorArguments or [] if isinstance(argument, CLObject)],
+            ]
+        )
+
+        if activeSlots is not None:
+            activeCount = len(activeSlots)
+        else:
+            self._launch(
+                "wavefrontGenerate",
+                photons.length,
+                [*generatorArguments, *photons.buffers, seeds, self._nextActiveQueue, self._queueSizes],
+            )
+            activeCount = self._getQueueSizes()[ACTIVE_QUEUE]
+            self._swapActiveQueues()
+
+        while activeCount > 0:
+            self._resetQueueSizes()
+            self._launch(
+                "wavefrontSampleStep",
+                activeCount,
+                [
+                    np.uint32(self._logger.length),
+                    self._logReservation,
+                    self._activeQueue,
+                    self._stepQueue,
+                    self._queueSizes,
+                    distances,
+                    *photons.buffers,
+                    scene.materials,
+                    seeds,
+                    self._kernelCounters,
+                ],
+            )
+            stepCount = self._getQueueSizes()[STEP_QUEUE]
+            if stepCount == 0:
+                break
+
+            nWorkUnits = scene.nWorkUnits
+            for queueOffset in range(0, stepCount, nWorkUnits):
+                self._launch(
+                    "wavefrontIntersect",
+                    min(nWorkUnits, stepCount - queueOffset),
+                    [
+                        np.uint32(queueOffset),
+                        self._stepQueue,
+                        self._surfaceQueue,
+                        self._scatterQueue,
+                        self._queueSizes,
+                        distances,
+                        self._surfaceHits,
+                        *photons.buffers,
+                        *sceneBuffers,
+                        self._kernelCounters,
+                    ],
+                )
+            queueSizes = self._getQueueSizes()
+
+            self._launch(
+                "wavefrontInteractWithSurface",
+                queueSizes[SURFACE_QUEUE],
+                [
+                    self._logCursor,
+                    self._surfaceQueue,
+                    distances,
+                    self._surfaceHits,
+                    *photons.buffers,
+                    scene.materials,
+                    *sceneBuffers,
+                    seeds,
+                    self._logger,
+                    self._stagingLog,
+                    self._tallyBins,
+                    self._kernelCounters,
+                ],
+            )
+            self._launch(
+                "wavefrontScatter",
+                queueSizes[SCATTER_QUEUE],
+                [
+                    self._logCursor,
+                    self._scatterQueue,
+                    *photons.buffers,
+                    scene.materials,
+                    seeds,
+                    self._logger,
+                    self._tallyBins,
+                ],
+            )
+            self._launch(
+                "wavefrontRoulette",
+                stepCount,
+                [
+                    self._weightThreshold,
+                    self._stepQueue,
+                    self._nextActiveQueue,
+                    self._queueSizes,
+                    *photons.buffers,
+                    seeds,
+                    self._kernelCounters,
+                ],
+            )
+            activeCount = self._getQueueSizes()[ACTIVE_QUEUE]
+            self._swapActiveQueues()
+
+    def _launch(self, kernelName: str, queueLength: int, arguments: List):
+        """Launches a stage kernel on the first `queueLength` items of its queue."""
+        if queueLength == 0:
+            return
+        N = int(np.ceil(queueLength / self._workGroupSize)) * self._workGroupSize
+        self._program.launchKernel(
+            kernelName,
+            N=np.int32(N),
+            arguments=[np.uint32(queueLength), *arguments],
+            build=False,
+            localSize=self._workGroupSize,
+        )
+
+    def _getQueueSizes(self) -> List[int]:
+        self._program.getData(self._queueSizes, returnData=False)
+        return [int(size) for size in self._queueSizes.hostBuffer]
+
+    def _resetQueueSizes(self):
+        self._queueSizes.hostBuffer[:] = 0
+        self._program.setData(self._queueSizes)
+
+    def _swapActiveQueues(self):
+        self._activeQueue, self._nextActiveQueue = self._nextActiveQueue, self._activeQueue
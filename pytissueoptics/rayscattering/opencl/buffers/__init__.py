@@ -1,11 +1,13 @@
 from .CLObject import BufferOf, CLObject, EmptyBuffer, RandomBuffer
-from .dataPointCL import DataPointCL
+from .dataPointCL import FULL_LOG_LAYOUT, PACKED_LOG_LAYOUT, QUANTIZED_LOG_LAYOUT, DataPointCL, LogLayout
 from .materialCL import MaterialCL
-from .photonCL import PhotonCL
+from .photonCL import PhotonCL, PhotonSoACL
 from .seedCL import SeedCL
 from .solidCandidateCL import SolidCandidateCL
 from .solidCL import SolidCL, SolidCLInfo
+from .sourceCL import SourceCL, SourceCLInfo
 from .surfaceCL import SurfaceCL, SurfaceCLInfo
+from .surfaceHitCL import SurfaceHitCL
 from .triangleCL import TriangleCL, TriangleCLInfo
 from .vertexCL import VertexCL
 
@@ -15,14 +17,22 @@ __all__ = [
     "EmptyBuffer",
     "RandomBuffer",
     "DataPointCL",
+    "LogLayout",
+    "FULL_LOG_LAYOUT",
+    "PACKED_LOG_LAYOUT",
+    "QUANTIZED_LOG_LAYOUT",
     "MaterialCL",
     "PhotonCL",
+    "PhotonSoACL",
     "SeedCL",
     "SolidCandidateCL",
     "SolidCL",
     "SolidCLInfo",
+    "SourceCL",
+    "SourceCLInfo",
     "SurfaceCL",
     "SurfaceCLInfo",
+    "SurfaceHitCL",
     "TriangleCL",
     "TriangleCLInfo",
     "VertexCL",
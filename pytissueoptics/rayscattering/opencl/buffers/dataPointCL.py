@@ -1,9 +1,24 @@
+from typing import NamedTuple
+
 import numpy as np
 
 from .CLObject import CLObject, cl
 
+LogLayout = NamedTuple("LogLayout", [("photonID", bool), ("packedKey", bool), ("quantizedPositions", bool)])
+
+FULL_LOG_LAYOUT = LogLayout(photonID=True, packedKey=False, quantizedPositions=False)
+PACKED_LOG_LAYOUT = LogLayout(photonID=False, packedKey=True, quantizedPositions=False)
+QUANTIZED_LOG_LAYOUT = LogLayout(photonID=False, packedKey=True, quantizedPositions=True)
+
 
 class DataPointCL(CLObject):
+    """
+    Interaction log entries written by the propagation kernels. The `layout` selects a more compact record format
+    for the device-to-host transfer: without the photonID, with the solid and surface IDs packed into a single
+    16-bit key, and/or with positions quantized to 16-bit offsets within the bounding box of the logged solid.
+    These compact records are decoded on the host by `CLLogCodec`.
+    """
+
     STRUCT_NAME = "DataPoint"
 
     STRUCT_DTYPE = np.dtype(
@@ -12,15 +27,49 @@ class DataPointCL(CLObject):
             ("x", cl.cltypes.float),
             ("y", cl.cltypes.float),
             ("z", cl.cltypes.float),
-            ("photonID", cl.cltypes.uint),
+            ("photonID", cl.cltypes.ulong),
             ("solidID", cl.cltypes.int),
             ("surfaceID", cl.cltypes.int),
         ]
     )
 
-    def __init__(self, size: int):
+    def __init__(self, size: int, layout: LogLayout = FULL_LOG_LAYOUT):
         self._size = size
+        self._layout = layout
+        self.STRUCT_DTYPE = self.getLayoutDtype(layout)
         super().__init__()
 
+    def make(self, device):
+        # All layouts share the same struct name, so the matched dtype is kept per instance instead of registered.
+        cl_struct, self._declaration = cl.tools.match_dtype_to_c_struct(device, self.STRUCT_NAME, self.STRUCT_DTYPE)
+        self._dtype = cl_struct
+
     def _getInitialHostBuffer(self) -> np.ndarray:
         return np.zeros(self._size, dtype=self._dtype)
+
+    @property
+    def layout(self) -> LogLayout:
+        return self._layout
+
+    @property
+    def nBytes(self) -> int:
+        return self.hostBuffer.nbytes
+
+    @staticmethod
+    def getLayoutDtype(layout: LogLayout) -> np.dtype:
+        positionType = cl.cltypes.ushort if layout.quantizedPositions else cl.cltypes.float
+        fields = [("delta_weight", cl.cltypes.float), ("x", positionType), ("y", positionType), ("z", positionType)]
+        if layout.photonID:
+            fields.append(("photonID", cl.cltypes.ulong))
+        if layout.packedKey:
+            fields.append(("key", cl.cltypes.ushort))
+        else:
+            fields.extend([("solidID", cl.cltypes.int), ("surfaceID", cl.cltypes.int)])
+        return np.dtype(fields)
+
+    @classmethod
+    def getLayoutItemSize(cls, layout: LogLayout) -> int:
+        """Returns the size in bytes of a single log entry of the given layout, including the struct padding."""
+        dtype = cls.getLayoutDtype(layout)
+        alignment = max(dtype.fields[name][0].itemsize for name in dtype.names)
+        return int(np.ceil(dtype.itemsize / alignment) * alignment)
@@ -1,12 +1,16 @@
+from typing import List
+
 import numpy as np
 from numpy.lib import recfunctions as rfn
 
-from .CLObject import CLObject, cl
+from .CLObject import BufferOf, CLObject, cl
 
 NULL_SOLID_ID = 0
 
 
 class PhotonCL(CLObject):
+    """Array of structs layout of the photons. Each photon is a single `Photon` struct in the device buffer."""
+
     STRUCT_NAME = "Photon"
     STRUCT_DTYPE = np.dtype(
         [
@@ -17,7 +21,7 @@ class PhotonCL(CLObject):
             ("materialID", cl.cltypes.uint),
             ("solidID", cl.cltypes.int),
             ("lastIntersectedDetectorID", cl.cltypes.int),
-            ("ID", cl.cltypes.uint),
+            ("ID", cl.cltypes.ulong),
         ]
     )
 
@@ -44,5 +48,77 @@ class PhotonCL(CLObject):
         buffer["materialID"] = self._materialID
         buffer["solidID"] = self._solidID
         buffer["lastIntersectedDetectorID"] = NULL_SOLID_ID
-        buffer["ID"] = np.arange(self._startID, self._startID + self._N, dtype=np.uint32)
+        buffer["ID"] = np.arange(self._startID, self._startID + self._N, dtype=np.uint64)
         return buffer
+
+    @property
+    def buffers(self) -> List[CLObject]:
+        """Device buffers of the photons, in the order expected by the propagation kernels."""
+        return [self]
+
+    @property
+    def weights(self) -> np.ndarray:
+        return self.hostBuffer["weight"]
+
+    def replace(self, indices: np.ndarray, photons: "PhotonCL"):
+        self.hostBuffer[indices] = photons.hostBuffer
+
+    def remove(self, indices: np.ndarray):
+        self.hostBuffer = np.delete(self.hostBuffer, indices)
+
+
+class PhotonSoACL:
+    """
+    Structure of arrays layout of the photons. Each field of the `Photon` struct is stored in its own tightly packed
+    buffer, so vectors take 12 bytes instead of the 16 bytes of a padded float3, and the host can fill the buffers
+    directly from the position and direction arrays. The kernels select this layout with the PHOTON_SOA definition
+    and assemble the `Photon` struct in private memory. The `er` vector is not stored since the kernels recompute it
+    whenever a photon is loaded.
+    """
+
+    FIELDS = ["position", "direction", "weight", "materialID", "solidID", "lastIntersectedDetectorID", "ID"]
+
+    def __init__(
+        self, positions: np.ndarray, directions: np.ndarray, materialID: int, solidID: int, weight=1.0, startID=0
+    ):
+        N = positions.shape[0]
+        arrays = {
+            "position": np.ascontiguousarray(positions, dtype=np.float32).reshape(N, 3),
+            "direction": np.ascontiguousarray(directions, dtype=np.float32).reshape(N, 3),
+            "weight": np.full(N, weight, dtype=cl.cltypes.float),
+            "materialID": np.full(N, materialID, dtype=cl.cltypes.uint),
+            "solidID": np.full(N, solidID, dtype=cl.cltypes.int),
+            "lastIntersectedDetectorID": np.full(N, NULL_SOLID_ID, dtype=cl.cltypes.int),
+            "ID": np.arange(startID, startID + N, dtype=cl.cltypes.ulong),
+        }
+        self._buffers = {field: BufferOf(array) for field, array in arrays.items()}
+
+    @staticmethod
+    def getDeclaration(device) -> str:
+        """The `Photon` struct is still required in the kernels for the private photon state."""
+        _, declaration = cl.tools.match_dtype_to_c_struct(device, PhotonCL.STRUCT_NAME, PhotonCL.STRUCT_DTYPE)
+        return declaration
+
+    @property
+    def buffers(self) -> List[CLObject]:
+        return [self._buffers[field] for field in self.FIELDS]
+
+    @property
+    def length(self) -> int:
+        return len(self.weights)
+
+    @property
+    def weights(self) -> np.ndarray:
+        return self._buffers["weight"].hostBuffer
+
+    def getField(self, field: str) -> np.ndarray:
+        return self._buffers[field].hostBuffer
+
+    def replace(self, indices: np.ndarray, photons: "PhotonSoACL"):
+        for field in self.FIELDS:
+            self._buffers[field].hostBuffer[indices] = photons.getField(field)
+
+    def remove(self, indices: np.ndarray):
+        for field in self.FIELDS:
+            buffer = self._buffers[field]
+            buffer.hostBuffer = np.delete(buffer.hostBuffer, indices, axis=0)
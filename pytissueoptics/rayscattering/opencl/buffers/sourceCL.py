@@ -0,0 +1,61 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from pytissueoptics.scene.geometry import Vector
+
+from .CLObject import CLObject, cl
+
+PENCIL_SOURCE = 0
+DIRECTIONAL_SOURCE = 1
+DIVERGENT_SOURCE = 2
+ISOTROPIC_SOURCE = 3
+
+SourceCLInfo = NamedTuple(
+    "SourceInfo",
+    [
+        ("type", int),
+        ("position", Vector),
+        ("direction", Vector),
+        ("xAxis", Vector),
+        ("yAxis", Vector),
+        ("diameter", float),
+        ("divergence", float),
+    ],
+)
+
+
+class SourceCL(CLObject):
+    """
+    Parameters of a light source used to generate photons directly on the device. The struct is declared in
+    `source.c` since it is always required by the propagation kernels.
+    """
+
+    STRUCT_NAME = "Source"
+    STRUCT_DTYPE = np.dtype(
+        [
+            ("position", cl.cltypes.float3),
+            ("direction", cl.cltypes.float3),
+            ("xAxis", cl.cltypes.float3),
+            ("yAxis", cl.cltypes.float3),
+            ("diameter", cl.cltypes.float),
+            ("divergence", cl.cltypes.float),
+            ("type", cl.cltypes.uint),
+        ]
+    )
+
+    def __init__(self, sourceInfo: SourceCLInfo):
+        self._sourceInfo = sourceInfo
+        super().__init__(skipDeclaration=True, buildOnce=True)
+
+    def _getInitialHostBuffer(self) -> np.ndarray:
+        buffer = np.zeros(1, dtype=self._dtype)
+        for field in ["position", "direction", "xAxis", "yAxis"]:
+            vector = getattr(self._sourceInfo, field)
+            buffer[0][field][0] = np.float32(vector.x)
+            buffer[0][field][1] = np.float32(vector.y)
+            buffer[0][field][2] = np.float32(vector.z)
+        buffer[0]["diameter"] = np.float32(self._sourceInfo.diameter)
+        buffer[0]["divergence"] = np.float32(self._sourceInfo.divergence)
+        buffer[0]["type"] = np.uint32(self._sourceInfo.type)
+        return buffer
@@ -0,0 +1,31 @@
+import numpy as np
+
+from .CLObject import CLObject, cl
+
+
+class SurfaceHitCL(CLObject):
+    """
+    Surface intersection of each photon slot, written by the intersection stage of the wavefront kernels and read by
+    the surface interaction stage. These are the fields of the `Intersection` struct that are required after the
+    photon was moved to the intersection.
+    """
+
+    STRUCT_NAME = "SurfaceHit"
+    STRUCT_DTYPE = np.dtype(
+        [
+            ("position", cl.cltypes.float3),
+            ("normal", cl.cltypes.float3),
+            ("rawNormal", cl.cltypes.float3),
+            ("surfaceID", cl.cltypes.uint),
+            ("polygonID", cl.cltypes.uint),
+            ("distanceLeft", cl.cltypes.float),
+            ("isSmooth", cl.cltypes.uint),
+        ]
+    )
+
+    def __init__(self, size: int):
+        self._size = size
+        super().__init__(buildOnce=True)
+
+    def _getInitialHostBuffer(self) -> np.ndarray:
+        return np.zeros(max(self._size, 1), dtype=self._dtype)
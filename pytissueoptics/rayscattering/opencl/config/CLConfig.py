@@ -1,9 +1,12 @@
 import json
 import os
+import sys
 import time
 import warnings
 from typing import List
 
+from pytissueoptics.rayscattering.opencl.config.deviceProfiles import DeviceProfile, DeviceProfiles
+
 try:
     import pyopencl as cl
 
@@ -30,7 +33,6 @@ DEFAULT_CONFIG = {
     "DEVICE_INDEX": None,
     "N_WORK_UNITS": None,
     "MAX_MEMORY_MB": None,
-    "IPP_TEST_N_PHOTONS": 1000,
     "BATCH_LOAD_FACTOR": 0.20,
 }
 
@@ -64,10 +66,18 @@ class CLConfig:
                 )
 
         self._validateDeviceIndex()
+        self._validateDeviceIndices()
+        if self.N_WORK_UNITS is None:
+            self._loadDeviceProfile()
+        # The default MAX_MEMORY_MB set below is replaced by the tuned one, but a value set by the user is kept.
+        maxMemoryIsSet = self.MAX_MEMORY_MB is not None
         self._validateMaxMemory()
 
         if self.N_WORK_UNITS is None:
-            self._autoSetNWorkUnits()
+            if self._isHeadless():
+                self.autotune(applyMaxMemory=not maxMemoryIsSet)
+            else:
+                self._autoSetNWorkUnits()
 
         parameterKeys.pop(0)
         for key in parameterKeys:
@@ -100,6 +110,13 @@ class CLConfig:
                 f"reset global CONFIG.DEVICE_INDEX parameter to 'None'."
             )
             self._config["DEVICE_INDEX"] = 0
+        elif self._isHeadless():
+            deviceIndex = self._getDefaultDeviceIndex()
+            warnings.warn(
+                f"Running headless: using OpenCL device {deviceIndex} ({self._devices[deviceIndex].name}). "
+                f"\n\tSet CONFIG.DEVICE_INDEX to select another device."
+            )
+            self._config["DEVICE_INDEX"] = deviceIndex
         else:
             self.showAvailableDevices()
             deviceIndex = int(
@@ -113,6 +130,66 @@ class CLConfig:
             self._config["DEVICE_INDEX"] = deviceIndex
         self.save()
 
+    def _validateDeviceIndices(self):
+        """The optional parameter DEVICE_INDICES selects multiple devices to propagate photons on simultaneously."""
+        deviceIndices = self._config.get("DEVICE_INDICES")
+        if deviceIndices is None:
+            return
+        numberOfDevices = len(self._devices)
+        if not deviceIndices or any(index not in range(numberOfDevices) for index in deviceIndices):
+            warnings.warn(f"Invalid device indices {deviceIndices}. Resetting to 'null' to only use DEVICE_INDEX.")
+            self._config["DEVICE_INDICES"] = None
+            self.save()
+
+    def _getDefaultDeviceIndex(self) -> int:
+        """Returns the index of the first GPU, or of the first device if there is no GPU."""
+        for i, device in enumerate(self._devices):
+            if device.type & cl.device_type.GPU:
+                return i
+        return 0
+
+    @staticmethod
+    def _isHeadless() -> bool:
+        """
+        Configuration prompts are skipped when the environment variable 'PTO_AUTOTUNE'=1 is set or when there is no
+        interactive terminal, as in batch jobs and containers.
+        """
+        if os.environ.get("PTO_AUTOTUNE", "0") == "1":
+            return True
+        return not sys.stdin or not sys.stdin.isatty()
+
+    def autotune(self, timeBudget: float = None, verbose: bool = True, applyMaxMemory: bool = True) -> DeviceProfile:
+        """
+        Runs a headless test on a synthetic scene to find the optimal N_WORK_UNITS, BATCH_LOAD_FACTOR and MAX_MEMORY_MB
+        of the selected device, within the given time budget in seconds (defaults to the environment variable
+        'PTO_AUTOTUNE_TIME_BUDGET', or 120 s). The resulting profile is applied, and saved for future runs on the same
+        device and driver. The current MAX_MEMORY_MB is kept if `applyMaxMemory` is False.
+        """
+        from pytissueoptics.rayscattering.opencl.utils.deviceAutotuner import DEFAULT_TIME_BUDGET, DeviceAutotuner
+
+        if timeBudget is None:
+            timeBudget = float(os.environ.get("PTO_AUTOTUNE_TIME_BUDGET", DEFAULT_TIME_BUDGET))
+        warnings.warn(f"... Tuning the OpenCL parameters of '{self.device.name}' (max {timeBudget:.0f} s).")
+
+        profile = DeviceAutotuner(self.device, timeBudget=timeBudget, verbose=verbose).run()
+        DeviceProfiles().setProfile(self.device, profile)
+        self._applyDeviceProfile(profile, applyMaxMemory=applyMaxMemory)
+        return profile
+
+    def _loadDeviceProfile(self):
+        profile = DeviceProfiles().getProfile(self.device)
+        if profile is None:
+            return
+        warnings.warn(f"Using the tuned OpenCL parameters saved for device '{self.device.name}'.")
+        self._applyDeviceProfile(profile, applyMaxMemory=self.MAX_MEMORY_MB is None)
+
+    def _applyDeviceProfile(self, profile: DeviceProfile, applyMaxMemory: bool):
+        self._config["N_WORK_UNITS"] = profile.N_WORK_UNITS
+        self._config["BATCH_LOAD_FACTOR"] = profile.BATCH_LOAD_FACTOR
+        if applyMaxMemory:
+            self._config["MAX_MEMORY_MB"] = profile.MAX_MEMORY_MB
+        self.save()
+
     def _validateMaxMemory(self):
         """
         If the user has not set a value for MAX_MEMORY_MB, it is set to the minimum value between 1GB and 75% of the
@@ -236,6 +313,32 @@ class CLConfig:
     def device(self) -> cl.Device:
         return self._devices[self.DEVICE_INDEX]
 
+    @property
+    def DEVICE_INDICES(self) -> List[int]:
+        deviceIndices = self._config.get("DEVICE_INDICES")
+        if deviceIndices is None:
+            return [self.DEVICE_INDEX]
+        return deviceIndices
+
+    @DEVICE_INDICES.setter
+    def DEVICE_INDICES(self, value: List[int]):
+        self._config["DEVICE_INDICES"] = value
+        self._validateDeviceIndices()
+
+    @property
+    def devices(self) -> List[cl.Device]:
+        """Devices used for propagation. Only the device at DEVICE_INDEX unless DEVICE_INDICES is set."""
+        return [self._devices[index] for index in self.DEVICE_INDICES]
+
+    def createSubDevices(self, nSubDevices: int) -> List[cl.Device]:
+        """
+        Splits the selected device into `nSubDevices` sub-devices with the same number of compute units (device
+        fission), which can be given to CLPhotons to propagate on each of them simultaneously. Mostly useful for CPU
+        devices.
+        """
+        computeUnits = max(1, self.device.max_compute_units // nSubDevices)
+        return self.device.create_sub_devices([cl.device_partition_property.EQUALLY, computeUnits])[:nSubDevices]
+
     @property
     def N_WORK_UNITS(self):
         return self._config["N_WORK_UNITS"]
@@ -255,14 +358,6 @@ class CLConfig:
     def MAX_MEMORY_MB(self, memoryInMB: int):
         self._config["MAX_MEMORY_MB"] = memoryInMB
 
-    @property
-    def IPP_TEST_N_PHOTONS(self):
-        return self._config["IPP_TEST_N_PHOTONS"]
-
-    @IPP_TEST_N_PHOTONS.setter
-    def IPP_TEST_N_PHOTONS(self, value: int):
-        self._config["IPP_TEST_N_PHOTONS"] = value
-
     @property
     def BATCH_LOAD_FACTOR(self):
         return self._config["BATCH_LOAD_FACTOR"]
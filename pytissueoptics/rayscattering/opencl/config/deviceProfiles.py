@@ -0,0 +1,54 @@
+import json
+import os
+from typing import NamedTuple, Optional
+
+DeviceProfile = NamedTuple(
+    "DeviceProfile",
+    [
+        ("N_WORK_UNITS", int),
+        ("BATCH_LOAD_FACTOR", float),
+        ("MAX_MEMORY_MB", int),
+        ("timePerPhoton", float),
+    ],
+)
+
+
+class DeviceProfiles:
+    """
+    Persisted table of the tuned OpenCL parameters of each device, keyed by device name and driver version so
+    that a driver update triggers a new tuning.
+    """
+
+    TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "device_profiles.json")
+
+    def __init__(self):
+        self._assertExists()
+
+        with open(self.TABLE_PATH, "r") as f:
+            self._table = json.load(f)
+
+    def getProfile(self, device) -> Optional[DeviceProfile]:
+        profile = self._table.get(self.getDeviceKey(device))
+        if profile is None:
+            return None
+        return DeviceProfile(**profile)
+
+    def setProfile(self, device, profile: DeviceProfile):
+        self._table[self.getDeviceKey(device)] = profile._asdict()
+        self._save()
+
+    @staticmethod
+    def getDeviceKey(device) -> str:
+        return f"{device.name} [{device.driver_version}]"
+
+    def __contains__(self, device):
+        return self.getDeviceKey(device) in self._table
+
+    def _save(self):
+        with open(self.TABLE_PATH, "w") as f:
+            json.dump(self._table, f, indent=4)
+
+    def _assertExists(self):
+        if not os.path.exists(self.TABLE_PATH):
+            self._table = {}
+            self._save()
@@ -37,9 +37,9 @@ float _getReflectionCoefficient(float n1, float n2, float thetaIn) {
     return 0.5 * sam * sam * (cap * cap + cam * cam) / (sap * sap * cam * cam);
 }
 
-bool _getIsReflected(float nIn, float nOut, float thetaIn, __global uint *seeds, uint gid) {
+bool _getIsReflected(float nIn, float nOut, float thetaIn, uint *seed) {
     float R = _getReflectionCoefficient(nIn, nOut, thetaIn);
-    float randomFloat = getRandomFloatValue(seeds, gid);
+    float randomFloat = getRandomFloat(seed);
     if (R >= randomFloat) {
         return true;
     }
@@ -57,8 +57,8 @@ float _getRefractionDeflection(float nIn, float nOut, float thetaIn) {
 }
 
 void _createFresnelIntersection(FresnelIntersection* fresnelIntersection,
-                                float nIn, float nOut, float thetaIn, __global uint *seeds, uint gid) {
-    fresnelIntersection->isReflected = _getIsReflected(nIn, nOut, thetaIn, seeds, gid);
+                                float nIn, float nOut, float thetaIn, uint *seed) {
+    fresnelIntersection->isReflected = _getIsReflected(nIn, nOut, thetaIn, seed);
 
     if (fresnelIntersection->isReflected) {
         fresnelIntersection->angleDeflection = _getReflectionDeflection(thetaIn);
@@ -68,7 +68,7 @@ void _createFresnelIntersection(FresnelIntersection* fresnelIntersection,
 }
 
 FresnelIntersection computeFresnelIntersection(float3 rayDirection, Intersection *intersection,
-        __constant Material *materials, __global Surface *surfaces, __global uint *seeds, uint gid) {
+        __constant Material *materials, __global Surface *surfaces, uint *seed) {
     FresnelIntersection fresnelIntersection;
     float3 normal = intersection->normal;
 
@@ -97,7 +97,7 @@ FresnelIntersection computeFresnelIntersection(float3 rayDirection, Intersection
 
     float thetaIn = acos(clamp(dot(normal, rayDirection), -1.0f, 1.0f));
 
-    _createFresnelIntersection(&fresnelIntersection, nIn, nOut, thetaIn, seeds, gid);
+    _createFresnelIntersection(&fresnelIntersection, nIn, nOut, thetaIn, seed);
 
     return fresnelIntersection;
 }
@@ -121,7 +121,9 @@ __kernel void computeFresnelIntersectionKernel(float3 rayDirection, __global Int
         __global FresnelIntersection *fresnelIntersections) {
     uint gid = get_global_id(0);
     Intersection localIntersection = getLocalIntersection(intersections, gid);
-    fresnelIntersections[gid] = computeFresnelIntersection(rayDirection, &localIntersection, materials, surfaces, seeds, gid);
+    uint seed = seeds[gid];
+    fresnelIntersections[gid] = computeFresnelIntersection(rayDirection, &localIntersection, materials, surfaces, &seed);
+    seeds[gid] = seed;
 }
 
 struct FloatContainer {
@@ -41,10 +41,72 @@ struct Scene{
     __global Triangle *triangles;
     __global Vertex *vertices;
     __global SolidCandidate *solidCandidates;
+#ifdef KERNEL_COUNTERS
+    ulong *counters;
+#endif
 };
 
 typedef struct Scene Scene;
 
+/*
+With KERNEL_COUNTERS, the work done by each work item is counted in private counters of the scene (see
+CLKernelCounters), which are added to the global `kernelCounters` at the end of the kernel. Each global counter is a
+pair of 32-bit words (low, high), since 64-bit atomics are optional.
+*/
+__constant uint COUNTER_STEPS = 0;
+__constant uint COUNTER_TRIANGLE_TESTS = 1;
+__constant uint COUNTER_BBOX_TESTS = 2;
+__constant uint COUNTER_REFLECTIONS = 3;
+__constant uint COUNTER_REFRACTIONS = 4;
+__constant uint COUNTER_ROULETTE_KILLS = 5;
+__constant uint COUNTER_DETECTOR_HITS = 6;
+__constant uint COUNTER_LOG_FULL_EXITS = 7;
+__constant uint COUNTER_VERTEX_NUDGES = 8;
+#define N_KERNEL_COUNTERS 9
+
+#ifdef KERNEL_COUNTERS
+#define DECLARE_COUNTERS(scene) ulong sceneCounters[N_KERNEL_COUNTERS] = {0}; scene.counters = sceneCounters
+#else
+#define DECLARE_COUNTERS(scene)
+#endif
+
+void countEvents(Scene *scene, uint counter, uint count){
+#ifdef KERNEL_COUNTERS
+    scene->counters[counter] += count;
+#endif
+}
+
+void addToKernelCounter(__global uint *kernelCounters, uint counter, ulong count){
+#ifdef KERNEL_COUNTERS
+    uint low = (uint)count;
+    uint high = (uint)(count >> 32);
+    uint previousLow = atomic_add(&kernelCounters[2 * counter], low);
+    if (previousLow + low < previousLow){
+        high++;  // Carry of the low word.
+    }
+    if (high != 0){
+        atomic_add(&kernelCounters[2 * counter + 1], high);
+    }
+#endif
+}
+
+void flushCounters(Scene *scene, __global uint *kernelCounters){
+#ifdef KERNEL_COUNTERS
+    for (uint counter = 0; counter < N_KERNEL_COUNTERS; counter++){
+        if (scene->counters[counter] != 0){
+            addToKernelCounter(kernelCounters, counter, scene->counters[counter]);
+        }
+    }
+#endif
+}
+
+// The number of solids is a compile-time constant when the kernels are specialized for a scene.
+#ifdef N_SOLIDS
+#define SCENE_N_SOLIDS N_SOLIDS
+#else
+#define SCENE_N_SOLIDS scene->nSolids
+#endif
+
 GemsBoxIntersection _getBBoxIntersection(Ray ray, float3 minCornerVector, float3 maxCornerVector) {
     GemsBoxIntersection intersection;
     intersection.rayIsInside = true;
@@ -117,8 +179,8 @@ GemsBoxIntersection _getBBoxIntersection(Ray ray, float3 minCornerVector, float3
 
 void _findBBoxIntersectingSolids(Ray ray, Scene *scene, uint gid, uint photonSolidID, uint ignoreSolidID) {
 
-    for (uint i = 0; i < scene->nSolids; i++) {
-        uint boxGID = gid * scene->nSolids + i;
+    for (uint i = 0; i < SCENE_N_SOLIDS; i++) {
+        uint boxGID = gid * SCENE_N_SOLIDS + i;
         uint solidID = i + 1;
         scene->solidCandidates[boxGID].solidID = solidID;
 
@@ -132,6 +194,7 @@ void _findBBoxIntersectingSolids(Ray ray, Scene *scene, uint gid, uint photonSol
             continue;
         }
 
+        countEvents(scene, COUNTER_BBOX_TESTS, 1);
         GemsBoxIntersection gemsIntersection = _getBBoxIntersection(ray, scene->solids[i].bbox_min, scene->solids[i].bbox_max);
         if (gemsIntersection.rayIsInside) {
             scene->solidCandidates[boxGID].distance = 0;
@@ -147,10 +210,10 @@ void _sortSolidCandidates(Scene *scene, uint gid) {
     /*
     Simple bubble sort algorithm (kernel-friendly) to sort the solid candidates by distance.
     */
-    for (uint i = 0; i < scene->nSolids; i++) {
-        uint boxGID = gid * scene->nSolids + i;
-        for (uint j = i + 1; j < scene->nSolids; j++) {
-            uint boxGID2 = gid * scene->nSolids + j;
+    for (uint i = 0; i < SCENE_N_SOLIDS; i++) {
+        uint boxGID = gid * SCENE_N_SOLIDS + i;
+        for (uint j = i + 1; j < SCENE_N_SOLIDS; j++) {
+            uint boxGID2 = gid * SCENE_N_SOLIDS + j;
             if (scene->solidCandidates[boxGID].distance > scene->solidCandidates[boxGID2].distance) {
                 SolidCandidate tmp = scene->solidCandidates[boxGID];
                 scene->solidCandidates[boxGID] = scene->solidCandidates[boxGID2];
@@ -249,10 +312,12 @@ HitPoint _getTriangleIntersection(Ray ray, float3 v1, float3 v2, float3 v3, floa
     return hitPoint;
 }
 
-Intersection _findClosestPolygonIntersection(Ray ray, uint solidID,
-                                            __global Solid *solids, __global Surface *surfaces,
-                                            __global Triangle *triangles, __global Vertex *vertices,
-                                            uint photonSolidID) {
+Intersection _findClosestPolygonIntersection(Ray ray, uint solidID, Scene *scene, uint photonSolidID) {
+    __global Solid *solids = scene->solids;
+    __global Surface *surfaces = scene->surfaces;
+    __global Triangle *triangles = scene->triangles;
+    __global Vertex *vertices = scene->vertices;
+
     Intersection intersection;
     intersection.exists = false;
     intersection.distance = INFINITY;
@@ -266,6 +331,7 @@ Intersection _findClosestPolygonIntersection(Ray ray, uint solidID,
             continue;
         }
 
+        countEvents(scene, COUNTER_TRIANGLE_TESTS, surfaces[s].lastPolygonID + 1 - surfaces[s].firstPolygonID);
         for (uint p = surfaces[s].firstPolygonID; p <= surfaces[s].lastPolygonID; p++) {
             uint vertexIDs[3] = {triangles[p].vertexIDs[0], triangles[p].vertexIDs[1], triangles[p].vertexIDs[2]};
             HitPoint hitPoint = _getTriangleIntersection(ray, vertices[vertexIDs[0]].position, vertices[vertexIDs[1]].position, vertices[vertexIDs[2]].position, triangles[p].normal);
@@ -374,9 +440,11 @@ void _composeIntersection(Intersection *intersection, Ray *ray, Scene *scene) {
     }
 
     intersection->isSmooth = false;
+#ifndef NO_SMOOTHING
     if (scene->surfaces[intersection->surfaceID].toSmooth) {
         setSmoothNormal(intersection, scene->triangles, scene->vertices, ray);
     }
+#endif
     intersection->distanceLeft = ray->length - intersection->distance;
 }
 
@@ -391,12 +459,12 @@ Intersection findIntersection(Ray ray, Scene *scene, uint gid, uint photonSolidI
     Intersection closestIntersection;
     closestIntersection.exists = false;
     closestIntersection.distance = INFINITY;
-    if (scene->nSolids == 0) {
+    if (SCENE_N_SOLIDS == 0) {
         return closestIntersection;
     }
 
-    for (uint i = 0; i < scene->nSolids; i++) {
-        uint boxGID = gid * scene->nSolids + i;
+    for (uint i = 0; i < SCENE_N_SOLIDS; i++) {
+        uint boxGID = gid * SCENE_N_SOLIDS + i;
         if (scene->solidCandidates[boxGID].distance == -1) {
             // Default buffer value -1 means that there is no intersection with this solid
             continue;
@@ -409,7 +477,7 @@ Intersection findIntersection(Ray ray, Scene *scene, uint gid, uint photonSolidI
         }
 
         uint solidID = scene->solidCandidates[boxGID].solidID;
-        Intersection intersection = _findClosestPolygonIntersection(ray, solidID, scene->solids, scene->surfaces, scene->triangles, scene->vertices, photonSolidID);
+        Intersection intersection = _findClosestPolygonIntersection(ray, solidID, scene, photonSolidID);
         if (intersection.exists && intersection.distance < closestIntersection.distance) {
             closestIntersection = intersection;
         }
@@ -3,89 +3,244 @@
 #include "scatteringMaterial.c"
 #include "intersection.c"
 #include "fresnel.c"
+#include "source.c"
 
 __constant int NULL_SOLID_ID = 0;
 __constant int WORLD_SOLID_ID = -1;
 __constant int NO_SURFACE_ID = -1;
 __constant float MIN_ANGLE = 0.0001f;
 
-void moveBy(float distance, __global Photon *photons, uint photonID){
-    photons[photonID].position += (distance * photons[photonID].direction);
+#ifdef PHOTON_SOA
+// Structure of arrays layout of the photons (see PhotonSoACL), where vectors are tightly packed float triplets.
+#define PHOTON_BUFFERS __global float *photonPositions, __global float *photonDirections, __global float *photonWeights, \
+        __global uint *photonMaterialIDs, __global int *photonSolidIDs, __global int *photonDetectorIDs, __global ulong *photonIDs
+#define PHOTON_BUFFER_ARGS photonPositions, photonDirections, photonWeights, photonMaterialIDs, photonSolidIDs, \
+        photonDetectorIDs, photonIDs
+#else
+#define PHOTON_BUFFERS __global Photon *photons
+#define PHOTON_BUFFER_ARGS photons
+#endif
+
+/*
+The interactions are written to the `dataPoints` of the logger, unless NO_LOG_DATA_POINTS is defined. With
+ENERGY_TALLY, the energy of each interaction is also summed in the bins of the `energyTally` (see CLEnergyTally). The
+bins of a work group are summed in local memory and added to the global bins at the end of the kernel, unless
+TALLY_GLOBAL_ATOMICS is defined, in which case the energy is added to the global bins directly.
+*/
+#ifdef TALLY_GLOBAL_ATOMICS
+#define TALLY_MEMORY __global
+#define atomicAddTally atomicAddGlobalFloat
+#else
+#define TALLY_MEMORY __local
+#define atomicAddTally atomicAddLocalFloat
+#endif
+
+typedef struct {
+    __global DataPoint *dataPoints;
+#ifdef ENERGY_TALLY
+    TALLY_MEMORY float *energyTally;
+#endif
+} Logger;
+
+#if !defined(ENERGY_TALLY)
+#define DECLARE_LOGGER(logger, dataPoints, energyTally) Logger logger = {dataPoints}
+#elif defined(TALLY_GLOBAL_ATOMICS)
+#define DECLARE_LOGGER(logger, dataPoints, energyTally) Logger logger = {dataPoints, energyTally}
+#else
+#define DECLARE_LOGGER(logger, dataPoints, energyTally) \
+        __local float localEnergyTally[TALLY_SIZE]; \
+        clearLocalEnergyTally(localEnergyTally); \
+        Logger logger = {dataPoints, localEnergyTally}
+#endif
+
+void atomicAddGlobalFloat(volatile __global float *address, float value){
+    volatile __global uint *uintAddress = (volatile __global uint *)address;
+    uint expected = *uintAddress;
+    uint previous;
+    while ((previous = atomic_cmpxchg(uintAddress, expected, as_uint(as_float(expected) + value))) != expected){
+        expected = previous;
+    }
+}
+
+void atomicAddLocalFloat(volatile __local float *address, float value){
+    volatile __local uint *uintAddress = (volatile __local uint *)address;
+    uint expected = *uintAddress;
+    uint previous;
+    while ((previous = atomic_cmpxchg(uintAddress, expected, as_uint(as_float(expected) + value))) != expected){
+        expected = previous;
+    }
+}
+
+void clearLocalEnergyTally(__local float *energyTally){
+#ifdef ENERGY_TALLY
+    for (uint bin = get_local_id(0); bin < TALLY_SIZE; bin += get_local_size(0)){
+        energyTally[bin] = 0;
+    }
+    barrier(CLK_LOCAL_MEM_FENCE);
+#endif
+}
+
+void flushEnergyTally(Logger *logger, __global float *energyTally){
+    // Must be reached by every work item of the work group.
+#if defined(ENERGY_TALLY) && !defined(TALLY_GLOBAL_ATOMICS)
+    barrier(CLK_LOCAL_MEM_FENCE);
+    for (uint bin = get_local_id(0); bin < TALLY_SIZE; bin += get_local_size(0)){
+        float energy = logger->energyTally[bin];
+        if (energy != 0){
+            atomicAddGlobalFloat(&energyTally[bin], energy);
+        }
+    }
+#endif
+}
+
+Photon loadPhoton(uint index, PHOTON_BUFFERS){
+    // The er vector is left for the caller to initialize.
+#ifdef PHOTON_SOA
+    Photon photon;
+    photon.position = vload3(index, photonPositions);
+    photon.direction = vload3(index, photonDirections);
+    photon.weight = photonWeights[index];
+    photon.materialID = photonMaterialIDs[index];
+    photon.solidID = photonSolidIDs[index];
+    photon.lastIntersectedDetectorID = photonDetectorIDs[index];
+    photon.ID = photonIDs[index];
+    return photon;
+#else
+    return photons[index];
+#endif
 }
 
-void moveTo(float3 position, __global Photon *photons, uint photonID){
-    photons[photonID].position = position;
+void storePhoton(Photon *photon, uint index, PHOTON_BUFFERS){
+#ifdef PHOTON_SOA
+    vstore3(photon->position, index, photonPositions);
+    vstore3(photon->direction, index, photonDirections);
+    photonWeights[index] = photon->weight;
+    photonMaterialIDs[index] = photon->materialID;
+    photonSolidIDs[index] = photon->solidID;
+    photonDetectorIDs[index] = photon->lastIntersectedDetectorID;
+    photonIDs[index] = photon->ID;
+#else
+    photons[index] = *photon;
+#endif
 }
 
-void scatterBy(float phi, float theta, __global Photon *photons, uint photonID){
-    rotateAroundAxisGlobal(&photons[photonID].er, &photons[photonID].direction, phi);
-    rotateAroundAxisGlobal(&photons[photonID].direction, &photons[photonID].er, theta);
-    photons[photonID].er = getAnyOrthogonalGlobal(&photons[photonID].direction);
+void moveBy(float distance, Photon *photon){
+    photon->position += (distance * photon->direction);
 }
 
-void decreaseWeightBy(float delta_weight, __global Photon *photons, uint photonID){
-    photons[photonID].weight -= delta_weight;
+void moveTo(float3 position, Photon *photon){
+    photon->position = position;
+}
+
+void scatterBy(float phi, float theta, Photon *photon){
+    rotateAroundAxis(&photon->er, &photon->direction, phi);
+    rotateAroundAxis(&photon->direction, &photon->er, theta);
+    photon->er = getAnyOrthogonal(&photon->direction);
+}
+
+void decreaseWeightBy(float delta_weight, Photon *photon){
+    photon->weight -= delta_weight;
+}
+
+void tallyEnergy(float delta_weight, int solidID, int surfaceID, uint side, Logger *logger){
+#ifdef ENERGY_TALLY
+    if (side != 0){
+        return;  // The crossing logged for the outside solid mirrors the one of the inside solid.
+    }
+    uint bin;
+    if (surfaceID == NO_SURFACE_ID){
+        bin = solidID - WORLD_SOLID_ID;
+    } else {
+        bin = TALLY_SURFACE_OFFSET + 2 * surfaceID + (delta_weight < 0 ? 1 : 0);
+    }
+    atomicAddTally(&logger->energyTally[bin], fabs(delta_weight));
+#endif
+}
+
+void logDataPoint(float delta_weight, float3 position, ulong photonID, int solidID, int surfaceID, uint side,
+                  Logger *logger, uint logID){
+    tallyEnergy(delta_weight, solidID, surfaceID, side, logger);
+#ifndef NO_LOG_DATA_POINTS
+    // The record format is selected at compile time (see DataPointCL and CLLogCodec).
+    __global DataPoint *dataPoint = &logger->dataPoints[logID];
+    dataPoint->delta_weight = delta_weight;
+#ifdef LOG_QUANTIZED_POSITIONS
+    // Only used when photons do not interact in the world, so the positions are within the box of their solid.
+    int bboxID = solidID - WORLD_SOLID_ID;
+    float3 bboxMin = vload3(bboxID, LOG_BBOX_MIN);
+    float3 bboxSize = vload3(bboxID, LOG_BBOX_SIZE);
+    ushort3 quantizedPosition = convert_ushort3_sat_rte((position - bboxMin) / bboxSize * LOG_QUANTIZATION_LEVELS);
+    dataPoint->x = quantizedPosition.x;
+    dataPoint->y = quantizedPosition.y;
+    dataPoint->z = quantizedPosition.z;
+#else
+    dataPoint->x = position.x;
+    dataPoint->y = position.y;
+    dataPoint->z = position.z;
+#endif
+#ifndef LOG_NO_PHOTON_ID
+    dataPoint->photonID = photonID;
+#endif
+#ifdef LOG_PACKED_KEY
+    if (surfaceID == NO_SURFACE_ID){
+        dataPoint->key = solidID - WORLD_SOLID_ID + 1;
+    } else {
+        dataPoint->key = LOG_SURFACE_KEY_OFFSET + 2 * surfaceID + side;
+    }
+#else
+    dataPoint->solidID = solidID;
+    dataPoint->surfaceID = surfaceID;
+#endif
+#endif
 }
 
-void interact(__global Photon *photons, __constant Material *materials, __global DataPoint *logger,
-              uint logIndex, uint photonID){
-    float delta_weight = photons[photonID].weight * materials[photons[photonID].materialID].albedo;
-    decreaseWeightBy(delta_weight, photons, photonID);
-    logger[logIndex].x = photons[photonID].position.x;
-    logger[logIndex].y = photons[photonID].position.y;
-    logger[logIndex].z = photons[photonID].position.z;
-    logger[logIndex].delta_weight = delta_weight;
-    logger[logIndex].solidID = photons[photonID].solidID;
-    logger[logIndex].surfaceID = NO_SURFACE_ID;
-    logger[logIndex].photonID = photons[photonID].ID;
+void interact(Photon *photon, __constant Material *materials, Logger *logger, uint logIndex){
+    float delta_weight = photon->weight * materials[photon->materialID].albedo;
+    decreaseWeightBy(delta_weight, photon);
+    logDataPoint(delta_weight, photon->position, photon->ID, photon->solidID,
+                 NO_SURFACE_ID, 0, logger, logIndex);
 }
 
-void scatter(__global Photon *photons, __constant Material *materials, __global uint *seeds, __global DataPoint *logger,
-             uint *logIndex, uint gid, uint photonID){
+void scatter(Photon *photon, __constant Material *materials, uint *seed, Logger *logger, uint *logIndex){
 
-    float rndPhi = getRandomFloatValue(seeds, gid);
-    float rndTheta = getRandomFloatValue(seeds, gid);
-    ScatteringAngles angles = getScatteringAngles(rndPhi, rndTheta, photons, materials, photonID);
+    float rndPhi = getRandomFloat(seed);
+    float rndTheta = getRandomFloat(seed);
+    ScatteringAngles angles = getScatteringAngles(rndPhi, rndTheta, photon, materials);
 
-    scatterBy(angles.phi, angles.theta, photons, photonID);
-    interact(photons, materials, logger, *logIndex, photonID);
+    scatterBy(angles.phi, angles.theta, photon);
+    interact(photon, materials, logger, *logIndex);
     (*logIndex)++;
 }
 
-void roulette(float weightThreshold, __global Photon *photons, __global uint *seeds, uint gid, uint photonID){
-    if (photons[photonID].weight >= weightThreshold || photons[photonID].weight == 0){
-        return;
+bool roulette(float weightThreshold, Photon *photon, uint *seed){
+    // Returns true if the photon was killed.
+    if (photon->weight >= weightThreshold || photon->weight == 0){
+        return false;
     }
-    float randomFloat = getRandomFloatValue(seeds, gid);
+    float randomFloat = getRandomFloat(seed);
     if (randomFloat < 0.1){
-        photons[photonID].weight /= 0.1;
-    }
-    else{
-        photons[photonID].weight = 0;
+        photon->weight /= 0.1;
+        return false;
     }
+    photon->weight = 0;
+    return true;
 }
 
-void reflect(FresnelIntersection *fresnelIntersection, __global Photon *photons, uint photonID){
-    rotateAround(&photons[photonID].direction, &fresnelIntersection->incidencePlane, fresnelIntersection->angleDeflection);
+void reflect(FresnelIntersection *fresnelIntersection, Photon *photon){
+    rotateAround(&photon->direction, &fresnelIntersection->incidencePlane, fresnelIntersection->angleDeflection);
 }
 
-void refract(FresnelIntersection *fresnelIntersection, __global Photon *photons, uint photonID){
-    rotateAround(&photons[photonID].direction, &fresnelIntersection->incidencePlane, fresnelIntersection->angleDeflection);
+void refract(FresnelIntersection *fresnelIntersection, Photon *photon){
+    rotateAround(&photon->direction, &fresnelIntersection->incidencePlane, fresnelIntersection->angleDeflection);
 }
 
-void logIntersection(Intersection *intersection, __global Photon *photons, __global Surface *surfaces,
-                    __global DataPoint *logger, uint *logIndex, uint photonID){
+void logIntersection(Intersection *intersection, Photon *photon, __global Surface *surfaces,
+                    Logger *logger, uint *logIndex){
     uint logID = *logIndex;
-    logger[logID].x = photons[photonID].position.x;
-    logger[logID].y = photons[photonID].position.y;
-    logger[logID].z = photons[photonID].position.z;
-    logger[logID].surfaceID = intersection->surfaceID;
-    logger[logID].solidID = surfaces[intersection->surfaceID].insideSolidID;
-    logger[logID].photonID = photons[photonID].ID;
-
-    bool isLeavingSurface = dot(photons[photonID].direction, intersection->normal) > 0;
+    bool isLeavingSurface = dot(photon->direction, intersection->normal) > 0;
     int sign = isLeavingSurface ? 1 : -1;
-    logger[logID].delta_weight = sign * photons[photonID].weight;
+    logDataPoint(sign * photon->weight, photon->position, photon->ID,
+                 surfaces[intersection->surfaceID].insideSolidID, intersection->surfaceID, 0, logger, logID);
     (*logIndex)++;
 
     int outsideSolidID = surfaces[intersection->surfaceID].outsideSolidID;
@@ -93,46 +248,37 @@ void logIntersection(Intersection *intersection, __global Photon *photons, __glo
         return;
     }
     logID++;
-    logger[logID].x = photons[photonID].position.x;
-    logger[logID].y = photons[photonID].position.y;
-    logger[logID].z = photons[photonID].position.z;
-    logger[logID].surfaceID = intersection->surfaceID;
-    logger[logID].solidID = outsideSolidID;
-    logger[logID].delta_weight = -sign * photons[photonID].weight;
-    logger[logID].photonID = photons[photonID].ID;
+    logDataPoint(-sign * photon->weight, photon->position, photon->ID,
+                 outsideSolidID, intersection->surfaceID, 1, logger, logID);
     (*logIndex)++;
 }
 
-bool detectOrIgnore(Intersection *intersection, __global Photon *photons, __global Surface *surfaces,
-    __global DataPoint *logger, uint *logIndex, uint gid, uint photonID){
+bool detectOrIgnore(Intersection *intersection, Photon *photon, __global Surface *surfaces,
+    Logger *logger, uint *logIndex){
     // If the incidence angle is within the numerical aperture, absorb photon.
-    float cosIncidence = -1 * dot(intersection->normal, photons[photonID].direction);
+    float cosIncidence = -1 * dot(intersection->normal, photon->direction);
     float cosDetector = surfaces[intersection->surfaceID].detectorCosine;
 
     if (cosIncidence < cosDetector){
         return false;  // Outside NA, ignore.
     }
 
-    logger[*logIndex].x = photons[photonID].position.x;
-    logger[*logIndex].y = photons[photonID].position.y;
-    logger[*logIndex].z = photons[photonID].position.z;
-    logger[*logIndex].solidID = surfaces[intersection->surfaceID].insideSolidID;
-    logger[*logIndex].delta_weight = photons[photonID].weight;
-    logger[*logIndex].surfaceID = NO_SURFACE_ID;
-    logger[*logIndex].photonID = photons[photonID].ID;
+    logDataPoint(photon->weight, photon->position, photon->ID,
+                 surfaces[intersection->surfaceID].insideSolidID, NO_SURFACE_ID, 0, logger, *logIndex);
     (*logIndex)++;
 
     // Absorb photon.
-    photons[photonID].weight = 0;
+    photon->weight = 0;
     return true;
 }
 
-float reflectOrRefract(Intersection *intersection, __global Photon *photons, __constant Material *materials,
-        __global Surface *surfaces, __global DataPoint *logger, uint *logIndex, __global uint *seeds, uint gid, uint photonID){
-    FresnelIntersection fresnelIntersection = computeFresnelIntersection(photons[photonID].direction, intersection,
-                                                                         materials, surfaces, seeds, gid);
+float reflectOrRefract(Intersection *intersection, Photon *photon, __constant Material *materials,
+        __global Surface *surfaces, Logger *logger, uint *logIndex, uint *seed){
+    FresnelIntersection fresnelIntersection = computeFresnelIntersection(photon->direction, intersection,
+                                                                         materials, surfaces, seed);
 
     if (fresnelIntersection.isReflected) {
+#ifndef NO_SMOOTHING
         if (intersection->isSmooth) {
             // Prevent reflection from crossing the raw surface.
             float smoothAngle = acos(dot(intersection->normal, intersection->rawNormal));
@@ -141,21 +287,27 @@ float reflectOrRefract(Intersection *intersection, __global Photon *photons, __c
                 fresnelIntersection.angleDeflection = sign(fresnelIntersection.angleDeflection) * minDeflectionAngle;
             }
         }
-        reflect(&fresnelIntersection, photons, photonID);
+#endif
+        reflect(&fresnelIntersection, photon);
     }
     else {
-        logIntersection(intersection, photons, surfaces, logger, logIndex, photonID);
+        logIntersection(intersection, photon, surfaces, logger, logIndex);
+#ifndef NO_SMOOTHING
         if (intersection->isSmooth) {
             // Prevent refraction from not crossing the raw surface.
-            float maxDeflectionAngle = fabs(M_PI_F / 2 - acos(dot(intersection->rawNormal, photons[photonID].direction))) - MIN_ANGLE;
+            float maxDeflectionAngle = fabs(M_PI_F / 2 - acos(dot(intersection->rawNormal, photon->direction))) - MIN_ANGLE;
             if (fabs(fresnelIntersection.angleDeflection) > maxDeflectionAngle) {
                 fresnelIntersection.angleDeflection = sign(fresnelIntersection.angleDeflection) * maxDeflectionAngle;
             }
         }
-        refract(&fresnelIntersection, photons, photonID);
+#endif
+        refract(&fresnelIntersection, photon);
 
-        float mut1 = materials[photons[photonID].materialID].mu_t;
+        float mut1 = materials[photon->materialID].mu_t;
         float mut2 = materials[fresnelIntersection.nextMaterialID].mu_t;
+#ifdef NO_ZERO_MU_T
+        intersection->distanceLeft *= mut1 / mut2;
+#else
         if (mut1 == 0) {
             intersection->distanceLeft = 0;
         } else if (mut2 != 0) {
@@ -163,115 +315,280 @@ float reflectOrRefract(Intersection *intersection, __global Photon *photons, __c
         } else {
             intersection->distanceLeft = INFINITY;
         }
-        photons[photonID].materialID = fresnelIntersection.nextMaterialID;
-        photons[photonID].solidID = fresnelIntersection.nextSolidID;
+#endif
+        photon->materialID = fresnelIntersection.nextMaterialID;
+        photon->solidID = fresnelIntersection.nextSolidID;
     }
 
     return intersection->distanceLeft;
 }
 
-float propagateStep(float distance, __global Photon *photons, __constant Material *materials, Scene *scene,
-                    __global uint *seeds, __global DataPoint *logger, uint *logIndex, uint gid, uint photonID){
-
+float sampleStepDistance(float distance, Photon *photon, __constant Material *materials, uint *seed){
+    // A new scattering distance is only sampled once the distance left from the previous step is consumed.
     if (distance <= 0) {
-        float mu_t = materials[photons[photonID].materialID].mu_t;
-        float randomNumber = getRandomFloatValue(seeds, gid);
+        float mu_t = materials[photon->materialID].mu_t;
+        float randomNumber = getRandomFloat(seed);
         distance += getScatteringDistance(mu_t, randomNumber);
         if (distance < 0){
             // Not really possible until mu_t is very high (> 1000) and intense smoothing is applied (order-1 spheres).
             distance = 0;
         }
     }
+    return distance;
+}
 
-    Ray stepRay = {photons[photonID].position, photons[photonID].direction, distance};
-    Intersection intersection = findIntersection(stepRay, scene, gid, photons[photonID].solidID, photons[photonID].lastIntersectedDetectorID);
-
-    photons[photonID].lastIntersectedDetectorID = NULL_SOLID_ID;  // Reset ignored detector ID.
-
-    float distanceLeft = 0;
-
-    if (intersection.exists){
-        moveTo(intersection.position, photons, photonID);
-        if (scene->surfaces[intersection.surfaceID].isDetector) {
-            if (detectOrIgnore(&intersection, photons, scene->surfaces, logger, logIndex, gid, photonID)) {;
-                return 0;  // Skip unnecessary vertex check if detected.
-            }
+float interactWithSurface(Intersection *intersection, Photon *photon, __constant Material *materials, Scene *scene,
+                          uint *seed, Logger *logger, uint *logIndex){
+    // The photon is expected to be at the intersection position. Returns the distance left to propagate.
+#ifndef NO_DETECTORS
+    if (scene->surfaces[intersection->surfaceID].isDetector) {
+        if (detectOrIgnore(intersection, photon, scene->surfaces, logger, logIndex)) {;
+            countEvents(scene, COUNTER_DETECTOR_HITS, 1);
+            return 0;  // Skip unnecessary vertex check if detected.
+        }
 
-            // Prevent re-intersecting with the same detector when passing through it.
-            photons[photonID].lastIntersectedDetectorID = scene->surfaces[intersection.surfaceID].insideSolidID;
+        // Prevent re-intersecting with the same detector when passing through it.
+        photon->lastIntersectedDetectorID = scene->surfaces[intersection->surfaceID].insideSolidID;
 
-            // Skipping vertex check for now.
-            return intersection.distanceLeft;
-        } else {
-            distanceLeft = reflectOrRefract(&intersection, photons, materials, scene->surfaces, logger, logIndex, seeds, gid, photonID);
+        // Skipping vertex check for now.
+        return intersection->distanceLeft;
+    }
+#endif
+    int solidID = photon->solidID;
+    float distanceLeft = reflectOrRefract(intersection, photon, materials, scene->surfaces, logger, logIndex, seed);
+    // A refraction always moves the photon to the solid on the other side of the surface.
+    countEvents(scene, photon->solidID == solidID ? COUNTER_REFLECTIONS : COUNTER_REFRACTIONS, 1);
+
+    // Check if intersection lies too close to a vertex.
+    int closeToVertexID = -1;
+    for (uint i = 0; i < 3; i++) {
+        uint vertexID = scene->triangles[intersection->polygonID].vertexIDs[i];
+        if (length(intersection->position - scene->vertices[vertexID].position) < 3e-7) {
+            closeToVertexID = vertexID;
+            break;
         }
+    }
 
-        // Check if intersection lies too close to a vertex.
-        int closeToVertexID = -1;
-        for (uint i = 0; i < 3; i++) {
-            uint vertexID = scene->triangles[intersection.polygonID].vertexIDs[i];
-            if (length(intersection.position - scene->vertices[vertexID].position) < 3e-7) {
-                closeToVertexID = vertexID;
-                break;
-            }
+    // If too close to a vertex, move photon away slightly.
+    if (closeToVertexID != -1) {
+        int stepSign = 1;
+        int solidIDTowardsNormal = scene->surfaces[intersection->surfaceID].outsideSolidID;
+        if (solidIDTowardsNormal != photon->solidID) {
+            stepSign = -1;
         }
+        float3 stepCorrection = stepSign * scene->vertices[closeToVertexID].normal * EPS_CATCH;
+        photon->position += stepCorrection;
+        countEvents(scene, COUNTER_VERTEX_NUDGES, 1);
+    }
 
-        // If too close to a vertex, move photon away slightly.
-        if (closeToVertexID != -1) {
-            int stepSign = 1;
-            int solidIDTowardsNormal = scene->surfaces[intersection.surfaceID].outsideSolidID;
-            if (solidIDTowardsNormal != photons[photonID].solidID) {
-                stepSign = -1;
-            }
-            float3 stepCorrection = stepSign * scene->vertices[closeToVertexID].normal * EPS_CATCH;
-            photons[photonID].position += stepCorrection;
-        }
+    return distanceLeft;
+}
 
-    } else {
-        if (distance == INFINITY){
-            photons[photonID].weight = 0;
-            return 0;
-        }
+float propagateStep(float distance, Photon *photon, __constant Material *materials, Scene *scene,
+                    uint *seed, Logger *logger, uint *logIndex, uint gid){
+    countEvents(scene, COUNTER_STEPS, 1);
+    distance = sampleStepDistance(distance, photon, materials, seed);
+
+    Ray stepRay = {photon->position, photon->direction, distance};
+    Intersection intersection = findIntersection(stepRay, scene, gid, photon->solidID, photon->lastIntersectedDetectorID);
 
-        moveBy(distance, photons, photonID);
+    photon->lastIntersectedDetectorID = NULL_SOLID_ID;  // Reset ignored detector ID.
 
-        scatter(photons, materials, seeds, logger, logIndex, gid, photonID);
+    if (intersection.exists){
+        moveTo(intersection.position, photon);
+        return interactWithSurface(&intersection, photon, materials, scene, seed, logger, logIndex);
     }
 
-    return distanceLeft;
+    if (distance == INFINITY){
+        photon->weight = 0;
+        return 0;
+    }
+
+    moveBy(distance, photon);
+
+    scatter(photon, materials, seed, logger, logIndex);
+
+    return 0;
+}
+
+bool reserveLogSpace(__global uint *logCursor, uint logSize, uint logChunkSize, uint *logIndex, uint *maxLogIndex){
+    /*
+    Makes sure the work item can log the next step. Log entries are allocated in chunks of `logChunkSize` from the
+    global atomic `logCursor`, so the log is filled densely by all work items. Returns false when the log is full,
+    in which case the work item must stop and let the next batch resume its photon. Without data points, the log
+    never fills up.
+    */
+#ifdef NO_LOG_DATA_POINTS
+    return true;
+#endif
+    if (*logIndex + 1 < *maxLogIndex){  // Room for an intersection that logs twice
+        return true;
+    }
+    uint chunkStart = atomic_add(logCursor, logChunkSize);
+    if (chunkStart + 1 >= logSize){
+        return false;
+    }
+    *logIndex = chunkStart;
+    *maxLogIndex = min(chunkStart + logChunkSize, logSize);
+    return true;
 }
 
-__kernel void propagate(uint maxPhotons, uint maxInteractions, float weightThreshold, uint workUnitsAmount, __global Photon *photons,
-            __constant Material *materials, uint nSolids, __global Solid *solids, __global Surface *surfaces, __global Triangle *triangles,
-            __global Vertex *vertices, __global SolidCandidate *solidCandidates, __global uint *seeds, __global DataPoint *logger){
+__kernel void propagate(uint maxPhotons, uint logSize, uint logChunkSize, __global uint *logCursor, float weightThreshold,
+            uint workUnitsAmount, PHOTON_BUFFERS, __constant Material *materials, uint nSolids, __global Solid *solids,
+            __global Surface *surfaces, __global Triangle *triangles, __global Vertex *vertices,
+            __global SolidCandidate *solidCandidates, __global uint *seeds, __global DataPoint *dataPoints,
+            __global float *energyTally, __global uint *kernelCounters){
     /*
     OpenCL implementation of the Python module Photon.
     See the Python module documentation for more details.
+
+    The photon and the RNG state are kept in private memory during propagation. They are only loaded from and
+    written back to global memory once per photon and once per batch, respectively.
     */
 
     Scene scene = {nSolids, solids, surfaces, triangles, vertices, solidCandidates};
+    DECLARE_COUNTERS(scene);
+    DECLARE_LOGGER(logger, dataPoints, energyTally);
 
     uint gid = get_global_id(0);
-    uint logIndex = gid * maxInteractions;
-    uint maxLogIndex = logIndex + maxInteractions;
+    uint seed = seeds[gid];
+    uint logIndex = 0;
+    uint maxLogIndex = 0;
 
     uint photonCount = 0;
 
     while (photonCount < maxPhotons){
         uint currentPhotonIndex = gid + (photonCount * workUnitsAmount);
-        photons[currentPhotonIndex].er = getAnyOrthogonalGlobal(&photons[currentPhotonIndex].direction);
+        Photon photon = loadPhoton(currentPhotonIndex, PHOTON_BUFFER_ARGS);
+        photon.er = getAnyOrthogonal(&photon.direction);
 
         float distance = 0;
-        while (photons[currentPhotonIndex].weight != 0){
-            if (logIndex >= (maxLogIndex -1)){  // Added -1 to avoid potential overflow when intersection logs twice
-                return;
+        bool logIsFull = false;
+        while (photon.weight != 0){
+            if (!reserveLogSpace(logCursor, logSize, logChunkSize, &logIndex, &maxLogIndex)){
+                logIsFull = true;
+                break;
             }
-            distance = propagateStep(distance, photons, materials, &scene,
-                                     seeds, logger, &logIndex, gid, currentPhotonIndex);
-            roulette(weightThreshold, photons, seeds, gid, currentPhotonIndex);
+            distance = propagateStep(distance, &photon, materials, &scene, &seed, &logger, &logIndex, gid);
+            countEvents(&scene, COUNTER_ROULETTE_KILLS, roulette(weightThreshold, &photon, &seed));
+        }
+        storePhoton(&photon, currentPhotonIndex, PHOTON_BUFFER_ARGS);
+        if (logIsFull){
+            countEvents(&scene, COUNTER_LOG_FULL_EXITS, 1);
+            break;
         }
         photonCount++;
     }
+    seeds[gid] = seed;
+    flushCounters(&scene, kernelCounters);
+    flushEnergyTally(&logger, energyTally);
+}
+
+__kernel void propagatePersistent(uint maxPhotons, uint logSize, uint logChunkSize, __global uint *logCursor,
+            float weightThreshold, __global uint *photonCounter, PHOTON_BUFFERS, __constant Material *materials,
+            uint nSolids, __global Solid *solids, __global Surface *surfaces, __global Triangle *triangles,
+            __global Vertex *vertices, __global SolidCandidate *solidCandidates, __global uint *seeds,
+            __global DataPoint *dataPoints, __global float *energyTally, __global uint *kernelCounters){
+    /*
+    Persistent-threads variant of `propagate`. Instead of a fixed strided slice of photons, each work item takes the
+    next photon index from the global atomic `photonCounter` until all `maxPhotons` photons of the batch are taken
+    or the log is full, which keeps the device busy until the end of the batch.
+    */
+
+    Scene scene = {nSolids, solids, surfaces, triangles, vertices, solidCandidates};
+    DECLARE_COUNTERS(scene);
+    DECLARE_LOGGER(logger, dataPoints, energyTally);
+
+    uint gid = get_global_id(0);
+    uint seed = seeds[gid];
+    uint logIndex = 0;
+    uint maxLogIndex = 0;
+
+    bool logIsFull = false;
+    while (!logIsFull){
+        if (!reserveLogSpace(logCursor, logSize, logChunkSize, &logIndex, &maxLogIndex)){
+            logIsFull = true;
+            break;
+        }
+        uint currentPhotonIndex = atomic_inc(photonCounter);
+        if (currentPhotonIndex >= maxPhotons){
+            break;
+        }
+        Photon photon = loadPhoton(currentPhotonIndex, PHOTON_BUFFER_ARGS);
+        photon.er = getAnyOrthogonal(&photon.direction);
+
+        float distance = 0;
+        while (photon.weight != 0){
+            if (!reserveLogSpace(logCursor, logSize, logChunkSize, &logIndex, &maxLogIndex)){
+                logIsFull = true;
+                break;
+            }
+            distance = propagateStep(distance, &photon, materials, &scene, &seed, &logger, &logIndex, gid);
+            countEvents(&scene, COUNTER_ROULETTE_KILLS, roulette(weightThreshold, &photon, &seed));
+        }
+        storePhoton(&photon, currentPhotonIndex, PHOTON_BUFFER_ARGS);
+    }
+    seeds[gid] = seed;
+    countEvents(&scene, COUNTER_LOG_FULL_EXITS, logIsFull);
+    flushCounters(&scene, kernelCounters);
+    flushEnergyTally(&logger, energyTally);
+}
+
+__kernel void propagateFromSource(uint photonLimit, uint logSize, uint logChunkSize, __global uint *logCursor,
+            float weightThreshold, __global uint *photonCounter, ulong firstPhotonID, __constant Source *source,
+            uint initialMaterialID,
+            int initialSolidID, PHOTON_BUFFERS, __constant Material *materials, uint nSolids, __global Solid *solids,
+            __global Surface *surfaces, __global Triangle *triangles, __global Vertex *vertices,
+            __global SolidCandidate *solidCandidates, __global uint *seeds, __global DataPoint *dataPoints,
+            __global float *energyTally, __global uint *kernelCounters){
+    /*
+    Persistent-threads propagation of photons generated on the device from the source parameters. Each work item
+    owns a single photon slot. When its photon is dead, it takes the next photon index from the global atomic
+    `photonCounter` and generates a new photon in its slot, until `photonLimit` photons were generated. The 64-bit ID
+    of the photon is its index offset by `firstPhotonID`. A photon interrupted by a full log stays in its slot and is
+    resumed by the next batch.
+    */
+
+    Scene scene = {nSolids, solids, surfaces, triangles, vertices, solidCandidates};
+    DECLARE_COUNTERS(scene);
+    DECLARE_LOGGER(logger, dataPoints, energyTally);
+
+    uint gid = get_global_id(0);
+    uint seed = seeds[gid];
+    uint logIndex = 0;
+    uint maxLogIndex = 0;
+    Photon photon = loadPhoton(gid, PHOTON_BUFFER_ARGS);
+
+    bool logIsFull = false;
+    while (!logIsFull){
+        if (!reserveLogSpace(logCursor, logSize, logChunkSize, &logIndex, &maxLogIndex)){
+            logIsFull = true;
+            break;
+        }
+        if (photon.weight == 0){
+            uint photonIndex = atomic_inc(photonCounter);
+            if (photonIndex >= photonLimit){
+                break;
+            }
+            generatePhoton(source, firstPhotonID + photonIndex, initialMaterialID, initialSolidID, &photon, &seed);
+        }
+        photon.er = getAnyOrthogonal(&photon.direction);
+
+        float distance = 0;
+        while (photon.weight != 0){
+            if (!reserveLogSpace(logCursor, logSize, logChunkSize, &logIndex, &maxLogIndex)){
+                logIsFull = true;
+                break;
+            }
+            distance = propagateStep(distance, &photon, materials, &scene, &seed, &logger, &logIndex, gid);
+            countEvents(&scene, COUNTER_ROULETTE_KILLS, roulette(weightThreshold, &photon, &seed));
+        }
+    }
+    storePhoton(&photon, gid, PHOTON_BUFFER_ARGS);
+    seeds[gid] = seed;
+    countEvents(&scene, COUNTER_LOG_FULL_EXITS, logIsFull);
+    flushCounters(&scene, kernelCounters);
+    flushEnergyTally(&logger, energyTally);
 }
 
 
@@ -279,68 +596,97 @@ __kernel void propagate(uint maxPhotons, uint maxInteractions, float weightThres
 
 
 __kernel void moveByKernel(float distance, __global Photon *photons, uint photonID){
-    moveBy(distance, photons, photonID);
+    Photon photon = photons[photonID];
+    moveBy(distance, &photon);
+    photons[photonID] = photon;
 }
 
 __kernel void scatterByKernel(float phi, float theta, __global Photon *photons, uint photonID){
-    photons[photonID].er = getAnyOrthogonalGlobal(&photons[photonID].direction);
-    scatterBy(phi, theta, photons, photonID);
+    Photon photon = photons[photonID];
+    photon.er = getAnyOrthogonal(&photon.direction);
+    scatterBy(phi, theta, &photon);
+    photons[photonID] = photon;
 }
 
 __kernel void decreaseWeightByKernel(float delta_weight, __global Photon *photons, uint photonID){
-    decreaseWeightBy(delta_weight, photons, photonID);
+    Photon photon = photons[photonID];
+    decreaseWeightBy(delta_weight, &photon);
+    photons[photonID] = photon;
 }
 
 __kernel void rouletteKernel(float weightThreshold, __global uint *seeds, __global Photon *photons, uint photonID){
-    roulette(weightThreshold, photons, seeds, photonID, photonID);
+    Photon photon = photons[photonID];
+    uint seed = seeds[photonID];
+    roulette(weightThreshold, &photon, &seed);
+    photons[photonID] = photon;
+    seeds[photonID] = seed;
 }
 
 __kernel void reflectKernel(float3 incidencePlane, float angleDeflection, __global Photon *photons, uint photonID){
     FresnelIntersection fresnelIntersection;
     fresnelIntersection.incidencePlane = incidencePlane;
     fresnelIntersection.angleDeflection = angleDeflection;
-    reflect(&fresnelIntersection, photons, photonID);
+    Photon photon = photons[photonID];
+    reflect(&fresnelIntersection, &photon);
+    photons[photonID] = photon;
 }
 
 __kernel void refractKernel(float3 incidencePlane, float angleDeflection, __global Photon *photons, uint photonID){
     FresnelIntersection fresnelIntersection;
     fresnelIntersection.incidencePlane = incidencePlane;
     fresnelIntersection.angleDeflection = angleDeflection;
-    refract(&fresnelIntersection, photons, photonID);
+    Photon photon = photons[photonID];
+    refract(&fresnelIntersection, &photon);
+    photons[photonID] = photon;
 }
 
-__kernel void interactKernel(__constant Material *materials, __global DataPoint *logger,
+__kernel void interactKernel(__constant Material *materials, __global DataPoint *dataPoints,
                              uint logIndex, __global Photon *photons, uint photonID){
-    interact(photons, materials, logger, logIndex, photonID);
+    Logger logger = {dataPoints};
+    Photon photon = photons[photonID];
+    interact(&photon, materials, &logger, logIndex);
+    photons[photonID] = photon;
 }
 
 __kernel void logIntersectionKernel(float3 normal, int surfaceID, __global Surface *surfaces,
-                    __global DataPoint *logger, uint logIndex, __global Photon *photons, uint photonID){
+                    __global DataPoint *dataPoints, uint logIndex, __global Photon *photons, uint photonID){
+    Logger logger = {dataPoints};
     Intersection intersection;
     intersection.normal = normal;
     intersection.surfaceID = surfaceID;
-    logIntersection(&intersection, photons, surfaces, logger, &logIndex, photonID);
+    Photon photon = photons[photonID];
+    logIntersection(&intersection, &photon, surfaces, &logger, &logIndex);
 }
 
 __kernel void reflectOrRefractKernel(float3 normal, int surfaceID, float distanceLeft,
                                      __constant Material *materials, __global Surface *surfaces,
-                                     __global DataPoint *logger, uint logIndex, __global uint *seeds,
+                                     __global DataPoint *dataPoints, uint logIndex, __global uint *seeds,
                                      __global Photon *photons, uint photonID){
+    Logger logger = {dataPoints};
     Intersection intersection;
     intersection.normal = normal;
     intersection.surfaceID = surfaceID;
     intersection.distanceLeft = distanceLeft;
     intersection.isSmooth = surfaces[surfaceID].toSmooth;
-    reflectOrRefract(&intersection, photons, materials, surfaces, logger, &logIndex, seeds, photonID, photonID);
+    Photon photon = photons[photonID];
+    uint seed = seeds[photonID];
+    reflectOrRefract(&intersection, &photon, materials, surfaces, &logger, &logIndex, &seed);
+    photons[photonID] = photon;
+    seeds[photonID] = seed;
 }
 
 __kernel void propagateStepKernel(float distance, __constant Material *materials, __global Surface *surfaces,
-                    __global Triangle *triangles, __global Vertex *vertices, __global uint *seeds, __global DataPoint *logger, uint logIndex,
-                    __global Photon *photons, uint photonID){
+                    __global Triangle *triangles, __global Vertex *vertices, __global uint *seeds, __global DataPoint *dataPoints,
+                    uint logIndex, __global Photon *photons, uint photonID){
+    Logger logger = {dataPoints};
     Scene scene;
     scene.surfaces = surfaces;
     scene.triangles = triangles;
     scene.vertices = vertices;
     uint gid = photonID;
-    propagateStep(distance, photons, materials, &scene, seeds, logger, &logIndex, gid, photonID);
+    Photon photon = photons[photonID];
+    uint seed = seeds[gid];
+    propagateStep(distance, &photon, materials, &scene, &seed, &logger, &logIndex, gid);
+    photons[photonID] = photon;
+    seeds[gid] = seed;
 }
@@ -8,16 +8,23 @@ uint wangHash(uint seed){
     return seed;
 }
 
-float getRandomFloatValue(__global unsigned int *seeds, unsigned int id){
+float getRandomFloat(uint *seed){
      float result = 0.0f;
      while(result == 0.0f){
-         uint rnd_seed = wangHash(seeds[id]);
-         seeds[id] = rnd_seed;
+         uint rnd_seed = wangHash(*seed);
+         *seed = rnd_seed;
          result = (float)rnd_seed / (float)UINT_MAX;
      }
      return result;
 }
 
+float getRandomFloatValue(__global unsigned int *seeds, unsigned int id){
+     uint seed = seeds[id];
+     float result = getRandomFloat(&seed);
+     seeds[id] = seed;
+     return result;
+}
+
 // ----------------- TEST KERNELS -----------------
 
  __kernel void fillRandomFloatBuffer(__global unsigned int *seeds, __global float *randomNumbers){
@@ -23,11 +23,14 @@ float getScatteringAngleTheta(float g, float randomNumber){
     }
 }
 
-ScatteringAngles getScatteringAngles(float rndPhi, float rndTheta,__global Photon *photons,
-                                     __constant Material *materials, uint photonID)
+ScatteringAngles getScatteringAngles(float rndPhi, float rndTheta, Photon *photon, __constant Material *materials)
 {
     ScatteringAngles angles;
-    float g = materials[photons[photonID].materialID].g;
+#ifdef CONSTANT_G
+    float g = CONSTANT_G;
+#else
+    float g = materials[photon->materialID].g;
+#endif
     angles.phi = getScatteringAnglePhi(rndPhi);
     angles.theta = getScatteringAngleTheta(g, rndTheta);
     return angles;
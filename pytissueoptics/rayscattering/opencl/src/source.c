@@ -0,0 +1,66 @@
+__constant uint PENCIL_SOURCE = 0;
+__constant uint DIRECTIONAL_SOURCE = 1;
+__constant uint DIVERGENT_SOURCE = 2;
+__constant uint ISOTROPIC_SOURCE = 3;
+
+struct Source {
+    float3 position;
+    float3 direction;
+    float3 xAxis;
+    float3 yAxis;
+    float diameter;
+    float divergence;
+    uint type;
+};
+
+typedef struct Source Source;
+
+float3 sampleDisc(float diameter, float3 xAxis, float3 yAxis, uint *seed){
+    // Square root method, same as the Python implementation in Source._getUniformlySampledDisc.
+    float r = diameter / 2 * sqrt(getRandomFloat(seed));
+    float theta = getRandomFloat(seed) * 2 * M_PI_F;
+    return r * cos(theta) * xAxis + r * sin(theta) * yAxis;
+}
+
+float3 sampleSphere(uint *seed){
+    float cost = 2 * getRandomFloat(seed) - 1;
+    float sint = sqrt(max(0.0f, 1 - cost * cost));
+    float phi = getRandomFloat(seed) * 2 * M_PI_F;
+    return (float3)(sint * cos(phi), sint * sin(phi), cost);
+}
+
+void generatePhoton(__constant Source *source, ulong photonID, uint materialID, int solidID, Photon *photon, uint *seed){
+    float3 position = source->position;
+    float3 direction = source->direction;
+
+    if (source->type == DIRECTIONAL_SOURCE || source->type == DIVERGENT_SOURCE){
+        position += sampleDisc(source->diameter, source->xAxis, source->yAxis, seed);
+    }
+    if (source->type == DIVERGENT_SOURCE){
+        float thetaDiameter = tan(source->divergence / 2) * 2;
+        direction = normalize(direction + sampleDisc(thetaDiameter, source->xAxis, source->yAxis, seed));
+    }
+    else if (source->type == ISOTROPIC_SOURCE){
+        direction = sampleSphere(seed);
+    }
+
+    photon->position = position;
+    photon->direction = direction;
+    photon->er = getAnyOrthogonal(&direction);
+    photon->weight = 1.0f;
+    photon->materialID = materialID;
+    photon->solidID = solidID;
+    photon->lastIntersectedDetectorID = 0;
+    photon->ID = photonID;
+}
+
+// ----------------- TEST KERNELS -----------------
+
+__kernel void generatePhotonsKernel(__constant Source *source, __global Photon *photons, __global uint *seeds){
+    uint gid = get_global_id(0);
+    Photon photon;
+    uint seed = seeds[gid];
+    generatePhoton(source, gid, 0, 0, &photon, &seed);
+    photons[gid] = photon;
+    seeds[gid] = seed;
+}
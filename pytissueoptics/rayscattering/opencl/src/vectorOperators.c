@@ -17,8 +17,8 @@ void normalizeVectorGlobal(__global float3 *vector){
     }
 }
 
-void rotateAroundAxisGlobal(__global float3 *mainVector, __global float3 *axisVector, float theta){
-    normalizeVectorGlobal(axisVector);
+void rotateAroundAxis(float3 *mainVector, float3 *axisVector, float theta){
+    normalizeVectorLocal(axisVector);
     float sint = sin(theta);
     float cost = cos(theta);
     float one_cost = 1.0f - cost;
@@ -40,9 +40,17 @@ void rotateAroundAxisGlobal(__global float3 *mainVector, __global float3 *axisVe
     mainVector->x = x;
     mainVector->y = y;
     mainVector->z = z;
-    }
+}
+
+void rotateAroundAxisGlobal(__global float3 *mainVector, __global float3 *axisVector, float theta){
+    float3 vector = *mainVector;
+    float3 axis = *axisVector;
+    rotateAroundAxis(&vector, &axis, theta);
+    *mainVector = vector;
+    *axisVector = axis;
+}
 
-void rotateAround(__global float3 *mainVector, float3 *axisVector, float theta){
+void rotateAround(float3 *mainVector, float3 *axisVector, float theta){
 //    normalizeVectorLocal(axisVector);
     float sint = sin(theta);
     float cost = cos(theta);
@@ -0,0 +1,233 @@
+#include "propagation.c"
+
+/*
+Wavefront propagation kernels (see CLWavefront). Each step of the active photons is split into stage kernels which
+communicate through compacted queues of photon slot indices. The size of each queue is counted at its index in
+`queueSizes`. The photons, their RNG state and the distance left to propagate stay in global memory between stages.
+The kernels are launched with a fixed work-group size, so the work items beyond the `queueLength` do nothing.
+*/
+
+#if defined(ENERGY_TALLY) && !defined(TALLY_GLOBAL_ATOMICS)
+#error "The wavefront kernels require TALLY_GLOBAL_ATOMICS, since their work items return early."
+#endif
+
+__constant uint STEP_QUEUE = 0;
+__constant uint SURFACE_QUEUE = 1;
+__constant uint SCATTER_QUEUE = 2;
+__constant uint ACTIVE_QUEUE = 3;
+__constant uint MAX_LOGS_PER_STEP = 2;
+
+void enqueue(uint slot, __global uint *queue, __global uint *queueSizes, uint queueID){
+    queue[atomic_inc(&queueSizes[queueID])] = slot;
+}
+
+void storeSurfaceHit(Intersection *intersection, __global SurfaceHit *surfaceHit){
+    surfaceHit->position = intersection->position;
+    surfaceHit->normal = intersection->normal;
+    surfaceHit->rawNormal = intersection->rawNormal;
+    surfaceHit->surfaceID = intersection->surfaceID;
+    surfaceHit->polygonID = intersection->polygonID;
+    surfaceHit->distanceLeft = intersection->distanceLeft;
+    surfaceHit->isSmooth = intersection->isSmooth;
+}
+
+Intersection loadSurfaceHit(__global SurfaceHit *surfaceHit){
+    Intersection intersection;
+    intersection.exists = true;
+    intersection.position = surfaceHit->position;
+    intersection.normal = surfaceHit->normal;
+    intersection.rawNormal = surfaceHit->rawNormal;
+    intersection.surfaceID = surfaceHit->surfaceID;
+    intersection.polygonID = surfaceHit->polygonID;
+    intersection.distanceLeft = surfaceHit->distanceLeft;
+    intersection.isSmooth = surfaceHit->isSmooth;
+    return intersection;
+}
+
+__kernel void wavefrontGenerate(uint queueLength, uint photonLimit, __global uint *photonCounter,
+            ulong firstPhotonID, __constant Source *source, uint initialMaterialID, int initialSolidID, PHOTON_BUFFERS, __global uint *seeds,
+            __global uint *activeQueue, __global uint *queueSizes){
+    /*
+    Generates a new photon from the source in each empty slot until `photonLimit` photons were generated, and queues
+    every slot with a photon left to propagate. The 64-bit ID of a photon is its index offset by `firstPhotonID`.
+    */
+    uint slot = get_global_id(0);
+    if (slot >= queueLength){
+        return;
+    }
+    Photon photon = loadPhoton(slot, PHOTON_BUFFER_ARGS);
+    if (photon.weight == 0){
+        uint photonIndex = atomic_inc(photonCounter);
+        if (photonIndex >= photonLimit){
+            return;
+        }
+        uint seed = seeds[slot];
+        generatePhoton(source, firstPhotonID + photonIndex, initialMaterialID, initialSolidID, &photon, &seed);
+        storePhoton(&photon, slot, PHOTON_BUFFER_ARGS);
+        seeds[slot] = seed;
+    }
+    enqueue(slot, activeQueue, queueSizes, ACTIVE_QUEUE);
+}
+
+__kernel void wavefrontSampleStep(uint queueLength, uint logSize, __global uint *logReservation,
+            __global uint *activeQueue, __global uint *stepQueue, __global uint *queueSizes, __global float *distances,
+            PHOTON_BUFFERS, __constant Material *materials, __global uint *seeds, __global uint *kernelCounters){
+    /*
+    Reserves the log space of the next step of each active photon and samples its scattering distance if the
+    distance left from the previous step is consumed. Photons that cannot reserve the log space are not queued and
+    stay in their slot to be resumed by the next batch.
+    */
+    if (get_global_id(0) >= queueLength){
+        return;
+    }
+    uint slot = activeQueue[get_global_id(0)];
+#ifndef NO_LOG_DATA_POINTS
+    if (atomic_add(logReservation, MAX_LOGS_PER_STEP) + MAX_LOGS_PER_STEP > logSize){
+        addToKernelCounter(kernelCounters, COUNTER_LOG_FULL_EXITS, 1);
+        return;
+    }
+#endif
+    Photon photon = loadPhoton(slot, PHOTON_BUFFER_ARGS);
+    uint seed = seeds[slot];
+    distances[slot] = sampleStepDistance(distances[slot], &photon, materials, &seed);
+    seeds[slot] = seed;
+    enqueue(slot, stepQueue, queueSizes, STEP_QUEUE);
+}
+
+__kernel void wavefrontIntersect(uint queueLength, uint queueOffset, __global uint *stepQueue,
+            __global uint *surfaceQueue, __global uint *scatterQueue, __global uint *queueSizes,
+            __global float *distances, __global SurfaceHit *surfaceHits, PHOTON_BUFFERS, uint nSolids,
+            __global Solid *solids, __global Surface *surfaces, __global Triangle *triangles, __global Vertex *vertices,
+            __global SolidCandidate *solidCandidates, __global uint *kernelCounters){
+    /*
+    Moves each stepping photon to its next intersection or to its scattering point, and queues it for the surface
+    or the scattering stage. The queue is processed in launches of at most one photon per work unit of the scene,
+    starting at `queueOffset`, since each work item uses the solid candidates of its global ID.
+    */
+    Scene scene = {nSolids, solids, surfaces, triangles, vertices, solidCandidates};
+    DECLARE_COUNTERS(scene);
+
+    uint gid = get_global_id(0);
+    if (gid >= queueLength){
+        return;
+    }
+    countEvents(&scene, COUNTER_STEPS, 1);
+    uint slot = stepQueue[queueOffset + gid];
+    Photon photon = loadPhoton(slot, PHOTON_BUFFER_ARGS);
+    float distance = distances[slot];
+
+    Ray stepRay = {photon.position, photon.direction, distance};
+    Intersection intersection = findIntersection(stepRay, &scene, gid, photon.solidID, photon.lastIntersectedDetectorID);
+
+    photon.lastIntersectedDetectorID = NULL_SOLID_ID;  // Reset ignored detector ID.
+    distances[slot] = 0;
+
+    if (intersection.exists){
+        moveTo(intersection.position, &photon);
+        storeSurfaceHit(&intersection, &surfaceHits[slot]);
+        enqueue(slot, surfaceQueue, queueSizes, SURFACE_QUEUE);
+    } else if (distance == INFINITY){
+        photon.weight = 0;
+    } else {
+        moveBy(distance, &photon);
+        enqueue(slot, scatterQueue, queueSizes, SCATTER_QUEUE);
+    }
+    storePhoton(&photon, slot, PHOTON_BUFFER_ARGS);
+    flushCounters(&scene, kernelCounters);
+}
+
+__kernel void wavefrontInteractWithSurface(uint queueLength, __global uint *logCursor, __global uint *surfaceQueue,
+            __global float *distances, __global SurfaceHit *surfaceHits, PHOTON_BUFFERS, __constant Material *materials,
+            uint nSolids, __global Solid *solids, __global Surface *surfaces, __global Triangle *triangles,
+            __global Vertex *vertices, __global SolidCandidate *solidCandidates, __global uint *seeds,
+            __global DataPoint *dataPoints, __global DataPoint *stagingLog, __global float *energyTally,
+            __global uint *kernelCounters){
+    /*
+    Reflects, refracts or detects each photon at its surface intersection. The number of entries logged is only
+    known after the interaction, so they are first written to the entries of the slot in `stagingLog`, and then
+    appended to the dense log.
+    */
+    Scene scene = {nSolids, solids, surfaces, triangles, vertices, solidCandidates};
+    DECLARE_COUNTERS(scene);
+    DECLARE_LOGGER(stagingLogger, stagingLog, energyTally);
+
+    if (get_global_id(0) >= queueLength){
+        return;
+    }
+    uint slot = surfaceQueue[get_global_id(0)];
+    Photon photon = loadPhoton(slot, PHOTON_BUFFER_ARGS);
+    uint seed = seeds[slot];
+    Intersection intersection = loadSurfaceHit(&surfaceHits[slot]);
+
+    uint stagingIndex = slot * MAX_LOGS_PER_STEP;
+    uint logIndex = stagingIndex;
+    distances[slot] = interactWithSurface(&intersection, &photon, materials, &scene, &seed, &stagingLogger, &logIndex);
+
+#ifndef NO_LOG_DATA_POINTS
+    uint logCount = logIndex - stagingIndex;
+    if (logCount > 0){
+        uint logStart = atomic_add(logCursor, logCount);
+        for (uint i = 0; i < logCount; i++){
+            dataPoints[logStart + i] = stagingLog[stagingIndex + i];
+        }
+    }
+#endif
+    storePhoton(&photon, slot, PHOTON_BUFFER_ARGS);
+    seeds[slot] = seed;
+    flushCounters(&scene, kernelCounters);
+}
+
+__kernel void wavefrontScatter(uint queueLength, __global uint *logCursor, __global uint *scatterQueue,
+            PHOTON_BUFFERS, __constant Material *materials, __global uint *seeds, __global DataPoint *dataPoints,
+            __global float *energyTally){
+    /*
+    Scatters each photon at its scattering point and logs the energy it deposits. Every photon logs exactly once,
+    so the log entries are reserved with a single atomic operation per work group.
+    */
+    DECLARE_LOGGER(logger, dataPoints, energyTally);
+    __local uint groupLogStart;
+    if (get_local_id(0) == 0){
+        uint groupStart = get_group_id(0) * get_local_size(0);
+        groupLogStart = atomic_add(logCursor, min((uint)get_local_size(0), queueLength - groupStart));
+    }
+    barrier(CLK_LOCAL_MEM_FENCE);
+    if (get_global_id(0) >= queueLength){
+        return;
+    }
+
+    uint slot = scatterQueue[get_global_id(0)];
+    Photon photon = loadPhoton(slot, PHOTON_BUFFER_ARGS);
+    photon.er = getAnyOrthogonal(&photon.direction);
+    uint seed = seeds[slot];
+    uint logIndex = groupLogStart + get_local_id(0);
+
+    scatter(&photon, materials, &seed, &logger, &logIndex);
+
+    storePhoton(&photon, slot, PHOTON_BUFFER_ARGS);
+    seeds[slot] = seed;
+}
+
+__kernel void wavefrontRoulette(uint queueLength, float weightThreshold, __global uint *stepQueue,
+            __global uint *activeQueue, __global uint *queueSizes, PHOTON_BUFFERS, __global uint *seeds,
+            __global uint *kernelCounters){
+    /*
+    Applies the russian roulette to each photon that completed its step, and queues the photons with energy left
+    for the next step.
+    */
+    if (get_global_id(0) >= queueLength){
+        return;
+    }
+    uint slot = stepQueue[get_global_id(0)];
+    Photon photon = loadPhoton(slot, PHOTON_BUFFER_ARGS);
+    uint seed = seeds[slot];
+
+    if (roulette(weightThreshold, &photon, &seed)){
+        addToKernelCounter(kernelCounters, COUNTER_ROULETTE_KILLS, 1);
+    }
+
+    storePhoton(&photon, slot, PHOTON_BUFFER_ARGS);
+    seeds[slot] = seed;
+    if (photon.weight != 0){
+        enqueue(slot, activeQueue, queueSizes, ACTIVE_QUEUE);
+    }
+}
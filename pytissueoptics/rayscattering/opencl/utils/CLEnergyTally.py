@@ -0,0 +1,72 @@
+from typing import Dict
+
+import numpy as np
+
+from pytissueoptics.rayscattering.energyLogging.energyTally import EnergyTally
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf
+from pytissueoptics.rayscattering.opencl.CLScene import FIRST_SOLID_ID, WORLD_SOLID_ID, CLScene
+from pytissueoptics.rayscattering.opencl.config.CLConfig import cl
+from pytissueoptics.scene.logger import InteractionKey
+
+
+class CLEnergyTally:
+    """
+    Energy tallied on the device by the propagation kernels, so that the totals required by `Stats` do not require
+    the interaction log. The energy deposited in each solid (or detected by a detector) is summed in the bin
+    `solidID - WORLD_SOLID_ID`, and the energy crossing each surface along its normal (or against its normal) in the
+    bin `surfaceOffset + 2 * surfaceID` (+ 1).
+
+    Each work group sums its energy in local memory and adds it to the global bins once at the end of the kernel.
+    With `globalAtomics`, or when the bins do not fit in local memory, the energy of each interaction is added to the
+    global bins directly. The bins are single precision on the device, so they are collected on the host and reset
+    after each batch.
+    """
+
+    def __init__(self, sceneCL: CLScene, device: cl.Device, globalAtomics: bool = False):
+        self._sceneCL = sceneCL
+        self._surfaceSolidIDs = sceneCL.getSurfaceSolidIDs()
+        self._surfaceOffset = sceneCL.nSolidIDs + FIRST_SOLID_ID - WORLD_SOLID_ID
+        self._size = self._surfaceOffset + 2 * len(self._surfaceSolidIDs)
+        fitsInLocalMemory = self._size * np.dtype(np.float32).itemsize <= device.local_mem_size // 2
+        self._globalAtomics = globalAtomics or not fitsInLocalMemory
+
+        self.bins = BufferOf(np.zeros(self._size, dtype=np.float32))
+        self._totals = np.zeros(self._size, dtype=np.float64)
+
+    @property
+    def defines(self) -> Dict[str, str]:
+        defines = {"ENERGY_TALLY": "", "TALLY_SIZE": str(self._size), "TALLY_SURFACE_OFFSET": str(self._surfaceOffset)}
+        if self._globalAtomics:
+            defines["TALLY_GLOBAL_ATOMICS"] = ""
+        return defines
+
+    def collect(self, program):
+        """Adds the bins of the last batch to the totals and resets them for the next batch."""
+        program.getData(self.bins, returnData=False)
+        self._totals += self.bins.hostBuffer
+        self.bins.hostBuffer[:] = 0
+
+    def toEnergyTally(self) -> EnergyTally:
+        """Returns the totals of each interaction key, following the sign convention of the logged data points."""
+        energyTally = EnergyTally()
+        for solidID in self._sceneCL.getSolidIDs():
+            energy = self._totals[solidID - WORLD_SOLID_ID]
+            if energy != 0:
+                energyTally.add(InteractionKey(self._sceneCL.getSolidLabel(solidID)), energy)
+
+        for surfaceID, (insideSolidID, outsideSolidID) in enumerate(self._surfaceSolidIDs):
+            surfaceBin = self._surfaceOffset + 2 * surfaceID
+            outwardEnergy, inwardEnergy = self._totals[surfaceBin : surfaceBin + 2]
+            self._addCrossings(energyTally, insideSolidID, surfaceID, outwardEnergy, inwardEnergy)
+            if outsideSolidID != WORLD_SOLID_ID:
+                self._addCrossings(energyTally, outsideSolidID, surfaceID, inwardEnergy, outwardEnergy)
+        return energyTally
+
+    def _addCrossings(
+        self, energyTally: EnergyTally, solidID: int, surfaceID: int, leavingEnergy: float, enteringEnergy: float
+    ):
+        key = InteractionKey(self._sceneCL.getSolidLabel(solidID), self._sceneCL.getSurfaceLabel(solidID, surfaceID))
+        if leavingEnergy != 0:
+            energyTally.add(key, leavingEnergy)
+        if enteringEnergy != 0:
+            energyTally.add(key, -enteringEnergy)
@@ -0,0 +1,51 @@
+from typing import Dict
+
+import numpy as np
+
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf
+
+KERNEL_COUNTER_NAMES = [
+    "steps",
+    "triangleTests",
+    "bboxTests",
+    "reflections",
+    "refractions",
+    "rouletteKills",
+    "detectorHits",
+    "logFullExits",
+    "vertexNudges",
+]
+
+
+class CLKernelCounters:
+    """
+    Counts the work done by the propagation kernels when they are compiled with KERNEL_COUNTERS (see
+    `intersection.c`), in the same order as `KERNEL_COUNTER_NAMES`:
+
+    - steps: propagation steps, each requiring an intersection search,
+    - triangleTests: ray-triangle intersection tests,
+    - bboxTests: ray-bounding box intersection tests of the solid candidates,
+    - reflections and refractions: Fresnel interactions at the surfaces,
+    - rouletteKills: photons killed by the russian roulette,
+    - detectorHits: photons absorbed by a detector,
+    - logFullExits: work items (photons for the wavefront kernels) interrupted because the log was full,
+    - vertexNudges: photons moved away from a vertex they hit.
+
+    Each counter is stored on the device as a pair of 32-bit words (low, high). The counters are collected on the
+    host and reset after each batch.
+    """
+
+    def __init__(self):
+        self.buffer = BufferOf(np.zeros(2 * len(KERNEL_COUNTER_NAMES), dtype=np.uint32))
+
+    @property
+    def defines(self) -> Dict[str, str]:
+        return {"KERNEL_COUNTERS": ""}
+
+    def collect(self, program) -> Dict[str, int]:
+        """Returns the counters of the last batch and resets them for the next batch."""
+        program.getData(self.buffer, returnData=False)
+        words = self.buffer.hostBuffer.astype(np.uint64).reshape(-1, 2)
+        counts = words[:, 0] + (words[:, 1] << np.uint64(32))
+        self.buffer.hostBuffer[:] = 0
+        return {name: int(count) for name, count in zip(KERNEL_COUNTER_NAMES, counts)}
@@ -1,28 +1,32 @@
 from multiprocessing.pool import ThreadPool
-from typing import List
+from typing import Optional
 
 import numpy as np
 
 from pytissueoptics.rayscattering.opencl.CLScene import NO_LOG_ID, WORLD_SOLID_LABEL, CLScene
 from pytissueoptics.scene.logger import InteractionKey, Logger
 
-SOLID_ID_COL = 5
-SURFACE_ID_COL = 6
+SOLID_ID_COL = -2
+SURFACE_ID_COL = -1
 
 
 class CLKeyLog:
-    """Parses a DataPointCL array of shape (N, 7) where each point is of the form
-    (weight, x, y, z, photonID, solidID, surfaceID) to extract a dictionary of InteractionKey
-    and their corresponding datapoint array of the form (weight, x, y, z, photonID). The
-    translation from IDs to their corresponding labels is done using the given CLScene.
+    """Parses a DataPointCL array of shape (N, 6) where each point is of the form
+    (weight, x, y, z, solidID, surfaceID) to extract a dictionary of InteractionKey
+    and their corresponding datapoint array of the form (weight, x, y, z). The optional
+    photon IDs of the points, of shape (N,), are kept in a separate integer array which
+    follows the points of each key. The translation from IDs to their corresponding
+    labels is done using the given CLScene.
     """
 
-    def __init__(self, log: np.ndarray, sceneCL: CLScene):
+    def __init__(self, log: np.ndarray, sceneCL: CLScene, photonIDs: Optional[np.ndarray] = None):
         self._log = log
+        self._photonIDs = photonIDs
         self._sceneCL = sceneCL
 
         self._keyIndices = []
         self._keyLog = {}
+        self._keyPhotonIDs = {}
 
         self._batchSize = min(50000, len(self._log))
 
@@ -31,7 +35,10 @@ class CLKeyLog:
     def toSceneLogger(self, sceneLogger: Logger):
         """Writes the extracted key-based log to the given scene logger."""
         for key, points in self._keyLog.items():
-            sceneLogger.logDataPointArray(points, key)
+            if self._photonIDs is None:
+                sceneLogger.logDataPointArray(points, key)
+            else:
+                sceneLogger.logDataPointArray(points, key, photonIDs=self._keyPhotonIDs[key])
 
     def _extractKeyLog(self):
         if self._sceneCL.nSolids == 0:
@@ -41,9 +48,12 @@ class CLKeyLog:
 
     def _extractNoKeyLog(self):
         noInteractionIndices = np.where(self._log[:, SOLID_ID_COL] == NO_LOG_ID)[0]
-        self._log = self._log[:, :5]
+        self._log = self._log[:, :SOLID_ID_COL]
         self._log = np.delete(self._log, noInteractionIndices, axis=0)
-        self._keyLog[InteractionKey(WORLD_SOLID_LABEL, None)] = self._log
+        key = InteractionKey(WORLD_SOLID_LABEL, None)
+        self._keyLog[key] = self._log
+        if self._photonIDs is not None:
+            self._keyPhotonIDs[key] = np.delete(self._photonIDs, noInteractionIndices)
 
     def _sortLocal(self):
         """Sorts the log locally by solidID and surfaceID,
@@ -62,7 +72,11 @@ class CLKeyLog:
 
     def _sortBatch(self, startIdx: int):
         ba, bb = startIdx, startIdx + self._batchSize
-        batchLog = self._sort(self._log[ba:bb], columns=[SOLID_ID_COL, SURFACE_ID_COL])
+        batchLog = self._log[ba:bb]
+        order = np.lexsort([batchLog[:, SOLID_ID_COL], batchLog[:, SURFACE_ID_COL]])
+        batchLog = batchLog[order]
+        if self._photonIDs is not None:
+            self._photonIDs[ba:bb] = self._photonIDs[ba:bb][order]
 
         solidChanges = self._getValueChangeIndices(batchLog, column=SOLID_ID_COL)
 
@@ -90,13 +104,9 @@ class CLKeyLog:
         indices = np.where(log[:-1, column] != log[1:, column])[0] + 1
         return np.concatenate(([0], indices, [log.shape[0]]))
 
-    @staticmethod
-    def _sort(log: np.ndarray, columns: List[int]):
-        return log[np.lexsort([log[:, i] for i in columns])]
-
     def _merge(self):
         """Merges the local batches into a single key log with unique interaction keys."""
-        self._log = self._log[:, :5]
+        self._log = self._log[:, :SOLID_ID_COL]
 
         for i, batchKeyIndices in enumerate(self._keyIndices):
             batchStartIndex = i * self._batchSize
@@ -104,15 +114,15 @@ class CLKeyLog:
                 if len(indices) == 0:
                     continue
                 a, b = batchStartIndex + indices[0], batchStartIndex + indices[1]
-                points = self._log[a:b]
                 key = self._getInteractionKey(*keyIDs)
-                if key not in self._keyLog:
-                    self._keyLog[key] = [points]
-                else:
-                    self._keyLog[key].append(points)
+                self._keyLog.setdefault(key, []).append(self._log[a:b])
+                if self._photonIDs is not None:
+                    self._keyPhotonIDs.setdefault(key, []).append(self._photonIDs[a:b])
 
         for key in self._keyLog:
             self._keyLog[key] = np.concatenate(self._keyLog[key])
+            if self._photonIDs is not None:
+                self._keyPhotonIDs[key] = np.concatenate(self._keyPhotonIDs[key])
 
     def _getInteractionKey(self, solidID: int, surfaceID: int):
         return InteractionKey(self._sceneCL.getSolidLabel(solidID), self._sceneCL.getSurfaceLabel(solidID, surfaceID))
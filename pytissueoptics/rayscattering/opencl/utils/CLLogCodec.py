@@ -0,0 +1,123 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from pytissueoptics.rayscattering.opencl.buffers.dataPointCL import LogLayout
+from pytissueoptics.rayscattering.opencl.CLScene import NO_LOG_ID, NO_SURFACE_ID, WORLD_SOLID_ID, CLScene
+
+MAX_LOG_KEYS = 2**16
+QUANTIZATION_LEVELS = 2**16 - 1
+MIN_BBOX_SIZE = 1e-6
+
+
+class CLLogCodec:
+    """
+    Encodes and decodes the interaction log records of a given DataPointCL layout.
+
+    On the device, the codec provides the compile-time definitions required by the layout. The packed key of a data
+    point is 0 when nothing was logged, `solidID - WORLD_SOLID_ID + 1` for a volume interaction and
+    `surfaceKeyOffset + 2 * surfaceID + side` for a surface crossing, where side is 0 for the inside solid and 1 for
+    the outside solid. Quantized positions are 16-bit offsets within the bounding box of the logged solid. They are
+    rejected when photons interact in the world, since these interactions are not bounded by any box.
+
+    On the host, `decode` converts the records back to float arrays of the form (weight, x, y, z, solidID, surfaceID)
+    as expected by CLKeyLog, with the 64-bit photon IDs in a separate integer array if the layout keeps them.
+    """
+
+    def __init__(self, layout: LogLayout, sceneCL: CLScene):
+        self._layout = layout
+        self._surfaceKeyOffset = sceneCL.nSolidIDs + 3
+        self._keyTable = None
+        self._bboxMin = None
+        self._bboxSize = None
+
+        if layout.packedKey:
+            self._keyTable = self._makeKeyTable(sceneCL)
+        if layout.quantizedPositions:
+            self._makeQuantizationBoxes(sceneCL)
+
+    def _makeKeyTable(self, sceneCL: CLScene) -> np.ndarray:
+        """Returns the (solidID, surfaceID) of each key."""
+        surfaceSolidIDs = sceneCL.getSurfaceSolidIDs()
+        nKeys = self._surfaceKeyOffset + 2 * len(surfaceSolidIDs)
+        if nKeys > MAX_LOG_KEYS:
+            raise ValueError(
+                f"The scene requires {nKeys} interaction keys, but packed log keys are limited to {MAX_LOG_KEYS}. "
+                f"Use a log layout without packed keys."
+            )
+
+        keyTable = np.full((nKeys, 2), NO_SURFACE_ID, dtype=np.int32)
+        keyTable[0, 0] = NO_LOG_ID
+        keyTable[1 : self._surfaceKeyOffset, 0] = np.arange(WORLD_SOLID_ID, self._surfaceKeyOffset + WORLD_SOLID_ID - 1)
+        surfaceIDs = np.arange(len(surfaceSolidIDs))
+        keyTable[self._surfaceKeyOffset :: 2] = np.stack([surfaceSolidIDs[:, 0], surfaceIDs], axis=1)
+        keyTable[self._surfaceKeyOffset + 1 :: 2] = np.stack([surfaceSolidIDs[:, 1], surfaceIDs], axis=1)
+        return keyTable
+
+    def _makeQuantizationBoxes(self, sceneCL: CLScene):
+        if sceneCL.logsWorldInteractions:
+            raise ValueError(
+                "Quantized log positions cannot represent the interactions in a world material with mu_t > 0, which "
+                "are not bounded by the scene. Use a log layout without quantized positions."
+            )
+        try:
+            bboxes = sceneCL.getSolidBoundingBoxes()
+        except ValueError:
+            raise ValueError("Quantized log positions require a scene with at least one solid.")
+        self._bboxMin = bboxes[:, 0]
+        self._bboxSize = np.maximum(bboxes[:, 1] - bboxes[:, 0], MIN_BBOX_SIZE).astype(np.float32)
+
+    @property
+    def defines(self) -> Dict[str, str]:
+        """Preprocessor definitions selecting the layout in the kernels. The full layout requires none."""
+        defines = {}
+        if not self._layout.photonID:
+            defines["LOG_NO_PHOTON_ID"] = ""
+        if self._layout.packedKey:
+            defines["LOG_PACKED_KEY"] = ""
+            defines["LOG_SURFACE_KEY_OFFSET"] = str(self._surfaceKeyOffset)
+        if self._layout.quantizedPositions:
+            defines["LOG_QUANTIZED_POSITIONS"] = ""
+        return defines
+
+    @property
+    def declarations(self) -> str:
+        """Constant tables required by the layout in the kernels."""
+        if not self._layout.quantizedPositions:
+            return ""
+        return (
+            f"__constant float LOG_QUANTIZATION_LEVELS = {float(QUANTIZATION_LEVELS)!r}f;\n"
+            f"__constant float LOG_BBOX_MIN[] = {self._toCArray(self._bboxMin)};\n"
+            f"__constant float LOG_BBOX_SIZE[] = {self._toCArray(self._bboxSize)};\n"
+        )
+
+    @staticmethod
+    def _toCArray(values: np.ndarray) -> str:
+        return "{" + ", ".join(f"{float(value)!r}f" for value in values.flatten()) + "}"
+
+    def decode(self, log: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Decodes a structured array of DataPointCL records of this layout into a float array and the array of their
+        photon IDs, which is None if the layout does not keep them.
+        """
+        decodedLog = np.empty((len(log), 6), dtype=np.float32)
+        decodedLog[:, 0] = log["delta_weight"]
+
+        if self._layout.packedKey:
+            solidIDs, surfaceIDs = self._keyTable[log["key"]].T
+        else:
+            solidIDs, surfaceIDs = log["solidID"], log["surfaceID"]
+        decodedLog[:, -2] = solidIDs
+        decodedLog[:, -1] = surfaceIDs
+
+        for i, axis in enumerate("xyz"):
+            decodedLog[:, 1 + i] = log[axis]
+        if self._layout.quantizedPositions:
+            bboxIDs = solidIDs - WORLD_SOLID_ID
+            decodedLog[:, 1:4] *= self._bboxSize[bboxIDs] / QUANTIZATION_LEVELS
+            decodedLog[:, 1:4] += self._bboxMin[bboxIDs]
+
+        photonIDs = None
+        if self._layout.photonID:
+            photonIDs = np.array(log["photonID"], dtype=np.uint64)
+        return decodedLog, photonIDs
@@ -5,15 +5,26 @@ from pytissueoptics.rayscattering.opencl import CONFIG, warnings
 from pytissueoptics.rayscattering.opencl.buffers import DataPointCL
 
 DATAPOINT_SIZE = DataPointCL.getItemSize()
+MIN_LOG_CHUNK_SIZE = 2
+MAX_LOG_CHUNK_SIZE = 64
+LOG_CHUNKS_PER_WORK_ITEM = 8
+MAX_PHOTONS_PER_BATCH = np.iinfo(np.int32).max
 
 
 class CLParameters:
-    def __init__(self, N, AVG_IT_PER_PHOTON):
+    def __init__(self, N, AVG_IT_PER_PHOTON, dataPointSize: int = DATAPOINT_SIZE, keepsLogInMemory: bool = True):
+        """
+        :param keepsLogInMemory: (Default to True) If False, the logs of the batches are not accumulated in memory,
+                like when the scene logger stores its data on disk, so only the memory of a batch is required.
+        """
+        self._dataPointSize = dataPointSize
+        self._keepsLogInMemory = keepsLogInMemory
         nBatch = 1 / CONFIG.BATCH_LOAD_FACTOR
         avgPhotonsPerBatch = int(np.ceil(N / min(nBatch, CONFIG.N_WORK_UNITS)))
         self._maxLoggerMemory = self._calculateAverageBatchMemorySize(avgPhotonsPerBatch, AVG_IT_PER_PHOTON)
         self._workItemAmount = CONFIG.N_WORK_UNITS
-        self.maxPhotonsPerBatch = min(2 * avgPhotonsPerBatch, N)
+        # The photon counters of a batch are 32-bit, but the total number of photons N is not limited.
+        self.maxPhotonsPerBatch = min(2 * avgPhotonsPerBatch, N, MAX_PHOTONS_PER_BATCH)
 
         self._assertEnoughRAM()
 
@@ -24,7 +35,7 @@ class CLParameters:
         """
         avgInteractions = avgPhotonsPerBatch * avgInteractionsPerPhoton
         minInteractions = 2 * CONFIG.N_WORK_UNITS
-        batchSize = max(avgInteractions, minInteractions) * DATAPOINT_SIZE
+        batchSize = max(avgInteractions, minInteractions) * self._dataPointSize
         maxSize = CONFIG.MAX_MEMORY_MB * 1024**2
         return min(batchSize, maxSize)
 
@@ -44,11 +55,16 @@ class CLParameters:
 
     @property
     def maxLoggableInteractions(self):
-        return np.int32(self._maxLoggerMemory / DATAPOINT_SIZE)
+        return np.int32(self._maxLoggerMemory / self._dataPointSize)
 
     @property
-    def maxLoggableInteractionsPerWorkItem(self):
-        return np.int32(self.maxLoggableInteractions / self._workItemAmount)
+    def logChunkSize(self):
+        """
+        Number of log entries reserved at once by a work item from the shared log. Small enough for the log to be
+        filled densely by all work items, large enough to limit the contention on the atomic log cursor.
+        """
+        chunkSize = self.maxLoggableInteractions // (LOG_CHUNKS_PER_WORK_ITEM * self._workItemAmount)
+        return np.uint32(min(max(chunkSize, MIN_LOG_CHUNK_SIZE), MAX_LOG_CHUNK_SIZE))
 
     @property
     def photonsPerWorkItem(self):
@@ -56,7 +72,7 @@ class CLParameters:
 
     @property
     def requiredRAMBytes(self) -> float:
-        averageNBatches = 1.4 * (1 / CONFIG.BATCH_LOAD_FACTOR)
+        averageNBatches = 1.4 * (1 / CONFIG.BATCH_LOAD_FACTOR) if self._keepsLogInMemory else 1
         overHead = 1.15
         return overHead * averageNBatches * self._maxLoggerMemory
 
@@ -1,5 +1,18 @@
 from .batchTiming import BatchTiming
+from .CLEnergyTally import CLEnergyTally
+from .CLKernelCounters import KERNEL_COUNTER_NAMES, CLKernelCounters
 from .CLKeyLog import CLKeyLog
+from .CLLogCodec import CLLogCodec
 from .CLParameters import CLParameters
+from .photonScheduler import PhotonScheduler
 
-__all__ = ["BatchTiming", "CLKeyLog", "CLParameters"]
+__all__ = [
+    "BatchTiming",
+    "CLEnergyTally",
+    "CLKernelCounters",
+    "CLKeyLog",
+    "CLLogCodec",
+    "CLParameters",
+    "KERNEL_COUNTER_NAMES",
+    "PhotonScheduler",
+]
@@ -1,3 +1,6 @@
+from typing import Dict
+
+
 class BatchTiming:
     """
     Used to record and display the progress of a batched photon propagation.
@@ -12,6 +15,7 @@ class BatchTiming:
         self._dataTransferTime = 0
         self._dataConversionTime = 0
         self._totalTime = 0
+        self._kernelCounters = {}
 
         self._title = "SIMULATION PROGRESS"
         self._header = ["BATCH #", "PHOTON COUNT", "SPEED (ph/ms)", "TIME ELAPSED", "TIME LEFT"]
@@ -30,12 +34,14 @@ class BatchTiming:
         dataTransferTime: float,
         dataConversionTime: float,
         totalTime: float,
+        kernelCounters: Dict[str, int] = None,
     ):
         """
         Photon count is the number of photons that were propagated in the batch. The other times are in nanoseconds.
         Propagation time is the time it took to run the propagation kernel. Data transfer time is the time it took to
         transfer the raw 3D data from the GPU. Data conversion time is the time it took to sort and convert the
-        interactions IDs into proper InteractionKey points.
+        interactions IDs into proper InteractionKey points. The kernel counters of the batch, if any, are summed and
+        displayed at the end of the propagation.
         """
         self._photonCount += photonCount
         self._propagationTime += propagationTime
@@ -43,6 +49,8 @@ class BatchTiming:
         self._dataConversionTime += dataConversionTime
         self._totalTime += totalTime
         self._batchCount += 1
+        for name, count in (kernelCounters or {}).items():
+            self._kernelCounters[name] = self._kernelCounters.get(name, 0) + count
 
         self._printProgress()
         if self._photonCount == self._totalPhotons:
@@ -82,4 +90,8 @@ class BatchTiming:
         }
         for key, value in splits.items():
             print(f"\t{key}: {value / self._totalTime * 100:.1f}%")
+        if self._kernelCounters:
+            print("Kernel counters:")
+            for name, count in self._kernelCounters.items():
+                print(f"\t{name}: {count} ({count / self._photonCount:.2f} per photon)")
         print("".join(["=" * self._width]) + "\n")
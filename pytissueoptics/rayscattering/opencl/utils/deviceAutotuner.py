@@ -0,0 +1,122 @@
+import time
+from typing import Optional
+
+import numpy as np
+
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.opencl import CONFIG, WEIGHT_THRESHOLD
+from pytissueoptics.rayscattering.opencl.buffers.sourceCL import DIRECTIONAL_SOURCE, SourceCLInfo
+from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons
+from pytissueoptics.rayscattering.opencl.config.CLConfig import cl
+from pytissueoptics.rayscattering.opencl.config.deviceProfiles import DeviceProfile
+from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
+from pytissueoptics.scene.geometry import Vector
+from pytissueoptics.scene.logger import Logger
+from pytissueoptics.scene.solids import Cuboid, Sphere
+
+DEFAULT_TIME_BUDGET = 120
+MAX_SECONDS_PER_TEST = 5
+PHOTONS_PER_WORK_UNIT = 5
+
+WORK_UNITS_CANDIDATES = [2**i for i in range(7, 16)]
+BATCH_LOAD_FACTOR_CANDIDATES = [0.2, 0.1, 0.5]
+MAX_MEMORY_MB_CANDIDATES = [1024, 256, 512, 2048]
+
+
+class DeviceAutotuner:
+    """
+    Finds the OpenCL parameters (N_WORK_UNITS, BATCH_LOAD_FACTOR and MAX_MEMORY_MB) that minimize the propagation
+    time per photon of a synthetic scene on the given device. Runs without any user input or display so that it can
+    be used in batch jobs. The parameters are swept one after the other, starting from N_WORK_UNITS, and the sweep
+    stops early when the time budget (in seconds) is exhausted.
+    """
+
+    def __init__(self, device: cl.Device, timeBudget: float = DEFAULT_TIME_BUDGET, verbose: bool = True):
+        self._device = device
+        self._timeBudget = timeBudget
+        self._verbose = verbose
+        self._startTime = None
+
+        self._scene = self._createScene()
+        self._sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, -2), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 0.5, 0
+        )
+
+    def run(self) -> DeviceProfile:
+        previousValues = (CONFIG.N_WORK_UNITS, CONFIG.BATCH_LOAD_FACTOR, CONFIG.MAX_MEMORY_MB)
+        self._startTime = time.time()
+        try:
+            best = DeviceProfile(
+                N_WORK_UNITS=WORK_UNITS_CANDIDATES[0],
+                BATCH_LOAD_FACTOR=BATCH_LOAD_FACTOR_CANDIDATES[0],
+                MAX_MEMORY_MB=self._maxMemoryCandidates[0],
+                timePerPhoton=np.inf,
+            )
+            best = self._sweep(best, "N_WORK_UNITS", WORK_UNITS_CANDIDATES, stopWhenSlower=True)
+            best = self._sweep(best, "BATCH_LOAD_FACTOR", BATCH_LOAD_FACTOR_CANDIDATES)
+            best = self._sweep(best, "MAX_MEMORY_MB", self._maxMemoryCandidates)
+        finally:
+            CONFIG.N_WORK_UNITS, CONFIG.BATCH_LOAD_FACTOR, CONFIG.MAX_MEMORY_MB = previousValues
+
+        if self._verbose:
+            print(
+                f"... Tuned '{self._device.name}': N_WORK_UNITS={best.N_WORK_UNITS}, "
+                f"BATCH_LOAD_FACTOR={best.BATCH_LOAD_FACTOR}, MAX_MEMORY_MB={best.MAX_MEMORY_MB} "
+                f"({best.timePerPhoton * 1e6:.2f} us/photon) in {time.time() - self._startTime:.1f} s."
+            )
+        return best
+
+    def _sweep(self, best: DeviceProfile, parameter: str, candidates: list, stopWhenSlower=False) -> DeviceProfile:
+        for value in candidates:
+            if self._timeLeft <= 0 and best.timePerPhoton != np.inf:
+                break
+            candidate = best._replace(**{parameter: value})
+            if candidate != best or best.timePerPhoton == np.inf:
+                timePerPhoton = self._measure(candidate)
+                if timePerPhoton is None:
+                    break
+                if timePerPhoton < best.timePerPhoton:
+                    best = candidate._replace(timePerPhoton=timePerPhoton)
+                elif stopWhenSlower:
+                    break
+        return best
+
+    def _measure(self, profile: DeviceProfile) -> Optional[float]:
+        """Returns the average propagation time per photon, or None if the test took too long."""
+        CONFIG.N_WORK_UNITS = profile.N_WORK_UNITS
+        CONFIG.BATCH_LOAD_FACTOR = profile.BATCH_LOAD_FACTOR
+        CONFIG.MAX_MEMORY_MB = profile.MAX_MEMORY_MB
+        N = profile.N_WORK_UNITS * PHOTONS_PER_WORK_UNIT
+
+        photons = CLPhotons(sourceInfo=self._sourceInfo, N=N, devices=[self._device])
+        photons.setContext(self._scene, self._scene.getEnvironmentAt(self._sourceInfo.position), logger=Logger())
+        t0 = time.time()
+        photons.propagate(IPP=self._scene.getEstimatedIPP(WEIGHT_THRESHOLD))
+        elapsedTime = time.time() - t0
+
+        if self._verbose:
+            print(
+                f"... N_WORK_UNITS={profile.N_WORK_UNITS}, BATCH_LOAD_FACTOR={profile.BATCH_LOAD_FACTOR}, "
+                f"MAX_MEMORY_MB={profile.MAX_MEMORY_MB} : {elapsedTime / N * 1e6:.2f} us/photon [{elapsedTime:.2f}s]"
+            )
+        if elapsedTime > MAX_SECONDS_PER_TEST:
+            return None
+        return elapsedTime / N
+
+    @property
+    def _timeLeft(self) -> float:
+        return self._timeBudget - (time.time() - self._startTime)
+
+    @property
+    def _maxMemoryCandidates(self) -> list:
+        maxDeviceMemoryMB = self._device.global_mem_size // 1024**2
+        candidates = [memory for memory in MAX_MEMORY_MB_CANDIDATES if memory <= 0.75 * maxDeviceMemoryMB]
+        return candidates or [int(0.75 * maxDeviceMemoryMB)]
+
+    @staticmethod
+    def _createScene() -> ScatteringScene:
+        material1 = ScatteringMaterial(mu_s=5, mu_a=0.8, g=0.9, n=1.4)
+        material2 = ScatteringMaterial(mu_s=10, mu_a=0.8, g=0.9, n=1.7)
+        cube = Cuboid(a=3, b=3, c=3, position=Vector(0, 0, 0), material=material1, label="Cube")
+        sphere = Sphere(radius=1, order=2, position=Vector(0, 0, 0), material=material2, label="Sphere", smooth=True)
+        return ScatteringScene([cube, sphere])
@@ -0,0 +1,28 @@
+import threading
+from typing import Tuple
+
+
+class PhotonScheduler:
+    """
+    Thread-safe photon budget shared by the devices of a propagation. Each device claims a new range of photon
+    indices whenever it runs out of work between two batches, so that faster devices end up propagating more
+    photons (dynamic work stealing).
+    """
+
+    def __init__(self, totalPhotons: int):
+        self._totalPhotons = totalPhotons
+        self._nextPhotonIndex = 0
+        self._lock = threading.Lock()
+
+    def claim(self, maxPhotons: int) -> Tuple[int, int]:
+        """Returns the start index and the number of photons claimed, which is 0 when all photons are taken."""
+        with self._lock:
+            startIndex = self._nextPhotonIndex
+            photonCount = max(0, min(int(maxPhotons), self._totalPhotons - startIndex))
+            self._nextPhotonIndex += photonCount
+        return startIndex, photonCount
+
+    @property
+    def photonsRemaining(self) -> int:
+        with self._lock:
+            return self._totalPhotons - self._nextPhotonIndex
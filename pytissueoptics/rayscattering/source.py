@@ -1,13 +1,19 @@
 import hashlib
 import random
-import time
 from typing import List, Optional, Tuple, Union
 
 import numpy as np
 
 from pytissueoptics.rayscattering import utils
-from pytissueoptics.rayscattering.energyLogging import EnergyLogger
-from pytissueoptics.rayscattering.opencl import CONFIG, IPPTable, validateOpenCL, warnings
+from pytissueoptics.rayscattering.energyLogging import DataPointBuffer, EnergyLogger
+from pytissueoptics.rayscattering.opencl import CONFIG, IPPTable, validateOpenCL
+from pytissueoptics.rayscattering.opencl.buffers.sourceCL import (
+    DIRECTIONAL_SOURCE,
+    DIVERGENT_SOURCE,
+    ISOTROPIC_SOURCE,
+    PENCIL_SOURCE,
+    SourceCLInfo,
+)
 from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons
 from pytissueoptics.rayscattering.photon import Photon
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
@@ -66,53 +72,39 @@ class Source(Displayable):
         if showProgress:
             print(f"Propagating {self._N} photons without hardware acceleration...")
         intersectionFinder = FastIntersectionFinder(scene)
+        logBuffer = DataPointBuffer(logger) if logger is not None else None
 
-        for i in progressBar(range(self._N), desc="Propagating photons", disable=not showProgress):
-            self._photons[i].setContext(self._environment, intersectionFinder=intersectionFinder, logger=logger)
-            self._photons[i].propagate()
+        try:
+            for i in progressBar(range(self._N), desc="Propagating photons", disable=not showProgress):
+                self._photons[i].setContext(self._environment, intersectionFinder=intersectionFinder, logger=logBuffer)
+                self._photons[i].propagate()
+        finally:
+            if logBuffer is not None:
+                logBuffer.flush()
 
     def _getAverageInteractionsPerPhoton(self, scene: ScatteringScene) -> float:
         """
         Returns the average number of interactions per photon (IPP) for a given experiment (scene and source
-        combination). This is used to optimize the hardware accelerated kernel (OpenCL).
+        combination). This is only used to size the batches of the hardware accelerated kernel (OpenCL), since the
+        kernel resumes its photons in a new batch whenever the interaction log is full.
 
-        If the experiment was already seen, the IPP is loaded from the hash table. Otherwise, the IPP is estimated by
-        propagating 1000 photons (using a gross estimate of the IPP by assuming an infinite medium of mean scene
-        albedo). The measured IPP is stored in the hash table for future use and updated (cumulative average) after
-        each propagation.
+        If the experiment was already seen, the IPP is loaded from the hash table. Otherwise, a gross estimate of the
+        IPP is used by assuming an infinite medium of mean scene albedo. The measured IPP is stored in the hash table
+        for future use and updated (cumulative average) after each propagation.
         """
         experimentHash = self._getExperimentHash(scene)
 
         if experimentHash not in IPPTable():
-            self._measureIPP(scene)
+            return scene.getEstimatedIPP(CONFIG.WEIGHT_THRESHOLD)
 
         return IPPTable().getIPP(experimentHash)
 
     def _getExperimentHash(self, scene: ScatteringScene) -> int:
         return hash((scene, self))
 
-    def _measureIPP(self, scene: ScatteringScene):
-        warnings.warn(
-            "This experiment was not seen before. The program will need to estimate the average interactions "
-            "per photon (IPP). \n... Estimating IPP]"
-        )
-
-        t0 = time.time()
-        tempN = self._N
-        self._N = CONFIG.IPP_TEST_N_PHOTONS
-        self._loadPhotons()
-        tempLogger = Logger()
-        estimatedIPP = scene.getEstimatedIPP(CONFIG.WEIGHT_THRESHOLD)
-        self._propagateOpenCL(estimatedIPP, scene, tempLogger, showProgress=False)
-        self._updateIPP(scene, tempLogger)
-
-        self._N = tempN
-        self._loadPhotons()
-
-        warnings.warn(f"... [IPP test took {time.time() - t0:.2f}s]")
-
     def _updateIPP(self, scene: ScatteringScene, logger: Logger = None):
-        if logger is None:
+        if logger is None or logger.nDataPoints == 0:
+            # Nothing to measure when the data points are not logged (only the energy is tallied).
             return
         measuredIPP = logger.nDataPoints / self._N
         table = IPPTable()
@@ -129,6 +121,11 @@ class Source(Displayable):
         initial positions and normalized directions of the photons as (N, 3) numpy arrays."""
         raise NotImplementedError
 
+    def getCLInfo(self) -> Optional[SourceCLInfo]:
+        """Can be implemented by subclasses to describe the source with parameters, in which case the photons are
+        generated directly on the OpenCL device instead of being sampled on the host. Defaults to None."""
+        return None
+
     def _loadPhotons(self):
         if self._useHardwareAcceleration:
             self._loadPhotonsOpenCL()
@@ -141,6 +138,10 @@ class Source(Displayable):
             self._photons.append(Photon(Vector(*positions[i]), Vector(*directions[i]), ID=i))
 
     def _loadPhotonsOpenCL(self):
+        sourceInfo = self.getCLInfo()
+        if sourceInfo is not None:
+            self._photons = CLPhotons(sourceInfo=sourceInfo, N=self._N)
+            return
         positions, directions = self.getInitialPositionsAndDirections()
         self._photons = CLPhotons(positions, directions)
 
@@ -263,6 +264,10 @@ class DirectionalSource(Source):
     def _getInitialDirections(self):
         return np.full((self._N, 3), self._direction.array)
 
+    def getCLInfo(self) -> SourceCLInfo:
+        sourceType = DIRECTIONAL_SOURCE if self._diameter > 0 else PENCIL_SOURCE
+        return SourceCLInfo(sourceType, self._position, self._direction, self._xAxis, self._yAxis, self._diameter, 0)
+
     @property
     def _hashComponents(self) -> tuple:
         return self._position, self._direction, self._diameter
@@ -296,6 +301,9 @@ class IsotropicPointSource(Source):
         directions /= np.linalg.norm(directions, axis=1, keepdims=True)
         return positions, directions
 
+    def getCLInfo(self) -> SourceCLInfo:
+        return SourceCLInfo(ISOTROPIC_SOURCE, self._position, Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 0, 0)
+
     @property
     def _hashComponents(self) -> tuple:
         return (self._position,)
@@ -332,6 +340,17 @@ class DivergentSource(DirectionalSource):
         directions /= np.linalg.norm(directions, axis=1, keepdims=True)
         return directions
 
+    def getCLInfo(self) -> SourceCLInfo:
+        return SourceCLInfo(
+            DIVERGENT_SOURCE,
+            self._position,
+            self._direction,
+            self._xAxis,
+            self._yAxis,
+            self._diameter,
+            self._divergence,
+        )
+
     @property
     def _hashComponents(self) -> tuple:
         return self._position, self._direction, self._diameter, self._divergence
@@ -26,8 +26,14 @@ class SolidStats:
 
 class Stats:
     def __init__(self, logger: EnergyLogger):
+        """
+        The statistics are computed from the energy tallies of the logger when it tallies the energy (see
+        `EnergyLogger`). Otherwise, they are computed from the 3D data points, or from the 2D views if the 3D data was
+        discarded.
+        """
         self._logger = logger
         self._pointCloudFactory = PointCloudFactory(logger)
+        self._energyTally = logger.energyTally
         self._extractFromViews = not logger.has3D
 
         self._photonCount = logger.info["photonCount"]
@@ -112,12 +118,19 @@ class Stats:
         return reportString
 
     def getAbsorbance(self, solidLabel: str, useTotalEnergy=False) -> float:
+        if self._energyTally is not None:
+            return self._getAbsorbanceFromTally(solidLabel, useTotalEnergy)
         if self._extractFromViews:
             return self._getAbsorbanceFromViews(solidLabel, useTotalEnergy)
         points = self._getPointCloud(solidLabel).solidPoints
         energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
         return 100 * self._sumEnergy(points) / energyInput if energyInput else math.inf
 
+    def _getAbsorbanceFromTally(self, solidLabel: str, useTotalEnergy=False) -> float:
+        energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
+        absorbedEnergy = self._energyTally.getDepositedEnergy(solidLabel)
+        return 100 * absorbedEnergy / energyInput if energyInput else math.inf
+
     def _getAbsorbanceFromViews(self, solidLabel: str, useTotalEnergy=False) -> float:
         energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
         absorbedEnergy = self._getAbsorbedEnergyFromViews(solidLabel)
@@ -154,6 +167,8 @@ class Stats:
     def getEnergyInput(self, solidLabel: str = None) -> float:
         if solidLabel is None:
             return self.getPhotonCount()
+        if self._energyTally is not None:
+            return self._getEnergyCrossingSolidFromTally(solidLabel, leaving=False)
         if self._extractFromViews:
             return self._getEnergyInputFromViews(solidLabel)
         points = self._getPointCloudOfSurfaces(solidLabel).enteringSurfacePoints
@@ -163,6 +178,15 @@ class Stats:
             energy += self.getPhotonCount()
         return energy
 
+    def _getEnergyCrossingSolidFromTally(self, solidLabel: str, leaving: bool) -> float:
+        energy = 0
+        for surfaceLabel in self._logger.getSeenSurfaceLabels(solidLabel):
+            energy += self._energyTally.getSurfaceEnergy(solidLabel, surfaceLabel, leaving=leaving)
+
+        if utils.labelsEqual(self._sourceSolidLabel, solidLabel) and not leaving:
+            energy += self.getPhotonCount()
+        return energy
+
     def _getEnergyInputFromViews(self, solidLabel: str) -> float:
         return self._getEnergyCrossingSolidFromViews(solidLabel, leaving=False)
 
@@ -204,6 +228,8 @@ class Stats:
     def getTransmittance(self, solidLabel: str, surfaceLabel: str = None, useTotalEnergy=False):
         """Uses local energy input for the desired solid by default. Specify 'useTotalEnergy' = True
         to compare instead with total input energy of the scene."""
+        if self._energyTally is not None:
+            return self._getTransmittanceFromTally(solidLabel, surfaceLabel, useTotalEnergy)
         if self._extractFromViews:
             return self._getTransmittanceFromViews(solidLabel, surfaceLabel, useTotalEnergy)
 
@@ -215,6 +241,15 @@ class Stats:
         energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
         return 100 * self._sumEnergy(points) / energyInput if energyInput else math.inf
 
+    def _getTransmittanceFromTally(self, solidLabel: str, surfaceLabel: str = None, useTotalEnergy=False):
+        if surfaceLabel is None:
+            energyLeaving = self._getEnergyCrossingSolidFromTally(solidLabel, leaving=True)
+        else:
+            energyLeaving = self._energyTally.getSurfaceEnergy(solidLabel, surfaceLabel, leaving=True)
+
+        energyInput = self.getEnergyInput(solidLabel) if not useTotalEnergy else self.getPhotonCount()
+        return 100 * energyLeaving / energyInput if energyInput else math.inf
+
     def _getTransmittanceFromViews(self, solidLabel: str, surfaceLabel: str = None, useTotalEnergy=False):
         if surfaceLabel is None:
             energyLeaving = self._getEnergyLeavingFromViews(solidLabel)
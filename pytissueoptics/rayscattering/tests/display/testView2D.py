@@ -20,6 +20,8 @@ from pytissueoptics.rayscattering.display.views import (
     View2DSurfaceX,
     ViewGroup,
 )
+from pytissueoptics.rayscattering.display.views.view2D import ViewBinner
+from pytissueoptics.rayscattering.energyLogging import EnergyType
 from pytissueoptics.rayscattering.tests import SHOW_VISUAL_TESTS
 from pytissueoptics.scene.tests import compareVisuals
 
@@ -568,3 +570,50 @@ class TestView2D(unittest.TestCase):
             isOK = compareVisuals(referenceImage, currentImage, title="TestView2D: View2DProjectionX")
         if not isOK:
             self.fail("Visual test failed.")
+
+
+class TestViewBinner(unittest.TestCase):
+    def setUp(self):
+        self.views = [
+            View2DProjectionX(),
+            View2DProjectionZ(),
+            View2DProjection(Direction.Z_NEG, Direction.Y_NEG),
+            View2DProjectionZ(limits=((0, 1), (0, 1)), binSize=0.05),
+            View2DSliceZ(position=1, thickness=0.5),
+            View2DSurfaceX("A", "B", surfaceEnergyLeaving=True),
+            View2DSurfaceX("A", "B", surfaceEnergyLeaving=False),
+        ]
+        for view in self.views:
+            view.setContext([(-1, 2), (-2, 2), (0, 3)], (0.1, 0.2, 0.3))
+
+        rng = np.random.default_rng(0)
+        self.dataPoints = np.column_stack([rng.normal(size=1000), rng.uniform(-2, 4, (1000, 3))])
+        self.dataPoints[:100, 1:] = [-1, 2, 0.3]
+
+    def testWhenExtract_shouldHaveTheSameDataAsAHistogramOfEachView(self):
+        ViewBinner(self.views).extract(self.dataPoints)
+
+        for i, view in enumerate(self.views):
+            with self.subTest(view=i):
+                dataPoints = self.dataPoints[view._filterMask(self.dataPoints)] if i >= 4 else self.dataPoints
+                u, v = dataPoints[:, 1 + view.axisU], dataPoints[:, 1 + view.axisV]
+                expectedData = np.histogram2d(
+                    u,
+                    v,
+                    weights=dataPoints[:, 0] * view._valueSign,
+                    bins=(view.binsU, view.binsV),
+                    range=(sorted(view.limitsU), sorted(view.limitsV)),
+                )[0]
+                self.assertTrue(np.array_equal(np.flip(expectedData, axis=1).astype(np.float32), view._dataUV))
+
+    def testGivenFluenceRates_whenExtract_shouldOnlyUseThemForTheViewsOfFluenceRate(self):
+        depositionView = View2DProjectionX()
+        fluenceView = View2DProjectionX(energyType=EnergyType.FLUENCE_RATE)
+        for view in [depositionView, fluenceView]:
+            view.setContext([(-1, 2), (-2, 2), (0, 3)], (0.1, 0.2, 0.3))
+        dataPoints = np.array([[1, 0, 0, 1], [2, 0, 1, 1]])
+
+        ViewBinner([depositionView, fluenceView]).extract(dataPoints, fluenceRates=np.array([10, 20]))
+
+        self.assertEqual(3, depositionView.getSum())
+        self.assertEqual(30, fluenceView.getSum())
@@ -26,6 +26,7 @@ class TestViewer(unittest.TestCase):
         self.logger.defaultBinSize = 1
         self.logger.infiniteLimits = ((-10, 10), (-10, 10), (-10, 10))
         self.logger.has3D = True
+        self.logger.energyTally = None
         self.logger.info = {"photonCount": 0, "sourceSolidLabel": None}
         self.viewer = Viewer(self.scene, self.source, self.logger)
 
@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+from mockito import mock, verify, when
+
+from pytissueoptics.rayscattering.energyLogging import DataPointBuffer, EnergyLogger
+from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
+from pytissueoptics.scene.geometry import Vector
+from pytissueoptics.scene.logger import InteractionKey, Logger
+from pytissueoptics.scene.solids import Cube
+
+
+class TestDataPointBuffer(unittest.TestCase):
+    TEST_SCENE = ScatteringScene([Cube(1, material=ScatteringMaterial(), label="cube")])
+    CUBE_KEY = InteractionKey("cube")
+    SURFACE_KEY = InteractionKey("cube", "cube_top")
+
+    def setUp(self):
+        self.logger = EnergyLogger(self.TEST_SCENE)
+
+    def testWhenLogDataPoint_shouldNotLogItUntilFlushed(self):
+        buffer = DataPointBuffer(self.logger)
+
+        buffer.logDataPoint(0.5, Vector(1, 2, 3), self.CUBE_KEY, 7)
+
+        self.assertTrue(self.logger.isEmpty)
+        buffer.flush()
+        self.assertTrue(np.array_equal([[0.5, 1, 2, 3, 7]], self.logger.getRawDataPoints(self.CUBE_KEY)))
+        self.assertEqual(0, len(buffer))
+
+    def testWhenFlush_shouldLogTheSameDataAsTheLoggerInTheSameOrderForEachKey(self):
+        unbufferedLogger = EnergyLogger(self.TEST_SCENE)
+        buffer = DataPointBuffer(self.logger)
+        for i in range(10):
+            key = self.CUBE_KEY if i % 3 else self.SURFACE_KEY
+            for logger in [buffer, unbufferedLogger]:
+                logger.logDataPoint(i / 10, Vector(i, 0, -i), key, i)
+
+        buffer.flush()
+
+        for key in [self.CUBE_KEY, self.SURFACE_KEY]:
+            self.assertTrue(np.array_equal(unbufferedLogger.getRawDataPoints(key), self.logger.getRawDataPoints(key)))
+
+    def testWhenFull_shouldFlushToTheLogger(self):
+        buffer = DataPointBuffer(self.logger, capacity=2)
+
+        for i in range(3):
+            buffer.logDataPoint(1, Vector(0, 0, 0), self.CUBE_KEY, i)
+
+        self.assertEqual(2, self.logger.nDataPoints)
+        self.assertEqual(1, len(buffer))
+
+    def testGivenDataPointsWithoutID_shouldLogDataPointsWithoutID(self):
+        buffer = DataPointBuffer(self.logger)
+
+        buffer.logDataPoint(0.5, Vector(1, 2, 3), self.CUBE_KEY)
+        buffer.flush()
+
+        self.assertTrue(np.array_equal([[0.5, 1, 2, 3]], self.logger.getRawDataPoints(self.CUBE_KEY)))
+
+    def testWhenFlush_shouldLogTheDataOfAllKeysInASingleCall(self):
+        logger = mock(Logger)
+        when(logger).logDataPointArrays(...).thenReturn()
+        buffer = DataPointBuffer(logger)
+        buffer.logDataPoint(1, Vector(0, 0, 0), self.CUBE_KEY, 0)
+        buffer.logDataPoint(1, Vector(0, 0, 0), self.SURFACE_KEY, 0)
+
+        buffer.flush()
+
+        verify(logger, times=1).logDataPointArrays(...)
+
+    def testGivenEnergyTally_whenFlush_shouldTallyTheEnergyOfTheDataPoints(self):
+        self.logger = EnergyLogger(self.TEST_SCENE, tallyEnergy=True, logDataPoints=False)
+        buffer = DataPointBuffer(self.logger)
+
+        buffer.logDataPoint(0.5, Vector(0, 0, 0), self.CUBE_KEY, 0)
+        buffer.logDataPoint(0.25, Vector(0, 0, 0), self.CUBE_KEY, 0)
+        buffer.logDataPoint(-1, Vector(0, 0, 0), self.SURFACE_KEY, 0)
+        buffer.logDataPoint(0.2, Vector(0, 0, 0), self.SURFACE_KEY, 0)
+        buffer.flush()
+
+        self.assertEqual(0, self.logger.nDataPoints)
+        self.assertEqual(0.75, self.logger.energyTally.getDepositedEnergy("cube"))
+        self.assertEqual(1, self.logger.energyTally.getSurfaceEnergy("cube", "cube_top", leaving=False))
+        self.assertEqual(0.2, self.logger.energyTally.getSurfaceEnergy("cube", "cube_top", leaving=True))
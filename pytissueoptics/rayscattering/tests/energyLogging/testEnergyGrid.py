@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.energyLogging.energyGrid import BLOCK_CELLS, EnergyGrid
+
+
+class TestEnergyGrid(unittest.TestCase):
+    def setUp(self):
+        self.grid = EnergyGrid(voxelSize=0.1)
+
+    def testWhenAddDataPoints_shouldOnlyAllocateTheBlocksWithEnergy(self):
+        self.grid.addDataPoints("cube", np.array([[1, 0.05, 0.05, 0.05], [1, -50, 20, 3]]))
+
+        self.assertEqual(2, self.grid.nBlocks)
+        self.assertEqual(["cube"], self.grid.solidLabels)
+
+    def testWhenAddDataPoints_shouldConserveTheEnergyOfEachSolid(self):
+        dataPoints = np.column_stack((np.full(1000, 0.5), np.random.uniform(-3, 3, (1000, 3))))
+
+        self.grid.addDataPoints("cube", dataPoints)
+        self.grid.addDataPoints("sphere", dataPoints[:10])
+
+        self.assertAlmostEqual(500, self.grid.getTotalEnergy("cube"))
+        self.assertAlmostEqual(505, self.grid.getTotalEnergy())
+        self.assertAlmostEqual(500, np.sum(self.grid.getDataPoints("cube")[:, 0]))
+
+    def testWhenGetDataPoints_shouldReturnTheEnergyAtTheCenterOfTheCells(self):
+        grid = EnergyGrid(voxelSize=0.1, maxRefinement=0)
+
+        grid.addDataPoints("cube", np.array([[1, 0.01, 0.02, 0.03], [2, 0.09, 0.08, 0.07], [4, -0.01, 0.15, 0.2]]))
+
+        dataPoints = grid.getDataPoints("cube")
+        expectedDataPoints = [[3, 0.05, 0.05, 0.05], [4, -0.05, 0.15, 0.25]]
+        self.assertTrue(np.allclose(expectedDataPoints, dataPoints[np.argsort(dataPoints[:, 0])]))
+
+    def testGivenNoDataInSolid_whenGetDataPoints_shouldReturnNone(self):
+        self.assertIsNone(self.grid.getDataPoints("cube"))
+
+    def testGivenConcentratedEnergy_shouldRefineTheBlocksWithMostEnergy(self):
+        hotPoints = np.column_stack((np.ones(100), np.random.uniform(0, 0.8, (100, 3))))
+
+        self.grid.addDataPoints("cube", np.array([[0.01, 5, 5, 5], [0.01, -5, -5, -5]]))
+        self.grid.addDataPoints("cube", hotPoints)
+
+        dataPoints = self.grid.getDataPoints("cube")
+        hotCells = dataPoints[np.all(np.abs(dataPoints[:, 1:]) < 0.8, axis=1)]
+        self.assertTrue(np.allclose(0.1 / 2 / 2, np.min(hotCells[:, 1:])))
+        self.assertEqual(1, np.sum(np.all(dataPoints[:, 1:] > 4, axis=1)))
+
+    def testGivenMemoryLimit_shouldCoarsenTheBlocksWithLeastEnergy(self):
+        blockBytes = BLOCK_CELLS**3 * 8
+        grid = EnergyGrid(voxelSize=0.1, memoryMB=2.5 * blockBytes / 1024**2, maxRefinement=0)
+
+        grid.addDataPoints("cube", np.array([[1, 0.05, 0.05, 0.05], [2, 5, 5, 5], [3, -5, -5, -5]]))
+
+        self.assertLessEqual(grid.nBytes, 2.5 * blockBytes)
+        self.assertEqual(3, grid.nBlocks)
+        self.assertAlmostEqual(6, grid.getTotalEnergy())
+        dataPoints = grid.getDataPoints("cube")
+        coarsePoint = dataPoints[dataPoints[:, 0] == 1][0]
+        self.assertTrue(np.allclose([1, 0.1, 0.1, 0.1], coarsePoint))
+
+    def testGivenMemoryLimitTooSmall_shouldWarnOnce(self):
+        grid = EnergyGrid(voxelSize=0.1, memoryMB=1e-6)
+
+        with self.assertWarns(UserWarning):
+            grid.addDataPoints("cube", np.array([[1, 0.05, 0.05, 0.05]]))
+
+        self.assertEqual(8, grid.nBytes)
+
+    def testWhenMerge_shouldAddTheEnergyAtTheFinestResolution(self):
+        other = EnergyGrid(voxelSize=0.1)
+        other.addDataPoints("cube", np.array([[1, 0.01, 0.01, 0.01], [0.01, 5, 5, 5]]))
+        self.grid.addDataPoints("cube", np.array([[1, 0.01, 0.01, 0.01], [1, -5, -5, -5]]))
+        self.grid.addDataPoints("sphere", np.array([[1, 0, 0, 0]]))
+
+        self.grid.merge(other)
+
+        self.assertAlmostEqual(4.01, self.grid.getTotalEnergy())
+        self.assertEqual(4, self.grid.nBlocks)
+        self.assertAlmostEqual(3.01, np.sum(self.grid.getDataPoints("cube")[:, 0]))
+
+    def testGivenDifferentVoxelSizes_whenMerge_shouldRaise(self):
+        with self.assertRaises(AssertionError):
+            self.grid.merge(EnergyGrid(voxelSize=0.2))
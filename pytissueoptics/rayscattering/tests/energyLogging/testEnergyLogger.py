@@ -16,13 +16,15 @@ from pytissueoptics.rayscattering.display.views import (
     View2DSurfaceY,
     ViewGroup,
 )
-from pytissueoptics.rayscattering.energyLogging import EnergyLogger
+from pytissueoptics.rayscattering.energyLogging import EnergyLogger, EnergyType, MemoryPolicy
+from pytissueoptics.rayscattering.energyLogging.energyLogger import MISSING_PHOTON_ID
 from pytissueoptics.rayscattering.materials import ScatteringMaterial
 from pytissueoptics.rayscattering.opencl.CLScene import WORLD_SOLID_LABEL
 from pytissueoptics.rayscattering.samples import PhantomTissue
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.scene.geometry import Vector
 from pytissueoptics.scene.logger import InteractionKey
+from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
 from pytissueoptics.scene.solids import Cube
 
 
@@ -35,6 +37,29 @@ class TestEnergyLogger(unittest.TestCase):
     def setUp(self):
         self.logger = EnergyLogger(self.TEST_SCENE)
 
+    def testGivenEnergyTally_whenLogDataPoint_shouldTallyItsEnergy(self):
+        logger = EnergyLogger(self.TEST_SCENE, tallyEnergy=True)
+        surfaceKey = InteractionKey("cube", "cube_top")
+
+        logger.logDataPoint(0.5, Vector(0, 0, 0), self.INTERACTION_KEY)
+        logger.logDataPoint(0.25, Vector(0, 0, 0), self.INTERACTION_KEY)
+        logger.logDataPoint(-1, Vector(0, 0, 0), surfaceKey)
+        logger.logDataPoint(0.2, Vector(0, 0, 0), surfaceKey)
+
+        self.assertEqual(0.75, logger.energyTally.getDepositedEnergy("cube"))
+        self.assertEqual(1, logger.energyTally.getSurfaceEnergy("cube", "cube_top", leaving=False))
+        self.assertEqual(0.2, logger.energyTally.getSurfaceEnergy("cube", "cube_top", leaving=True))
+        self.assertEqual(4, logger.nDataPoints)
+
+    def testGivenNoDataPointLogging_whenLogDataPoint_shouldOnlyTallyItsEnergy(self):
+        logger = EnergyLogger(self.TEST_SCENE, tallyEnergy=True, logDataPoints=False)
+
+        logger.logDataPoint(0.5, Vector(0, 0, 0), self.INTERACTION_KEY)
+
+        self.assertEqual(0, logger.nDataPoints)
+        self.assertEqual(0.5, logger.energyTally.getDepositedEnergy("cube"))
+        self.assertEqual(["cube"], logger.getSeenSolidLabels())
+
     def testShouldBeEmpty(self):
         self.assertTrue(self.logger.isEmpty)
 
@@ -81,6 +106,40 @@ class TestEnergyLogger(unittest.TestCase):
         self.assertEqual(2, surfaceView.getSum())
         self.assertEqual(5, sceneView.getSum())
 
+    def testGiven2DLogger_whenLogDataArrays_shouldExtractTheDataOfAllKeysToViewsAtOnce(self):
+        sceneView = View2DProjectionX()
+        cubeView = View2DProjectionX(solidLabel="cube")
+        self.logger = EnergyLogger(self.TEST_SCENE, keep3D=False, views=[sceneView, cubeView])
+
+        self.logger.logDataPointArrays(
+            {
+                InteractionKey("cube"): np.array([[1, 0, 0, 0], [2, 0, 0, 0]]),
+                InteractionKey("sphere"): np.array([[4, 0, 0, 0]]),
+            }
+        )
+
+        self.assertEqual(3, cubeView.getSum())
+        self.assertEqual(7, sceneView.getSum())
+        self.assertEqual(3, self.logger.nDataPoints)
+
+    def testGivenStorageDirectory_shouldExtractTheStoredDataToViews(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            cubeView = View2DProjectionX(solidLabel="cube")
+            self.logger = EnergyLogger(self.TEST_SCENE, views=[cubeView], storageDirectory=tempDir)
+            self.logger.logDataPointArray(np.array([[1, 0, 0, 0], [2, 0, 0, 0]]), InteractionKey("cube"))
+
+            self.logger.updateView(cubeView)
+
+            self.assertEqual(3, cubeView.getSum())
+            self.assertIsInstance(self.logger.getRawDataPoints(InteractionKey("cube")), np.memmap)
+
+    def testWhenGetFluenceRateDataPoints_shouldNotModifyTheLoggedData(self):
+        self.logger.logDataPointArray(np.array([[1.0, 0, 0, 0]]), self.INTERACTION_KEY)
+
+        self.logger.getDataPoints(self.INTERACTION_KEY, energyType=EnergyType.FLUENCE_RATE)
+
+        self.assertEqual(1, self.logger.getRawDataPoints(self.INTERACTION_KEY)[0, 0])
+
     def testGivenLoggerWithData_whenUpdateView_shouldExtractDataToTheView(self):
         self.logger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
         cubeViewZ = self.logger.views[5]
@@ -89,6 +148,44 @@ class TestEnergyLogger(unittest.TestCase):
 
         self.assertEqual(0.5, cubeViewZ.getSum())
 
+    def testGivenUpdatedView_whenLogMoreDataAndUpdateView_shouldOnlyAddTheNewDataToTheView(self):
+        self.logger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
+        cubeViewZ = self.logger.views[5]
+        self.logger.updateView(cubeViewZ)
+
+        self.logger.logDataPoint(0.25, self.CUBE_CENTER, self.INTERACTION_KEY)
+        self.logger.updateView(cubeViewZ)
+        self.logger.updateView(cubeViewZ)
+
+        self.assertEqual(0.75, cubeViewZ.getSum())
+
+    def testGivenUpdatedViewPreviouslySaved_whenLoadAndLogMoreData_shouldOnlyAddTheNewDataToTheView(self):
+        self.logger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
+        self.logger.updateView(self.logger.views[5])
+
+        for fileName in ["test.log", "test.ptlog"]:
+            with tempfile.TemporaryDirectory() as tempDir:
+                filePath = os.path.join(tempDir, fileName)
+                self.logger.save(filePath)
+                logger = EnergyLogger(self.TEST_SCENE, filepath=filePath)
+
+                logger.logDataPoint(0.25, self.CUBE_CENTER, self.INTERACTION_KEY)
+                logger.updateView(logger.views[5])
+
+                self.assertEqual(0.75, logger.views[5].getSum())
+
+    def testGivenUpdatedView_whenFilter_shouldOnlyHaveTheFilteredDataInTheView(self):
+        self.logger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY, ID=0)
+        self.logger.logDataPoint(0.25, self.CUBE_CENTER, self.INTERACTION_KEY, ID=1)
+        self.logger.logDataPoint(1, self.CUBE_CENTER, InteractionKey("detector"), ID=1)
+        cubeViewZ = self.logger.views[5]
+        self.logger.updateView(cubeViewZ)
+
+        self.logger.filter(detectedBy="detector")
+        self.logger.updateView(cubeViewZ)
+
+        self.assertEqual(0.25, cubeViewZ.getSum())
+
     def testWhenAddExistingView_shouldIgnore(self):
         defaultSceneView = View2DProjectionX()
         initialNumberOfViews = len(self.logger.views)
@@ -147,6 +244,32 @@ class TestEnergyLogger(unittest.TestCase):
         with self.assertWarns(UserWarning):
             self.assertFalse(self.logger.addView(customView))
 
+    def testGiven2DLoggerWithEnergyGrid_whenGetDataPoints_shouldReturnTheCellsOfTheGrid(self):
+        self.logger = EnergyLogger(self.TEST_SCENE, keep3D=False, voxelSize=0.1)
+        self.logger.logDataPoint(0.8, Vector(0.51, 0.52, 0.53), self.INTERACTION_KEY)
+        self.logger.logDataPoint(0.2, Vector(0.52, 0.51, 0.54), self.INTERACTION_KEY)
+
+        dataPoints = self.logger.getDataPoints(self.INTERACTION_KEY)
+
+        self.assertFalse(self.logger.has3D)
+        self.assertEqual(["cube"], self.logger.getStoredSolidLabels())
+        self.assertTrue(np.allclose([[1, 0.55, 0.55, 0.55]], dataPoints))
+
+    def testGiven2DLoggerWithEnergyGrid_whenAddCustomViewNotContainedByExistingViews_shouldInitializeViewFromGrid(self):
+        self.logger = EnergyLogger(self.TEST_SCENE, keep3D=False, voxelSize=0.1)
+        self.logger.logDataPoint(0.8, self.CUBE_CENTER, self.INTERACTION_KEY)
+        customView = View2DSliceX(position=self.CUBE_CENTER.x, thickness=0.2)
+
+        self.assertTrue(self.logger.addView(customView))
+
+        self.assertAlmostEqual(0.8, customView.getSum())
+
+    def testGiven3DLogger_whenCreatedWithVoxelSize_shouldWarnAndNotCreateAnEnergyGrid(self):
+        with self.assertWarns(UserWarning):
+            logger = EnergyLogger(self.TEST_SCENE, voxelSize=0.1)
+
+        self.assertIsNone(logger.energyGrid)
+
     def testWhenShowViewWithViewIndex_shouldShowViewWithCorrespondingIndex(self):
         mockShow = MagicMock()
         self.logger.views[5].show = mockShow
@@ -233,6 +356,54 @@ class TestEnergyLogger(unittest.TestCase):
             self.assertTrue(np.array_equal(previousLogger.getRawDataPoints(), logger.getRawDataPoints()))
             self.assertEqual(previousLogger.info, logger.info)
 
+    def testGivenALoggerWithEnergyTallyPreviouslySaved_whenLoad_shouldLoadTheEnergyTally(self):
+        previousLogger = EnergyLogger(self.TEST_SCENE, tallyEnergy=True)
+        previousLogger.logDataPoint(0.5, Vector(0, 0, 0), self.INTERACTION_KEY)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test.log")
+            previousLogger.save(filePath)
+
+            logger = EnergyLogger(self.TEST_SCENE)
+            logger.load(filePath)
+
+            self.assertEqual(0.5, logger.energyTally.getDepositedEnergy("cube"))
+
+    def testGivenALoggerWithEnergyGridPreviouslySaved_whenLoad_shouldLoadTheEnergyGrid(self):
+        previousLogger = EnergyLogger(self.TEST_SCENE, keep3D=False, voxelSize=0.1)
+        previousLogger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
+
+        for fileName in ["test.log", "test.ptlog"]:
+            with tempfile.TemporaryDirectory() as tempDir:
+                filePath = os.path.join(tempDir, fileName)
+                previousLogger.save(filePath)
+
+                logger = EnergyLogger(self.TEST_SCENE, filePath, keep3D=False)
+
+                self.assertEqual(0.5, logger.energyGrid.getTotalEnergy("cube"))
+
+    def testGivenALoggerPreviouslySavedAsAnArchive_whenLoad_shouldLoadTheDataViewsAndEnergyTally(self):
+        previousLogger = EnergyLogger(self.TEST_SCENE, tallyEnergy=True)
+        previousLogger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
+        previousLogger.updateView(previousLogger.views[5])
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test.zip")
+            previousLogger.save(filePath, compress=True)
+
+            logger = EnergyLogger(self.TEST_SCENE, filepath=filePath)
+
+            self.assertTrue(
+                np.array_equal(
+                    previousLogger.getRawDataPoints(self.INTERACTION_KEY), logger.getRawDataPoints(self.INTERACTION_KEY)
+                )
+            )
+            self.assertEqual(len(previousLogger.views), len(logger.views))
+            self.assertEqual(0.5, logger.views[5].getSum())
+            self.assertNotIn(logger.views[5], logger._outdatedViews)
+            self.assertIn(logger.views[0], logger._outdatedViews)
+            self.assertEqual(0.5, logger.energyTally.getDepositedEnergy("cube"))
+
     def testGivenALoggerPreviouslySaved_whenCreatingNewLoggerFromFile_shouldLoadPreviousLoggerFromFile(self):
         previousLogger = EnergyLogger(self.TEST_SCENE)
         previousLogger.logDataPointArray(np.array([[0.5, 0, 0, 0]]), self.INTERACTION_KEY)
@@ -330,6 +501,110 @@ class TestEnergyLogger(unittest.TestCase):
             self.assertEqual(parse_line(lines[3]), [0.1, 0.7, 0.8, 0.8, 1.0, 2.0, -1.0])
             self.assertEqual(parse_line(lines[4]), [0.4, 0.0, 5.0, 0.0, 0.0, 3.0, -1.0])
 
+    def _logExportTestData(self):
+        scene = PhantomTissue(worldMaterial=ScatteringMaterial(0.1, 0.1, 0.99))
+        scene.add(Sphere(position=Vector(0, 5, 0), material=ScatteringMaterial(0.4, 0.2, 0.9)))
+        self.logger = EnergyLogger(scene)
+        self.logger.logDataPoint(0.1, Vector(0.7, 0.8, 0.8), InteractionKey("middleLayer"), ID=1)
+        self.logger.logDataPoint(-0.9, Vector(0.5, 1.0, 0.75), InteractionKey("frontLayer", "interface1"), ID=0)
+        self.logger.logDataPoint(0.2, Vector(0, 0, 0), InteractionKey(WORLD_SOLID_LABEL), ID=0)
+
+    def testWhenExportToNpy_shouldExportAStructuredArrayWithTheSameColumnsAsTheCSV(self):
+        self._logExportTestData()
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test_sim")
+            self.logger.export(filePath, fileFormat="npy")
+            data = np.load(filePath + ".npy")
+
+        self.assertEqual(("energy", "x", "y", "z", "photon_index", "solid_index", "surface_index"), data.dtype.names)
+        self.assertEqual([0.2, -0.9, 0.1], data["energy"].tolist())
+        self.assertEqual([0, 0, 1], data["photon_index"].tolist())
+        self.assertEqual([-1, 1, 2], data["solid_index"].tolist())
+        self.assertEqual([-1, 5, -1], data["surface_index"].tolist())
+
+    def testWhenExportToNpz_shouldExportTheDataPointsOfEachKey(self):
+        self._logExportTestData()
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test_sim")
+            self.logger.export(filePath, fileFormat="npz")
+            with np.load(filePath + ".npz") as archive:
+                data = dict(archive)
+
+        self.assertEqual(
+            [
+                "solid_-1",
+                "solid_-1_photon_index",
+                "solid_1_surface_5",
+                "solid_1_surface_5_photon_index",
+                "solid_2",
+                "solid_2_photon_index",
+            ],
+            sorted(data.keys()),
+        )
+        self.assertTrue(np.array_equal([[-0.9, 0.5, 1.0, 0.75]], data["solid_1_surface_5"]))
+        self.assertEqual([0], data["solid_1_surface_5_photon_index"].tolist())
+
+    def testGivenManyArraysPerKey_whenExportToNpyAndNpz_shouldStreamTheChunksWithoutConcatenatingThem(self):
+        self.logger.logDataPointArray(np.array([[0.5, 0, 0, 0]], dtype=np.float32), self.INTERACTION_KEY, [2])
+        self.logger.logDataPointArray(np.array([[0.25, 1, 1, 1], [0.125, 1, 1, 1]]), self.INTERACTION_KEY, [0, 1])
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test_sim")
+            with patch.object(ListArrayContainer, "getData", side_effect=AssertionError("Concatenated the data.")):
+                self.logger.export(filePath, fileFormat="npy")
+                self.logger.export(filePath, fileFormat="npz")
+            data = np.load(filePath + ".npy")
+            with np.load(filePath + ".npz") as archive:
+                keyData, keyPhotonIDs = archive["solid_0"], archive["solid_0_photon_index"]
+
+        self.assertEqual([0.5, 0.25, 0.125], data["energy"].tolist())
+        self.assertEqual([2, 0, 1], data["photon_index"].tolist())
+        self.assertEqual(np.float64, keyData.dtype)
+        self.assertEqual([0.5, 0.25, 0.125], keyData[:, 0].tolist())
+        self.assertEqual([2, 0, 1], keyPhotonIDs.tolist())
+
+    def _logDataWithoutPhotonIDs(self):
+        self.logger.logDataPointArray(np.array([[0.5, 0, 0, 0], [0.25, 1, 1, 1]]), self.INTERACTION_KEY)
+        self.logger.logDataPointArray(np.array([[-1, 0, 0, 1]]), InteractionKey("cube", "cube_top"), [3])
+
+    def testGivenDataWithoutPhotonIDs_whenExportToCSV_shouldWriteAPhotonIndexOfMinusOne(self):
+        self._logDataWithoutPhotonIDs()
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test_sim")
+            self.logger.export(filePath, fileFormat="csv")
+            with open(filePath + ".csv", "r") as f:
+                lines = f.readlines()[1:]
+
+        photonIndices = [int(line.strip().split(",")[4]) for line in lines]
+        self.assertEqual([-1, -1, 3], photonIndices)
+
+    def testGivenDataWithoutPhotonIDs_whenExportToNpy_shouldWriteTheMissingPhotonIDSentinel(self):
+        self._logDataWithoutPhotonIDs()
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test_sim")
+            self.logger.export(filePath, fileFormat="npy")
+            data = np.load(filePath + ".npy")
+
+        self.assertEqual([0.5, 0.25, -1], data["energy"].tolist())
+        self.assertEqual([MISSING_PHOTON_ID, MISSING_PHOTON_ID, 3], data["photon_index"].tolist())
+
+    def testGivenDataWithoutPhotonIDs_whenExportToNpz_shouldNotExportThePhotonIndicesOfTheKey(self):
+        self._logDataWithoutPhotonIDs()
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test_sim")
+            self.logger.export(filePath, fileFormat="npz")
+            with np.load(filePath + ".npz") as archive:
+                data = dict(archive)
+
+        self.assertEqual(["solid_0", "solid_0_surface_3", "solid_0_surface_3_photon_index"], sorted(data.keys()))
+        self.assertEqual([0.5, 0.25], data["solid_0"][:, 0].tolist())
+        self.assertEqual([3], data["solid_0_surface_3_photon_index"].tolist())
+
     def testWhenExport_shouldExportMetadataToFile(self):
         scene = PhantomTissue(worldMaterial=ScatteringMaterial(0.1, 0.1, 0.99))
         scene.add(Sphere(position=Vector(0, 5, 0), material=ScatteringMaterial(0.4, 0.2, 0.9)))
@@ -407,6 +682,29 @@ class TestEnergyLogger(unittest.TestCase):
         self.assertEqual(8, data.shape[0])
         self.assertTrue(np.array_equal(np.unique(data[:, 4]), [1, 2]))
 
+    def testGivenLargePhotonIDs_whenFilter_shouldKeepTheDataOfTheDetectedPhotonsInTheirOrder(self):
+        photonIDs = np.array([2**40 + 2, 2**40, 2**40 + 1, 2**40 + 2], dtype=np.uint64)
+        self.logger.logDataPointArray(np.array([[i, 0, 0, 0] for i in range(4)]), InteractionKey("cube"), photonIDs)
+        self.logger.logDataPointArray(np.array([[9, 0, 5, 0]]), InteractionKey("sphere"), photonIDs[:1])
+
+        self.logger.filter(detectedBy="sphere")
+
+        self.assertEqual([0, 3], self.logger.getRawDataPoints(InteractionKey("cube"))[:, 0].tolist())
+        self.assertEqual([2**40 + 2, 2**40 + 2], self.logger.getRawPhotonIDs(InteractionKey("cube")).tolist())
+
+    def testGivenFilteredLogger_whenLogMoreDataAndGetFilteredAgain_shouldIncludeTheNewData(self):
+        self.logger.logDataPoint(0.1, Vector(0.7, 0.8, 0.8), InteractionKey("cube"), ID=1)
+        self.logger.logDataPoint(0.4, Vector(0, 5, 0), InteractionKey("sphere"), ID=1)
+        self.assertEqual(2, len(self.logger.getFiltered(detectedBy="sphere").getRawDataPoints()))
+
+        self.logger.logDataPoint(0.1, Vector(0.7, 0.8, 0.8), InteractionKey("cube"), ID=2)
+        self.logger.logDataPoint(0.4, Vector(0, 5, 0), InteractionKey("sphere"), ID=2)
+        self.logger.logDataPoint(0.2, Vector(0.7, 0.8, 0.8), InteractionKey("cube"), ID=3)
+
+        data = self.logger.getFiltered(detectedBy="sphere").getRawDataPoints()
+        self.assertEqual([1, 2], np.unique(data[:, 4]).tolist())
+        self.assertEqual(4, len(data))
+
     def testWhenGetFiltered_shouldReturnANewFilteredLogger(self):
         # Photon 0
         self.logger.logDataPoint(0.1, Vector(0.7, 0.8, 0.8), InteractionKey("cube"), ID=0)
@@ -429,3 +727,169 @@ class TestEnergyLogger(unittest.TestCase):
         # Should not modify the original logger.
         originalData = self.logger.getRawDataPoints()
         self.assertEqual(7, originalData.shape[0])
+
+    def _makeShardLogger(self, keep3D: bool = True, value: float = 1) -> EnergyLogger:
+        logger = EnergyLogger(self.TEST_SCENE, keep3D=keep3D, views=[View2DProjectionX(solidLabel="cube")])
+        logger.info["photonCount"] = 2
+        logger.logDataPointArray(np.array([[value, 0.5, 0.5, 0.5]] * 2), self.INTERACTION_KEY, photonIDs=[0, 1])
+        return logger
+
+    def testWhenMerge_shouldAddTheDataAndPhotonCountWithOffsetPhotonIDs(self):
+        self.logger = self._makeShardLogger()
+
+        self.logger.merge(self._makeShardLogger(value=2), self._makeShardLogger(value=3))
+
+        self.assertEqual(6, self.logger.info["photonCount"])
+        self.assertEqual([1, 1, 2, 2, 3, 3], self.logger.getRawDataPoints(self.INTERACTION_KEY)[:, 0].tolist())
+        self.assertEqual([0, 1, 2, 3, 4, 5], self.logger.getRawPhotonIDs(self.INTERACTION_KEY).tolist())
+
+    def testGivenViewCompiledBeforeMerge_whenShowAgain_shouldIncludeTheMergedData(self):
+        self.logger = self._makeShardLogger()
+        view = self.logger.views[0]
+        self.logger.updateView(view)
+
+        self.logger.merge(self._makeShardLogger())
+        self.logger.updateView(view)
+
+        self.assertAlmostEqual(4, view.getSum())
+
+    def testGivenLoggersWithout3D_whenMerge_shouldSumTheDataOfTheirViews(self):
+        self.logger = self._makeShardLogger(keep3D=False)
+
+        self.logger.merge(self._makeShardLogger(keep3D=False, value=2))
+
+        self.assertAlmostEqual(6, self.logger.views[0].getSum())
+        self.assertEqual(4, self.logger.nDataPoints)
+        self.assertEqual(4, self.logger.info["photonCount"])
+
+    def testGivenLoggerWithout3D_whenMergeLoggerWith3D_shouldBinItsDataToTheViews(self):
+        self.logger = self._makeShardLogger(keep3D=False)
+
+        self.logger.merge(self._makeShardLogger(value=2))
+
+        self.assertAlmostEqual(6, self.logger.views[0].getSum())
+        self.assertEqual(4, self.logger.nDataPoints)
+
+    def testGivenLoggerWith3D_whenMergeLoggerWithout3D_shouldRaiseError(self):
+        self.logger = self._makeShardLogger()
+
+        with self.assertRaises(ValueError):
+            self.logger.merge(self._makeShardLogger(keep3D=False))
+
+    def testGivenLoggerOfAnotherScene_whenMerge_shouldRaiseError(self):
+        otherScene = ScatteringScene([Cube(2, material=ScatteringMaterial(), label="cube")])
+
+        with self.assertRaises(ValueError):
+            self.logger.merge(EnergyLogger(otherScene))
+
+    def testWhenMergeFiles_shouldSaveTheMergedLoggerToTheOutputPath(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            filepaths = [os.path.join(tempDir, name) for name in ["shard0.log", "shard1.ptlog"]]
+            for i, filepath in enumerate(filepaths):
+                self._makeShardLogger(value=i + 1).save(filepath)
+            outputPath = os.path.join(tempDir, "merged.ptlog")
+
+            EnergyLogger.mergeFiles(self.TEST_SCENE, filepaths, outputPath, storageDirectory=tempDir)
+
+            logger = EnergyLogger(self.TEST_SCENE, outputPath)
+            self.assertEqual(4, logger.info["photonCount"])
+            self.assertEqual([1, 1, 2, 2], logger.getRawDataPoints(self.INTERACTION_KEY)[:, 0].tolist())
+            self.assertEqual([0, 1, 2, 3], logger.getRawPhotonIDs(self.INTERACTION_KEY).tolist())
+
+    def testGivenFilesWithEnergyTallies_whenMergeFiles_shouldSumTheTallies(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            filepaths = [os.path.join(tempDir, name) for name in ["shard0.log", "shard1.log"]]
+            for filepath in filepaths:
+                logger = EnergyLogger(self.TEST_SCENE, tallyEnergy=True)
+                logger.logDataPoint(0.5, self.CUBE_CENTER, self.INTERACTION_KEY)
+                logger.save(filepath)
+
+            mergedLogger = EnergyLogger.mergeFiles(self.TEST_SCENE, filepaths, os.path.join(tempDir, "merged.log"))
+
+            self.assertEqual(1, mergedLogger.energyTally.getDepositedEnergy("cube"))
+
+    def _makeBudgetLogger(self, memoryPolicy: MemoryPolicy, **kwargs) -> EnergyLogger:
+        return EnergyLogger(
+            self.TEST_SCENE,
+            views=[View2DProjectionX(solidLabel="cube")],
+            memoryBudgetMB=2000 / 1024**2,
+            memoryPolicy=memoryPolicy,
+            **kwargs,
+        )
+
+    def _logBudgetData(self, logger: EnergyLogger, nPoints: int = 100):
+        dataPoints = np.column_stack((np.full(nPoints, 0.5), np.random.uniform(0, 1, (nPoints, 3))))
+        logger.logDataPointArray(dataPoints, self.INTERACTION_KEY, photonIDs=np.arange(nPoints))
+
+    def testGivenMemoryBudgetNotReached_shouldNotApplyThePolicy(self):
+        self.logger = self._makeBudgetLogger(MemoryPolicy.SPILL)
+
+        self._logBudgetData(self.logger, nPoints=10)
+
+        self.assertIsNone(self.logger.appliedMemoryPolicy)
+        self.assertEqual(400, self.logger.memoryUsage)
+
+    def testGivenSpillPolicy_whenMemoryBudgetReached_shouldWarnAndMoveTheDataToFiles(self):
+        self.logger = self._makeBudgetLogger(MemoryPolicy.SPILL)
+
+        with self.assertWarns(UserWarning):
+            self._logBudgetData(self.logger)
+        self._logBudgetData(self.logger, nPoints=10)
+
+        spillDirectory = self.logger._spillDirectory
+        self.assertEqual(MemoryPolicy.SPILL, self.logger.appliedMemoryPolicy)
+        self.assertEqual(0, self.logger.memoryUsage)
+        self.assertEqual(2, len(os.listdir(spillDirectory)))
+        self.assertEqual(110, self.logger.nDataPoints)
+        self.assertAlmostEqual(55, np.sum(self.logger.getRawDataPoints(self.INTERACTION_KEY)[:, 0]))
+        photonIDs = self.logger.getRawPhotonIDs(self.INTERACTION_KEY).tolist()
+        self.assertEqual(list(range(100)) + list(range(10)), photonIDs)
+
+    def testGivenSpilledData_whenDeleteLogger_shouldRemoveTheTemporaryDirectory(self):
+        logger = self._makeBudgetLogger(MemoryPolicy.SPILL)
+        with self.assertWarns(UserWarning):
+            self._logBudgetData(logger)
+        spillDirectory = logger._spillDirectory
+        self.assertTrue(os.path.isdir(spillDirectory))
+
+        del logger
+
+        self.assertFalse(os.path.exists(spillDirectory))
+
+    def testGivenCompilePolicy_whenMemoryBudgetReached_shouldCompileTheDataToTheViewsAndGridAndDiscardIt(self):
+        self.logger = self._makeBudgetLogger(MemoryPolicy.COMPILE, voxelSize=0.1)
+
+        with self.assertWarns(UserWarning):
+            self._logBudgetData(self.logger)
+        self._logBudgetData(self.logger, nPoints=10)
+
+        self.assertEqual(MemoryPolicy.COMPILE, self.logger.appliedMemoryPolicy)
+        self.assertFalse(self.logger.has3D)
+        self.assertEqual(110, self.logger.nDataPoints)
+        self.assertAlmostEqual(55, self.logger.views[0].getSum())
+        self.assertAlmostEqual(55, self.logger.energyGrid.getTotalEnergy("cube"))
+
+    def testGivenDownsamplePolicy_whenMemoryBudgetReached_shouldKeepFewerDataPointsWithTheSameEnergy(self):
+        with patch("numpy.random.default_rng", return_value=np.random.default_rng(0)):
+            self.logger = self._makeBudgetLogger(MemoryPolicy.DOWNSAMPLE)
+        surfaceKey = InteractionKey("cube", "cube_top")
+        surfaceData = np.array([[-1, 0.5, 0.5, 1]] * 39 + [[0.25, 0.5, 0.5, 1]])
+        self.logger.logDataPointArray(surfaceData, surfaceKey, photonIDs=np.arange(40))
+        view = self.logger.views[0]
+        self.logger.updateView(view)
+
+        with self.assertWarns(UserWarning):
+            self._logBudgetData(self.logger)
+
+        self.assertEqual(MemoryPolicy.DOWNSAMPLE, self.logger.appliedMemoryPolicy)
+        self.assertLessEqual(self.logger.memoryUsage, 0.5 * 2000)
+        dataPoints = self.logger.getRawDataPoints(self.INTERACTION_KEY)
+        self.assertLess(len(dataPoints), 100)
+        self.assertEqual(len(dataPoints), len(self.logger.getRawPhotonIDs(self.INTERACTION_KEY)))
+        self.assertAlmostEqual(50, np.sum(dataPoints[:, 0]))
+        surfacePoints = self.logger.getRawDataPoints(surfaceKey)
+        self.assertLess(len(surfacePoints), 40)
+        self.assertAlmostEqual(-39, np.sum(surfacePoints[surfacePoints[:, 0] < 0, 0]))
+        self.assertAlmostEqual(0.25, np.sum(surfacePoints[surfacePoints[:, 0] > 0, 0]))
+        self.logger.updateView(view)
+        self.assertAlmostEqual(50, view.getSum())
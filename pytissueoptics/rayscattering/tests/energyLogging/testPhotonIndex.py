@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.energyLogging.photonIndex import PhotonIndex
+from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+
+
+class TestPhotonIndex(unittest.TestCase):
+    def setUp(self):
+        self.photonIDs = ListArrayContainer()
+        self.photonIDs.append(np.array([[5], [2], [9], [2], [5]], dtype=np.uint64))
+        self.photonIndex = PhotonIndex(self.photonIDs)
+
+    def testShouldHaveTheSortedUniquePhotonIDs(self):
+        self.assertEqual([2, 5, 9], self.photonIndex.uniqueIDs.tolist())
+
+    def testWhenGetRows_shouldReturnTheSortedRowsOfTheGivenPhotons(self):
+        rows = self.photonIndex.getRows(np.array([2, 9], dtype=np.uint64))
+
+        self.assertEqual([1, 2, 3], rows.tolist())
+
+    def testGivenMorePhotonsThanRows_whenGetRows_shouldReturnTheSortedRowsOfTheGivenPhotons(self):
+        rows = self.photonIndex.getRows(np.arange(3, 100, dtype=np.uint64))
+
+        self.assertEqual([0, 2, 4], rows.tolist())
+
+    def testGivenNoMatchingPhotons_whenGetRows_shouldReturnNoRows(self):
+        self.assertEqual(0, len(self.photonIndex.getRows(np.array([3, 2**40], dtype=np.uint64))))
+
+    def testGivenNewRows_whenGetRows_shouldIncludeTheNewRows(self):
+        self.photonIndex.getRows(np.array([5], dtype=np.uint64))
+
+        self.photonIDs.append(np.array([[2**40], [5]], dtype=np.uint64))
+
+        self.assertEqual([0, 4, 6], self.photonIndex.getRows(np.array([5], dtype=np.uint64)).tolist())
+        self.assertEqual([2, 5, 9, 2**40], self.photonIndex.uniqueIDs.tolist())
+
+    def testShouldOnlyFollowItsContainer(self):
+        self.assertTrue(self.photonIndex.follows(self.photonIDs))
+        self.assertFalse(self.photonIndex.follows(ListArrayContainer()))
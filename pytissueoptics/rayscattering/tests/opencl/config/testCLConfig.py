@@ -1,3 +1,4 @@
+import json
 import os
 import tempfile
 import unittest
@@ -5,6 +6,8 @@ from unittest.mock import patch
 
 from pytissueoptics.rayscattering.opencl import OPENCL_OK
 from pytissueoptics.rayscattering.opencl.config import CLConfig as clc
+from pytissueoptics.rayscattering.opencl.config.deviceProfiles import DeviceProfile, DeviceProfiles
+from pytissueoptics.rayscattering.opencl.utils.deviceAutotuner import DeviceAutotuner
 
 
 def tempConfigPath(func):
@@ -18,8 +21,21 @@ def tempConfigPath(func):
     return wrapper
 
 
+def tempProfilesPath(func):
+    def wrapper(*args, **kwargs):
+        previousPath = DeviceProfiles.TABLE_PATH
+        with tempfile.TemporaryDirectory() as tempDir:
+            DeviceProfiles.TABLE_PATH = os.path.join(tempDir, "device_profiles.json")
+            func(*args, **kwargs)
+        DeviceProfiles.TABLE_PATH = previousPath
+
+    return wrapper
+
+
 @unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
 class TestCLConfig(unittest.TestCase):
+    PROFILE = DeviceProfile(N_WORK_UNITS=1024, BATCH_LOAD_FACTOR=0.5, MAX_MEMORY_MB=512, timePerPhoton=1e-5)
+
     @tempConfigPath
     def testGivenNoConfigFile_shouldWarnAndCreateANewOne(self):
         with self.assertWarns(UserWarning):
@@ -38,26 +54,19 @@ class TestCLConfig(unittest.TestCase):
             self.assertEqual(None, config.DEVICE_INDEX)
             self.assertEqual(None, config.N_WORK_UNITS)
             self.assertEqual(None, config.MAX_MEMORY_MB)
-        self.assertEqual(1000, config.IPP_TEST_N_PHOTONS)
         self.assertEqual(0.20, config.BATCH_LOAD_FACTOR)
 
     @tempConfigPath
     def testGivenCompleteConfigFile_shouldBeValid(self):
         with open(clc.OPENCL_CONFIG_PATH, "w") as f:
-            f.write(
-                '{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 1000, '
-                '"IPP_TEST_N_PHOTONS": 1000, "BATCH_LOAD_FACTOR": 0.2}'
-            )
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 1000, "BATCH_LOAD_FACTOR": 0.2}')
         config = clc.CLConfig()
         config.validate()
 
     @tempConfigPath
     def testGivenMaxMemoryNotSet_whenValidate_shouldWarnAndSetMaxMemory(self):
         with open(clc.OPENCL_CONFIG_PATH, "w") as f:
-            f.write(
-                '{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": null, '
-                '"IPP_TEST_N_PHOTONS": 1000, "BATCH_LOAD_FACTOR": 0.2}'
-            )
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": null, "BATCH_LOAD_FACTOR": 0.2}')
         with patch("os.getenv", return_value=None):
             config = clc.CLConfig()
         with self.assertWarns(UserWarning):
@@ -68,7 +77,7 @@ class TestCLConfig(unittest.TestCase):
     @tempConfigPath
     def testGivenFileIsMissingParameter_whenValidate_shouldResetDefaultValueAndRaise(self):
         with open(clc.OPENCL_CONFIG_PATH, "w") as f:
-            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 1000, "IPP_TEST_N_PHOTONS": 1000}')
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 1000}')
         config = clc.CLConfig()
         with self.assertRaises(ValueError):
             config.validate()
@@ -78,10 +87,7 @@ class TestCLConfig(unittest.TestCase):
     @tempConfigPath
     def testGivenFileWithAParameterBelowOrEqualToZero_whenValidate_shouldResetDefaultValueAndRaise(self):
         with open(clc.OPENCL_CONFIG_PATH, "w") as f:
-            f.write(
-                '{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 0, '
-                '"IPP_TEST_N_PHOTONS": 1000, "BATCH_LOAD_FACTOR": 0.2}'
-            )
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 0, "BATCH_LOAD_FACTOR": 0.2}')
 
         with patch("os.getenv", return_value=None):
             config = clc.CLConfig()
@@ -89,3 +95,85 @@ class TestCLConfig(unittest.TestCase):
                 config.validate()
             config = clc.CLConfig()
             self.assertIsNone(config.MAX_MEMORY_MB)
+
+    @tempConfigPath
+    def testGivenNoDeviceIndices_shouldOnlyUseDeviceAtDeviceIndex(self):
+        with open(clc.OPENCL_CONFIG_PATH, "w") as f:
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 1000, "BATCH_LOAD_FACTOR": 0.2}')
+        config = clc.CLConfig()
+        self.assertEqual([0], config.DEVICE_INDICES)
+        self.assertEqual([config.device], config.devices)
+
+    @tempConfigPath
+    def testGivenDeviceIndices_shouldUseAllSelectedDevices(self):
+        with open(clc.OPENCL_CONFIG_PATH, "w") as f:
+            f.write(
+                '{"DEVICE_INDEX": 0, "DEVICE_INDICES": [0, 0], "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 1000, '
+                '"BATCH_LOAD_FACTOR": 0.2}'
+            )
+        config = clc.CLConfig()
+        config.validate()
+        self.assertEqual([config.device, config.device], config.devices)
+
+    @tempConfigPath
+    def testGivenInvalidDeviceIndices_whenValidate_shouldWarnAndResetToDeviceIndex(self):
+        with open(clc.OPENCL_CONFIG_PATH, "w") as f:
+            f.write(
+                '{"DEVICE_INDEX": 0, "DEVICE_INDICES": [0, 99], "N_WORK_UNITS": 100, "MAX_MEMORY_MB": 1000, '
+                '"BATCH_LOAD_FACTOR": 0.2}'
+            )
+        config = clc.CLConfig()
+        with self.assertWarns(UserWarning):
+            config.validate()
+        self.assertEqual([0], config.DEVICE_INDICES)
+
+    @tempConfigPath
+    @tempProfilesPath
+    def testGivenSavedDeviceProfile_whenValidate_shouldUseProfileWithoutPrompt(self):
+        with open(clc.OPENCL_CONFIG_PATH, "w") as f:
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": null, "MAX_MEMORY_MB": null, "BATCH_LOAD_FACTOR": 0.2}')
+        with patch("os.getenv", return_value=None):
+            config = clc.CLConfig()
+        DeviceProfiles().setProfile(config.device, self.PROFILE)
+
+        with patch("builtins.input") as mockInput:
+            with self.assertWarns(UserWarning):
+                config.validate()
+        mockInput.assert_not_called()
+        self.assertEqual(self.PROFILE.N_WORK_UNITS, config.N_WORK_UNITS)
+        self.assertEqual(self.PROFILE.BATCH_LOAD_FACTOR, config.BATCH_LOAD_FACTOR)
+        self.assertEqual(self.PROFILE.MAX_MEMORY_MB, config.MAX_MEMORY_MB)
+
+    @tempConfigPath
+    @tempProfilesPath
+    def testGivenHeadlessAndNoDeviceProfile_whenValidate_shouldAutotuneAndSaveProfile(self):
+        with open(clc.OPENCL_CONFIG_PATH, "w") as f:
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": null, "MAX_MEMORY_MB": 1000, "BATCH_LOAD_FACTOR": 0.2}')
+        with patch("os.getenv", return_value=None):
+            config = clc.CLConfig()
+
+        with patch.dict(os.environ, {"PTO_AUTOTUNE": "1"}):
+            with patch("builtins.input") as mockInput:
+                with patch.object(DeviceAutotuner, "run", return_value=self.PROFILE):
+                    with self.assertWarns(UserWarning):
+                        config.validate()
+        mockInput.assert_not_called()
+        self.assertEqual(self.PROFILE.N_WORK_UNITS, config.N_WORK_UNITS)
+        self.assertEqual(1000, config.MAX_MEMORY_MB)
+        self.assertEqual(self.PROFILE, DeviceProfiles().getProfile(config.device))
+
+    @tempConfigPath
+    @tempProfilesPath
+    def testGivenHeadlessAndMaxMemoryNotSet_whenValidate_shouldUseTheTunedMaxMemory(self):
+        with open(clc.OPENCL_CONFIG_PATH, "w") as f:
+            f.write('{"DEVICE_INDEX": 0, "N_WORK_UNITS": null, "MAX_MEMORY_MB": null, "BATCH_LOAD_FACTOR": 0.2}')
+        with patch("os.getenv", return_value=None):
+            config = clc.CLConfig()
+
+        with patch.dict(os.environ, {"PTO_AUTOTUNE": "1"}):
+            with patch.object(DeviceAutotuner, "run", return_value=self.PROFILE):
+                with self.assertWarns(UserWarning):
+                    config.validate()
+        self.assertEqual(self.PROFILE.MAX_MEMORY_MB, config.MAX_MEMORY_MB)
+        with open(clc.OPENCL_CONFIG_PATH) as f:
+            self.assertEqual(self.PROFILE.MAX_MEMORY_MB, json.load(f)["MAX_MEMORY_MB"])
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+
+from mockito import mock
+
+from pytissueoptics.rayscattering.opencl.config.deviceProfiles import DeviceProfile, DeviceProfiles
+
+
+def tempTablePath(func):
+    def wrapper(*args, **kwargs):
+        previousPath = DeviceProfiles.TABLE_PATH
+        with tempfile.TemporaryDirectory() as tempDir:
+            DeviceProfiles.TABLE_PATH = os.path.join(tempDir, "device_profiles.json")
+            func(*args, **kwargs)
+        DeviceProfiles.TABLE_PATH = previousPath
+
+    return wrapper
+
+
+class TestDeviceProfiles(unittest.TestCase):
+    PROFILE = DeviceProfile(N_WORK_UNITS=1024, BATCH_LOAD_FACTOR=0.2, MAX_MEMORY_MB=512, timePerPhoton=1e-5)
+
+    def setUp(self):
+        self.device = self._createDevice("GPU", "1.0")
+
+    @tempTablePath
+    def testGivenNoProfilesFile_shouldCreateAnEmptyOne(self):
+        profiles = DeviceProfiles()
+
+        self.assertTrue(os.path.exists(DeviceProfiles.TABLE_PATH))
+        self.assertFalse(self.device in profiles)
+        self.assertIsNone(profiles.getProfile(self.device))
+
+    @tempTablePath
+    def testWhenSetProfile_shouldSaveProfileToFile(self):
+        DeviceProfiles().setProfile(self.device, self.PROFILE)
+
+        with open(DeviceProfiles.TABLE_PATH, "r") as f:
+            table = json.load(f)
+        self.assertEqual({"GPU [1.0]": self.PROFILE._asdict()}, table)
+        self.assertEqual(self.PROFILE, DeviceProfiles().getProfile(self.device))
+
+    @tempTablePath
+    def testGivenProfileOfOtherDriverVersion_shouldNotHaveProfile(self):
+        DeviceProfiles().setProfile(self.device, self.PROFILE)
+
+        self.assertFalse(self._createDevice("GPU", "2.0") in DeviceProfiles())
+
+    @staticmethod
+    def _createDevice(name: str, driverVersion: str):
+        device = mock()
+        device.name = name
+        device.driver_version = driverVersion
+        return device
@@ -185,15 +185,15 @@ class TestCLFresnel(unittest.TestCase):
         return vectorOperatorsSourceCode + randomSourceCode
 
     def _mockIsReflected(self, isReflected: bool):
-        isReflectedFunction = """bool _getIsReflected(float nIn, float nOut, float thetaIn, __global uint *seeds, uint gid) {
+        isReflectedFunction = """bool _getIsReflected(float nIn, float nOut, float thetaIn, uint *seed) {
     float R = _getReflectionCoefficient(nIn, nOut, thetaIn);
-    float randomFloat = getRandomFloatValue(seeds, gid);
+    float randomFloat = getRandomFloat(seed);
     if (R >= randomFloat) {
         return true;
     }
     return false;
 }"""
-        mockFunction = """bool _getIsReflected(float nIn, float nOut, float thetaIn, __global uint *seeds, uint gid) {
+        mockFunction = """bool _getIsReflected(float nIn, float nOut, float thetaIn, uint *seed) {
         return %s;
         }""" % str(isReflected).lower()
         self.program.mock(isReflectedFunction, mockFunction)
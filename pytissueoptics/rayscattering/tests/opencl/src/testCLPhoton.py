@@ -8,6 +8,7 @@ import numpy as np
 from pytissueoptics import ScatteringMaterial, ScatteringScene, Vector
 from pytissueoptics.rayscattering.opencl import OPENCL_AVAILABLE, OPENCL_OK
 from pytissueoptics.rayscattering.opencl.buffers import (
+    BufferOf,
     DataPointCL,
     MaterialCL,
     PhotonCL,
@@ -530,7 +531,9 @@ class TestCLPhoton(unittest.TestCase):
             N=1,
             arguments=[
                 np.int32(1),
-                np.int32(maxInteractions),
+                np.uint32(maxInteractions),
+                np.uint32(maxInteractions),
+                BufferOf(np.zeros(1, dtype=np.uint32)),
                 np.float32(WEIGHT_THRESHOLD),
                 np.int32(1),
                 photonBuffer,
@@ -543,6 +546,8 @@ class TestCLPhoton(unittest.TestCase):
                 s.solidCandidates,
                 SeedCL(1),
                 logger,
+                BufferOf(np.zeros(1, dtype=np.float32)),
+                BufferOf(np.zeros(2, dtype=np.uint32)),
             ],
         )
         return self._getPhotonResult(photonBuffer)
@@ -603,22 +608,22 @@ class TestCLPhoton(unittest.TestCase):
         self.fail("Vectors are equal")
 
     def _mockRandomValue(self, value):
-        getRandomFloatValueFunction = """float getRandomFloatValue(__global unsigned int *seeds, unsigned int id){
+        getRandomFloatFunction = """float getRandomFloat(uint *seed){
      float result = 0.0f;
      while(result == 0.0f){
-         uint rnd_seed = wangHash(seeds[id]);
-         seeds[id] = rnd_seed;
+         uint rnd_seed = wangHash(*seed);
+         *seed = rnd_seed;
          result = (float)rnd_seed / (float)UINT_MAX;
      }
      return result;
 }"""
         mockFunction = (
-            """float getRandomFloatValue(__global unsigned int *seeds, unsigned int id){
+            """float getRandomFloat(uint *seed){
         return %f;
     }"""
             % value
         )
-        self.program.mock(getRandomFloatValueFunction, mockFunction)
+        self.program.mock(getRandomFloatFunction, mockFunction)
 
     def _mockFresnelIntersection(
         self,
@@ -628,8 +633,8 @@ class TestCLPhoton(unittest.TestCase):
         nextMaterialID=0,
         nextSolidID=0,
     ):
-        fresnelCall = """FresnelIntersection fresnelIntersection = computeFresnelIntersection(photons[photonID].direction, intersection,
-                                                                         materials, surfaces, seeds, gid);"""
+        fresnelCall = """FresnelIntersection fresnelIntersection = computeFresnelIntersection(photon->direction, intersection,
+                                                                         materials, surfaces, seed);"""
         x, y, z = incidencePlane.array
         mockCall = """FresnelIntersection fresnelIntersection;
         fresnelIntersection.isReflected = %s;
@@ -642,7 +647,7 @@ class TestCLPhoton(unittest.TestCase):
 
     def _mockFindIntersection(self, exists=True, distance=8.0, normal=Vector(0, 0, 1), surfaceID=0, distanceLeft=2):
         expectedPosition = self.INITIAL_POSITION + self.INITIAL_DIRECTION * distance
-        intersectionCall = """Intersection intersection = findIntersection(stepRay, scene, gid, photons[photonID].solidID, photons[photonID].lastIntersectedDetectorID);"""
+        intersectionCall = """Intersection intersection = findIntersection(stepRay, scene, gid, photon->solidID, photon->lastIntersectedDetectorID);"""
         px, py, pz = expectedPosition.array
         nx, ny, nz = normal.array
         mockCall = """Intersection intersection;
@@ -651,6 +656,9 @@ class TestCLPhoton(unittest.TestCase):
         intersection.position = (float3)(%.7f, %.7f, %.7f);
         intersection.normal = (float3)(%.f, %f, %f);
         intersection.surfaceID = %d;
+        intersection.polygonID = 0;
         intersection.distanceLeft = %f;
+        intersection.isSmooth = false;
+        intersection.rawNormal = intersection.normal;
         """ % (str(exists).lower(), distance, px, py, pz, nx, ny, nz, surfaceID, distanceLeft)
         self.program.mock(intersectionCall, mockCall)
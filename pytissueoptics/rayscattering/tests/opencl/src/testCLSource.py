@@ -0,0 +1,106 @@
+import os
+import unittest
+
+import numpy as np
+
+from pytissueoptics import ScatteringMaterial, Vector
+from pytissueoptics.rayscattering.opencl import OPENCL_OK
+from pytissueoptics.rayscattering.opencl.buffers import (
+    DataPointCL,
+    MaterialCL,
+    PhotonCL,
+    SeedCL,
+    SolidCandidateCL,
+    SolidCL,
+    SourceCL,
+    SourceCLInfo,
+    SurfaceCL,
+    TriangleCL,
+    VertexCL,
+)
+from pytissueoptics.rayscattering.opencl.buffers.sourceCL import (
+    DIRECTIONAL_SOURCE,
+    DIVERGENT_SOURCE,
+    ISOTROPIC_SOURCE,
+    PENCIL_SOURCE,
+)
+from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram
+from pytissueoptics.rayscattering.opencl.config.CLConfig import OPENCL_SOURCE_DIR
+
+N = 2000
+POSITION = Vector(1, 2, 3)
+DIRECTION = Vector(0, 0, 1)
+X_AXIS = Vector(1, 0, 0)
+Y_AXIS = Vector(0, 1, 0)
+
+
+@unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
+class TestCLSource(unittest.TestCase):
+    def setUp(self):
+        sourcePath = os.path.join(OPENCL_SOURCE_DIR, "propagation.c")
+        self.program = CLProgram(sourcePath)
+        self._addMissingDeclarations()
+
+    def testGivenPencilSource_shouldGeneratePhotonsAtSourcePositionAndDirection(self):
+        positions, directions, IDs = self._generatePhotons(
+            SourceCLInfo(PENCIL_SOURCE, POSITION, DIRECTION, X_AXIS, Y_AXIS, 0, 0)
+        )
+
+        self.assertTrue(np.allclose(positions, POSITION.array))
+        self.assertTrue(np.allclose(directions, DIRECTION.array))
+        self.assertTrue(np.array_equal(np.arange(N), IDs))
+
+    def testGivenDirectionalSource_shouldGeneratePhotonsUniformlyInADiscOrthogonalToDirection(self):
+        diameter = 2
+        positions, directions, _ = self._generatePhotons(
+            SourceCLInfo(DIRECTIONAL_SOURCE, POSITION, DIRECTION, X_AXIS, Y_AXIS, diameter, 0)
+        )
+
+        radii = np.linalg.norm(positions[:, :2] - POSITION.array[:2], axis=1)
+        self.assertTrue(np.all(radii <= diameter / 2 + 1e-6))
+        self.assertAlmostEqual(np.mean(radii), diameter / 3, places=1)
+        self.assertTrue(np.allclose(positions[:, 2], POSITION.z))
+        self.assertTrue(np.allclose(directions, DIRECTION.array))
+
+    def testGivenDivergentSource_shouldGenerateDirectionsWithinDivergenceAngle(self):
+        divergence = 0.4
+        _, directions, _ = self._generatePhotons(
+            SourceCLInfo(DIVERGENT_SOURCE, POSITION, DIRECTION, X_AXIS, Y_AXIS, 1, divergence)
+        )
+
+        self.assertTrue(np.allclose(np.linalg.norm(directions, axis=1), 1, atol=1e-6))
+        angles = np.arccos(np.clip(directions[:, 2], -1, 1))
+        self.assertTrue(np.all(angles <= divergence / 2 + 1e-4))
+        self.assertTrue(np.max(angles) > 0.9 * divergence / 2)
+
+    def testGivenIsotropicSource_shouldGenerateUniformDirectionsOnTheSphere(self):
+        positions, directions, _ = self._generatePhotons(
+            SourceCLInfo(ISOTROPIC_SOURCE, POSITION, DIRECTION, X_AXIS, Y_AXIS, 0, 0)
+        )
+
+        self.assertTrue(np.allclose(positions, POSITION.array))
+        self.assertTrue(np.allclose(np.linalg.norm(directions, axis=1), 1, atol=1e-6))
+        self.assertTrue(np.allclose(np.mean(directions, axis=0), 0, atol=0.1))
+
+    def _generatePhotons(self, sourceInfo: SourceCLInfo):
+        photons = PhotonCL(np.zeros((N, 3)), np.zeros((N, 3)), materialID=0, solidID=0, weight=0)
+        self.program.launchKernel("generatePhotonsKernel", N=N, arguments=[SourceCL(sourceInfo), photons, SeedCL(N)])
+        self.program.getData(photons, returnData=False)
+        buffer = photons.hostBuffer
+        positions = np.array([list(p)[:3] for p in buffer["position"]])
+        directions = np.array([list(d)[:3] for d in buffer["direction"]])
+        self.assertTrue(np.all(buffer["weight"] == 1))
+        return positions, directions, buffer["ID"]
+
+    def _addMissingDeclarations(self):
+        for clObject in [
+            MaterialCL([ScatteringMaterial()]),
+            SurfaceCL([]),
+            VertexCL([]),
+            DataPointCL(1),
+            SolidCandidateCL(1, 1),
+            TriangleCL([]),
+            SolidCL([]),
+        ]:
+            clObject.make(self.program.device)
+            self.program.include(clObject.declaration)
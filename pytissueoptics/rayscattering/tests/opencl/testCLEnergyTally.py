@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+from mockito import mock
+
+from pytissueoptics import Cube, ScatteringMaterial, ScatteringScene, Sphere
+from pytissueoptics.rayscattering.opencl import OPENCL_OK
+from pytissueoptics.rayscattering.opencl.CLScene import WORLD_SOLID_ID, WORLD_SOLID_LABEL, CLScene
+from pytissueoptics.rayscattering.opencl.utils import CLEnergyTally
+
+
+@unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
+class TestCLEnergyTally(unittest.TestCase):
+    def setUp(self):
+        self.cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        self.sphere = Sphere(1, material=ScatteringMaterial(5, 0.5, 0.8, 1.4), label="sphere")
+        self.sceneCL = CLScene(ScatteringScene([self.cube, self.sphere]), nWorkUnits=10)
+        self.cubeID = self.sceneCL.getSolidID(self.cube)
+        self.sphereID = self.sceneCL.getSolidID(self.sphere)
+        self.nSurfaces = len(self.sceneCL.getSurfaceSolidIDs())
+        self.surfaceOffset = self.sceneCL.nSolidIDs + 1 - WORLD_SOLID_ID
+        self.program = mock()
+
+    def testShouldDefineTheSizeOfTheBinsForEachSolidAndBothSidesOfEachSurface(self):
+        energyTally = CLEnergyTally(self.sceneCL, mock({"local_mem_size": 2**16}))
+
+        self.assertEqual(self.surfaceOffset + 2 * self.nSurfaces, len(energyTally.bins.hostBuffer))
+        self.assertEqual(str(len(energyTally.bins.hostBuffer)), energyTally.defines["TALLY_SIZE"])
+        self.assertEqual(str(self.surfaceOffset), energyTally.defines["TALLY_SURFACE_OFFSET"])
+        self.assertNotIn("TALLY_GLOBAL_ATOMICS", energyTally.defines)
+
+    def testGivenBinsLargerThanLocalMemory_shouldUseGlobalAtomics(self):
+        energyTally = CLEnergyTally(self.sceneCL, mock({"local_mem_size": 16}))
+
+        self.assertIn("TALLY_GLOBAL_ATOMICS", energyTally.defines)
+
+    def testWhenCollect_shouldAccumulateTheBinsOfEachBatchAndResetThem(self):
+        energyTally = CLEnergyTally(self.sceneCL, mock({"local_mem_size": 2**16}))
+
+        for _ in range(2):
+            energyTally.bins.hostBuffer[self.cubeID - WORLD_SOLID_ID] = 0.5
+            energyTally.collect(self.program)
+
+        self.assertEqual(0, np.sum(energyTally.bins.hostBuffer))
+        self.assertEqual(1, energyTally.toEnergyTally().getDepositedEnergy("cube"))
+
+    def testWhenToEnergyTally_shouldTallyTheEnergyOfEachSolid(self):
+        energyTally = CLEnergyTally(self.sceneCL, mock({"local_mem_size": 2**16}))
+        energyTally.bins.hostBuffer[self.cubeID - WORLD_SOLID_ID] = 2
+        energyTally.bins.hostBuffer[self.sphereID - WORLD_SOLID_ID] = 3
+        energyTally.bins.hostBuffer[0] = 4
+        energyTally.collect(self.program)
+
+        tally = energyTally.toEnergyTally()
+
+        self.assertEqual(2, tally.getDepositedEnergy("cube"))
+        self.assertEqual(3, tally.getDepositedEnergy("sphere"))
+        self.assertEqual(4, tally.getDepositedEnergy(WORLD_SOLID_LABEL))
+
+    def testWhenToEnergyTally_shouldTallyTheEnergyCrossingEachSurfaceOnBothSides(self):
+        energyTally = CLEnergyTally(self.sceneCL, mock({"local_mem_size": 2**16}))
+        surfaceID = self.sceneCL.getSurfaceIDs(self.sphereID)[1]
+        surfaceLabel = self.sceneCL.getSurfaceLabel(self.sphereID, surfaceID)
+        energyTally.bins.hostBuffer[self.surfaceOffset + 2 * surfaceID] = 0.25
+        energyTally.bins.hostBuffer[self.surfaceOffset + 2 * surfaceID + 1] = 0.75
+        energyTally.collect(self.program)
+
+        tally = energyTally.toEnergyTally()
+
+        self.assertEqual(0.25, tally.getSurfaceEnergy("sphere", surfaceLabel, leaving=True))
+        self.assertEqual(0.75, tally.getSurfaceEnergy("sphere", surfaceLabel, leaving=False))
+        self.assertEqual(0.75, tally.getSurfaceEnergy("cube", surfaceLabel, leaving=True))
+        self.assertEqual(0.25, tally.getSurfaceEnergy("cube", surfaceLabel, leaving=False))
@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+from mockito import mock
+
+from pytissueoptics.rayscattering.opencl import OPENCL_OK
+from pytissueoptics.rayscattering.opencl.utils import KERNEL_COUNTER_NAMES, CLKernelCounters
+
+
+@unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
+class TestCLKernelCounters(unittest.TestCase):
+    def setUp(self):
+        self.kernelCounters = CLKernelCounters()
+        self.program = mock()
+
+    def testShouldDefineKernelCounters(self):
+        self.assertIn("KERNEL_COUNTERS", self.kernelCounters.defines)
+
+    def testShouldHaveALowAndHighWordForEachCounter(self):
+        self.assertEqual(2 * len(KERNEL_COUNTER_NAMES), len(self.kernelCounters.buffer.hostBuffer))
+
+    def testWhenCollect_shouldReturnTheCountOfEachCounterFromItsLowAndHighWords(self):
+        words = self.kernelCounters.buffer.hostBuffer.reshape(-1, 2)
+        words[0] = [5, 0]
+        words[1] = [7, 2]
+
+        counters = self.kernelCounters.collect(self.program)
+
+        self.assertEqual(5, counters["steps"])
+        self.assertEqual(7 + 2 * 2**32, counters["triangleTests"])
+        self.assertEqual(0, counters["vertexNudges"])
+        self.assertEqual(KERNEL_COUNTER_NAMES, list(counters.keys()))
+
+    def testWhenCollect_shouldResetTheCounters(self):
+        self.kernelCounters.buffer.hostBuffer[:] = 3
+
+        self.kernelCounters.collect(self.program)
+
+        self.assertTrue(np.all(self.kernelCounters.buffer.hostBuffer == 0))
@@ -33,13 +33,13 @@ class TestCLKeyLog(unittest.TestCase):
 
         log = np.array(
             [
-                [0, 0, 0, 0, 0, cubeID, NO_SURFACE_ID],
-                [2, 0, 0, 0, 0, sphereID, NO_SURFACE_ID],
-                [3, 0, 0, 0, 0, WORLD_SOLID_ID, NO_SURFACE_ID],
-                [4, 9, 9, 9, 0, NO_LOG_ID, 9],
-                [5, 0, 0, 0, 0, cubeID, cubeSurfaceIDs[1]],
-                [6, 0, 0, 0, 0, sphereID, sphereSurfaceIDs[1]],
-                [1, 0, 0, 0, 0, cubeID, NO_SURFACE_ID],
+                [0, 0, 0, 0, cubeID, NO_SURFACE_ID],
+                [2, 0, 0, 0, sphereID, NO_SURFACE_ID],
+                [3, 0, 0, 0, WORLD_SOLID_ID, NO_SURFACE_ID],
+                [4, 9, 9, 9, NO_LOG_ID, 9],
+                [5, 0, 0, 0, cubeID, cubeSurfaceIDs[1]],
+                [6, 0, 0, 0, sphereID, sphereSurfaceIDs[1]],
+                [1, 0, 0, 0, cubeID, NO_SURFACE_ID],
             ]
         )
         return log
@@ -55,7 +55,7 @@ class TestCLKeyLog(unittest.TestCase):
 
         verify(sceneLogger, times=5).logDataPointArray(...)
 
-        expectedCubeData = arg_that(lambda arg: np.array_equal(arg, np.array([[0, 0, 0, 0, 0], [1, 0, 0, 0, 0]])))
+        expectedCubeData = arg_that(lambda arg: np.array_equal(arg, np.array([[0, 0, 0, 0], [1, 0, 0, 0]])))
         verify(sceneLogger).logDataPointArray(expectedCubeData, InteractionKey(self.cube.getLabel()))
 
         expectedValuesWithKeys = [
@@ -65,7 +65,7 @@ class TestCLKeyLog(unittest.TestCase):
             (6, InteractionKey(self.sphere.getLabel(), self.sphere.surfaceLabels[0])),
         ]
         for value, expectedKey in expectedValuesWithKeys:
-            expectedData = arg_that(lambda arg: np.array_equal(arg, np.array([[value, 0, 0, 0, 0]])))
+            expectedData = arg_that(lambda arg: np.array_equal(arg, np.array([[value, 0, 0, 0]])))
             verify(sceneLogger).logDataPointArray(expectedData, expectedKey)
 
     def testGivenCLKeyLogForInfiniteScene_whenTransferToSceneLogger_shouldLogDataWithInteractionKeys(self):
@@ -73,9 +73,9 @@ class TestCLKeyLog(unittest.TestCase):
         sceneCL = CLScene(self.scene, nWorkUnits=10)
         log = np.array(
             [
-                [1, 0, 0, 0, 0, WORLD_SOLID_ID, NO_SURFACE_ID],
-                [2, 0, 0, 0, 0, NO_LOG_ID, 99],
-                [3, 0, 0, 0, 0, WORLD_SOLID_ID, NO_SURFACE_ID],
+                [1, 0, 0, 0, WORLD_SOLID_ID, NO_SURFACE_ID],
+                [2, 0, 0, 0, NO_LOG_ID, 99],
+                [3, 0, 0, 0, WORLD_SOLID_ID, NO_SURFACE_ID],
             ]
         )
         clKeyLog = CLKeyLog(log, sceneCL)
@@ -85,5 +85,21 @@ class TestCLKeyLog(unittest.TestCase):
         clKeyLog.toSceneLogger(sceneLogger)
 
         verify(sceneLogger, times=1).logDataPointArray(...)
-        expectedWorldData = arg_that(lambda arg: np.array_equal(arg, np.array([[1, 0, 0, 0, 0], [3, 0, 0, 0, 0]])))
+        expectedWorldData = arg_that(lambda arg: np.array_equal(arg, np.array([[1, 0, 0, 0], [3, 0, 0, 0]])))
         verify(sceneLogger).logDataPointArray(expectedWorldData, InteractionKey(WORLD_SOLID_LABEL))
+
+    def testGivenPhotonIDs_whenTransferToSceneLogger_shouldLogThePhotonIDsOfEachKey(self):
+        sceneCL = CLScene(self.scene, nWorkUnits=10)
+        log = self._createTestLog(sceneCL)
+        photonIDs = np.arange(len(log), dtype=np.uint64) + 2**40
+        clKeyLog = CLKeyLog(log, sceneCL, photonIDs=photonIDs)
+        sceneLogger = mock(EnergyLogger)
+        when(sceneLogger).logDataPointArray(...).thenReturn()
+
+        clKeyLog.toSceneLogger(sceneLogger)
+
+        expectedCubeData = arg_that(lambda arg: np.array_equal(arg, np.array([[0, 0, 0, 0], [1, 0, 0, 0]])))
+        expectedCubeIDs = arg_that(lambda arg: arg.tolist() == [2**40, 2**40 + 6])
+        verify(sceneLogger).logDataPointArray(
+            expectedCubeData, InteractionKey(self.cube.getLabel()), photonIDs=expectedCubeIDs
+        )
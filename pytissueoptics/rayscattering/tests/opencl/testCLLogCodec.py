@@ -0,0 +1,109 @@
+import unittest
+
+import numpy as np
+
+from pytissueoptics import Cube, ScatteringMaterial, ScatteringScene, Sphere
+from pytissueoptics.rayscattering.opencl import OPENCL_OK
+from pytissueoptics.rayscattering.opencl.buffers import (
+    FULL_LOG_LAYOUT,
+    PACKED_LOG_LAYOUT,
+    QUANTIZED_LOG_LAYOUT,
+    DataPointCL,
+    LogLayout,
+)
+from pytissueoptics.rayscattering.opencl.CLScene import NO_LOG_ID, NO_SURFACE_ID, WORLD_SOLID_ID, CLScene
+from pytissueoptics.rayscattering.opencl.utils import CLLogCodec
+
+
+@unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
+class TestCLLogCodec(unittest.TestCase):
+    def setUp(self):
+        material = ScatteringMaterial(2, 0.8, 0.8, 1.4)
+        self.cube = Cube(4, material=material, label="cube")
+        self.sphere = Sphere(1, material=material, label="sphere")
+        self.sceneCL = CLScene(ScatteringScene([self.cube, self.sphere]), nWorkUnits=10)
+        self.cubeID = self.sceneCL.getSolidID(self.cube)
+        self.sphereID = self.sceneCL.getSolidID(self.sphere)
+
+    def testGivenFullLayout_shouldNotRequireDefinesOrDeclarations(self):
+        codec = CLLogCodec(FULL_LOG_LAYOUT, self.sceneCL)
+
+        self.assertEqual({}, codec.defines)
+        self.assertEqual("", codec.declarations)
+
+    def testGivenFullLayout_whenDecode_shouldReturnAllColumnsAndExactPhotonIDs(self):
+        codec = CLLogCodec(FULL_LOG_LAYOUT, self.sceneCL)
+        photonID = 2**40 + 7
+        log = self._makeLog(FULL_LOG_LAYOUT, [(0.5, 1, 2, 3, photonID, self.cubeID, NO_SURFACE_ID)])
+
+        decodedLog, photonIDs = codec.decode(log)
+
+        self.assertTrue(np.array_equal([[0.5, 1, 2, 3, self.cubeID, NO_SURFACE_ID]], decodedLog))
+        self.assertEqual(np.uint64, photonIDs.dtype)
+        self.assertEqual([photonID], photonIDs.tolist())
+
+    def testGivenPackedLayout_whenDecode_shouldUnpackSolidAndSurfaceIDsOfEachKey(self):
+        codec = CLLogCodec(PACKED_LOG_LAYOUT, self.sceneCL)
+        surfaceKeyOffset = int(codec.defines["LOG_SURFACE_KEY_OFFSET"])
+        surfaceID = 2
+        insideSolidID, outsideSolidID = self.sceneCL.getSurfaceSolidIDs()[surfaceID]
+        keys = [0, WORLD_SOLID_ID + 2, self.sphereID + 2, surfaceKeyOffset + 2 * surfaceID, surfaceKeyOffset + 5]
+        log = self._makeLog(PACKED_LOG_LAYOUT, [(1, 0, 0, 0, key) for key in keys])
+
+        decodedLog, photonIDs = codec.decode(log)
+
+        self.assertIsNone(photonIDs)
+        self.assertEqual(6, decodedLog.shape[1])
+        expectedIDs = [
+            [NO_LOG_ID, NO_SURFACE_ID],
+            [WORLD_SOLID_ID, NO_SURFACE_ID],
+            [self.sphereID, NO_SURFACE_ID],
+            [insideSolidID, surfaceID],
+            [outsideSolidID, surfaceID],
+        ]
+        self.assertTrue(np.array_equal(expectedIDs, decodedLog[:, 4:]))
+
+    def testGivenQuantizedLayout_whenDecode_shouldRestorePositionsWithinTheSolidBoundingBox(self):
+        codec = CLLogCodec(QUANTIZED_LOG_LAYOUT, self.sceneCL)
+        sphereKey = self.sphereID + 2
+        log = self._makeLog(QUANTIZED_LOG_LAYOUT, [(1, 0, 2**16 - 1, 2**15, sphereKey)])
+
+        decodedLog, _ = codec.decode(log)
+
+        bboxMin, bboxMax = self.sceneCL.getSolidBoundingBoxes()[self.sphereID - WORLD_SOLID_ID]
+        expectedPosition = [bboxMin[0], bboxMax[1], (bboxMin[2] + bboxMax[2]) / 2]
+        self.assertTrue(np.allclose(expectedPosition, decodedLog[0, 1:4], atol=1e-4))
+        self.assertTrue(np.array_equal([1, self.sphereID, NO_SURFACE_ID], decodedLog[0, [0, 4, 5]]))
+
+    def testGivenQuantizedLayout_shouldDeclareBoundingBoxesOfEachSolidID(self):
+        codec = CLLogCodec(QUANTIZED_LOG_LAYOUT, self.sceneCL)
+
+        self.assertIn("LOG_QUANTIZED_POSITIONS", codec.defines)
+        self.assertIn("LOG_BBOX_MIN[]", codec.declarations)
+        self.assertIn("LOG_BBOX_SIZE[]", codec.declarations)
+
+    def testGivenQuantizedLayoutWithEmptyScene_shouldRaiseValueError(self):
+        sceneCL = CLScene(ScatteringScene([]), nWorkUnits=10)
+
+        with self.assertRaises(ValueError):
+            CLLogCodec(QUANTIZED_LOG_LAYOUT, sceneCL)
+
+    def testGivenQuantizedLayoutWithInteractionsInTheWorld_shouldRaiseValueError(self):
+        worldMaterial = ScatteringMaterial(2, 0.8, 0.8, 1.4)
+        sceneCL = CLScene(ScatteringScene([self.cube], worldMaterial=worldMaterial), nWorkUnits=10)
+
+        with self.assertRaises(ValueError):
+            CLLogCodec(QUANTIZED_LOG_LAYOUT, sceneCL)
+
+    def testGivenLayouts_shouldHaveSmallerItemSizes(self):
+        fullSize = DataPointCL.getLayoutItemSize(FULL_LOG_LAYOUT)
+        packedSize = DataPointCL.getLayoutItemSize(PACKED_LOG_LAYOUT)
+        quantizedSize = DataPointCL.getLayoutItemSize(QUANTIZED_LOG_LAYOUT)
+
+        self.assertEqual(32, fullSize)
+        self.assertEqual(20, packedSize)
+        self.assertEqual(12, quantizedSize)
+
+    @staticmethod
+    def _makeLog(layout: LogLayout, rows: list) -> np.ndarray:
+        return np.array(rows, dtype=DataPointCL.getLayoutDtype(layout))
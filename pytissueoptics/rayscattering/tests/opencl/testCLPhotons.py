@@ -1,11 +1,24 @@
+import json
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
 import numpy as np
 
 from pytissueoptics import Cube, EnergyLogger, ScatteringMaterial, ScatteringScene
-from pytissueoptics.rayscattering.opencl import OPENCL_OK, WEIGHT_THRESHOLD
+from pytissueoptics.rayscattering.opencl import CONFIG, OPENCL_OK, WEIGHT_THRESHOLD
+from pytissueoptics.rayscattering.opencl.buffers import (
+    FULL_LOG_LAYOUT,
+    PACKED_LOG_LAYOUT,
+    QUANTIZED_LOG_LAYOUT,
+    LogLayout,
+    SourceCLInfo,
+)
+from pytissueoptics.rayscattering.opencl.buffers.sourceCL import DIRECTIONAL_SOURCE
 from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons
-from pytissueoptics.scene.geometry import Environment
+from pytissueoptics.rayscattering.opencl.utils import PhotonScheduler
+from pytissueoptics.scene.geometry import Environment, Vector
 from pytissueoptics.scene.logger import InteractionKey
 
 
@@ -40,6 +53,90 @@ class TestCLPhotons(unittest.TestCase):
         # Roulette effect will result in total weight slightly different from N.
         self.assertAlmostEqual(N, totalWeightScattered, places=1)
 
+    def testGivenNoPersistentThreads_whenPropagate_shouldPropagateUntilAllPhotonsHaveNoMoreEnergy(self):
+        N = 100
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        logger = EnergyLogger(infiniteScene)
+
+        positions = np.full((N, 3), 0)
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(positions, directions, persistentThreads=False)
+        photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+        IPP = infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD)
+
+        photons.propagate(IPP=IPP, verbose=False)
+
+        dataPoints = logger.getRawDataPoints()
+        totalWeightScattered = float(np.sum(dataPoints[:, 0]))
+        self.assertAlmostEqual(N, totalWeightScattered, places=1)
+
+    def testWhenPropagateWithPersistentThreads_shouldPropagateEveryPhoton(self):
+        N = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        logger = EnergyLogger(infiniteScene)
+
+        positions = np.full((N, 3), 0)
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(positions, directions, persistentThreads=True)
+        photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+        IPP = infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD)
+
+        photons.propagate(IPP=IPP, verbose=False)
+
+        dataPoints = logger.getRawDataPoints()
+        self.assertTrue(np.array_equal(np.arange(N), np.unique(dataPoints[:, 4])))
+        self.assertAlmostEqual(1, float(np.sum(dataPoints[:, 0])) / N, places=1)
+
+    def testGivenUnderestimatedIPP_whenPropagate_shouldResumePhotonsUntilAllAreFullyPropagated(self):
+        N = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        positions = np.full((N, 3), 0)
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+
+        for photons in [CLPhotons(positions, directions), CLPhotons(sourceInfo=sourceInfo, N=N)]:
+            logger = EnergyLogger(infiniteScene)
+            photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+
+            photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD) / 2, verbose=False)
+
+            dataPoints = logger.getRawDataPoints()
+            self.assertTrue(np.array_equal(np.arange(N), np.unique(dataPoints[:, 4])))
+            self.assertAlmostEqual(1, float(np.sum(dataPoints[:, 0])) / N, places=1)
+
+    def testGivenMultipleDevices_whenPropagate_shouldPropagateEveryPhotonOnceAndMergeLogs(self):
+        N = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        positions = np.full((N, 3), 0)
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        devices = [CONFIG.device, CONFIG.device]
+
+        for photons in [
+            CLPhotons(positions, directions, devices=devices),
+            CLPhotons(sourceInfo=sourceInfo, N=N, devices=devices),
+        ]:
+            logger = EnergyLogger(infiniteScene)
+            photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+
+            photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD) / 2, verbose=False)
+
+            dataPoints = logger.getRawDataPoints()
+            self.assertTrue(np.array_equal(np.arange(N), np.unique(dataPoints[:, 4])))
+            self.assertAlmostEqual(1, float(np.sum(dataPoints[:, 0])) / N, places=1)
+
     def testWhenPropagateInSolids_shouldLogEnergyWithCorrectInteractionKeys(self):
         N = 100
         material = ScatteringMaterial(5, 2, 0.9, 1.4)
@@ -72,6 +169,257 @@ class TestCLPhotons(unittest.TestCase):
 
         self.assertAlmostEqual(energyInput, energyScattered + energyLeaving, places=2)
 
+    def testGivenPackedLogLayout_whenPropagateInSolids_shouldLogSameDataWithoutPhotonIDs(self):
+        fullLogger = self._propagateInCube(logLayout=FULL_LOG_LAYOUT)
+        packedLogger = self._propagateInCube(logLayout=PACKED_LOG_LAYOUT)
+
+        self.assertEqual(fullLogger.getStoredSurfaceLabels("cube"), packedLogger.getStoredSurfaceLabels("cube"))
+        for surfaceLabel in [None, *fullLogger.getStoredSurfaceLabels("cube")]:
+            key = InteractionKey("cube", surfaceLabel)
+            fullPoints = fullLogger.getRawDataPoints(key)
+            packedPoints = packedLogger.getRawDataPoints(key)
+            self.assertEqual(4, packedPoints.shape[1])
+            self.assertTrue(np.array_equal(fullPoints[:, :4], packedPoints))
+
+    def testGivenQuantizedLogLayout_whenPropagateInSolids_shouldLogPositionsWithinQuantizationError(self):
+        fullLogger = self._propagateInCube(logLayout=FULL_LOG_LAYOUT)
+        quantizedLogger = self._propagateInCube(logLayout=QUANTIZED_LOG_LAYOUT)
+
+        for surfaceLabel in [None, *fullLogger.getStoredSurfaceLabels("cube")]:
+            key = InteractionKey("cube", surfaceLabel)
+            fullPoints = fullLogger.getRawDataPoints(key)
+            quantizedPoints = quantizedLogger.getRawDataPoints(key)
+            self.assertTrue(np.array_equal(fullPoints[:, 0], quantizedPoints[:, 0]))
+            cubeSize = 1
+            self.assertTrue(np.allclose(fullPoints[:, 1:4], quantizedPoints[:, 1:4], atol=cubeSize / 2**16 + 1e-6))
+
+    def testGivenQuantizedLogLayoutInEmptyScene_whenPropagate_shouldRaiseValueError(self):
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        photons = CLPhotons(np.zeros((10, 3)), np.tile([0, 0, 1], (10, 1)), logLayout=QUANTIZED_LOG_LAYOUT)
+        photons.setContext(infiniteScene, Environment(worldMaterial), logger=EnergyLogger(infiniteScene))
+
+        with self.assertRaises(ValueError):
+            photons.propagate(IPP=10)
+
+    def testGivenSpecializedKernels_whenPropagateInSolids_shouldLogTheSameDataAsGenericKernels(self):
+        genericLogger = self._propagateInCube(specializeKernels=False)
+        specializedLogger = self._propagateInCube(specializeKernels=True)
+
+        for surfaceLabel in [None, *genericLogger.getStoredSurfaceLabels("cube")]:
+            key = InteractionKey("cube", surfaceLabel)
+            self.assertTrue(
+                np.array_equal(genericLogger.getRawDataPoints(key), specializedLogger.getRawDataPoints(key))
+            )
+
+    def testGivenStructureOfArrays_whenPropagateInSolids_shouldLogTheSameDataAsArrayOfStructs(self):
+        aosLogger = self._propagateInCube(structureOfArrays=False)
+        soaLogger = self._propagateInCube(structureOfArrays=True)
+
+        for surfaceLabel in [None, *aosLogger.getStoredSurfaceLabels("cube")]:
+            key = InteractionKey("cube", surfaceLabel)
+            self.assertTrue(np.array_equal(aosLogger.getRawDataPoints(key), soaLogger.getRawDataPoints(key)))
+
+    def testGivenStructureOfArrays_whenPropagateWithUnderestimatedIPP_shouldResumeEveryPhoton(self):
+        N = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        positions = np.full((N, 3), 0)
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+
+        for photons in [
+            CLPhotons(positions, directions, structureOfArrays=True),
+            CLPhotons(sourceInfo=sourceInfo, N=N, structureOfArrays=True),
+        ]:
+            logger = EnergyLogger(infiniteScene)
+            photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+
+            photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD) / 2, verbose=False)
+
+            dataPoints = logger.getRawDataPoints()
+            self.assertTrue(np.array_equal(np.arange(N), np.unique(dataPoints[:, 4])))
+            self.assertAlmostEqual(1, float(np.sum(dataPoints[:, 0])) / N, places=1)
+
+    def testGivenWavefront_whenPropagateWithUnderestimatedIPP_shouldResumeEveryPhoton(self):
+        N = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        positions = np.full((N, 3), 0)
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+
+        for photons in [
+            CLPhotons(positions, directions, wavefront=True),
+            CLPhotons(sourceInfo=sourceInfo, N=N, wavefront=True),
+        ]:
+            logger = EnergyLogger(infiniteScene)
+            photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+
+            photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD) / 2, verbose=False)
+
+            dataPoints = logger.getRawDataPoints()
+            self.assertTrue(np.array_equal(np.arange(N), np.unique(dataPoints[:, 4])))
+            self.assertAlmostEqual(1, float(np.sum(dataPoints[:, 0])) / N, places=1)
+
+    def testGivenWavefront_whenPropagateInSolids_shouldLogTheSameEnergyAsTheSingleKernel(self):
+        N = 1000
+        singleKernelLogger = self._propagateInCube(N=N)
+        wavefrontLogger = self._propagateInCube(N=N, wavefront=True)
+
+        self.assertEqual(
+            set(singleKernelLogger.getStoredSurfaceLabels("cube")), set(wavefrontLogger.getStoredSurfaceLabels("cube"))
+        )
+        for surfaceLabel in [None, *singleKernelLogger.getStoredSurfaceLabels("cube")]:
+            key = InteractionKey("cube", surfaceLabel)
+            singleKernelEnergy = np.sum(singleKernelLogger.getRawDataPoints(key)[:, 0])
+            wavefrontEnergy = np.sum(wavefrontLogger.getRawDataPoints(key)[:, 0])
+            self.assertAlmostEqual(singleKernelEnergy / N, wavefrontEnergy / N, delta=0.05)
+
+    def testGivenWavefrontWithStructureOfArrays_whenPropagateInSolids_shouldLogTheSameDataAsArrayOfStructs(self):
+        aosLogger = self._propagateInCube(wavefront=True)
+        soaLogger = self._propagateInCube(wavefront=True, structureOfArrays=True)
+
+        for surfaceLabel in [None, *aosLogger.getStoredSurfaceLabels("cube")]:
+            key = InteractionKey("cube", surfaceLabel)
+            self.assertTrue(np.array_equal(aosLogger.getRawDataPoints(key), soaLogger.getRawDataPoints(key)))
+
+    def testGivenEnergyTally_whenPropagateInSolids_shouldTallyTheEnergyOfTheLoggedDataPoints(self):
+        for wavefront in [False, True]:
+            with self.subTest(["singleKernel", "wavefront"][wavefront]):
+                logger = self._propagateInCube(wavefront=wavefront, tallyEnergy=True)
+                energyTally = logger.energyTally
+
+                cubePoints = logger.getRawDataPoints(InteractionKey("cube"))
+                self.assertAlmostEqual(np.sum(cubePoints[:, 0]), energyTally.getDepositedEnergy("cube"), places=3)
+                for surfaceLabel in logger.getStoredSurfaceLabels("cube"):
+                    surfaceEnergy = logger.getRawDataPoints(InteractionKey("cube", surfaceLabel))[:, 0]
+                    leavingEnergy = energyTally.getSurfaceEnergy("cube", surfaceLabel, leaving=True)
+                    enteringEnergy = energyTally.getSurfaceEnergy("cube", surfaceLabel, leaving=False)
+                    self.assertAlmostEqual(np.sum(surfaceEnergy[surfaceEnergy > 0]), leavingEnergy, places=3)
+                    self.assertAlmostEqual(-np.sum(surfaceEnergy[surfaceEnergy < 0]), enteringEnergy, places=3)
+
+    def testGivenEnergyTallyWithoutDataPoints_whenPropagateInSolids_shouldOnlyTallyTheEnergy(self):
+        for wavefront in [False, True]:
+            with self.subTest(["singleKernel", "wavefront"][wavefront]):
+                referenceLogger = self._propagateInCube(wavefront=wavefront, tallyEnergy=True)
+                logger = self._propagateInCube(wavefront=wavefront, tallyEnergy=True, logDataPoints=False)
+
+                self.assertEqual(0, logger.nDataPoints)
+                self.assertEqual(referenceLogger.getSeenSurfaceLabels("cube"), logger.getSeenSurfaceLabels("cube"))
+                self.assertAlmostEqual(
+                    referenceLogger.energyTally.getDepositedEnergy("cube"),
+                    logger.energyTally.getDepositedEnergy("cube"),
+                    places=3,
+                )
+
+    def testGivenSourceInfoAndEnergyTallyWithoutDataPoints_whenPropagate_shouldTallyAllTheEnergy(self):
+        N = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        logger = EnergyLogger(infiniteScene, tallyEnergy=True, logDataPoints=False)
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        photons = CLPhotons(sourceInfo=sourceInfo, N=N)
+        photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+
+        photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        self.assertEqual(0, logger.nDataPoints)
+        self.assertAlmostEqual(1, logger.energyTally.getDepositedEnergy("world") / N, places=1)
+
+    def testGivenKernelCounters_whenPropagate_shouldCountTheWorkOfTheKernels(self):
+        N = 100
+        material = ScatteringMaterial(5, 2, 0.9, 1.4)
+        worldMaterial = ScatteringMaterial()
+        scene = ScatteringScene([Cube(1, material=material, label="cube")], worldMaterial=worldMaterial)
+        positions = np.tile([0, 0, -1], (N, 1))
+        directions = np.tile([0, 0, 1], (N, 1))
+
+        for wavefront in [False, True]:
+            with self.subTest(["singleKernel", "wavefront"][wavefront]):
+                logger = EnergyLogger(scene)
+                photons = CLPhotons(positions, directions, wavefront=wavefront, countKernelEvents=True)
+                photons.setContext(scene, Environment(worldMaterial), logger=logger)
+
+                photons.propagate(IPP=scene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+                counters = photons.kernelCounters
+                nScatteringPoints = len(logger.getRawDataPoints(InteractionKey("cube")))
+                nSurfacePoints = sum(
+                    len(logger.getRawDataPoints(InteractionKey("cube", surfaceLabel)))
+                    for surfaceLabel in logger.getStoredSurfaceLabels("cube")
+                )
+                self.assertEqual(nSurfacePoints, counters["refractions"])
+                self.assertGreaterEqual(
+                    counters["steps"], nScatteringPoints + counters["reflections"] + counters["refractions"]
+                )
+                self.assertLessEqual(counters["bboxTests"], counters["steps"])
+                self.assertGreaterEqual(counters["triangleTests"], counters["steps"])
+                self.assertGreater(counters["rouletteKills"], 0)
+                self.assertEqual(0, counters["detectorHits"])
+                for name, count in counters.items():
+                    self.assertEqual(count, sum(batch[name] for batch in photons.batchKernelCounters))
+
+    def testGivenTraceFilePath_whenPropagate_shouldWriteTheTimelineOfThePropagation(self):
+        N = 10
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        logger = EnergyLogger(infiniteScene)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            traceFilePath = os.path.join(tempDir, "trace.json")
+            photons = CLPhotons(np.zeros((N, 3)), np.tile([0, 0, 1], (N, 1)), traceFilePath=traceFilePath)
+            photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+            photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+            with open(traceFilePath) as file:
+                traceEvents = json.load(file)["traceEvents"]
+
+        sliceNames = {event["name"] for event in traceEvents if event["ph"] == "X"}
+        for name in ["propagatePersistent", "getData DataPoint", "CLKeyLog conversion", "Logger insertion"]:
+            self.assertIn(name, sliceNames)
+
+    @staticmethod
+    def _propagateInCube(
+        logLayout: LogLayout = FULL_LOG_LAYOUT,
+        specializeKernels: bool = True,
+        structureOfArrays: bool = False,
+        wavefront: bool = False,
+        N: int = 100,
+        tallyEnergy: bool = False,
+        logDataPoints: bool = True,
+    ) -> EnergyLogger:
+        material = ScatteringMaterial(5, 2, 0.9, 1.4)
+        worldMaterial = ScatteringMaterial()
+        scene = ScatteringScene([Cube(1, material=material, label="cube")], worldMaterial=worldMaterial)
+        logger = EnergyLogger(scene, tallyEnergy=tallyEnergy, logDataPoints=logDataPoints)
+
+        positions = np.full((N, 3), 0)
+        positions[:, 2] = -1
+        directions = np.full((N, 3), 0)
+        directions[:, 2] = 1
+        photons = CLPhotons(
+            positions,
+            directions,
+            logLayout=logLayout,
+            specializeKernels=specializeKernels,
+            structureOfArrays=structureOfArrays,
+            wavefront=wavefront,
+        )
+        photons.setContext(scene, Environment(worldMaterial), logger=logger)
+
+        np.random.seed(0)  # Same device seeds for every variant.
+        photons.propagate(IPP=scene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+        return logger
+
     def testWhenPropagateOnly1Photon_shouldPropagate(self):
         N = 1
         # Testing in infinite scene so that photons will scatter all their energy
@@ -91,3 +439,64 @@ class TestCLPhotons(unittest.TestCase):
         dataPoints = logger.getRawDataPoints()
         totalWeightScattered = float(np.sum(dataPoints[:, 0]))
         self.assertAlmostEqual(N, totalWeightScattered, places=2)
+
+    def testGivenSourceInfo_whenPropagate_shouldGenerateAndPropagateAllPhotonsOnDevice(self):
+        N = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        logger = EnergyLogger(infiniteScene)
+
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        photons = CLPhotons(sourceInfo=sourceInfo, N=N)
+        photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+        IPP = infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD)
+
+        photons.propagate(IPP=IPP, verbose=False)
+
+        dataPoints = logger.getRawDataPoints()
+        totalWeightScattered = float(np.sum(dataPoints[:, 0]))
+        self.assertAlmostEqual(1, totalWeightScattered / N, places=1)
+        self.assertTrue(np.array_equal(np.arange(N), np.unique(dataPoints[:, 4])))
+
+    def testGivenSourceInfoWithMoreThan2To32Photons_whenPropagate_shouldGiveThePhotons64BitIDs(self):
+        N = 5 * 10**9
+        nLastPhotons = 1000
+        worldMaterial = ScatteringMaterial(5, 2, 0.9, 1.4)
+        infiniteScene = ScatteringScene([], worldMaterial=worldMaterial)
+        logger = EnergyLogger(infiniteScene)
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        photons = CLPhotons(sourceInfo=sourceInfo, N=N)
+        photons.setContext(infiniteScene, Environment(worldMaterial), logger=logger)
+        claims = []
+
+        class LastPhotonsScheduler(PhotonScheduler):
+            """Skips to the last photons, so that only the photons with IDs above 2^32 are propagated."""
+
+            def __init__(self, totalPhotons: int):
+                super().__init__(totalPhotons)
+                self.claim(totalPhotons - nLastPhotons)
+
+            def claim(self, maxPhotons: int):
+                claim = super().claim(maxPhotons)
+                claims.append(claim)
+                return claim
+
+        with patch("pytissueoptics.rayscattering.opencl.CLPhotons.PhotonScheduler", LastPhotonsScheduler):
+            photons.propagate(IPP=infiniteScene.getEstimatedIPP(WEIGHT_THRESHOLD), verbose=False)
+
+        batchClaims = [(firstPhotonID, count) for firstPhotonID, count in claims[1:] if count > 0]
+        self.assertEqual(nLastPhotons, sum(count for _, count in batchClaims))
+        self.assertTrue(all(firstPhotonID > 2**32 for firstPhotonID, _ in batchClaims))
+        photonIDs = logger.getRawPhotonIDs()
+        self.assertTrue(np.array_equal(np.arange(N - nLastPhotons, N), np.unique(photonIDs)))
+
+    def testGivenSourceInfoWithoutN_shouldNotCreatePhotons(self):
+        sourceInfo = SourceCLInfo(
+            DIRECTIONAL_SOURCE, Vector(0, 0, 0), Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0), 1, 0
+        )
+        with self.assertRaises(AssertionError):
+            CLPhotons(sourceInfo=sourceInfo)
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from mockito import mock
+
+from pytissueoptics.rayscattering.opencl.CLProfiler import HOST_PROCESS_ID, CLProfiler
+
+
+class TestCLProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = CLProfiler()
+
+    def testWhenRecordSpan_shouldAddACompleteEventOnTheTrackOfTheCurrentThread(self):
+        startTime = self.profiler.now()
+        self.profiler.recordSpan("Propagation", "batch", startTime, startTime + 2000, photonCount=10)
+
+        traceEvents = self.profiler.toChromeTrace()["traceEvents"]
+
+        threadName = threading.current_thread().name
+        self.assertIn(
+            {"name": "thread_name", "ph": "M", "pid": HOST_PROCESS_ID, "tid": 0, "args": {"name": threadName}},
+            traceEvents,
+        )
+        span = traceEvents[-1]
+        self.assertEqual(
+            ("Propagation", "batch", "X", HOST_PROCESS_ID), (span["name"], span["cat"], span["ph"], span["pid"])
+        )
+        self.assertEqual(2, span["dur"])
+        self.assertEqual({"photonCount": 10}, span["args"])
+
+    def testWhenSpan_shouldRecordTheTimeSpentInTheContext(self):
+        with self.profiler.span("Logger insertion", "log"):
+            pass
+
+        span = self.profiler.toChromeTrace()["traceEvents"][-1]
+        self.assertEqual("Logger insertion", span["name"])
+        self.assertGreaterEqual(span["dur"], 0)
+
+    def testGivenDeviceEvent_shouldAlignItsTimestampsOnTheHostClock(self):
+        hostQueuedTime = self.profiler.now() + 10000
+        event = mock({"profile": mock({"queued": 100, "start": 1100, "end": 4100})})
+        device = mock({"int_ptr": 1, "name": "someDevice"})
+
+        self.profiler.recordEvent("someKernel", "kernel", device, hostQueuedTime, event, globalSize=8)
+
+        traceEvents = self.profiler.toChromeTrace()["traceEvents"]
+        execution = next(e for e in traceEvents if e["ph"] == "X" and e["tid"] == 0 and e["pid"] == 1)
+        queued = next(e for e in traceEvents if e["ph"] == "X" and e["tid"] == 1 and e["pid"] == 1)
+        self.assertEqual(3, execution["dur"])
+        self.assertEqual(1, queued["dur"])
+        self.assertAlmostEqual(queued["ts"] + 1, execution["ts"])
+        self.assertAlmostEqual((hostQueuedTime - self.profiler._startTime) / 1e3, queued["ts"])
+        self.assertEqual({"globalSize": 8, "queuedMicroseconds": 1}, execution["args"])
+
+    def testWhenSave_shouldWriteTheTraceAsJSON(self):
+        with self.profiler.span("Logger insertion", "log"):
+            pass
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "trace.json")
+            self.profiler.save(filePath)
+            with open(filePath) as file:
+                trace = json.load(file)
+
+        self.assertEqual(self.profiler.toChromeTrace()["traceEvents"][-1]["name"], trace["traceEvents"][-1]["name"])
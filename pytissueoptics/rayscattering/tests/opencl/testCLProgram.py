@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pytissueoptics.rayscattering.opencl import OPENCL_OK
+from pytissueoptics.rayscattering.opencl.buffers import BufferOf
+from pytissueoptics.rayscattering.opencl.CLProfiler import CLProfiler
+from pytissueoptics.rayscattering.opencl.CLProgram import CLProgram, ProgramCache
+from pytissueoptics.rayscattering.opencl.config.CLConfig import OPENCL_SOURCE_DIR
+
+
+@unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
+class TestCLProgram(unittest.TestCase):
+    def setUp(self):
+        ProgramCache.clear()
+        self.sourcePath = os.path.join(OPENCL_SOURCE_DIR, "vectorOperators.c")
+
+    def testWhenLaunchingTheSameKernelTwice_shouldOnlyCompileOnce(self):
+        program = CLProgram(self.sourcePath)
+
+        self._launchNormalize(program)
+        self._launchNormalize(program)
+
+        self.assertEqual(1, ProgramCache.size())
+
+    def testGivenTwoProgramsWithTheSameSource_shouldShareTheCompiledProgram(self):
+        self._launchNormalize(CLProgram(self.sourcePath))
+        self._launchNormalize(CLProgram(self.sourcePath))
+
+        self.assertEqual(1, ProgramCache.size())
+
+    def testGivenDifferentDefines_shouldCompileSpecializedVariants(self):
+        program = CLProgram(self.sourcePath)
+        specializedProgram = CLProgram(self.sourcePath)
+        specializedProgram.define("SOME_FEATURE_FLAG", "1")
+
+        self._launchNormalize(program)
+        self._launchNormalize(specializedProgram)
+
+        self.assertEqual(2, ProgramCache.size())
+
+    def testGivenNestedIncludes_shouldInlineEachIncludedFileOnce(self):
+        with tempfile.TemporaryDirectory() as sourceDir:
+            sourcePath = self._writeNestedSources(sourceDir)
+            program = CLProgram(sourcePath)
+            values = BufferOf(np.ones(4, dtype=np.float32))
+
+            program.launchKernel("quadrupleKernel", N=4, arguments=[values])
+
+            self.assertTrue(np.array_equal(np.full(4, 4), program.getData(values)))
+
+    def testWhenLaunchingWithoutBuild_shouldReuseTheDataOnTheDevice(self):
+        with tempfile.TemporaryDirectory() as sourceDir:
+            program = CLProgram(self._writeNestedSources(sourceDir))
+            values = BufferOf(np.ones(4, dtype=np.float32))
+            program.build([values])
+
+            program.launchKernel("quadrupleKernel", N=4, arguments=[values], build=False)
+            program.launchKernel("quadrupleKernel", N=4, arguments=[values], build=False)
+
+            self.assertTrue(np.array_equal(np.full(4, 16), program.getData(values)))
+
+    def testGivenProfiler_whenLaunchingKernelAndTransferringData_shouldRecordTheirEvents(self):
+        profiler = CLProfiler()
+        program = CLProgram(self.sourcePath, profiler=profiler)
+        vectors = BufferOf(np.ones((2, 4), dtype=np.float32))
+
+        program.launchKernel("normalizeVectorGlobalKernel", N=2, arguments=[vectors])
+        program.getData(vectors)
+
+        slices = [
+            event for event in profiler.toChromeTrace()["traceEvents"] if event.get("cat") in ("kernel", "transfer")
+        ]
+        self.assertEqual(["normalizeVectorGlobalKernel", "getData BufferOf"], [event["name"] for event in slices])
+        self.assertTrue(all(event["dur"] >= 0 for event in slices))
+
+    @staticmethod
+    def _writeNestedSources(sourceDir: str) -> str:
+        sources = {
+            "base.c": "float twice(float x){ return 2 * x; }\n",
+            "middle.c": '#include "base.c"\nfloat quadruple(float x){ return twice(twice(x)); }\n',
+            "main.c": '#include "base.c"\n#include "middle.c"\n'
+            "__kernel void quadrupleKernel(__global float *values){\n"
+            "    values[get_global_id(0)] = quadruple(values[get_global_id(0)]);\n}\n",
+        }
+        for fileName, code in sources.items():
+            with open(os.path.join(sourceDir, fileName), "w") as file:
+                file.write(code)
+        return os.path.join(sourceDir, "main.c")
+
+    @staticmethod
+    def _launchNormalize(program: CLProgram):
+        vectors = BufferOf(np.ones((2, 4), dtype=np.float32))
+        program.launchKernel("normalizeVectorGlobalKernel", N=2, arguments=[vectors])
@@ -0,0 +1,50 @@
+import unittest
+
+from pytissueoptics import Cube, ScatteringMaterial, ScatteringScene, Sphere, Vector
+from pytissueoptics.rayscattering.opencl import OPENCL_OK
+from pytissueoptics.rayscattering.opencl.CLScene import CLScene
+
+
+@unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
+class TestCLScene(unittest.TestCase):
+    def testGivenSimpleScene_shouldHaveFeatureFlagsToRemoveUnusedFeatures(self):
+        material = ScatteringMaterial(2, 0.8, 0.8, 1.4)
+        scene = ScatteringScene([Cube(2, material=material)], worldMaterial=ScatteringMaterial(1, 0.1, 0.8, 1))
+
+        flags = CLScene(scene, nWorkUnits=10).getFeatureFlags()
+
+        self.assertEqual("1", flags["N_SOLIDS"])
+        self.assertIn("NO_DETECTORS", flags)
+        self.assertIn("NO_SMOOTHING", flags)
+        self.assertIn("NO_ZERO_MU_T", flags)
+        self.assertAlmostEqual(0.8, float(flags["CONSTANT_G"].rstrip("f")), places=6)
+
+    def testGivenSceneWithDetectorsAndSmoothSolids_shouldKeepTheseFeatures(self):
+        material = ScatteringMaterial(2, 0.8, 0.8, 1.4)
+        sphere = Sphere(1, material=material, smooth=True, label="sphere")
+        detector = Cube(1, position=Vector(5, 0, 0), label="detector").asDetector()
+        scene = ScatteringScene([sphere, detector])
+
+        flags = CLScene(scene, nWorkUnits=10).getFeatureFlags()
+
+        self.assertNotIn("NO_DETECTORS", flags)
+        self.assertNotIn("NO_SMOOTHING", flags)
+
+    def testGivenMaterialsWithDifferentAnisotropies_shouldNotHaveConstantG(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        sphere = Sphere(1, material=ScatteringMaterial(2, 0.8, 0.5, 1.4), label="sphere")
+        scene = ScatteringScene([cube, sphere])
+
+        flags = CLScene(scene, nWorkUnits=10).getFeatureFlags()
+
+        self.assertEqual("2", flags["N_SOLIDS"])
+        self.assertNotIn("CONSTANT_G", flags)
+
+    def testGivenVacuumWorld_shouldIgnoreItsAnisotropyButKeepZeroMuTBranches(self):
+        cube = Cube(4, material=ScatteringMaterial(2, 0.8, 0.8, 1.4), label="cube")
+        scene = ScatteringScene([cube], worldMaterial=ScatteringMaterial(g=0.2))
+
+        flags = CLScene(scene, nWorkUnits=10).getFeatureFlags()
+
+        self.assertNotIn("NO_ZERO_MU_T", flags)
+        self.assertIn("CONSTANT_G", flags)
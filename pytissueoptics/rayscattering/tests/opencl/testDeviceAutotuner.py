@@ -0,0 +1,25 @@
+import unittest
+
+from pytissueoptics.rayscattering.opencl import CONFIG, OPENCL_OK
+from pytissueoptics.rayscattering.opencl.utils.deviceAutotuner import (
+    BATCH_LOAD_FACTOR_CANDIDATES,
+    WORK_UNITS_CANDIDATES,
+    DeviceAutotuner,
+)
+
+
+@unittest.skipIf(not OPENCL_OK, "OpenCL device not available.")
+class TestDeviceAutotuner(unittest.TestCase):
+    def testGivenNoTimeBudget_shouldOnlyMeasureFirstCandidate(self):
+        profile = DeviceAutotuner(CONFIG.device, timeBudget=0, verbose=False).run()
+
+        self.assertEqual(WORK_UNITS_CANDIDATES[0], profile.N_WORK_UNITS)
+        self.assertEqual(BATCH_LOAD_FACTOR_CANDIDATES[0], profile.BATCH_LOAD_FACTOR)
+        self.assertTrue(profile.timePerPhoton > 0)
+
+    def testWhenRun_shouldRestoreGlobalConfig(self):
+        previousValues = (CONFIG.N_WORK_UNITS, CONFIG.BATCH_LOAD_FACTOR, CONFIG.MAX_MEMORY_MB)
+
+        DeviceAutotuner(CONFIG.device, timeBudget=0, verbose=False).run()
+
+        self.assertEqual(previousValues, (CONFIG.N_WORK_UNITS, CONFIG.BATCH_LOAD_FACTOR, CONFIG.MAX_MEMORY_MB))
@@ -0,0 +1,34 @@
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from pytissueoptics.rayscattering.opencl.utils import PhotonScheduler
+
+
+class TestPhotonScheduler(unittest.TestCase):
+    def testWhenClaim_shouldReturnConsecutivePhotonRanges(self):
+        scheduler = PhotonScheduler(10)
+
+        self.assertEqual((0, 4), scheduler.claim(4))
+        self.assertEqual((4, 4), scheduler.claim(4))
+        self.assertEqual(2, scheduler.photonsRemaining)
+
+    def testWhenClaimMorePhotonsThanRemaining_shouldOnlyReturnRemainingPhotons(self):
+        scheduler = PhotonScheduler(10)
+        scheduler.claim(8)
+
+        self.assertEqual((8, 2), scheduler.claim(4))
+        self.assertEqual((10, 0), scheduler.claim(4))
+        self.assertEqual(0, scheduler.photonsRemaining)
+
+    def testWhenClaimFromMultipleThreads_shouldClaimEachPhotonOnce(self):
+        scheduler = PhotonScheduler(10000)
+
+        pool = ThreadPool(4)
+        try:
+            claims = pool.map(lambda _: scheduler.claim(7), range(2000))
+        finally:
+            pool.close()
+            pool.join()
+
+        claimedPhotons = sorted(i for start, count in claims for i in range(start, start + count))
+        self.assertEqual(list(range(10000)), claimedPhotons)
@@ -109,6 +109,17 @@ class TestStats(unittest.TestCase):
 
                 self.assertEqual(self.EXPECTED_REPORT_LINES, reportLines)
 
+    def testGivenEnergyTallyWithoutDataPoints_whenReport_shouldPrintTheSameReportFromTheTally(self):
+        logger = self.makeTestCubeLogger(tallyEnergy=True, logDataPoints=False)
+        self.stats = Stats(logger)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            self.stats.report()
+            reportLines = mock_stdout.getvalue().splitlines()
+
+        self.assertEqual(0, logger.nDataPoints)
+        self.assertEqual(self.EXPECTED_REPORT_LINES, reportLines)
+
     def testWhenReportToFile_shouldWriteReportToFile(self):
         with tempfile.TemporaryDirectory() as tempDir:
             filename = os.path.join(tempDir, "report.txt")
@@ -127,7 +138,9 @@ class TestStats(unittest.TestCase):
             self.stats.report(solidLabel="non-existing")
 
     @staticmethod
-    def makeTestCubeLogger(keep3D=True, sourceSolidLabel=None, noViews=False) -> EnergyLogger:
+    def makeTestCubeLogger(
+        keep3D=True, sourceSolidLabel=None, noViews=False, tallyEnergy=False, logDataPoints=True
+    ) -> EnergyLogger:
         """We log a few points taken from a unit cube centered at the origin where a single photon
         was propagated. We log one point entering front surface at z=0 with weight=1, then 8 points
         of weight 0.1 centered from z=0.1 to z=0.8, and one point exiting back surface at z=1 with
@@ -135,7 +148,7 @@ class TestStats(unittest.TestCase):
         """
         cube = Cube(1, position=Vector(0, 0, 0.5), material=ScatteringMaterial())
         scene = ScatteringScene([cube])
-        logger = EnergyLogger(scene, keep3D=keep3D)
+        logger = EnergyLogger(scene, keep3D=keep3D, tallyEnergy=tallyEnergy, logDataPoints=logDataPoints)
         if noViews:
             logger = EnergyLogger(scene, keep3D=keep3D, views=[])
         solidInteraction = InteractionKey("cube")
@@ -7,6 +7,12 @@ from mockito import mock, verify, when
 
 from pytissueoptics.rayscattering import EnergyLogger, PencilPointSource, Photon
 from pytissueoptics.rayscattering.materials import ScatteringMaterial
+from pytissueoptics.rayscattering.opencl.buffers.sourceCL import (
+    DIRECTIONAL_SOURCE,
+    DIVERGENT_SOURCE,
+    ISOTROPIC_SOURCE,
+    PENCIL_SOURCE,
+)
 from pytissueoptics.rayscattering.scatteringScene import ScatteringScene
 from pytissueoptics.rayscattering.source import DirectionalSource, DivergentSource, IsotropicPointSource, Source
 from pytissueoptics.scene.geometry import Environment, Vector
@@ -128,6 +134,15 @@ class TestPencilSource(unittest.TestCase):
         for photon in pencilSource.photons:
             self.assertEqual(sourcePosition, photon.position)
 
+    def testShouldDescribeItselfAsAPencilSource(self):
+        pencilSource = PencilPointSource(
+            position=Vector(3, 3, 0), direction=Vector(0, 0, 1), N=10, useHardwareAcceleration=False
+        )
+        sourceInfo = pencilSource.getCLInfo()
+        self.assertEqual(PENCIL_SOURCE, sourceInfo.type)
+        self.assertEqual(Vector(3, 3, 0), sourceInfo.position)
+        self.assertEqual(Vector(0, 0, 1), sourceInfo.direction)
+
 
 class TestIsotropicPointSource(unittest.TestCase):
     def testShouldHavePhotonsAllPositionedAtTheSourcePosition(self):
@@ -146,6 +161,12 @@ class TestIsotropicPointSource(unittest.TestCase):
         source2 = IsotropicPointSource(position=Vector(1, 0, 0), N=1, useHardwareAcceleration=False)
         self.assertNotEqual(hash(source1), hash(source2))
 
+    def testShouldDescribeItselfAsAnIsotropicSource(self):
+        pointSource = IsotropicPointSource(position=Vector(3, 3, 0), N=10, useHardwareAcceleration=False)
+        sourceInfo = pointSource.getCLInfo()
+        self.assertEqual(ISOTROPIC_SOURCE, sourceInfo.type)
+        self.assertEqual(Vector(3, 3, 0), sourceInfo.position)
+
 
 class TestDirectionalSource(unittest.TestCase):
     def testShouldHavePhotonsAllPointingInTheSourceDirection(self):
@@ -187,6 +208,18 @@ class TestDirectionalSource(unittest.TestCase):
         source2 = DirectionalSource(position=Vector(), direction=Vector(1, 0, 0), diameter=2, N=1)
         self.assertNotEqual(hash(source1), hash(source2))
 
+    def testShouldDescribeItselfAsADirectionalSourceWithOrthogonalAxes(self):
+        direction = Vector(0, 1, 0)
+        directionalSource = DirectionalSource(
+            position=Vector(), direction=direction, diameter=2, N=10, useHardwareAcceleration=False
+        )
+        sourceInfo = directionalSource.getCLInfo()
+        self.assertEqual(DIRECTIONAL_SOURCE, sourceInfo.type)
+        self.assertEqual(2, sourceInfo.diameter)
+        self.assertAlmostEqual(0, sourceInfo.xAxis.dot(direction))
+        self.assertAlmostEqual(0, sourceInfo.yAxis.dot(direction))
+        self.assertAlmostEqual(0, sourceInfo.xAxis.dot(sourceInfo.yAxis))
+
 
 class TestDivergentSource(unittest.TestCase):
     def testShouldHavePhotonsUniformlyPositionedInsideTheSourceDiameter(self):
@@ -252,3 +285,17 @@ class TestDivergentSource(unittest.TestCase):
             position=Vector(), direction=sourceDirection, diameter=1, divergence=divergence2, N=1
         )
         self.assertNotEqual(hash(divergentSource1), hash(divergentSource2))
+
+    def testShouldDescribeItselfAsADivergentSource(self):
+        divergentSource = DivergentSource(
+            position=Vector(),
+            direction=Vector(1, 0, 0),
+            diameter=1,
+            divergence=0.3,
+            N=10,
+            useHardwareAcceleration=False,
+        )
+        sourceInfo = divergentSource.getCLInfo()
+        self.assertEqual(DIVERGENT_SOURCE, sourceInfo.type)
+        self.assertEqual(1, sourceInfo.diameter)
+        self.assertEqual(0.3, sourceInfo.divergence)
@@ -6,8 +6,8 @@ from unittest.mock import patch
 import numpy as np
 from mockito import mock, verify, when
 
-from pytissueoptics import EnergyLogger, Logger, ScatteringMaterial, ScatteringScene, Vector
-from pytissueoptics.rayscattering.opencl import CONFIG, OPENCL_OK, IPPTable
+from pytissueoptics import DirectionalSource, EnergyLogger, ScatteringMaterial, ScatteringScene, Vector
+from pytissueoptics.rayscattering.opencl import OPENCL_OK, IPPTable
 from pytissueoptics.rayscattering.opencl.CLPhotons import CLPhotons
 from pytissueoptics.rayscattering.source import Source
 from pytissueoptics.scene.geometry import Environment
@@ -38,17 +38,6 @@ class TestSourceAccelerated(unittest.TestCase):
         source = SinglePhotonSourceAccelerated()
         self.assertIsNotNone(source.photons)
 
-    @tempTablePath
-    @patch("pytissueoptics.rayscattering.source.CLPhotons")
-    def testWhenPropagateNewExperiment_shouldWarnThatIPPWillBeEstimated(self, _CLPhotonsClassMock):
-        _CLPhotonsClassMock.return_value = self.photons
-        scene = self._createMockScene()
-        logger = self._createMockLogger()
-        source = SinglePhotonSourceAccelerated()
-
-        with self.assertWarns(UserWarning):
-            source.propagate(scene, logger, showProgress=False)
-
     @tempTablePath
     @patch("pytissueoptics.rayscattering.source.CLPhotons")
     def testWhenPropagate_shouldSetCorrectPhotonContext(self, _CLPhotonsClassMock):
@@ -57,8 +46,7 @@ class TestSourceAccelerated(unittest.TestCase):
         logger = self._createMockLogger()
         source = SinglePhotonSourceAccelerated()
 
-        with self.assertWarns(UserWarning):
-            source.propagate(scene, logger, showProgress=False)
+        source.propagate(scene, logger, showProgress=False)
 
         verify(self.photons).setContext(scene, self.SOURCE_ENV, logger=logger)
 
@@ -80,26 +68,25 @@ class TestSourceAccelerated(unittest.TestCase):
 
     @tempTablePath
     @patch("pytissueoptics.rayscattering.source.CLPhotons")
-    @patch("pytissueoptics.rayscattering.source.Logger")
-    def testGivenExperimentNotInIPPTable_whenPropagate_shouldEstimateIPP(self, _LoggerClassMock, _CLPhotonsClassMock):
+    def testGivenExperimentNotInIPPTable_whenPropagate_shouldUseIPPEstimateWithoutMeasuringIt(
+        self, _CLPhotonsClassMock
+    ):
         _CLPhotonsClassMock.return_value = self.photons
         source = SinglePhotonSourceAccelerated()
-
-        # First, an IPP estimate is taken from the scene
         IPPEstimate = 80
         scene = self._createMockScene(IPPEstimate=IPPEstimate)
 
-        # Then, a test is run with base Logger to measure IPP using 1000 photons (IPP_TEST_N_PHOTONS)
-        IPPMeasuredInTest = 100
-        estimationLogger = mock(Logger)
-        estimationLogger.nDataPoints = CONFIG.IPP_TEST_N_PHOTONS * IPPMeasuredInTest
-        _LoggerClassMock.return_value = estimationLogger
-
-        with self.assertWarns(UserWarning):
-            source.propagate(scene, self._createMockLogger(), showProgress=False)
+        source.propagate(scene, self._createMockLogger(), showProgress=False)
 
+        verify(self.photons, times=1).propagate(...)
         verify(self.photons).propagate(IPP=IPPEstimate, verbose=False)
-        verify(self.photons).propagate(IPP=IPPMeasuredInTest, verbose=False)
+
+    @patch("pytissueoptics.rayscattering.source.CLPhotons")
+    def testGivenSourceWithCLInfo_shouldLoadPhotonsFromSourceParameters(self, _CLPhotonsClassMock):
+        _CLPhotonsClassMock.return_value = self.photons
+        source = DirectionalSource(Vector(0, 0, 0), Vector(0, 0, 1), diameter=1, N=10)
+
+        _CLPhotonsClassMock.assert_called_once_with(sourceInfo=source.getCLInfo(), N=10)
 
     def _createMockScene(self, IPPEstimate=10):
         scene = mock(ScatteringScene)
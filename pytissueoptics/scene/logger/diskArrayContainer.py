@@ -0,0 +1,118 @@
+import os
+import struct
+from typing import Iterator, Optional
+
+import numpy as np
+
+HEADER_SIZE = 128
+CHUNK_SIZE = 2**22
+
+
+class DiskArrayContainer:
+    """
+    Rows of data stored in an append-only `.npy` file instead of in memory, with the same interface as the
+    `ListArrayContainer`. Each append writes the new rows at the end of the file and updates the shape in its header,
+    which has a fixed size so that the file is always a valid `.npy` file. The data is returned as a read-only
+    `np.memmap` of the file, so that it is only read from the disk when accessed, and can be processed chunk by chunk
+    with `iterChunks`.
+
+    The type of the data is the given `dtype`, or else the type of the first array appended (float64 for lists), and
+    the next rows are converted to this type.
+    """
+
+    def __init__(self, filePath: str, dtype: np.dtype = None):
+        self._filePath = filePath
+        self._length = 0
+        self._width: Optional[int] = None
+        self._dtype: Optional[np.dtype] = None if dtype is None else np.dtype(dtype)
+        self._data: Optional[np.memmap] = None
+
+        with open(self._filePath, "wb"):
+            pass
+
+    @property
+    def filePath(self) -> str:
+        return self._filePath
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def width(self) -> Optional[int]:
+        return self._width
+
+    @property
+    def nBytes(self) -> int:
+        """Number of bytes of the rows held in memory, which is always 0 since the rows are stored in the file."""
+        return 0
+
+    def _assertSameWidth(self, data: np.ndarray):
+        if self._width is None:
+            return
+        assert data.shape[1] == self._width
+
+    def append(self, item):
+        if isinstance(item, list):
+            item = np.array([item], dtype=self._dtype or np.float64)
+        self._assertSameWidth(item)
+        if self._width is None:
+            self._dtype = self._dtype or item.dtype
+            self._width = item.shape[1]
+
+        with open(self._filePath, "r+b") as file:
+            file.seek(HEADER_SIZE + self._length * self._rowSize)
+            file.write(np.ascontiguousarray(item, dtype=self._dtype).tobytes())
+            self._length += item.shape[0]
+            file.seek(0)
+            file.write(self._makeHeader())
+        self._data = None
+
+    def extend(self, other):
+        for chunk in other.iterChunks():
+            self.append(chunk)
+
+    def getData(self) -> Optional[np.ndarray]:
+        if self._width is None:
+            return None
+        if self._data is None:
+            if self._length == 0:
+                return np.empty((0, self._width), dtype=self._dtype)
+            self._data = np.memmap(
+                self._filePath, dtype=self._dtype, mode="r", offset=HEADER_SIZE, shape=(self._length, self._width)
+            )
+        return self._data
+
+    def iterChunks(self, startRow: int = 0, chunkSize: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+        """
+        Yields the data from the given row in consecutive chunks of at most `chunkSize` rows, which are read from the
+        disk on access.
+        """
+        data = self.getData()
+        if data is None:
+            return
+        for start in range(startRow, self._length, chunkSize):
+            yield data[start : start + chunkSize]
+
+    @property
+    def _rowSize(self) -> int:
+        return self._width * self._dtype.itemsize
+
+    def _makeHeader(self) -> bytes:
+        """Header of a version 1.0 `.npy` file, padded to `HEADER_SIZE` bytes."""
+        header = {
+            "descr": np.lib.format.dtype_to_descr(self._dtype),
+            "fortran_order": False,
+            "shape": (self._length, self._width),
+        }
+        text = repr(header).ljust(HEADER_SIZE - 11) + "\n"
+        return np.lib.format.magic(1, 0) + struct.pack("<H", len(text)) + text.encode("latin1")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if not os.path.exists(self._filePath):
+            raise FileNotFoundError(f"The data file '{self._filePath}' of the logger is missing.")
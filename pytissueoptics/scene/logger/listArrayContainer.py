@@ -1,31 +1,56 @@
-import copy
-from typing import Optional
+import itertools
+from typing import Iterator, List, Optional
 
 import numpy as np
 
 
 class ListArrayContainer:
+    """
+    Rows of data appended either one at a time as lists, or many at a time as 2D arrays. The arrays are kept as a list
+    of blocks which are only concatenated when the data is requested, so that appending many arrays only copies each
+    row once. The data is cached until the next append. The rows are kept in the order they were appended, so that new
+    rows are always at the end of the data, but the rows of another container appended as lists come first when
+    extending.
+
+    The blocks are never modified in place, so they can be shared between containers.
+    """
+
     def __init__(self):
-        self._list = None
-        self._array = None
+        self._list: Optional[list] = None
+        self._blocks: List[np.ndarray] = []
+        self._arrayLength = 0
+        self._data: Optional[np.ndarray] = None
 
     def __len__(self):
-        length = 0
+        length = self._arrayLength
         if self._list is not None:
             length += len(self._list)
-        if self._array is not None:
-            length += self._array.shape[0]
         return length
 
+    @property
+    def width(self) -> Optional[int]:
+        return self._width
+
     @property
     def _width(self):
         if self._list is not None:
             return len(self._list[0])
-        elif self._array is not None:
-            return self._array.shape[1]
+        elif self._blocks:
+            return self._blocks[0].shape[1]
         else:
             return None
 
+    @property
+    def nBytes(self) -> int:
+        """Number of bytes of the rows held in memory. The memory-mapped blocks are not counted."""
+        return self._countBytes(self._blocks)
+
+    def _countBytes(self, blocks: List[np.ndarray]) -> int:
+        nBytes = sum(block.nbytes for block in blocks if not isinstance(block, np.memmap))
+        if self._list is not None:
+            nBytes += len(self._list) * len(self._list[0]) * np.dtype(np.float64).itemsize
+        return nBytes
+
     def _assertSameWidth(self, data):
         if self._width is None:
             return
@@ -36,31 +61,81 @@ class ListArrayContainer:
 
     def append(self, item):
         self._assertSameWidth(item)
-        if isinstance(item, list):
+        if isinstance(item, list) and self._blocks:
+            # A row appended after arrays is stored as a block to keep it at the end of the data.
+            self._appendBlock(np.array([item]))
+        elif isinstance(item, list):
             if self._list is None:
-                self._list = [copy.deepcopy(item)]
-            else:
-                self._list.append(item)
+                self._list = []
+            self._list.append(list(item))
         elif isinstance(item, np.ndarray):
-            if self._array is None:
-                self._array = copy.deepcopy(item)
-            else:
-                self._array = np.concatenate((self._array, item), axis=0)
+            self._appendBlock(np.array(item, copy=True))
+        self._data = None
 
-    def extend(self, other: "ListArrayContainer"):
-        if self._list is None:
-            self._list = copy.deepcopy(other._list)
-        elif other._list is not None:
-            self._list.extend(other._list)
-        if other._array is not None:
-            self.append(other._array)
+    def _appendBlock(self, block: np.ndarray):
+        self._blocks.append(block)
+        self._arrayLength += block.shape[0]
+
+    def extend(self, other):
+        if not isinstance(other, ListArrayContainer):
+            # The data of other containers, like a DiskArrayContainer, is read-only and can be shared as a block.
+            data = other.getData()
+            if data is not None:
+                self._appendBlock(data)
+                self._data = None
+            return
+        if other._list is not None:
+            if self._list is None:
+                self._list = []
+            self._list.extend(list(row) for row in other._list)
+        for block in other._blocks:
+            self._appendBlock(block)
+        self._data = None
 
     def getData(self) -> Optional[np.ndarray]:
-        if self._list is None and self._array is None:
-            return None
+        if self._data is None:
+            self._data = self._mergeData()
+        return self._data
+
+    def iterChunks(self, startRow: int = 0) -> Iterator[np.ndarray]:
+        """
+        Yields the data from the given row, in the same order as `getData`. The list rows and each block are yielded
+        as separate chunks without concatenating the blocks, so that iterating over the new rows is not affected by
+        the size of the data.
+        """
+        chunks = [] if self._list is None else [np.array(self._list)]
+        for chunk in itertools.chain(chunks, self._blocks):
+            if startRow < len(chunk):
+                yield chunk[startRow:]
+            startRow = max(0, startRow - len(chunk))
+
+    def _mergeData(self) -> Optional[np.ndarray]:
+        array = self._consolidateBlocks()
         if self._list is None:
-            return self._array
-        if self._array is None:
+            return array
+        if array is None:
             return np.array(self._list)
-        mergedData = np.concatenate((np.array(self._list), self._array), axis=0)
-        return mergedData
+        return np.concatenate((np.array(self._list), array), axis=0)
+
+    def _consolidateBlocks(self) -> Optional[np.ndarray]:
+        """Replaces the blocks by their concatenation, which is done once until new blocks are appended."""
+        if not self._blocks:
+            return None
+        if len(self._blocks) > 1:
+            self._blocks = [np.concatenate(self._blocks, axis=0)]
+        return self._blocks[0]
+
+    def __getstate__(self):
+        self._consolidateBlocks()
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    def __setstate__(self, state):
+        if "_array" in state:
+            # Container saved before the arrays were stored as blocks.
+            array = state.pop("_array")
+            state["_blocks"] = [] if array is None else [array]
+            state["_arrayLength"] = 0 if array is None else array.shape[0]
+            state["_data"] = None
+        self.__dict__.update(state)
@@ -8,7 +8,9 @@ from typing import Callable, Dict, List, Optional, Union
 import numpy as np
 
 from pytissueoptics.scene.geometry import Vector
+from pytissueoptics.scene.logger.diskArrayContainer import DiskArrayContainer
 from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+from pytissueoptics.scene.logger.loggerArchive import LoggerArchive
 
 
 @dataclass(frozen=True)
@@ -33,22 +35,34 @@ class InteractionData:
     points: ListArrayContainer = None
     dataPoints: ListArrayContainer = None
     segments: ListArrayContainer = None
+    photonIDs: ListArrayContainer = None
 
 
 class DataType(Enum):
     POINT = "points"
     DATA_POINT = "dataPoints"
     SEGMENT = "segments"
+    PHOTON_ID = "photonIDs"
 
 
 class Logger:
     DEFAULT_LOGGER_PATH = "simulation.log"
 
-    def __init__(self, fromFilepath: str = None):
+    def __init__(self, fromFilepath: str = None, storageDirectory: str = None):
+        """
+        :param fromFilepath: (Optional) Load the logger from the given file.
+        :param storageDirectory: (Optional) Store the data of each interaction key in append-only `.npy` files in
+                this directory instead of in memory. The data is then returned as read-only memory-mapped arrays.
+        """
         self._data: Dict[InteractionKey, InteractionData] = {}
         self.info: dict = {}
         self._filepath = None
         self._labels = {}
+        self._storageDirectory = storageDirectory
+        self._nStorageFiles = 0
+
+        if storageDirectory:
+            os.makedirs(storageDirectory, exist_ok=True)
 
         if fromFilepath:
             self.load(fromFilepath)
@@ -79,10 +93,7 @@ class Logger:
         self._appendData([point.x, point.y, point.z], DataType.POINT, key)
 
     def logDataPoint(self, value: float, position: Vector, key: InteractionKey, ID: Optional[int] = None):
-        dataPoint = [value, *position.array]
-        if ID is not None:
-            dataPoint.append(ID)
-        self._appendData(dataPoint, DataType.DATA_POINT, key)
+        self._appendDataPoints([value, *position.array], None if ID is None else [np.uint64(ID)], key)
 
     def logSegment(self, start: Vector, end: Vector, key: InteractionKey = None):
         self._appendData([start.x, start.y, start.z, end.x, end.y, end.z], DataType.SEGMENT, key)
@@ -92,32 +103,79 @@ class Logger:
         assert array.shape[1] == 3 and array.ndim == 2, "Point array must be of shape (n, 3)"
         self._appendData(array, DataType.POINT, key)
 
-    def logDataPointArray(self, array: np.ndarray, key: InteractionKey):
+    def logDataPointArray(self, array: np.ndarray, key: InteractionKey, photonIDs: Optional[np.ndarray] = None):
         """'array' must be of shape (n, 4) or (n, 5) where the second axis is (value, x, y, z)
-        or (value, x, y, z, photonID). The photonID column is optional."""
+        or (value, x, y, z, photonID). The photonID column is optional. The photon IDs can also be given as a separate
+        integer array of shape (n,), which keeps them exact beyond the precision of the type of the data points."""
         assert array.shape[1] in [4, 5] and array.ndim == 2, "Data point array must be of shape (n, 4) or (n, 5)"
-        self._appendData(array, DataType.DATA_POINT, key)
+        if array.shape[1] == 5:
+            assert photonIDs is None, "Photon IDs cannot be given both as a column and as a separate array."
+            array, photonIDs = array[:, :4], array[:, 4]
+        if photonIDs is not None:
+            assert len(photonIDs) == len(array), "There must be one photon ID per data point."
+            photonIDs = np.asarray(photonIDs, dtype=np.uint64).reshape(-1, 1)
+        self._appendDataPoints(array, photonIDs, key)
+
+    def logDataPointArrays(self, keyArrays: Dict[InteractionKey, np.ndarray]):
+        """Logs the data point arrays of many interaction keys at once. See `logDataPointArray`."""
+        for key, array in keyArrays.items():
+            self.logDataPointArray(array, key)
 
     def logSegmentArray(self, array: np.ndarray, key: InteractionKey = None):
         """'array' must be of shape (n, 6) where the second axis is (x1, y1, z1, x2, y2, z2)"""
         assert array.shape[1] == 6 and array.ndim == 2, "Segment array must be of shape (n, 6)"
         self._appendData(array, DataType.SEGMENT, key)
 
+    def _appendDataPoints(self, data: Union[List, np.ndarray], photonIDs, key: InteractionKey):
+        """
+        The photon IDs are stored as unsigned 64-bit integers in their own container, with the same rows as the data
+        points. The photon IDs of a key are either always or never logged.
+        """
+        self._validateKey(key)
+        interactionData = self._data[key]
+        if interactionData.dataPoints is not None and len(interactionData.dataPoints) > 0:
+            hasPhotonIDs = interactionData.photonIDs is not None and len(interactionData.photonIDs) > 0
+            assert hasPhotonIDs == (photonIDs is not None), "Cannot mix data points with and without photon IDs."
+        self._appendData(data, DataType.DATA_POINT, key)
+        if photonIDs is not None:
+            self._appendData(photonIDs, DataType.PHOTON_ID, key)
+
     def _appendData(self, data: Union[List, np.ndarray], dataType: DataType, key: InteractionKey = None):
         if key is None:
             key = InteractionKey(None, None)
         self._validateKey(key)
         previousData = getattr(self._data[key], dataType.value)
         if previousData is None:
-            previousData = ListArrayContainer()
+            previousData = self._createContainer(dataType)
             previousData.append(data)
             setattr(self._data[key], dataType.value, previousData)
         else:
             previousData.append(data)
 
+    def _createContainer(
+        self, dataType: DataType, storageDirectory: str = None
+    ) -> Union[ListArrayContainer, DiskArrayContainer]:
+        """Creates a container in memory, or in a file of the given storage directory or else of the logger's one."""
+        storageDirectory = storageDirectory or self._storageDirectory
+        if storageDirectory is None:
+            return ListArrayContainer()
+        # The files of the data previously stored in this directory, like the data of a loaded logger, are kept.
+        filePath = None
+        while filePath is None or os.path.exists(filePath):
+            self._nStorageFiles += 1
+            filePath = os.path.join(storageDirectory, f"{dataType.value}-{self._nStorageFiles}.npy")
+        return DiskArrayContainer(filePath, dtype=np.uint64 if dataType == DataType.PHOTON_ID else None)
+
+    @property
+    def storageDirectory(self) -> Optional[str]:
+        return self._storageDirectory
+
     def _validateKey(self, key: InteractionKey):
         if key not in self._data:
             self._data[key] = InteractionData()
+        self._registerLabels(key)
+
+    def _registerLabels(self, key: InteractionKey):
         if key.solidLabel is None:
             return
         if key.solidLabel not in self._labels:
@@ -132,8 +190,23 @@ class Logger:
 
     def getRawDataPoints(self, key: InteractionKey = None) -> np.ndarray:
         """All raw 3D data points recorded for this InteractionKey (not binned). Array of shape (n, 4) or (n, 5) where
-        the second axis is (value, x, y, z) or (value, x, y, z, photonID) if photon IDs were logged."""
-        return self._getData(DataType.DATA_POINT, key)
+        the second axis is (value, x, y, z) or (value, x, y, z, photonID) if photon IDs were logged. With photon IDs,
+        the array is of type float64, which is exact for IDs up to 2^53. See `getRawPhotonIDs` for the integer IDs."""
+        dataPoints = self._getData(DataType.DATA_POINT, key)
+        if dataPoints is None:
+            return None
+        photonIDs = self.getRawPhotonIDs(key)
+        if photonIDs is None or len(photonIDs) != len(dataPoints):
+            return dataPoints
+        return np.column_stack((dataPoints.astype(np.float64), photonIDs))
+
+    def getRawPhotonIDs(self, key: InteractionKey = None) -> Optional[np.ndarray]:
+        """Photon ID of each raw data point of this InteractionKey, as an array of shape (n,) and of type uint64, or
+        None if the photon IDs were not logged."""
+        photonIDs = self._getData(DataType.PHOTON_ID, key)
+        if photonIDs is None:
+            return None
+        return photonIDs[:, 0]
 
     def getSegments(self, key: InteractionKey = None) -> np.ndarray:
         return self._getData(DataType.SEGMENT, key)
@@ -145,6 +218,8 @@ class Logger:
             if not self._keyExists(key):
                 return None
             container: ListArrayContainer = getattr(self._data[key], dataType.value)
+            if container is None:
+                return None
             return transform(key, container.getData())
         else:
             container = ListArrayContainer()
@@ -171,13 +246,23 @@ class Logger:
             return True
         return False
 
-    def save(self, filepath: str = None):
+    def save(self, filepath: str = None, compress: bool = False):
+        """
+        Saves the logger to the given file, or to the file it was loaded from. When the path has the `.ptlog` (as a
+        directory) or `.zip` extension, the logger is saved in the columnar format of `LoggerArchive`, in which each
+        array is only read when accessed after loading. Zip archives can be compressed. Other paths are pickled.
+        """
         if filepath is None and self._filepath is None:
             filepath = self.DEFAULT_LOGGER_PATH
             warnings.warn(f"No filepath specified. Saving to {filepath}.")
         elif filepath is None:
             filepath = self._filepath
 
+        if LoggerArchive.isArchive(filepath):
+            manifest = {"info": self.info, "labels": self._labels}
+            LoggerArchive(filepath).write(self._data, manifest, compress=compress)
+            return
+
         with open(filepath, "wb") as file:
             pickle.dump((self._data, self.info, self._labels), file)
 
@@ -191,8 +276,37 @@ class Logger:
             )
             return
 
-        with open(filepath, "rb") as file:
-            self._data, self.info, self._labels = pickle.load(file)
+        if LoggerArchive.isArchive(filepath):
+            archive = LoggerArchive(filepath)
+            manifest = archive.readManifest()
+            self._data = self._readArchiveData(archive, manifest)
+            self.info, self._labels = manifest["info"], manifest["labels"]
+        else:
+            with open(filepath, "rb") as file:
+                self._data, self.info, self._labels = pickle.load(file)
+        self._separatePhotonIDs()
+
+    def _separatePhotonIDs(self):
+        """Moves the photon IDs of loggers saved before they had their own container out of the data points."""
+        for interactionData in self._data.values():
+            dataPoints = interactionData.dataPoints
+            if dataPoints is None or interactionData.photonIDs is not None or len(dataPoints) == 0:
+                continue
+            if dataPoints.width != 5:
+                continue
+            interactionData.dataPoints = self._createContainer(DataType.DATA_POINT)
+            interactionData.photonIDs = self._createContainer(DataType.PHOTON_ID)
+            for chunk in dataPoints.iterChunks():
+                interactionData.dataPoints.append(np.array(chunk[:, :4]))
+                interactionData.photonIDs.append(chunk[:, 4:].astype(np.uint64))
+
+    @staticmethod
+    def _readArchiveData(archive: LoggerArchive, manifest: dict) -> Dict[InteractionKey, InteractionData]:
+        data = {}
+        for keyEntry in manifest["keys"]:
+            key = InteractionKey(keyEntry["solidLabel"], keyEntry["surfaceLabel"])
+            data[key] = InteractionData(**archive.readContainers(keyEntry))
+        return data
 
     @property
     def hasFilePath(self):
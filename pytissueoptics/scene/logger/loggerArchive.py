@@ -0,0 +1,217 @@
+import json
+import os
+import pickle
+import shutil
+import zipfile
+from typing import IO, Dict, Optional
+
+import numpy as np
+
+from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+
+FORMAT_NAME = "pytissueoptics-logger"
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+DIRECTORY_EXTENSION = ".ptlog"
+ZIP_EXTENSION = ".zip"
+DATA_TYPES = ["points", "dataPoints", "segments", "photonIDs"]
+
+
+class LoggerArchive:
+    """
+    Versioned columnar file format of a logger, as a directory (with the `.ptlog` extension) or a zip file (with the
+    `.zip` extension). The archive contains a JSON manifest with the interaction keys, the number of rows and the type
+    of their arrays, and the information of the logger. Each array of each key is stored in its own `.npy` entry,
+    so that the arrays are only read when their data is first accessed (see `LazyArrayContainer`). The arrays of a
+    directory are memory-mapped when read. The entries of a zip file can be compressed with zlib, in which case they
+    are read in memory. The other objects of the logger, like the views, are pickled in their own entry.
+
+    An archive is written in a temporary location which then replaces the previous archive.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+    @staticmethod
+    def isArchive(path: str) -> bool:
+        return path.endswith(DIRECTORY_EXTENSION) or path.endswith(ZIP_EXTENSION)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def _isZip(self) -> bool:
+        return self._path.endswith(ZIP_EXTENSION)
+
+    def write(self, data: dict, manifest: dict, objects: Dict[str, object] = None, compress: bool = False):
+        """
+        Writes the data of each interaction key with the given manifest fields, which must be JSON serializable, and
+        the given objects, which are pickled. Compression is only available for zip archives.
+        """
+        assert not compress or self._isZip, "Compression is only available for zip archives."
+        keyEntries = []
+        tempPath = self._path + ".tmp"
+        with self._openWriter(tempPath, compress) as writeEntry:
+            for i, (key, interactionData) in enumerate(data.items()):
+                keyEntry = {"solidLabel": key.solidLabel, "surfaceLabel": key.surfaceLabel}
+                for dataType in DATA_TYPES:
+                    container = getattr(interactionData, dataType)
+                    if container is None or len(container) == 0:
+                        continue
+                    entryName = f"data/{i}-{dataType}.npy"
+                    with writeEntry(entryName) as file:
+                        keyEntry[dataType] = self._writeArray(file, container)
+                    keyEntry[dataType]["entry"] = entryName
+                keyEntries.append(keyEntry)
+
+            for name, value in (objects or {}).items():
+                with writeEntry(f"{name}.pkl") as file:
+                    pickle.dump(value, file)
+
+            manifest = {"format": FORMAT_NAME, "version": FORMAT_VERSION, **manifest, "keys": keyEntries}
+            with writeEntry(MANIFEST_NAME) as file:
+                file.write(json.dumps(manifest, indent=2, default=_toJSON).encode("utf-8"))
+
+        if os.path.isdir(self._path):
+            shutil.rmtree(self._path)
+        os.replace(tempPath, self._path)
+
+    def _openWriter(self, path: str, compress: bool):
+        if self._isZip:
+            return _ZipWriter(path, compress)
+        return _DirectoryWriter(path)
+
+    @staticmethod
+    def _writeArray(file: IO, container) -> dict:
+        """Writes the `.npy` entry of the container chunk by chunk, and returns the description of its array."""
+        chunks = list(container.iterChunks())
+        dtype, width = np.result_type(*chunks), chunks[0].shape[1]
+        header = {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (len(container), width),
+        }
+        np.lib.format.write_array_header_1_0(file, header)
+        for chunk in chunks:
+            file.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+        return {"count": len(container), "width": width, "dtype": header["descr"]}
+
+    def readManifest(self) -> dict:
+        manifest = json.loads(self._readEntry(MANIFEST_NAME).decode("utf-8"))
+        if manifest.get("format") != FORMAT_NAME:
+            raise ValueError(f"The file at '{self._path}' is not a logger archive.")
+        if manifest["version"] > FORMAT_VERSION:
+            raise ValueError(
+                f"The logger archive at '{self._path}' has version {manifest['version']}, which is newer than the "
+                f"supported version {FORMAT_VERSION}. Please update PyTissueOptics."
+            )
+        return manifest
+
+    def readContainers(self, keyEntry: dict) -> Dict[str, "LazyArrayContainer"]:
+        """Returns the container of each data type of a key of the manifest, which is only read on first access."""
+        containers = {}
+        for dataType in DATA_TYPES:
+            if dataType in keyEntry:
+                arrayEntry = keyEntry[dataType]
+                containers[dataType] = LazyArrayContainer(
+                    self, arrayEntry["entry"], arrayEntry["count"], arrayEntry["width"]
+                )
+        return containers
+
+    def readObject(self, name: str, default=None):
+        """Returns the pickled object of the given name, or the default if the archive does not contain it."""
+        try:
+            return pickle.loads(self._readEntry(f"{name}.pkl"))
+        except (KeyError, FileNotFoundError):
+            return default
+
+    def readArray(self, entryName: str) -> np.ndarray:
+        if not self._isZip:
+            return np.load(os.path.join(self._path, entryName), mmap_mode="r")
+        with zipfile.ZipFile(self._path) as archive, archive.open(entryName) as file:
+            return np.lib.format.read_array(file)
+
+    def _readEntry(self, entryName: str) -> bytes:
+        if not self._isZip:
+            with open(os.path.join(self._path, entryName), "rb") as file:
+                return file.read()
+        with zipfile.ZipFile(self._path) as archive:
+            return archive.read(entryName)
+
+
+class LazyArrayContainer(ListArrayContainer):
+    """
+    `ListArrayContainer` of an array stored in a `LoggerArchive`, which is only read from the archive when the
+    blocks of the container are first accessed. The number of rows and the width are known from the manifest.
+    """
+
+    def __init__(self, archive: LoggerArchive, entryName: str, length: int, width: int):
+        self._archive: Optional[LoggerArchive] = archive
+        self._entryName = entryName
+        self._storedWidth = width
+        super().__init__()
+        self._arrayLength = length
+
+    @property
+    def _blocks(self):
+        if self._archive is not None:
+            array = self._archive.readArray(self._entryName)
+            self._archive = None
+            self._storedBlocks.insert(0, array)
+        return self._storedBlocks
+
+    @_blocks.setter
+    def _blocks(self, blocks):
+        self._storedBlocks = blocks
+
+    @property
+    def nBytes(self) -> int:
+        # The array is not read from the archive only to count its bytes.
+        return self._countBytes(self._storedBlocks)
+
+    @property
+    def _width(self):
+        if self._archive is not None and self._list is None:
+            return self._storedWidth
+        return super()._width
+
+
+class _DirectoryWriter:
+    def __init__(self, path: str):
+        self._path = path
+
+    def __enter__(self):
+        if os.path.isdir(self._path):
+            shutil.rmtree(self._path)
+        os.makedirs(self._path)
+        return self._openEntry
+
+    def __exit__(self, *args):
+        pass
+
+    def _openEntry(self, entryName: str) -> IO:
+        filePath = os.path.join(self._path, entryName)
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        return open(filePath, "wb")
+
+
+class _ZipWriter:
+    def __init__(self, path: str, compress: bool):
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self._archive = zipfile.ZipFile(path, "w", compression=compression, allowZip64=True)
+
+    def __enter__(self):
+        return self._openEntry
+
+    def __exit__(self, *args):
+        self._archive.close()
+
+    def _openEntry(self, entryName: str) -> IO:
+        return self._archive.open(entryName, "w", force_zip64=True)
+
+
+def _toJSON(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot save the value {value} of type {type(value)} in the manifest of a logger archive.")
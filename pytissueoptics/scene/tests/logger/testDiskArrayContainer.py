@@ -0,0 +1,88 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from pytissueoptics.scene.logger.diskArrayContainer import DiskArrayContainer
+from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
+
+
+class TestDiskArrayContainer(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join(self.tempDir.name, "data.npy")
+        self.container = DiskArrayContainer(self.filePath)
+
+    def tearDown(self):
+        self.container = None
+        self.tempDir.cleanup()
+
+    def testShouldHaveLengthOfZero(self):
+        self.assertEqual(0, len(self.container))
+
+    def testShouldInitializeDataToNone(self):
+        self.assertIsNone(self.container.getData())
+
+    def testWhenAppendingListsAndArrays_shouldHaveTheRowsInTheOrderTheyWereAppended(self):
+        self.container.append(np.array([[1, 2, 3]], dtype=np.float32))
+        self.container.append([4, 5, 6])
+        self.container.append(np.array([[7, 8, 9], [10, 11, 12]]))
+
+        data = self.container.getData()
+
+        self.assertEqual(4, len(self.container))
+        self.assertEqual(np.float32, data.dtype)
+        self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12]], data))
+
+    def testWhenGettingData_shouldReturnAReadOnlyMemoryMapOfTheFile(self):
+        self.container.append(np.array([[1, 2, 3]]))
+
+        data = self.container.getData()
+
+        self.assertIsInstance(data, np.memmap)
+        with self.assertRaises(ValueError):
+            data[0, 0] = 0
+
+    def testWhenAppendingArrayWithMoreColumns_shouldRaiseException(self):
+        self.container.append(np.array([[1, 2, 3]]))
+
+        with self.assertRaises(AssertionError):
+            self.container.append(np.array([[4, 5, 6, 7]]))
+
+    def testShouldWriteAValidNpyFile(self):
+        self.container.append(np.array([[1, 2, 3]]))
+        self.container.append(np.array([[4, 5, 6]]))
+
+        self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6]], np.load(self.filePath)))
+
+    def testWhenIteratingChunks_shouldYieldAllTheDataInChunksOfTheGivenSize(self):
+        self.container.append(np.arange(15).reshape(5, 3))
+
+        chunks = list(self.container.iterChunks(chunkSize=2))
+
+        self.assertEqual([2, 2, 1], [len(chunk) for chunk in chunks])
+        self.assertTrue(np.array_equal(np.arange(15).reshape(5, 3), np.concatenate(chunks)))
+
+    def testWhenExtendingAListArrayContainer_shouldHaveTheDataOfBothContainers(self):
+        self.container.append(np.array([[4, 5, 6]]))
+        listArrayContainer = ListArrayContainer()
+        listArrayContainer.append([1, 2, 3])
+
+        listArrayContainer.extend(self.container)
+
+        self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6]], listArrayContainer.getData()))
+
+    def testShouldNotCountAnyBytesInMemory(self):
+        self.container.append(np.array([[1, 2, 3]]))
+
+        self.assertEqual(0, self.container.nBytes)
+
+    def testShouldBePicklable(self):
+        self.container.append(np.array([[1, 2, 3]]))
+
+        container = pickle.loads(pickle.dumps(self.container))
+        container.append(np.array([[4, 5, 6]]))
+
+        self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6]], container.getData()))
@@ -1,7 +1,11 @@
+import os
+import pickle
+import tempfile
 import unittest
 
 import numpy as np
 
+from pytissueoptics.scene.logger.diskArrayContainer import DiskArrayContainer
 from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
 
 
@@ -70,3 +74,80 @@ class TestListArrayContainer(unittest.TestCase):
 
         self.otherListArrayContainer.append(np.array([[4, 5, 6]]))
         self.assertTrue(np.array_equal(np.array([[1, 2, 3]]), self.listArrayContainer.getData()))
+
+    def testWhenAppendingManyArrays_shouldHaveTheirConcatenatedData(self):
+        arrays = [np.full((i + 1, 3), i) for i in range(20)]
+        for array in arrays:
+            self.listArrayContainer.append(array)
+
+        self.assertEqual(210, len(self.listArrayContainer))
+        self.assertTrue(np.array_equal(np.concatenate(arrays), self.listArrayContainer.getData()))
+
+    def testWhenAppendingArray_shouldNotKeepAReferenceOfTheArray(self):
+        array = np.array([[1, 2, 3]])
+        self.listArrayContainer.append(array)
+
+        array[0, 0] = 9
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3]]), self.listArrayContainer.getData()))
+
+    def testGivenNoNewData_whenGettingDataAgain_shouldReturnTheSameData(self):
+        self.listArrayContainer.append([1, 2, 3])
+        self.listArrayContainer.append(np.array([[4, 5, 6]]))
+        self.listArrayContainer.append(np.array([[7, 8, 9]]))
+
+        self.assertIs(self.listArrayContainer.getData(), self.listArrayContainer.getData())
+
+    def testGivenNewData_whenGettingDataAgain_shouldIncludeTheNewData(self):
+        self.listArrayContainer.append(np.array([[1, 2, 3]]))
+        self.listArrayContainer.getData()
+
+        self.listArrayContainer.append(np.array([[4, 5, 6]]))
+
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6]]), self.listArrayContainer.getData()))
+
+    def testShouldBePicklable(self):
+        self.listArrayContainer.append([1, 2, 3])
+        self.listArrayContainer.append(np.array([[4, 5, 6]]))
+        self.listArrayContainer.append(np.array([[7, 8, 9]]))
+
+        container = pickle.loads(pickle.dumps(self.listArrayContainer))
+
+        self.assertEqual(3, len(container))
+        self.assertTrue(np.array_equal(self.listArrayContainer.getData(), container.getData()))
+
+    def testGivenStateOfAContainerWithASingleArray_whenUnpickling_shouldHaveItsData(self):
+        container = ListArrayContainer.__new__(ListArrayContainer)
+        container.__setstate__({"_list": [[1, 2, 3]], "_array": np.array([[4, 5, 6]])})
+
+        self.assertEqual(2, len(container))
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6]]), container.getData()))
+        container.append(np.array([[7, 8, 9]]))
+        self.assertEqual(3, len(container))
+
+    def testWhenIteratingChunksFromARow_shouldYieldTheDataFromThisRow(self):
+        self.listArrayContainer.append([1, 2, 3])
+        self.listArrayContainer.append(np.array([[4, 5, 6], [7, 8, 9]]))
+        self.listArrayContainer.append(np.array([[10, 11, 12]]))
+
+        chunks = list(self.listArrayContainer.iterChunks(2))
+
+        self.assertEqual(2, len(chunks))
+        self.assertTrue(np.array_equal([[7, 8, 9], [10, 11, 12]], np.concatenate(chunks)))
+
+    def testWhenAppendingListAfterArray_shouldKeepTheRowsInTheOrderTheyWereAppended(self):
+        self.listArrayContainer.append([1, 2, 3])
+        self.listArrayContainer.append(np.array([[4, 5, 6]]))
+        self.listArrayContainer.append([7, 8, 9])
+
+        self.assertTrue(np.array_equal([[1, 2, 3], [4, 5, 6], [7, 8, 9]], self.listArrayContainer.getData()))
+
+    def testShouldCountTheBytesOfTheRowsInMemoryButNotTheMemoryMappedBlocks(self):
+        self.listArrayContainer.append([1, 2, 3])
+        self.listArrayContainer.append(np.ones((2, 3), dtype=np.float32))
+        with tempfile.TemporaryDirectory() as tempDir:
+            diskContainer = DiskArrayContainer(os.path.join(tempDir, "data.npy"))
+            diskContainer.append(np.ones((10, 3)))
+            self.listArrayContainer.extend(diskContainer)
+
+            self.assertEqual(3 * 8 + 6 * 4, self.listArrayContainer.nBytes)
+            self.listArrayContainer = diskContainer = None
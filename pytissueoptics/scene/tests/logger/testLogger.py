@@ -6,6 +6,7 @@ import numpy as np
 
 from pytissueoptics.scene.geometry import Vector
 from pytissueoptics.scene.logger import InteractionKey, Logger
+from pytissueoptics.scene.logger.listArrayContainer import ListArrayContainer
 
 
 class TestLogger(unittest.TestCase):
@@ -55,6 +56,32 @@ class TestLogger(unittest.TestCase):
         self.assertEqual(2, len(logger.getRawDataPoints()))
         self.assertTrue(np.array_equal([1, 1, 0, 0], logger.getRawDataPoints()[-1]))
 
+    def testWhenLogDataPointArrayWithPhotonIDs_shouldKeepTheExactPhotonIDs(self):
+        logger = Logger()
+        photonIDs = np.array([2**40 + 1, 2**40 + 2], dtype=np.uint64)
+        logger.logDataPointArray(
+            np.array([[2, 0, 0, 0], [1, 1, 0, 0]], dtype=np.float32), self.INTERACTION_KEY, photonIDs
+        )
+
+        self.assertEqual(np.uint64, logger.getRawPhotonIDs().dtype)
+        self.assertEqual([2**40 + 1, 2**40 + 2], logger.getRawPhotonIDs().tolist())
+        self.assertTrue(np.array_equal([1, 1, 0, 0, 2**40 + 2], logger.getRawDataPoints()[-1]))
+
+    def testWhenLogDataPointsWithPhotonIDColumn_shouldStoreThePhotonIDsSeparately(self):
+        logger = Logger()
+        logger.logDataPointArray(np.array([[2, 0, 0, 0, 7]]), self.INTERACTION_KEY)
+        logger.logDataPoint(1, Vector(1, 0, 0), self.INTERACTION_KEY, ID=8)
+
+        self.assertEqual([7, 8], logger.getRawPhotonIDs().tolist())
+        self.assertTrue(np.array_equal([[2, 0, 0, 0, 7], [1, 1, 0, 0, 8]], logger.getRawDataPoints()))
+
+    def testGivenDataPointsWithoutPhotonIDs_whenLogDataPointsWithPhotonIDs_shouldRaiseException(self):
+        logger = Logger()
+        logger.logDataPointArray(np.array([[2, 0, 0, 0]]), self.INTERACTION_KEY)
+
+        with self.assertRaises(AssertionError):
+            logger.logDataPointArray(np.array([[2, 0, 0, 0]]), self.INTERACTION_KEY, photonIDs=[1])
+
     def testWhenLogNewSegment_shouldAddSegmentToTheLoggedSegments(self):
         logger = Logger()
         logger.logSegment(Vector(0, 0, 0), Vector(0, 0, 1), self.INTERACTION_KEY)
@@ -267,3 +294,47 @@ class TestLogger(unittest.TestCase):
 
             self.assertTrue(np.array_equal(previousLogger.getPoints(), logger.getPoints()))
             self.assertEqual(previousLogger.info, logger.info)
+
+    def testGivenStorageDirectory_shouldStoreTheDataOfEachKeyInAFileOfThisDirectory(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            logger = Logger(storageDirectory=tempDir)
+            logger.logDataPointArray(np.array([[1, 0, 0, 0], [2, 0, 0, 0]]), self.INTERACTION_KEY)
+            logger.logDataPoint(3, Vector(0, 0, 0), InteractionKey(self.SOLID_LABEL))
+
+            self.assertEqual(2, len(os.listdir(tempDir)))
+            data = logger.getRawDataPoints(self.INTERACTION_KEY)
+            self.assertIsInstance(data, np.memmap)
+            self.assertTrue(np.array_equal([[1, 0, 0, 0], [2, 0, 0, 0]], data))
+            self.assertEqual(3, logger.nDataPoints)
+            self.assertEqual(3, len(logger.getRawDataPoints()))
+            del data
+
+    def testGivenALoggerWithStorageDirectoryPreviouslySaved_whenLoadAndLogMoreData_shouldKeepThePreviousData(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            previousLogger = Logger(storageDirectory=tempDir)
+            previousLogger.logPoint(Vector(1, 0, 0), self.INTERACTION_KEY)
+            filePath = os.path.join(tempDir, "test.log")
+            previousLogger.save(filePath)
+
+            logger = Logger(filePath, storageDirectory=tempDir)
+            logger.logPoint(Vector(2, 0, 0), InteractionKey(self.SOLID_LABEL))
+
+            self.assertTrue(np.array_equal([[1, 0, 0]], logger.getPoints(self.INTERACTION_KEY)))
+            self.assertTrue(np.array_equal([[2, 0, 0]], logger.getPoints(InteractionKey(self.SOLID_LABEL))))
+
+    def testGivenALoggerSavedWithPhotonIDsInTheDataPoints_whenLoad_shouldMoveThePhotonIDsToTheirOwnContainer(self):
+        previousLogger = Logger()
+        previousLogger.logDataPointArray(np.array([[2, 0, 0, 0, 7], [1, 1, 0, 0, 8]]), self.INTERACTION_KEY)
+        interactionData = previousLogger._data[self.INTERACTION_KEY]
+        interactionData.dataPoints = ListArrayContainer()
+        interactionData.dataPoints.append(np.array([[2, 0, 0, 0, 7], [1, 1, 0, 0, 8]]))
+        interactionData.photonIDs = None
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filePath = os.path.join(tempDir, "test.log")
+            previousLogger.save(filePath)
+
+            logger = Logger(filePath)
+
+            self.assertEqual([7, 8], logger.getRawPhotonIDs().tolist())
+            self.assertTrue(np.array_equal([[2, 0, 0, 0, 7], [1, 1, 0, 0, 8]], logger.getRawDataPoints()))
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pytissueoptics.scene.geometry import Vector
+from pytissueoptics.scene.logger import InteractionKey, Logger
+from pytissueoptics.scene.logger.loggerArchive import FORMAT_VERSION, LazyArrayContainer, LoggerArchive
+
+
+class TestLoggerArchive(unittest.TestCase):
+    KEY = InteractionKey("mySolid", "front")
+    OTHER_KEY = InteractionKey("mySolid")
+    KEY2 = InteractionKey("otherSolid")
+
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.logger = Logger()
+        self.logger.logDataPointArray(np.array([[1, 2, 3, 4], [5, 6, 7, 8]], dtype=np.float32), self.KEY)
+        self.logger.logDataPoint(9, Vector(0, 0, 0), self.OTHER_KEY)
+        self.logger.logPoint(Vector(1, 1, 1), self.OTHER_KEY)
+        self.logger.info["photonCount"] = 10
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.tempDir.name, name)
+
+    def testShouldOnlyUseTheArchiveFormatForDirectoryAndZipExtensions(self):
+        self.assertTrue(LoggerArchive.isArchive("results.ptlog"))
+        self.assertTrue(LoggerArchive.isArchive("results.zip"))
+        self.assertFalse(LoggerArchive.isArchive("results.log"))
+
+    def testWhenSaveToDirectory_shouldWriteAVersionedManifestWithTheKeysAndTheirCounts(self):
+        self.logger.save(self._path("test.ptlog"))
+
+        with open(self._path(os.path.join("test.ptlog", "manifest.json"))) as file:
+            manifest = json.load(file)
+        self.assertEqual(FORMAT_VERSION, manifest["version"])
+        self.assertEqual({"photonCount": 10}, manifest["info"])
+        keyEntry = manifest["keys"][0]
+        self.assertEqual(["mySolid", "front"], [keyEntry["solidLabel"], keyEntry["surfaceLabel"]])
+        self.assertEqual(2, keyEntry["dataPoints"]["count"])
+        self.assertEqual(4, keyEntry["dataPoints"]["width"])
+
+    def testGivenDirectoryArchive_whenLoad_shouldReadTheArraysOfTheKeysOnlyWhenAccessed(self):
+        self.logger.save(self._path("test.ptlog"))
+
+        logger = Logger(self._path("test.ptlog"))
+
+        container = logger._data[self.KEY].dataPoints
+        self.assertIsInstance(container, LazyArrayContainer)
+        self.assertEqual(3, logger.nDataPoints)
+        self.assertIsNotNone(container._archive)
+        data = logger.getRawDataPoints(self.KEY)
+        self.assertIsNone(container._archive)
+        self.assertIsInstance(data, np.memmap)
+        self.assertTrue(np.array_equal(self.logger.getRawDataPoints(self.KEY), data))
+        self.assertEqual(np.float32, data.dtype)
+
+    def testGivenCompressedZipArchive_whenLoad_shouldHaveTheSameData(self):
+        self.logger.save(self._path("test.zip"), compress=True)
+
+        logger = Logger(self._path("test.zip"))
+
+        self.assertEqual(self.logger.info, logger.info)
+        self.assertEqual(self.logger.getSeenSurfaceLabels("mySolid"), logger.getSeenSurfaceLabels("mySolid"))
+        for key in [self.KEY, self.OTHER_KEY]:
+            self.assertTrue(np.array_equal(self.logger.getRawDataPoints(key), logger.getRawDataPoints(key)))
+        self.assertTrue(np.array_equal(self.logger.getPoints(self.OTHER_KEY), logger.getPoints(self.OTHER_KEY)))
+
+    def testGivenPhotonIDs_whenSaveAndLoad_shouldKeepTheExactPhotonIDs(self):
+        photonIDs = np.array([2**40 + 1, 2**40 + 2], dtype=np.uint64)
+        self.logger.logDataPointArray(np.array([[1, 0, 0, 0], [2, 0, 0, 0]], dtype=np.float32), self.KEY2, photonIDs)
+        self.logger.save(self._path("test.ptlog"))
+
+        logger = Logger(self._path("test.ptlog"))
+
+        self.assertEqual(np.uint64, logger.getRawPhotonIDs(self.KEY2).dtype)
+        self.assertEqual(photonIDs.tolist(), logger.getRawPhotonIDs(self.KEY2).tolist())
+        self.assertIsNone(logger.getRawPhotonIDs(self.KEY))
+
+    def testGivenLoadedArchive_whenLogMoreDataAndSaveToTheSameArchive_shouldHaveAllTheData(self):
+        self.logger.save(self._path("test.ptlog"))
+        logger = Logger(self._path("test.ptlog"))
+
+        logger.logDataPointArray(np.array([[0, 0, 0, 0]], dtype=np.float32), self.KEY)
+        logger.save()
+
+        self.assertEqual(3, len(Logger(self._path("test.ptlog")).getRawDataPoints(self.KEY)))
+
+    def testGivenArchiveWithNewerVersion_whenLoad_shouldRaiseError(self):
+        self.logger.save(self._path("test.ptlog"))
+        manifestPath = self._path(os.path.join("test.ptlog", "manifest.json"))
+        with open(manifestPath) as file:
+            manifest = json.load(file)
+        manifest["version"] = FORMAT_VERSION + 1
+        with open(manifestPath, "w") as file:
+            json.dump(manifest, file)
+
+        with self.assertRaises(ValueError):
+            Logger(self._path("test.ptlog"))
+
+    def testWhenSaveCompressedDirectory_shouldRaiseError(self):
+        with self.assertRaises(AssertionError):
+            self.logger.save(self._path("test.ptlog"), compress=True)